@@ -20,7 +20,11 @@ from .base_types import (
     Wei,
     ZeroPaddedHexNumber,
 )
-from .base_types_json import to_json
+from .base_types_json import (
+    canonical_json_chunks,
+    indented_json_chunks,
+    to_json,
+)
 from .composite_types import (
     AccessList,
     Account,
@@ -86,6 +90,8 @@ __all__ = (
     "TestPrivateKey2",
     "Wei",
     "ZeroPaddedHexNumber",
+    "canonical_json_chunks",
+    "indented_json_chunks",
     "to_bytes",
     "to_hex",
     "to_json",
@@ -1,6 +1,8 @@
 """JSON encoding and decoding for Ethereum types."""
 
-from typing import Any, AnyStr, List
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Any, AnyStr, Iterable, Iterator, List
 
 from .pydantic import EthereumTestBaseModel, EthereumTestRootModel
 
@@ -24,3 +26,132 @@ def to_json(
         )
     else:
         return str(input_model)
+
+
+JSON_CHUNK_SIZE = 1 << 20
+JSON_WALK_ITEMS = 64
+JSON_CHUNK_ITEMS = 1024
+
+
+def _needs_walk(value: Any) -> bool:
+    """
+    Whether `value` is an object or array of over `JSON_WALK_ITEMS` items, or
+    holds one, and so is walked rather than encoded whole.
+    """
+    if isinstance(value, dict):
+        children: Iterable[Any] = value.values()
+    elif isinstance(value, list):
+        children = value
+    else:
+        return False
+
+    large = len(value) > JSON_WALK_ITEMS
+    if not large:
+        for child in children:
+            if (
+                isinstance(child, (dict, list))
+                and len(child) > JSON_WALK_ITEMS
+            ):
+                large = True
+                break
+    # Objects with keys that aren't strings are left to `json`.
+    return large and (
+        not isinstance(value, dict)
+        or all(isinstance(key, str) for key in value)
+    )
+
+
+def _iter_json(
+    value: Any, encoder: json.JSONEncoder, level: int
+) -> Iterator[str]:
+    """
+    Encode `value` as `encoder` does, in pieces.
+
+    Objects and arrays that need it are walked here. Runs of up to
+    `JSON_CHUNK_ITEMS` of their other items are encoded together by
+    `encoder`, as an object or array whose brackets are then dropped, which
+    is much faster than encoding them one by one.
+    """
+    indent = encoder.indent
+    assert indent is None or isinstance(indent, str)
+    if indent is None:
+        newline = closing = ""
+    else:
+        newline = "\n" + indent * (level + 1)
+        closing = "\n" + indent * level
+
+    def encode(value: Any) -> str:
+        text = encoder.encode(value)
+        # JSON strings can't hold raw newlines, so every newline is one of
+        # the indentation's.
+        return text.replace("\n", closing) if level and closing else text
+
+    if not _needs_walk(value):
+        yield encode(value)
+        return
+
+    is_dict = isinstance(value, dict)
+    items: List[Any]
+    if not is_dict:
+        items = value
+    elif encoder.sort_keys:
+        items = sorted(value.items())
+    else:
+        items = list(value.items())
+
+    yield ("{" if is_dict else "[") + newline
+    separator = ""
+    run: List[Any] = []
+    for index, item in enumerate(items):
+        child = item[1] if is_dict else item
+        walk = _needs_walk(child)
+        if not walk:
+            run.append(item)
+        if run and (
+            walk or len(run) == JSON_CHUNK_ITEMS or index == len(items) - 1
+        ):
+            text = encode(dict(run) if is_dict else run)
+            yield separator + text[1 + len(newline) : -1 - len(closing)]
+            separator = encoder.item_separator + newline
+            run.clear()
+        if walk:
+            yield separator
+            if is_dict:
+                yield encode_basestring_ascii(item[0]) + encoder.key_separator
+            yield from _iter_json(child, encoder, level + 1)
+            separator = encoder.item_separator + newline
+    yield closing + ("}" if is_dict else "]")
+
+
+def _join_chunks(pieces: Iterator[str]) -> Iterator[str]:
+    """Join `pieces` into chunks of about `JSON_CHUNK_SIZE` characters."""
+    buffer: List[str] = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= JSON_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def canonical_json_chunks(value: Any) -> Iterator[str]:
+    """
+    Encode `value` as `json.dumps(value, sort_keys=True,
+    separators=(",", ":"))` does, in chunks, to be hashed without holding the
+    whole encoding.
+    """
+    encoder = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
+    return _join_chunks(_iter_json(value, encoder, 0))
+
+
+def indented_json_chunks(value: Any, indent: int = 4) -> Iterator[str]:
+    """
+    Encode `value` as `json.dumps(value, indent=indent)` does, in chunks, to
+    be written without holding the whole encoding.
+    """
+    encoder = json.JSONEncoder(indent=" " * indent)
+    return _join_chunks(_iter_json(value, encoder, 0))
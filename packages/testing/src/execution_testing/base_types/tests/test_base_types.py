@@ -1,11 +1,17 @@
 """Test suite for `ethereum_test` module base types."""
 
+from json import dumps
 from typing import Any, Dict
 
 import pytest
 
+from .. import base_types_json
 from ..base_types import Address, Hash, Wei
-from ..base_types_json import to_json
+from ..base_types_json import (
+    canonical_json_chunks,
+    indented_json_chunks,
+    to_json,
+)
 from ..composite_types import AccessList
 
 
@@ -290,3 +296,41 @@ class TestPydanticModelConversion:
             )
         model_type = type(model_instance)
         assert model_type(**json) == model_instance
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        pytest.param({}, id="empty"),
+        pytest.param("0x\u00e9\n", id="string"),
+        pytest.param(
+            {
+                "pre": {
+                    f"0x{i:040x}": {
+                        "nonce": i,
+                        "storage": {f"0x{j:x}": "0x01" for j in range(i)},
+                    }
+                    for i in range(100, 0, -1)
+                },
+                "post": [[i, None, True, 1.5] for i in range(100)],
+                "empty": {"list": [], "dict": {}},
+                "\u00e9": [{1: "int key"}, {"b": [], "a": {}}],
+            },
+            id="nested",
+        ),
+    ],
+)
+@pytest.mark.parametrize("chunk_items", [1, 2, 1024])
+def test_json_chunks(
+    monkeypatch: pytest.MonkeyPatch, value: Any, chunk_items: int
+) -> None:
+    """
+    Test that the chunked encoders give the same JSON as `json.dumps`, however
+    they split the walk into runs and chunks.
+    """
+    monkeypatch.setattr(base_types_json, "JSON_WALK_ITEMS", 2)
+    monkeypatch.setattr(base_types_json, "JSON_CHUNK_ITEMS", chunk_items)
+    monkeypatch.setattr(base_types_json, "JSON_CHUNK_SIZE", chunk_items)
+    canonical = dumps(value, sort_keys=True, separators=(",", ":"))
+    assert "".join(canonical_json_chunks(value)) == canonical
+    assert "".join(indented_json_chunks(value)) == dumps(value, indent=4)
@@ -0,0 +1,132 @@
+"""
+Reuse and parallelize values computed from the files of a fixture directory.
+
+Hashing or indexing a directory of fixtures reads and parses every file,
+which takes minutes for a release. `map_files()` computes a value from each
+file in a pool of processes, and a `FileCache` keeps the values in the
+directory's `.meta` folder, so that after a small refill only the files whose
+size or modification time changed are read again.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+FILE_CACHE_NAME = "file_cache.json"
+FILE_CACHE_VERSION = 1
+
+# Fewer files than this per worker aren't worth starting the processes for.
+MIN_FILES_PER_WORKER = 8
+
+
+class FileCache:
+    """
+    Values computed from the files under `root`, each kept while its file has
+    the same size and modification time.
+
+    The cache is stored in `<root>/.meta/file_cache.json`. Only the files
+    looked up since it was loaded are saved back.
+    """
+
+    root: Path
+    path: Path
+    _files: Dict[str, Dict[str, Any]]
+    _used: Set[str]
+
+    def __init__(self, root: Path) -> None:
+        """Load the cache of `root`, or start an empty one."""
+        self.root = root
+        self.path = root / ".meta" / FILE_CACHE_NAME
+        self._files = {}
+        self._used = set()
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        if (
+            isinstance(data, dict)
+            and data.get("version") == FILE_CACHE_VERSION
+            and isinstance(data.get("files"), dict)
+        ):
+            self._files = data["files"]
+
+    def values(self, file_path: Path) -> Dict[str, Any]:
+        """
+        Get the values cached for `file_path`, which are dropped first if
+        the file has changed. Values stored in the returned dictionary are
+        saved with the file's current size and modification time.
+        """
+        key = file_path.relative_to(self.root).as_posix()
+        stat = file_path.stat()
+        record = self._files.get(key)
+        if (
+            record is None
+            or record.get("size") != stat.st_size
+            or record.get("mtime_ns") != stat.st_mtime_ns
+        ):
+            record = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "values": {},
+            }
+            self._files[key] = record
+        self._used.add(key)
+        return record["values"]
+
+    def save(self) -> None:
+        """Write the values of the files looked up to the cache file."""
+        files = {key: self._files[key] for key in sorted(self._used)}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.path.with_suffix(".tmp")
+        temporary_path.write_text(
+            json.dumps({"version": FILE_CACHE_VERSION, "files": files})
+        )
+        os.replace(temporary_path, self.path)
+
+
+def map_files(
+    function: Callable[[Path], Any],
+    file_paths: List[Path],
+    name: str,
+    *,
+    workers: int = 1,
+    cache: Optional[FileCache] = None,
+) -> Iterator[Any]:
+    """
+    Yield `function(file_path)` for each of `file_paths`, in order.
+
+    Values are cached in `cache` under `name`, and must be JSON serializable.
+    The values that aren't cached are computed in up to `workers` processes,
+    so `function` must be picklable.
+    """
+    values = [
+        cache.values(file_path) if cache is not None else {}
+        for file_path in file_paths
+    ]
+    missing = [
+        file_path
+        for file_path, file_values in zip(file_paths, values, strict=True)
+        if name not in file_values
+    ]
+
+    workers = min(workers, len(missing) // MIN_FILES_PER_WORKER)
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    computed: Iterator[Any]
+    try:
+        if executor is None:
+            computed = map(function, missing)
+        else:
+            computed = executor.map(
+                function,
+                missing,
+                chunksize=max(1, min(64, len(missing) // (4 * workers))),
+            )
+        for file_values in values:
+            if name not in file_values:
+                file_values[name] = next(computed)
+            yield file_values[name]
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
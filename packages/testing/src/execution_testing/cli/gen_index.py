@@ -5,8 +5,9 @@ Generate an index file of all the json fixtures in the specified directory.
 import datetime
 import json
 import os
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional
 
 import click
 import rich
@@ -20,12 +21,10 @@ from rich.progress import (
 )
 
 from execution_testing.base_types import HexNumber
-from execution_testing.fixtures.consume import (
-    IndexFile,
-    TestCaseIndexFile,
-)
+from execution_testing.fixtures.consume import IndexFile
 from execution_testing.fixtures.file import Fixtures
 
+from .file_cache import FileCache, map_files
 from .hasher import HashableItem
 
 # Files and directories to exclude from index generation
@@ -44,6 +43,42 @@ def count_json_files_exclude_index(start_path: Path) -> int:
     return json_file_count
 
 
+def read_index_entries(
+    file_path: Path, input_path: Path
+) -> List[Dict[str, Any]]:
+    """
+    Read the index entries of the fixtures in a JSON fixture file, as raw
+    dicts of `TestCaseIndexFile` fields.
+    """
+    try:
+        fixtures: Fixtures = Fixtures.model_validate_json(
+            file_path.read_text()
+        )
+    except Exception as e:
+        rich.print(f"[red]Error loading fixtures from {file_path}[/red]")
+        raise e
+
+    relative_file_path = (
+        Path(file_path).absolute().relative_to(Path(input_path).absolute())
+    )
+    entries = []
+    for fixture_name, fixture in fixtures.items():
+        fixture_fork = fixture.get_fork()
+        entries.append(
+            {
+                "id": fixture_name,
+                "json_path": str(relative_file_path),
+                # eest uses hash; ethereum/tests uses generatedTestHash
+                "fixture_hash": fixture.info.get("hash")
+                or f"0x{fixture.info.get('generatedTestHash')}",
+                "fork": fixture_fork.name() if fixture_fork else None,
+                "format": fixture.format_name,
+                "pre_hash": getattr(fixture, "pre_hash", None),
+            }
+        )
+    return entries
+
+
 @click.command(
     help=(
         "Generate an index file of all the json fixtures in the specified "
@@ -79,8 +114,29 @@ def count_json_files_exclude_index(start_path: Path) -> int:
     expose_value=True,
     help="Force re-generation of the index file, even if it already exists.",
 )
+@click.option(
+    "--workers",
+    "-n",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of processes reading the fixture files. [default: CPUs]",
+)
+@click.option(
+    "--no-cache",
+    "no_cache",
+    is_flag=True,
+    default=False,
+    help=(
+        "Don't use .meta/file_cache.json to skip the fixture files that "
+        "haven't changed since the last run."
+    ),
+)
 def generate_fixtures_index_cli(
-    input_dir: str, quiet_mode: bool, force_flag: bool
+    input_dir: str,
+    quiet_mode: bool,
+    force_flag: bool,
+    workers: Optional[int],
+    no_cache: bool,
 ) -> None:
     """
     CLI wrapper to an index of all the fixtures in the specified directory.
@@ -89,6 +145,8 @@ def generate_fixtures_index_cli(
         Path(input_dir),
         quiet_mode=quiet_mode,
         force_flag=force_flag,
+        workers=workers,
+        use_cache=not no_cache,
     )
 
 
@@ -96,10 +154,19 @@ def generate_fixtures_index(
     input_path: Path,
     quiet_mode: bool = False,
     force_flag: bool = False,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
 ) -> None:
     """
     Generate an index file (index.json) of all the fixtures in specified dir.
+
+    The fixture files are read in `workers` processes, by default one per
+    CPU. With `use_cache`, what was read from each file is kept in
+    `.meta/file_cache.json`, and only the files that changed since are read
+    again.
     """
+    if workers is None:
+        workers = os.cpu_count() or 1
     total_files = 0
     if not os.path.isdir(input_path):  # caught by click if using via cli
         raise FileNotFoundError(f"The directory {input_path} does not exist.")
@@ -110,8 +177,11 @@ def generate_fixtures_index(
     output_file.parent.mkdir(
         parents=True, exist_ok=True
     )  # no meta dir in <=v3.0.0
+    cache = FileCache(input_path) if use_cache else None
     try:
-        root_hash = HashableItem.from_folder(folder_path=input_path).hash()
+        root_hash = HashableItem.from_folder(
+            folder_path=input_path, workers=workers, cache=cache
+        ).hash()
     except (KeyError, TypeError):
         root_hash = b""  # just regenerate a new index file
 
@@ -128,6 +198,8 @@ def generate_fixtures_index(
                         f"Index file [bold cyan]{output_file}[/] "
                         "is up-to-date."
                     )
+                if cache is not None:
+                    cache.save()
                 return
         except Exception as e:
             rich.print(f"Ignoring exception {e}")
@@ -159,41 +231,28 @@ def generate_fixtures_index(
         )
         forks = set()
         fixture_formats = set()
-        test_cases: List[TestCaseIndexFile] = []
-        for file in input_path.rglob("*.json"):
-            if file.name in INDEX_EXCLUDED_FILES or any(
+        test_cases: List[Dict[str, Any]] = []
+        files = [
+            file
+            for file in input_path.rglob("*.json")
+            if file.name not in INDEX_EXCLUDED_FILES
+            and not any(
                 part in INDEX_EXCLUDED_PATH_PARTS for part in file.parts
-            ):
-                continue
-
-            try:
-                fixtures: Fixtures = Fixtures.model_validate_json(
-                    file.read_text()
-                )
-            except Exception as e:
-                rich.print(f"[red]Error loading fixtures from {file}[/red]")
-                raise e
-
-            relative_file_path = (
-                Path(file).absolute().relative_to(Path(input_path).absolute())
             )
-            for fixture_name, fixture in fixtures.items():
-                fixture_fork = fixture.get_fork()
-                test_cases.append(
-                    TestCaseIndexFile(
-                        id=fixture_name,
-                        json_path=relative_file_path,
-                        # eest uses hash; ethereum/tests uses generatedTestHash
-                        fixture_hash=fixture.info.get("hash")
-                        or f"0x{fixture.info.get('generatedTestHash')}",
-                        fork=fixture_fork,
-                        format=fixture.__class__,
-                        pre_hash=getattr(fixture, "pre_hash", None),
-                    )
-                )
-                if fixture_fork:
-                    forks.add(fixture_fork)
-                fixture_formats.add(fixture.format_name)
+        ]
+        all_entries = map_files(
+            partial(read_index_entries, input_path=input_path),
+            files,
+            "index_entries",
+            workers=workers,
+            cache=cache,
+        )
+        for file, entries in zip(files, all_entries, strict=True):
+            for entry in entries:
+                test_cases.append(entry)
+                if entry["fork"]:
+                    forks.add(entry["fork"])
+                fixture_formats.add(entry["format"])
 
             display_filename = file.name
             if len(display_filename) > filename_display_width:
@@ -213,17 +272,21 @@ def generate_fixtures_index(
             filename="Indexing complete 🦄".ljust(filename_display_width),
         )
 
-    index = IndexFile(
-        test_cases=test_cases,
-        root_hash=root_hash,
-        created_at=datetime.datetime.now(),
-        test_count=len(test_cases),
-        forks=list(forks),
-        fixture_formats=list(fixture_formats),
+    index = IndexFile.model_validate(
+        {
+            "test_cases": test_cases,
+            "root_hash": root_hash,
+            "created_at": datetime.datetime.now(),
+            "test_count": len(test_cases),
+            "forks": list(forks),
+            "fixture_formats": list(fixture_formats),
+        }
     )
 
     with open(output_file, "w") as f:
         f.write(index.model_dump_json(exclude_none=False, indent=2))
+    if cache is not None:
+        cache.save()
 
 
 def merge_partial_indexes(output_dir: Path, quiet_mode: bool = False) -> None:
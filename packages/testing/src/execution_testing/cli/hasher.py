@@ -4,20 +4,62 @@ from __future__ import annotations
 
 import hashlib
 import json
+import os
 import sys
 from dataclasses import dataclass, field
 from enum import IntEnum, auto
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, TypeVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 import click
 from rich.console import Console
 from rich.markup import escape as rich_escape
 
+from .file_cache import FileCache, map_files
+
 if TYPE_CHECKING:
     from execution_testing.fixtures.consume import TestCaseIndexFile
 
 
+def read_test_hashes(file_path: Path) -> Dict[str, str]:
+    """Read the hash of each test in a JSON fixture file."""
+    test_hashes = {}
+    with file_path.open("r") as f:
+        data = json.load(f)
+    for key, item in sorted(data.items()):
+        if not isinstance(item, dict):
+            raise TypeError(f"Expected dict, got {type(item)} for {key}")
+        if "_info" not in item:
+            raise KeyError(
+                f"Expected '_info' in {key}, json file: {file_path.name}"
+            )
+
+        # EEST uses 'hash'; ethereum/tests use 'generatedTestHash'
+        hash_value = item["_info"].get("hash") or item["_info"].get(
+            "generatedTestHash"
+        )
+        if hash_value is None:
+            raise KeyError(f"Expected 'hash' or 'generatedTestHash' in {key}")
+
+        if not isinstance(hash_value, str):
+            raise TypeError(
+                f"Expected hash to be a string in {key}, "
+                f"got {type(hash_value)}"
+            )
+
+        test_hashes[key] = hash_value
+    return test_hashes
+
+
 class HashableItemType(IntEnum):
     """Represents the type of a hashable item."""
 
@@ -88,66 +130,90 @@ class HashableItem:
 
         return lines
 
+    @classmethod
+    def from_test_hashes(
+        cls, test_hashes: Dict[str, str], *, file_name: str, parents: List[str]
+    ) -> "HashableItem":
+        """
+        Create a hashable item from the test hashes read from a JSON file.
+        """
+        items = {
+            key: cls(
+                type=HashableItemType.TEST,
+                root=bytes.fromhex(hash_value[2:]),
+                parents=parents + [file_name],
+            )
+            for key, hash_value in test_hashes.items()
+        }
+        return cls(type=HashableItemType.FILE, items=items, parents=parents)
+
     @classmethod
     def from_json_file(
         cls, *, file_path: Path, parents: List[str]
     ) -> "HashableItem":
         """Create a hashable item from a JSON file."""
-        items = {}
-        with file_path.open("r") as f:
-            data = json.load(f)
-        for key, item in sorted(data.items()):
-            if not isinstance(item, dict):
-                raise TypeError(f"Expected dict, got {type(item)} for {key}")
-            if "_info" not in item:
-                raise KeyError(
-                    f"Expected '_info' in {key}, json file: {file_path.name}"
-                )
-
-            # EEST uses 'hash'; ethereum/tests use 'generatedTestHash'
-            hash_value = item["_info"].get("hash") or item["_info"].get(
-                "generatedTestHash"
-            )
-            if hash_value is None:
-                raise KeyError(
-                    f"Expected 'hash' or 'generatedTestHash' in {key}"
-                )
+        return cls.from_test_hashes(
+            read_test_hashes(file_path),
+            file_name=file_path.name,
+            parents=parents,
+        )
 
-            if not isinstance(hash_value, str):
-                raise TypeError(
-                    f"Expected hash to be a string in {key}, "
-                    f"got {type(hash_value)}"
-                )
+    @classmethod
+    def from_folder(
+        cls,
+        *,
+        folder_path: Path,
+        parents: Optional[List[str]] = None,
+        workers: int = 1,
+        cache: Optional[FileCache] = None,
+    ) -> "HashableItem":
+        """
+        Create a hashable item from a folder.
 
-            item_hash_bytes = bytes.fromhex(hash_value[2:])
-            items[key] = cls(
-                type=HashableItemType.TEST,
-                root=item_hash_bytes,
-                parents=parents + [file_path.name],
+        The JSON files are read in up to `workers` processes, and their test
+        hashes are looked up in and added to `cache`, if given.
+        """
+        json_files: List[Tuple[Path, List[str], Dict[str, HashableItem]]] = []
+        folder = cls._scan_folder(folder_path, parents or [], json_files)
+        all_test_hashes = map_files(
+            read_test_hashes,
+            [file_path for file_path, _, _ in json_files],
+            "test_hashes",
+            workers=workers,
+            cache=cache,
+        )
+        for (file_path, file_parents, items), test_hashes in zip(
+            json_files, all_test_hashes, strict=True
+        ):
+            items[file_path.name] = cls.from_test_hashes(
+                test_hashes, file_name=file_path.name, parents=file_parents
             )
-        return cls(type=HashableItemType.FILE, items=items, parents=parents)
+        return folder
 
     @classmethod
-    def from_folder(
-        cls, *, folder_path: Path, parents: Optional[List[str]] = None
+    def _scan_folder(
+        cls,
+        folder_path: Path,
+        parents: List[str],
+        json_files: List[Tuple[Path, List[str], Dict[str, "HashableItem"]]],
     ) -> "HashableItem":
-        """Create a hashable item from a folder."""
-        if parents is None:
-            parents = []
-        items = {}
+        """
+        Create the hashable item of a folder and its sub-folders, and add
+        each JSON file to `json_files`, with its parents and the items of its
+        folder, to be read.
+        """
+        items: Dict[str, HashableItem] = {}
         for file_path in sorted(folder_path.iterdir()):
             if ".meta" in file_path.parts:
                 continue
             if file_path.is_file() and file_path.suffix == ".json":
-                item = cls.from_json_file(
-                    file_path=file_path, parents=parents + [folder_path.name]
+                json_files.append(
+                    (file_path, parents + [folder_path.name], items)
                 )
-                items[file_path.name] = item
             elif file_path.is_dir():
-                item = cls.from_folder(
-                    folder_path=file_path, parents=parents + [folder_path.name]
+                items[file_path.name] = cls._scan_folder(
+                    file_path, parents + [folder_path.name], json_files
                 )
-                items[file_path.name] = item
         return cls(type=HashableItemType.FOLDER, items=items, parents=parents)
 
     @classmethod
@@ -249,6 +315,22 @@ class HashableItem:
         )
 
 
+def hash_folder(
+    folder: Path, *, workers: int = 1, use_cache: bool = False
+) -> HashableItem:
+    """
+    Create the hashable item of a folder, reading its files in up to
+    `workers` processes, and with the folder's file cache if `use_cache`.
+    """
+    cache = FileCache(folder) if use_cache else None
+    item = HashableItem.from_folder(
+        folder_path=folder, workers=workers, cache=cache
+    )
+    if cache is not None:
+        cache.save()
+    return item
+
+
 def render_hash_report(
     folder: Path,
     *,
@@ -257,9 +339,11 @@ def render_hash_report(
     root: bool,
     name_override: Optional[str] = None,
     max_depth: Optional[int] = None,
+    workers: int = 1,
+    use_cache: bool = False,
 ) -> List[str]:
     """Return canonical output lines for a folder."""
-    item = HashableItem.from_folder(folder_path=folder)
+    item = hash_folder(folder, workers=workers, use_cache=use_cache)
     if root:
         return [f"0x{item.hash().hex()}"]
     print_type: Optional[HashableItemType] = None
@@ -374,6 +458,23 @@ F = TypeVar("F", bound=Callable[..., None])
 
 def hash_options(func: F) -> F:
     """Decorator for common hash options."""
+    func = click.option(
+        "--cache",
+        "use_cache",
+        is_flag=True,
+        help=(
+            "Keep the test hashes of each file in the folder's "
+            ".meta/file_cache.json, and only read the files that changed"
+        ),
+    )(func)
+    func = click.option(
+        "--workers",
+        "-n",
+        type=click.IntRange(min=1),
+        default=os.cpu_count() or 1,
+        show_default=True,
+        help="Number of processes reading the files",
+    )(func)
     func = click.option(
         "--root", "-r", is_flag=True, help="Only print hash of root folder"
     )(func)
@@ -405,11 +506,21 @@ def hasher() -> None:
 )
 @hash_options
 def hash_cmd(
-    folder_path_str: str, files: bool, tests: bool, root: bool
+    folder_path_str: str,
+    files: bool,
+    tests: bool,
+    root: bool,
+    workers: int,
+    use_cache: bool,
 ) -> None:
     """Hash folders of JSON fixtures and print their hashes."""
     lines = render_hash_report(
-        Path(folder_path_str), files=files, tests=tests, root=root
+        Path(folder_path_str),
+        files=files,
+        tests=tests,
+        root=root,
+        workers=workers,
+        use_cache=use_cache,
     )
     for line in lines:
         print(line)
@@ -443,11 +554,17 @@ def compare_cmd(
     tests: bool,
     root: bool,
     depth: Optional[int],
+    workers: int,
+    use_cache: bool,
 ) -> None:
     """Compare two fixture directories and show differences."""
     try:
-        left_item = HashableItem.from_folder(folder_path=Path(left_folder))
-        right_item = HashableItem.from_folder(folder_path=Path(right_folder))
+        left_item = hash_folder(
+            Path(left_folder), workers=workers, use_cache=use_cache
+        )
+        right_item = hash_folder(
+            Path(right_folder), workers=workers, use_cache=use_cache
+        )
 
         if root:
             if left_item.hash() == right_item.hash():
@@ -9,9 +9,18 @@ import pytest
 from click.testing import CliRunner
 
 from execution_testing.base_types import HexNumber
-from execution_testing.cli.gen_index import merge_partial_indexes
+from execution_testing.cli import hasher as hasher_module
+from execution_testing.cli.file_cache import FileCache
+from execution_testing.cli.gen_index import (
+    generate_fixtures_index,
+    merge_partial_indexes,
+)
 from execution_testing.cli.hasher import HashableItem, hasher
 from execution_testing.fixtures.consume import IndexFile, TestCaseIndexFile
+from execution_testing.fixtures.transaction import (
+    FixtureResult,
+    TransactionFixture,
+)
 
 HASH_1 = 0x1111111111111111111111111111111111111111111111111111111111111111
 HASH_2 = 0x2222222222222222222222222222222222222222222222222222222222222222
@@ -767,3 +776,91 @@ class TestMergePartialIndexes:
 
             with pytest.raises(Exception, match="No partial indexes found"):
                 merge_partial_indexes(output_dir, quiet_mode=True)
+
+
+class TestParallelAndCachedHashing:
+    """Test hashing and indexing with worker processes and the file cache."""
+
+    @pytest.fixture
+    def fixture_dir(self, tmp_path: Path) -> Path:
+        """Create enough fixture files for the workers to be used."""
+        for i in range(40):
+            fixture = TransactionFixture(
+                transaction=f"0x{i:04x}",
+                result={"Paris": FixtureResult(intrinsic_gas=i)},
+            )
+            fixture.fill_info(
+                "t8n-version",
+                "test_case_description",
+                fixture_source_url="fixture_source_url",
+                ref_spec=None,
+                _info_metadata={},
+            )
+            path = tmp_path / "transaction_tests" / f"group_{i % 3}"
+            path.mkdir(parents=True, exist_ok=True)
+            (path / f"test_{i}.json").write_text(
+                json.dumps({f"test_{i}": fixture.json_dict_with_info()})
+            )
+        return tmp_path
+
+    def test_from_folder(
+        self, fixture_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        The hash is the same with workers and a cache, and cached files are
+        not read again unless they changed.
+        """
+        expected = HashableItem.from_folder(folder_path=fixture_dir).hash()
+
+        cache = FileCache(fixture_dir)
+        item = HashableItem.from_folder(
+            folder_path=fixture_dir, workers=2, cache=cache
+        )
+        assert item.hash() == expected
+        cache.save()
+        assert cache.path.exists()
+
+        read_files: List[str] = []
+        read_test_hashes = hasher_module.read_test_hashes
+
+        def counting_read_test_hashes(file_path: Path) -> dict[str, str]:
+            read_files.append(file_path.name)
+            return read_test_hashes(file_path)
+
+        monkeypatch.setattr(
+            hasher_module, "read_test_hashes", counting_read_test_hashes
+        )
+        changed = fixture_dir / "transaction_tests" / "group_0" / "test_0.json"
+        changed.write_text(
+            _make_json_fixture({"test_0": HASH_1, "test_00": HASH_2})
+        )
+        item = HashableItem.from_folder(
+            folder_path=fixture_dir, cache=FileCache(fixture_dir)
+        )
+        assert read_files == ["test_0.json"]
+        assert item.hash() != expected
+        assert (
+            item.hash()
+            == HashableItem.from_folder(folder_path=fixture_dir).hash()
+        )
+
+    def test_generate_fixtures_index(self, fixture_dir: Path) -> None:
+        """The index is the same with workers and a cache as without."""
+        index_path = fixture_dir / ".meta" / "index.json"
+        indexes = []
+        for workers, use_cache in [(1, False), (2, True), (2, True)]:
+            generate_fixtures_index(
+                fixture_dir,
+                quiet_mode=True,
+                force_flag=True,
+                workers=workers,
+                use_cache=use_cache,
+            )
+            indexes.append(
+                IndexFile.model_validate_json(index_path.read_text())
+            )
+        assert (fixture_dir / ".meta" / "file_cache.json").exists()
+        for index in indexes:
+            assert index.test_count == 40
+            assert index.root_hash == indexes[0].root_hash
+            assert index.test_cases == indexes[0].test_cases
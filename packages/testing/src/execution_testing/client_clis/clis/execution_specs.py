@@ -2,11 +2,10 @@
 Ethereum Specs EVM Transition Tool Interface.
 """
 
-import json
 import tempfile
 from io import StringIO
 from pathlib import Path
-from typing import Any, ClassVar, Dict, Optional
+from typing import Any, ClassVar, Dict, Optional, Sequence
 
 import ethereum
 from ethereum_spec_tools.evm_tools import create_parser
@@ -49,6 +48,7 @@ class ExecutionSpecsTransitionTool(TransitionTool):
         self.trace = trace
         self._info_metadata: Optional[Dict[str, Any]] = {}
         self.fork_cache = ForkCache()
+        self.parser = create_parser()
 
     @override
     def shutdown(self) -> None:
@@ -112,17 +112,10 @@ class ExecutionSpecsTransitionTool(TransitionTool):
                 ]
             )
 
-        parser = create_parser()
-        t8n_options = parser.parse_args(t8n_args)
+        # The input and output are passed as decoded JSON, without a round
+        # trip through text.
+        output_dict = self._run(t8n_args, request_data_json["input"])
 
-        out_stream = StringIO()
-
-        in_stream = StringIO(json.dumps(request_data_json["input"]))
-
-        t8n = T8N(t8n_options, out_stream, in_stream, self.fork_cache)
-        t8n.run()
-
-        output_dict = json.loads(out_stream.getvalue())
         output: TransitionToolOutput = TransitionToolOutput.model_validate(
             output_dict, context={"exception_mapper": self.exception_mapper}
         )
@@ -156,6 +149,18 @@ class ExecutionSpecsTransitionTool(TransitionTool):
 
         return output
 
+    def _run(
+        self, t8n_args: Sequence[str], stdin: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Run the EELS T8N in this process."""
+        t8n_options = self.parser.parse_args(t8n_args)
+
+        t8n = T8N(
+            t8n_options, StringIO(), StringIO(), self.fork_cache, stdin=stdin
+        )
+
+        return t8n.transition()
+
     @classmethod
     def is_installed(cls, binary_path: Optional[Path] = None) -> bool:
         """ExecutionSpecs is always installed."""
@@ -1,7 +1,6 @@
 """Base fixture definitions used to define all fixture types."""
 
 import hashlib
-import json
 from enum import Enum, auto
 from functools import cached_property
 from typing import Annotated, Any, ClassVar, Dict, List, Set, Type, Union
@@ -18,7 +17,11 @@ from pydantic import (
 )
 from pydantic_core.core_schema import ValidatorFunctionWrapHandler
 
-from execution_testing.base_types import CamelModel, ReferenceSpec
+from execution_testing.base_types import (
+    CamelModel,
+    ReferenceSpec,
+    canonical_json_chunks,
+)
 from execution_testing.forks import Fork
 
 
@@ -126,12 +129,14 @@ class BaseFixture(CamelModel):
 
     @cached_property
     def hash(self) -> str:
-        """Returns the hash of the fixture."""
-        json_str = json.dumps(
-            self.json_dict, sort_keys=True, separators=(",", ":")
-        )
-        h = hashlib.sha256(json_str.encode("utf-8")).hexdigest()
-        return f"0x{h}"
+        """
+        Returns the hash of the fixture's canonical JSON, which is fed to the
+        hasher in chunks rather than encoded whole.
+        """
+        h = hashlib.sha256()
+        for chunk in canonical_json_chunks(self.json_dict):
+            h.update(chunk.encode("utf-8"))
+        return f"0x{h.hexdigest()}"
 
     def json_dict_with_info(self, hash_only: bool = False) -> Dict[str, Any]:
         """Return JSON representation of the fixture with the info field."""
@@ -19,7 +19,7 @@ from typing import (
     Tuple,
 )
 
-from execution_testing.base_types import to_json
+from execution_testing.base_types import indented_json_chunks, to_json
 
 from .base import BaseFixture
 from .consume import FixtureConsumer
@@ -306,12 +306,24 @@ class FixtureCollector:
         fixture_id: str,
         fixture: BaseFixture,
     ) -> None:
-        """Stream a single fixture to its partial JSONL file."""
-        value = json.dumps(fixture.json_dict_with_info(), indent=4)
-        line = json.dumps({"k": fixture_id, "v": value}) + "\n"
+        """
+        Stream a single fixture to its partial JSONL file.
+
+        The line is the same as `json.dumps({"k": fixture_id, "v": value})`,
+        where `value` is the fixture encoded with `indent=4`, but the value is
+        encoded and escaped in chunks, so neither is held whole. The fixture
+        is hashed first, which also fails on values that can't be encoded
+        before anything is written.
+        """
+        dict_with_info = fixture.json_dict_with_info()
 
         f = self._get_partial_fixture_file(fixture_path)
-        f.write(line)
+        f.write(f'{{"k": {json.dumps(fixture_id)}, "v": "')
+        for chunk in indented_json_chunks(dict_with_info):
+            # Escaping is per character, so the escaped chunks join into the
+            # escaped value.
+            f.write(json.dumps(chunk)[1:-1])
+        f.write('"}\n')
         f.flush()  # Ensure data is written immediately
 
     def _get_partial_index_file(self) -> "IO[str]":
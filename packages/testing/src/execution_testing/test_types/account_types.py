@@ -1,7 +1,7 @@
 """Account-related types for Ethereum tests."""
 
 import json
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from enum import Enum, auto
 from typing import (
     Any,
@@ -10,14 +10,16 @@ from typing import (
     Iterator,
     List,
     Literal,
-    Optional,
+    Mapping,
     Self,
     Tuple,
 )
 
 from coincurve.keys import PrivateKey
-from ethereum_types.bytes import Bytes20
+from ethereum_rlp import rlp
+from ethereum_types.bytes import Bytes
 from ethereum_types.numeric import U256, Bytes32, Uint
+from pydantic import PrivateAttr
 
 from execution_testing.base_types import (
     Account,
@@ -34,82 +36,86 @@ from execution_testing.base_types.conversions import (
     NumberConvertible,
 )
 
-from .trie import (
-    EMPTY_TRIE_ROOT,
-    FrontierAccount,
-    Trie,
-    root,
-    trie_get,
-    trie_set,
-)
+from .trie import FrontierAccount, IncrementalTrie, encode_account
 from .utils import keccak256
 
-FrontierAddress = Bytes20
-
-
-@dataclass
-class State:
-    """Contains all information that is preserved between transactions."""
 
-    _main_trie: Trie[Bytes20, Optional[FrontierAccount]] = field(
-        default_factory=lambda: Trie(secured=True, default=None)
-    )
-    _storage_tries: Dict[Bytes20, Trie[Bytes32, U256]] = field(
-        default_factory=dict
+def encode_alloc_account(account: Account) -> Bytes:
+    """Encode an account of an allocation for the state trie."""
+    storage = IncrementalTrie(secured=True)
+    if account.storage is not None:
+        for key, value in account.storage.root.items():
+            storage.set(
+                Bytes32(Hash(key)),
+                rlp.encode(U256(value)) if value else b"",
+            )
+    return encode_account(
+        FrontierAccount(
+            nonce=Uint(account.nonce)
+            if account.nonce is not None
+            else Uint(0),
+            balance=(
+                U256(account.balance)
+                if account.balance is not None
+                else U256(0)
+            ),
+            code=account.code if account.code is not None else b"",
+        ),
+        storage.root(),
     )
-    _snapshots: List[
-        Tuple[
-            Trie[Bytes20, Optional[FrontierAccount]],
-            Dict[Bytes20, Trie[Bytes32, U256]],
-        ]
-    ] = field(default_factory=list)
 
 
-def set_account(
-    state: State, address: Bytes20, account: Optional[FrontierAccount]
-) -> None:
+def alloc_account_contents(account: Account) -> Tuple[Any, ...]:
     """
-    Set the `Account` object at an address. Setting to `None` deletes the
-    account (but not its storage, see `destroy_account()`).
+    Snapshot the fields of an account which make up its state trie leaf.
     """
-    trie_set(state._main_trie, address, account)
+    return (
+        account.nonce,
+        account.balance,
+        account.code,
+        None if account.storage is None else dict(account.storage.root),
+    )
 
 
-def set_storage(
-    state: State, address: Bytes20, key: Bytes32, value: U256
-) -> None:
-    """
-    Set a value at a storage key on an account. Setting to `U256(0)` deletes
-    the key.
+class AllocStateTrie:
     """
-    assert trie_get(state._main_trie, address) is not None
+    State trie of an allocation, updated incrementally between calls to
+    `state_root()`.
 
-    trie = state._storage_tries.get(address)
-    if trie is None:
-        trie = Trie(secured=True, default=U256(0))
-        state._storage_tries[address] = trie
-    trie_set(trie, key, value)
-    if trie._data == {}:
-        del state._storage_tries[address]
+    Each account is re-encoded only when its contents differ from the ones it
+    was last encoded with, so accounts added, removed, replaced or modified
+    in place by any means are all picked up.
+    """
 
+    _trie: IncrementalTrie
+    _accounts: Dict[Address, Tuple[Any, ...]]
 
-def storage_root(state: State, address: Bytes20) -> Bytes32:
-    """Calculate the storage root of an account."""
-    assert not state._snapshots
-    if address in state._storage_tries:
-        return root(state._storage_tries[address])
-    else:
-        return EMPTY_TRIE_ROOT
+    def __init__(self) -> None:
+        self._trie = IncrementalTrie(secured=True)
+        self._accounts = {}
 
+    def __reduce__(self) -> Any:
+        """Copy or pickle as an empty trie, which is rebuilt when needed."""
+        return (AllocStateTrie, ())
 
-def state_root(state: State) -> Bytes32:
-    """Calculate the state root."""
-    assert not state._snapshots
+    def state_root(self, alloc: Mapping[Address, Account | None]) -> Hash:
+        """Return the state root of `alloc`."""
+        accounts = self._accounts
+        for address, account in alloc.items():
+            if account is None:
+                continue
+            contents = alloc_account_contents(account)
+            if accounts.get(address) != contents:
+                accounts[address] = contents
+                self._trie.set(address, encode_alloc_account(account))
 
-    def get_storage_root(address: Bytes20) -> Bytes32:
-        return storage_root(state, address)
+        for address in [
+            address for address in accounts if alloc.get(address) is None
+        ]:
+            del accounts[address]
+            self._trie.set(address, b"")
 
-    return root(state._main_trie, get_storage_root=get_storage_root)
+        return Hash(self._trie.root())
 
 
 class EOA(Address):
@@ -163,6 +169,8 @@ class EOA(Address):
 class Alloc(BaseAlloc):
     """Allocation of accounts in the state, pre and post test execution."""
 
+    _state_trie: AllocStateTrie = PrivateAttr(default_factory=AllocStateTrie)
+
     @dataclass(kw_only=True)
     class UnexpectedAccountError(Exception):
         """Unexpected account found in the allocation."""
@@ -331,35 +339,11 @@ class Alloc(BaseAlloc):
         ]
 
     def state_root(self) -> Hash:
-        """Return state root of the allocation."""
-        state = State()
-        for address, account in self.root.items():
-            if account is None:
-                continue
-            set_account(
-                state=state,
-                address=FrontierAddress(address),
-                account=FrontierAccount(
-                    nonce=Uint(account.nonce)
-                    if account.nonce is not None
-                    else Uint(0),
-                    balance=(
-                        U256(account.balance)
-                        if account.balance is not None
-                        else U256(0)
-                    ),
-                    code=account.code if account.code is not None else b"",
-                ),
-            )
-            if account.storage is not None:
-                for key, value in account.storage.root.items():
-                    set_storage(
-                        state=state,
-                        address=FrontierAddress(address),
-                        key=Bytes32(Hash(key)),
-                        value=U256(value),
-                    )
-        return Hash(state_root(state))
+        """
+        Return state root of the allocation, only re-encoding the accounts
+        changed since the last call.
+        """
+        return self._state_trie.state_root(self.root)
 
     def verify_post_alloc(self, got_alloc: "Alloc") -> None:
         """
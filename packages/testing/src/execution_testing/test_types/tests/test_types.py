@@ -3,12 +3,14 @@
 from typing import Any, Dict, List
 
 import pytest
+from ethereum_types.numeric import U256, Uint
 
 from execution_testing.base_types import (
     AccessList,
     Account,
     Address,
     Bytes,
+    Hash,
     Storage,
     TestPrivateKey,
     ZeroPaddedHexNumber,
@@ -25,6 +27,13 @@ from ..transaction_types import (
     AuthorizationTuple,
     Transaction,
 )
+from ..trie import (
+    EMPTY_TRIE_ROOT,
+    FrontierAccount,
+    Trie,
+    root,
+    trie_set,
+)
 
 
 def test_storage() -> None:
@@ -407,6 +416,81 @@ def test_account_merge(
     assert Account.merge(account_1, account_2) == expected_account
 
 
+def reference_state_root(alloc: Alloc) -> bytes:
+    """Compute the state root of `alloc` by building the whole trie."""
+    main_trie: Trie = Trie(secured=True, default=None)
+    storage_tries: Dict[bytes, Trie] = {}
+    for address, account in alloc.root.items():
+        if account is None:
+            continue
+        trie_set(
+            main_trie,
+            address,
+            FrontierAccount(
+                nonce=Uint(account.nonce),
+                balance=U256(account.balance),
+                code=account.code,
+            ),
+        )
+        storage_trie: Trie = Trie(secured=True, default=U256(0))
+        for key, value in account.storage.root.items():
+            trie_set(storage_trie, Hash(key), U256(value))
+        storage_tries[address] = storage_trie
+    return root(
+        main_trie,
+        get_storage_root=lambda address: root(storage_tries[address]),
+    )
+
+
+def test_alloc_state_root() -> None:
+    """
+    The state root is the same as building the whole trie after each kind of
+    change to the allocation.
+    """
+    alloc = Alloc()
+    assert alloc.state_root() == EMPTY_TRIE_ROOT
+
+    for i in range(1, 40):
+        alloc[i] = Account(nonce=i, balance=10**18 + i, storage={1: i, 2: 0})
+    alloc[0x100] = Account(code="0x6001600055")
+    alloc[0x200] = None
+    assert alloc.state_root() == reference_state_root(alloc)
+
+    # Replaced, deleted and modified accounts.
+    alloc[3] = Account(balance=3)
+    del alloc[4]
+    alloc[5] = None
+    account = alloc[6]
+    assert account is not None
+    account.balance = ZeroPaddedHexNumber(0)
+    account.storage[3] = 3
+    account.storage[1] = 0
+    alloc.root[Address(7)] = Account(nonce=7)
+    alloc.root.pop(Address(8))
+    assert alloc.state_root() == reference_state_root(alloc)
+    assert alloc.state_root() == reference_state_root(alloc)
+
+    # Accounts modified in place through `items()` and `root`.
+    for _, account in alloc.items():
+        if account is not None:
+            account.balance = ZeroPaddedHexNumber(5)
+    assert alloc.state_root() == reference_state_root(alloc)
+    account = alloc.root[Address(10)]
+    assert account is not None
+    account.storage[1] = 2
+    assert alloc.state_root() == reference_state_root(alloc)
+    account.storage[1] = 0
+    account.code = Bytes("0x00")
+    assert alloc.state_root() == reference_state_root(alloc)
+
+    # Copies are independent.
+    copied = alloc.model_copy(deep=True)
+    copied[9] = Account(nonce=10)
+    assert copied.state_root() == reference_state_root(copied)
+    assert alloc.state_root() == reference_state_root(alloc)
+    assert copied.state_root() != alloc.state_root()
+
+
 CHECKSUM_ADDRESS = "0x8a0A19589531694250d570040a0c4B74576919B8"
 
 
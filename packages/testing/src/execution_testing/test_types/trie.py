@@ -392,3 +392,265 @@ def patricialize(
         cast(BranchSubnodes, assert_type(subnodes, Tuple[Extended, ...])),
         value,
     )
+
+
+class _Leaf:
+    """Leaf of an `IncrementalTrie`, with its encoding once computed."""
+
+    __slots__ = ("path", "value", "encoded")
+
+    def __init__(self, path: Bytes, value: Bytes) -> None:
+        self.path = path
+        self.value = value
+        self.encoded: Optional[Extended] = None
+
+
+class _Extension:
+    """Extension of an `IncrementalTrie`, with its encoding once computed."""
+
+    __slots__ = ("path", "child", "encoded")
+
+    def __init__(self, path: Bytes, child: "_Branch") -> None:
+        self.path = path
+        self.child = child
+        self.encoded: Optional[Extended] = None
+
+
+class _Branch:
+    """Branch of an `IncrementalTrie`, with its encoding once computed."""
+
+    __slots__ = ("children", "value", "encoded")
+
+    def __init__(
+        self, children: Tuple[Optional["_TreeNode"], ...], value: Bytes
+    ) -> None:
+        self.children = children
+        self.value = value
+        self.encoded: Optional[Extended] = None
+
+
+_TreeNode = _Leaf | _Extension | _Branch
+
+_NO_CHILDREN: Tuple[Optional[_TreeNode], ...] = (None,) * 16
+
+
+def _join(path: Bytes, node: _TreeNode) -> _TreeNode:
+    """Prefix `node` with `path`, merging the two if possible."""
+    if not path:
+        return node
+    if isinstance(node, _Leaf):
+        return _Leaf(path + node.path, node.value)
+    if isinstance(node, _Extension):
+        return _Extension(path + node.path, node.child)
+    return _Extension(path, node)
+
+
+def _insert(node: Optional[_TreeNode], path: Bytes, value: Bytes) -> _TreeNode:
+    """
+    Return a copy of the tree rooted at `node` with `path` set to `value`,
+    sharing every subtree off the path.
+    """
+    if node is None:
+        return _Leaf(path, value)
+
+    if isinstance(node, _Branch):
+        if not path:
+            return _Branch(node.children, value)
+        children = list(node.children)
+        children[path[0]] = _insert(children[path[0]], path[1:], value)
+        return _Branch(tuple(children), node.value)
+
+    prefix_length = common_prefix_length(node.path, path)
+    if isinstance(node, _Leaf) and node.path == path:
+        return _Leaf(path, value)
+    if isinstance(node, _Extension) and prefix_length == len(node.path):
+        child = _insert(node.child, path[prefix_length:], value)
+        assert isinstance(child, _Branch)
+        return _Extension(node.path, child)
+
+    # Split `node` at the first nibble where the paths differ.
+    children = list(_NO_CHILDREN)
+    branch_value = b""
+    rest = node.path[prefix_length + 1 :]
+    if len(node.path) == prefix_length:
+        assert isinstance(node, _Leaf)
+        branch_value = node.value
+    elif isinstance(node, _Leaf):
+        children[node.path[prefix_length]] = _Leaf(rest, node.value)
+    else:
+        children[node.path[prefix_length]] = _join(rest, node.child)
+    if len(path) == prefix_length:
+        branch_value = value
+    else:
+        children[path[prefix_length]] = _Leaf(path[prefix_length + 1 :], value)
+    return _join(path[:prefix_length], _Branch(tuple(children), branch_value))
+
+
+def _delete(node: Optional[_TreeNode], path: Bytes) -> Optional[_TreeNode]:
+    """
+    Return a copy of the tree rooted at `node` without `path`, sharing every
+    subtree off the path.
+    """
+    if node is None:
+        return None
+    if isinstance(node, _Leaf):
+        return None if node.path == path else node
+    if isinstance(node, _Extension):
+        if path[: len(node.path)] != node.path:
+            return node
+        child = _delete(node.child, path[len(node.path) :])
+        return None if child is None else _join(node.path, child)
+
+    children = list(node.children)
+    value = node.value
+    if path:
+        children[path[0]] = _delete(children[path[0]], path[1:])
+    else:
+        value = b""
+
+    remaining = [i for i in range(16) if children[i] is not None]
+    if len(remaining) + (value != b"") >= 2:
+        return _Branch(tuple(children), value)
+    if value != b"":
+        return _Leaf(b"", value)
+    if remaining:
+        only_child = children[remaining[0]]
+        assert only_child is not None
+        return _join(bytes([remaining[0]]), only_child)
+    return None
+
+
+def _build(obj: Mapping[Bytes, Bytes], level: int) -> Optional[_TreeNode]:
+    """Build a tree from scratch, like `patricialize()`."""
+    if len(obj) == 0:
+        return None
+
+    arbitrary_key = next(iter(obj))
+    if len(obj) == 1:
+        return _Leaf(arbitrary_key[level:], obj[arbitrary_key])
+
+    substring = arbitrary_key[level:]
+    prefix_length = len(substring)
+    for key in obj:
+        prefix_length = min(
+            prefix_length, common_prefix_length(substring, key[level:])
+        )
+        if prefix_length == 0:
+            break
+
+    if prefix_length > 0:
+        child = _build(obj, level + prefix_length)
+        assert isinstance(child, _Branch)
+        return _Extension(substring[:prefix_length], child)
+
+    branches: List[Dict[Bytes, Bytes]] = [{} for _ in range(16)]
+    value = b""
+    for key, item in obj.items():
+        if len(key) == level:
+            value = item
+        else:
+            branches[key[level]][key] = item
+    return _Branch(
+        tuple(_build(branches[k], level + 1) for k in range(16)), value
+    )
+
+
+def _encode_tree(node: Optional[_TreeNode]) -> Extended:
+    """
+    Encode `node` with `encode_internal_node()`, reusing and filling in the
+    encodings of the nodes.
+    """
+    if node is None:
+        return b""
+    if node.encoded is not None:
+        return node.encoded
+
+    if isinstance(node, _Leaf):
+        encoded = encode_internal_node(LeafNode(node.path, node.value))
+    elif isinstance(node, _Extension):
+        encoded = encode_internal_node(
+            ExtensionNode(node.path, _encode_tree(node.child))
+        )
+    else:
+        subnodes = tuple(_encode_tree(child) for child in node.children)
+        encoded = encode_internal_node(
+            BranchNode(cast(BranchSubnodes, subnodes), node.value)
+        )
+    node.encoded = encoded
+    return encoded
+
+
+class IncrementalTrie:
+    """
+    Merkle Trie of encoded values that keeps the tree of its last `root()`,
+    along with the encoding of every node. The next `root()` only re-encodes
+    the paths to the keys set since, so its cost is proportional to the
+    number of changes rather than to the size of the trie.
+    """
+
+    secured: bool
+    _leaves: Dict[Bytes, Tuple[Bytes, Bytes]]
+    _pending: Dict[Bytes, Bytes]
+    _node: Optional[_TreeNode]
+    _root: Optional[Bytes32]
+
+    def __init__(self, secured: bool) -> None:
+        self.secured = secured
+        self._leaves = {}
+        self._pending = {}
+        self._node = None
+        self._root = None
+
+    def __len__(self) -> int:
+        """Count the keys as of the last `root()`."""
+        return len(self._leaves)
+
+    def set(self, key: Bytes, value: Bytes) -> None:
+        """
+        Set `key` to the already encoded `value`, or delete it if `value` is
+        empty.
+        """
+        self._pending[key] = value
+
+    def _path(self, key: Bytes) -> Bytes:
+        if self.secured:
+            # "secure" tries hash keys once before construction
+            key = keccak256(key)
+        return bytes_to_nibble_list(key)
+
+    def root(self) -> Bytes32:
+        """Compute the root, updating the tree with the pending changes."""
+        pending = self._pending
+        if self._root is not None and not pending:
+            return self._root
+
+        leaves = self._leaves
+        node = self._node
+        rebuild = node is None or len(pending) > len(leaves) // 2
+        for key, value in pending.items():
+            leaf = leaves.get(key)
+            if not value:
+                if leaf is not None:
+                    del leaves[key]
+                    if not rebuild:
+                        node = _delete(node, leaf[0])
+                continue
+            if leaf is not None and leaf[1] == value:
+                continue
+            path = self._path(key) if leaf is None else leaf[0]
+            leaves[key] = (path, value)
+            if not rebuild:
+                node = _insert(node, path, value)
+        pending.clear()
+
+        if rebuild:
+            node = _build(dict(leaves.values()), 0)
+        self._node = node
+
+        root_node = _encode_tree(node)
+        if len(rlp.encode(root_node)) < 32:
+            self._root = keccak256(rlp.encode(root_node))
+        else:
+            assert isinstance(root_node, Bytes)
+            self._root = Bytes32(root_node)
+        return self._root
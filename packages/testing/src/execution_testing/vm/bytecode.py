@@ -1,6 +1,6 @@
 """Ethereum Virtual Machine bytecode primitives and utilities."""
 
-from typing import Any, List, Self, SupportsBytes, Type
+from typing import Any, List, Self, SupportsBytes, Tuple, Type
 
 from pydantic import GetCoreSchemaHandler
 from pydantic_core.core_schema import (
@@ -22,6 +22,11 @@ class Bytecode:
     between two bytecode objects. The stack height is not guaranteed to be
     correct, so the user must take this into consideration.
 
+    An addition doesn't copy the bytes or opcodes of its operands, but keeps
+    both as parts of the result, so that code built from many pieces takes
+    linear time to build. The bytes and the opcode list are joined the first
+    time either is needed, and kept.
+
     Parameters
     ----------
     - popped_stack_items: number of items the bytecode pops from the stack
@@ -32,7 +37,10 @@ class Bytecode:
     """
 
     _name_: str = ""
-    _bytes_: bytes
+    _length: int
+    _parts: "Tuple[Bytecode, Bytecode] | None" = None
+    _joined_bytes: bytes
+    _joined_opcode_list: List[OpcodeBase]
 
     popped_stack_items: int
     pushed_stack_items: int
@@ -40,7 +48,6 @@ class Bytecode:
     min_stack_height: int
 
     terminating: bool
-    opcode_list: List[OpcodeBase]
 
     def __new__(
         cls,
@@ -73,13 +80,17 @@ class Bytecode:
             # Required because Enum class calls the base class with the
             # instantiated object as parameter.
             obj = super().__new__(cls)
-            obj._bytes_ = bytes_or_byte_code_base._bytes_
+            if bytes_or_byte_code_base._parts is None:
+                obj._bytes_ = bytes_or_byte_code_base._bytes_
+                obj.opcode_list = bytes_or_byte_code_base.opcode_list[:]
+            else:
+                obj._length = bytes_or_byte_code_base._length
+                obj._parts = bytes_or_byte_code_base._parts
             obj.popped_stack_items = bytes_or_byte_code_base.popped_stack_items
             obj.pushed_stack_items = bytes_or_byte_code_base.pushed_stack_items
             obj.min_stack_height = bytes_or_byte_code_base.min_stack_height
             obj.max_stack_height = bytes_or_byte_code_base.max_stack_height
             obj.terminating = bytes_or_byte_code_base.terminating
-            obj.opcode_list = bytes_or_byte_code_base.opcode_list[:]
             obj._name_ = bytes_or_byte_code_base._name_
             return obj
 
@@ -109,13 +120,89 @@ class Bytecode:
             "Bytecode constructor '__new__' didn't return an instance!"
         )
 
+    @property
+    def _bytes_(self) -> bytes:
+        """The bytecode's bytes, joined from its parts if necessary."""
+        if self._parts is not None:
+            self._join()
+        return self._joined_bytes
+
+    @_bytes_.setter
+    def _bytes_(self, value: bytes) -> None:
+        if self._parts is not None:
+            self._join()
+        self._joined_bytes = value
+        self._length = len(value)
+
+    @property
+    def opcode_list(self) -> List[OpcodeBase]:
+        """The bytecode's opcodes, joined from its parts if necessary."""
+        if self._parts is not None:
+            self._join()
+        return self._joined_opcode_list
+
+    @opcode_list.setter
+    def opcode_list(self, value: List[OpcodeBase]) -> None:
+        if self._parts is not None:
+            self._join()
+        self._joined_opcode_list = value
+
+    def _join(self) -> None:
+        """
+        Join the bytes and opcodes of the parts, in order, and drop the
+        parts.
+
+        The parts are walked with an explicit stack, because code built by
+        adding one piece at a time is as deep as it has pieces.
+        """
+        chunks: List[bytes] = []
+        opcodes: List[OpcodeBase] = []
+        pending: List[Bytecode] = [self]
+        while pending:
+            node = pending.pop()
+            if node._parts is None:
+                chunks.append(node._joined_bytes)
+                opcodes.extend(node._joined_opcode_list)
+            else:
+                pending.extend(reversed(node._parts))
+        self._joined_bytes = b"".join(chunks)
+        self._joined_opcode_list = opcodes
+        self._parts = None
+
+    @classmethod
+    def _concatenate(
+        cls,
+        left: "Bytecode",
+        right: "Bytecode",
+        *,
+        popped_stack_items: int,
+        pushed_stack_items: int,
+        min_stack_height: int,
+        max_stack_height: int,
+        terminating: bool,
+    ) -> "Bytecode":
+        """
+        Create the bytecode of `left` followed by `right`, without joining
+        their bytes or opcodes.
+        """
+        obj = super().__new__(cls)
+        obj._length = left._length + right._length
+        obj._parts = (left, right)
+        obj.popped_stack_items = popped_stack_items
+        obj.pushed_stack_items = pushed_stack_items
+        obj.min_stack_height = min_stack_height
+        obj.max_stack_height = max_stack_height
+        obj.terminating = terminating
+        obj._name_ = ""
+        return obj
+
     def __bytes__(self) -> bytes:
         """Return the opcode byte representation."""
         return self._bytes_
 
     def __len__(self) -> int:
         """Return the length of the opcode byte representation."""
-        return len(self._bytes_)
+        return self._length
 
     def __str__(self) -> str:
         """Return the name of the opcode, assigned at Enum creation."""
@@ -165,10 +252,15 @@ class Bytecode:
             return self
 
         if isinstance(other, bytes):
-            c = Bytecode(self)
-            c._bytes_ += other
-            c._name_ = ""
-            return c
+            return Bytecode._concatenate(
+                self,
+                Bytecode(other, popped_stack_items=0, pushed_stack_items=0),
+                popped_stack_items=self.popped_stack_items,
+                pushed_stack_items=self.pushed_stack_items,
+                min_stack_height=self.min_stack_height,
+                max_stack_height=self.max_stack_height,
+                terminating=self.terminating,
+            )
 
         assert isinstance(other, Bytecode), (
             "Can only concatenate Bytecode instances"
@@ -217,14 +309,14 @@ class Bytecode:
             c_min + a_max - a_min, c_min - a_pop + a_push + b_max - b_min
         )
 
-        return Bytecode(
-            bytes(self) + bytes(other),
+        return Bytecode._concatenate(
+            self,
+            other,
             popped_stack_items=c_pop,
             pushed_stack_items=c_push,
             min_stack_height=c_min,
             max_stack_height=c_max,
             terminating=other.terminating,
-            opcode_list=self.opcode_list + other.opcode_list,
         )
 
     def __radd__(self, other: "Bytecode | int | None") -> "Bytecode":
@@ -261,7 +353,7 @@ class Bytecode:
 
     def keccak256(self) -> Hash:
         """Return the keccak256 hash of the opcode byte representation."""
-        return Bytes(self._bytes_).keccak256()
+        return Bytes(bytes(self)).keccak256()
 
     def gas_cost(
         self,
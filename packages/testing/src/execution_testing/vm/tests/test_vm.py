@@ -2,7 +2,7 @@
 
 import pytest
 
-from execution_testing.base_types import Address
+from execution_testing.base_types import Address, Bytes
 
 from ..opcodes import Bytecode
 from ..opcodes import Macros as Om
@@ -418,3 +418,28 @@ def test_opcode_kwargs_validation() -> None:
         ValueError, match=r"Invalid keyword argument\(s\).*for opcode MSTORE"
     ):
         Op.MSTORE(offest=0, valu=1, extra=2)  # codespell:ignore offest,valu
+
+
+def test_bytecode_deep_concatenation() -> None:
+    """
+    Test that code built from many pieces has the same bytes, opcodes and
+    properties as the same code built in one piece.
+    """
+    pieces = [Op.PUSH1[i % 256] for i in range(10_000)] + [Op.POP] * 10_000
+    code = sum(pieces, Bytecode())
+    assert len(code) == 30_000
+    assert bytes(code) == b"".join(bytes(piece) for piece in pieces)
+    assert code.opcode_list == pieces
+    assert code.popped_stack_items == 0
+    assert code.pushed_stack_items == 0
+    assert code.min_stack_height == 0
+    assert code.max_stack_height == 10_000
+
+    repeated = (Op.PUSH1[1] + Op.POP) * 10_000 + b"\x00"
+    expected = b"\x60\x01\x50" * 10_000 + b"\x00"
+    assert len(repeated) == len(expected)
+    assert Bytecode(repeated) == repeated
+    assert repeated.keccak256() == Bytes(expected).keccak256()
+    assert bytes(repeated) == expected
+    assert len(repeated.opcode_list) == 20_000
+    assert repeated.max_stack_height == 1
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Compare the reference BLAKE2b compression in `ethereum.crypto.blake2` with
+the fixed-width one from `ethereum_optimized.blake2`, checking that both give
+the same output.
+
+Each row compresses the same block with a growing number of rounds, and
+reports the cost of a single round, which should stay flat for both.
+"""
+
+import argparse
+import os
+import time
+from typing import Any, List
+
+from ethereum.crypto.blake2 import Blake2b
+from ethereum_optimized.blake2 import get_blake2b_patches
+
+
+class FastBlake2b(Blake2b):
+    """`Blake2b` with the fixed-width compression."""
+
+    pass
+
+
+for name, value in get_blake2b_patches().items():
+    setattr(FastBlake2b, name, value)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--max-rounds",
+        type=int,
+        default=10_000,
+        help="Largest number of rounds to compress with",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Compress with both implementations and print the cost per round."""
+    args = parse_args()
+
+    rows: List[str] = []
+    rounds = 12
+    while rounds <= args.max_rounds:
+        data = rounds.to_bytes(4, "big") + os.urandom(208) + b"\x01"
+        parameters: Any = Blake2b().get_blake2_parameters(data)
+
+        start = time.perf_counter()
+        expected = Blake2b().compress(*parameters)
+        reference = time.perf_counter() - start
+
+        start = time.perf_counter()
+        output = FastBlake2b().compress(*parameters)
+        optimized = time.perf_counter() - start
+
+        if output != expected:
+            raise Exception(f"outputs differ for {rounds} rounds")
+
+        rows.append(
+            f"{rounds:>8} {reference / rounds * 1e6:>13.2f}us "
+            f"{optimized / rounds * 1e6:>13.2f}us "
+            f"{reference / optimized:>7.2f}x"
+        )
+        rounds *= 10
+
+    print(
+        f"{'rounds':>8} {'reference':>15} {'fixed-width':>15} {'speedup':>8}"
+    )
+    for row in rows:
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Compare the reference interpreter loop with the pre-decoded dispatch loop
+from `ethereum_optimized.dispatch`, checking that both give the same result.
+
+Each benchmark calls a contract which runs a loop of `--iterations`
+iterations around a block of instructions, in the spirit of the
+`tests/benchmark/compute/instruction` tests.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from io import StringIO
+from typing import Any, Dict, Tuple
+
+import ethereum.forks.berlin.vm.interpreter as interpreter
+from ethereum_optimized.dispatch import get_dispatch_loop_patches
+from ethereum_spec_tools.evm_tools import create_parser
+from ethereum_spec_tools.evm_tools.t8n import T8N, ForkCache
+
+SENDER = "0xa94f5374fce5edbc8e2a8697c15331677e6ebf0b"
+SECRET_KEY = (
+    "0x45a915e4d060149eb4365960e6a7a45f334393093061116b197e3240065ff2d8"
+)
+CONTRACT = "0x00000000000000000000000000000000000000c0"
+
+# The body of each loop, which must leave the stack as it found it.
+BODIES = {
+    "arithmetic": "6003600201600402600506" * 4 + "50",
+    "push_pop": "7f" + "ff" * 32 + "50" + "6001" + "50" + "61ffff50" * 4,
+    "memory": "602a600052600051506020515060405150" * 2,
+    "stack": "6001600280809150505050" * 4,
+}
+
+
+def loop_code(body: str, iterations: int) -> str:
+    """Code which runs `body` `iterations` times."""
+    # PUSH2 iterations, JUMPDEST, body, PUSH1 1, SWAP1, SUB, DUP1, PUSH1 3,
+    # JUMPI, STOP
+    return (
+        "0x61"
+        + iterations.to_bytes(2, "big").hex()
+        + "5b"
+        + body
+        + "600190038060035700"
+    )
+
+
+def run_t8n(code: str) -> Tuple[float, Dict[str, Any]]:
+    """Call `code`, returning the elapsed seconds and the result."""
+    stdin = {
+        "alloc": {
+            SENDER: {"balance": "0x3635c9adc5dea00000", "nonce": "0x0"},
+            CONTRACT: {"balance": "0x0", "nonce": "0x1", "code": code},
+        },
+        "env": {
+            "currentCoinbase": "0x" + "00" * 19 + "ff",
+            "currentDifficulty": "0x20000",
+            "currentGasLimit": "0x10000000",
+            "currentNumber": "0x1",
+            "currentTimestamp": "0x3e8",
+            "blockHashes": {"0": "0x" + "00" * 32},
+        },
+        "txs": [
+            {
+                "nonce": "0x0",
+                "gasPrice": "0xa",
+                "gas": "0x8000000",
+                "to": CONTRACT,
+                "value": "0x0",
+                "input": "0x",
+                "v": "0x0",
+                "r": "0x0",
+                "s": "0x0",
+                "secretKey": SECRET_KEY,
+            }
+        ],
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        options = create_parser().parse_args(
+            [
+                "t8n",
+                "--input.env=stdin",
+                "--input.alloc=stdin",
+                "--input.txs=stdin",
+                "--output.result=stdout",
+                "--output.alloc=stdout",
+                f"--output.basedir={directory}",
+                "--state.fork=Berlin",
+            ]
+        )
+        out_file = StringIO()
+        with ForkCache() as fork_cache:
+            t8n_tool = T8N(
+                options,
+                out_file=out_file,
+                in_file=StringIO(json.dumps(stdin)),
+                cache=fork_cache,
+            )
+            start = time.perf_counter()
+            if t8n_tool.run() != 0:
+                raise Exception("t8n failed")
+            elapsed = time.perf_counter() - start
+    return elapsed, json.loads(out_file.getvalue())
+
+
+def main() -> None:
+    """Run every benchmark with both loops and print them."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=2000,
+        help="Number of loop iterations (at most 65535)",
+    )
+    args = parser.parse_args()
+
+    codes = {
+        name: loop_code(body, args.iterations) for name, body in BODIES.items()
+    }
+
+    reference = {name: run_t8n(code) for name, code in codes.items()}
+
+    for name, value in get_dispatch_loop_patches("berlin").items():
+        setattr(interpreter, name, value)
+
+    print(
+        f"{'benchmark':<12} {'reference':>10} {'dispatch':>10} {'speedup':>8}"
+    )
+    for name, code in codes.items():
+        reference_time, expected = reference[name]
+        dispatch_time, result = run_t8n(code)
+        if result != expected:
+            raise Exception(f"{name} results differ")
+        if int(result["result"]["gasUsed"], 16) < 100000:
+            raise Exception(f"{name} didn't loop")
+        print(
+            f"{name:<12} {reference_time:>9.2f}s {dispatch_time:>9.2f}s "
+            f"{reference_time / dispatch_time:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Compare tracing a long transaction with `Eip3155Tracer`, which writes the
+traces when the transaction ends, and `StreamingEip3155Tracer`, which writes
+each trace as it completes, checking that both write the same traces.
+
+The transaction runs a loop of `--iterations` iterations (seven opcodes
+each). Throughput is measured first, then the peak memory allocated by
+Python is measured in a second run with `tracemalloc`, which is slower.
+"""
+
+import argparse
+import gzip
+import json
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from ethereum_spec_tools.evm_tools import create_parser
+from ethereum_spec_tools.evm_tools.t8n import T8N, ForkCache
+
+SENDER = "0xa94f5374fce5edbc8e2a8697c15331677e6ebf0b"
+SECRET_KEY = (
+    "0x45a915e4d060149eb4365960e6a7a45f334393093061116b197e3240065ff2d8"
+)
+CONTRACT = "0x00000000000000000000000000000000000000c0"
+
+MODES = {
+    "buffered": [],
+    "streamed": ["--trace.stream"],
+    "streamed+gzip": ["--trace.stream", "--trace.gzip"],
+}
+
+
+def t8n_input(iterations: int) -> Dict[str, Any]:
+    """A transaction calling a contract that loops `iterations` times."""
+    # PUSH2 iterations, JUMPDEST, PUSH1 1, SWAP1, SUB, DUP1, PUSH1 3, JUMPI
+    code = (
+        "0x61" + iterations.to_bytes(2, "big").hex() + "5b600190038060035700"
+    )
+    return {
+        "alloc": {
+            SENDER: {"balance": "0x3635c9adc5dea00000", "nonce": "0x0"},
+            CONTRACT: {"balance": "0x0", "nonce": "0x1", "code": code},
+        },
+        "env": {
+            "currentCoinbase": "0x" + "00" * 19 + "ff",
+            "currentDifficulty": "0x20000",
+            "currentGasLimit": "0x10000000",
+            "currentNumber": "0x1",
+            "currentTimestamp": "0x3e8",
+            "blockHashes": {"0": "0x" + "00" * 32},
+        },
+        "txs": [
+            {
+                "nonce": "0x0",
+                "gasPrice": "0xa",
+                "gas": "0x8000000",
+                "to": CONTRACT,
+                "value": "0x0",
+                "input": "0x",
+                "v": "0x0",
+                "r": "0x0",
+                "s": "0x0",
+                "secretKey": SECRET_KEY,
+            }
+        ],
+    }
+
+
+def run_t8n(
+    stdin: Dict[str, Any], output_basedir: Path, extra: List[str]
+) -> None:
+    """Run the transition, tracing into `output_basedir`."""
+    options = create_parser().parse_args(
+        [
+            "t8n",
+            "--input.env=stdin",
+            "--input.alloc=stdin",
+            "--input.txs=stdin",
+            "--output.result=stdout",
+            "--output.alloc=stdout",
+            f"--output.basedir={output_basedir}",
+            "--state.fork=Berlin",
+            "--trace",
+            *extra,
+        ]
+    )
+    with ForkCache() as fork_cache:
+        t8n_tool = T8N(
+            options,
+            out_file=StringIO(),
+            in_file=StringIO(json.dumps(stdin)),
+            cache=fork_cache,
+        )
+        if t8n_tool.run() != 0:
+            raise Exception("t8n failed")
+
+
+def read_traces(output_basedir: Path) -> str:
+    """Read the (only) trace file in `output_basedir`."""
+    (path,) = output_basedir.iterdir()
+    if path.suffix == ".gz":
+        with gzip.open(path, "rt") as f:
+            return f.read()
+    return path.read_text()
+
+
+def measure(
+    stdin: Dict[str, Any], extra: List[str]
+) -> Tuple[float, int, int, str]:
+    """
+    Trace the transaction, returning the elapsed seconds, the peak traced
+    memory, the size of the output, and the traces.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        run_t8n(stdin, Path(directory), extra)
+        elapsed = time.perf_counter() - start
+
+        (path,) = Path(directory).iterdir()
+        size = path.stat().st_size
+        traces = read_traces(Path(directory))
+
+    with tempfile.TemporaryDirectory() as directory:
+        tracemalloc.start()
+        run_t8n(stdin, Path(directory), extra)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return elapsed, peak, size, traces
+
+
+def main() -> None:
+    """Run the benchmark in every mode and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=20000,
+        help="Number of loop iterations (at most 65535)",
+    )
+    args = parser.parse_args()
+
+    stdin = t8n_input(args.iterations)
+    expected = None
+
+    print(
+        f"{'mode':<14} {'seconds':>8} {'traces/s':>10} "
+        f"{'peak MiB':>9} {'file MiB':>9}"
+    )
+    for mode, extra in MODES.items():
+        elapsed, peak, size, traces = measure(stdin, extra)
+        if expected is None:
+            expected = traces
+        elif traces != expected:
+            raise Exception(f"{mode} traces differ")
+
+        count = traces.count("\n")
+        print(
+            f"{mode:<14} {elapsed:>8.2f} {count / elapsed:>10.0f} "
+            f"{peak / 2**20:>9.1f} {size / 2**20:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Compare the reference light ethash functions in `ethereum.ethash` with the
+NumPy ones from `ethereum_optimized.ethash_numpy`, checking that both give
+the same output.
+
+Benchmarks:
+
+* `generate_cache`: one epoch's cache, shrunk to `--cache-rows` rows unless
+  `--full-cache` is given.
+* `generate_dataset_item`: `--items` consecutive dataset items.
+* `hashimoto_light`: `--nonces` verifications against the same cache.
+"""
+
+import argparse
+import time
+from typing import Any, Callable, List, Tuple
+
+from ethereum_types.bytes import Bytes8
+from ethereum_types.numeric import Uint
+
+import ethereum.ethash as ethash
+from ethereum.crypto.hash import Hash32
+from ethereum.utils.numeric import le_uint32_sequence_to_bytes
+from ethereum_optimized import ethash_numpy
+
+BLOCK_NUMBER = Uint(30000 * 3 + 7)
+HEADER_HASH = Hash32(b"\x5a" * 32)
+
+
+def timed(f: Callable[[], Any]) -> Tuple[float, Any]:
+    """Call `f` and return the elapsed seconds along with its result."""
+    start = time.perf_counter()
+    result = f()
+    return time.perf_counter() - start, result
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--cache-rows",
+        type=int,
+        default=4099,
+        help="Number of 64-byte rows in the benchmarked cache",
+    )
+    parser.add_argument(
+        "--full-cache",
+        action="store_true",
+        help="Use the real cache size for the epoch (very slow)",
+    )
+    parser.add_argument(
+        "--items",
+        type=int,
+        default=64,
+        help="Number of dataset items to generate",
+    )
+    parser.add_argument(
+        "--nonces",
+        type=int,
+        default=3,
+        help="Number of hashimoto_light verifications",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run every benchmark with both implementations and print them."""
+    args = parse_args()
+
+    if not args.full_cache:
+        size = Uint(args.cache_rows) * ethash.HASH_BYTES
+        ethash.cache_size = lambda _: size  # type: ignore[assignment]
+
+    rows: List[str] = []
+
+    def report(name: str, reference: float, optimized: float) -> None:
+        rows.append(
+            f"{name:<22} {reference:>11.3f}s {optimized:>11.3f}s "
+            f"{reference / optimized:>7.2f}x"
+        )
+
+    reference_time, cache = timed(lambda: ethash.generate_cache(BLOCK_NUMBER))
+    numpy_time, words = timed(
+        lambda: ethash_numpy.generate_cache(BLOCK_NUMBER)
+    )
+    if words.tobytes() != b"".join(
+        le_uint32_sequence_to_bytes(row) for row in cache
+    ):
+        raise Exception("caches differ")
+    report("generate_cache", reference_time, numpy_time)
+
+    indices = [Uint(index) for index in range(args.items)]
+    reference_time, items = timed(
+        lambda: [ethash.generate_dataset_item(cache, i) for i in indices]
+    )
+    numpy_time, numpy_items = timed(
+        lambda: [ethash_numpy.generate_dataset_item(words, i) for i in indices]
+    )
+    if items != numpy_items:
+        raise Exception("dataset items differ")
+    report("generate_dataset_item", reference_time, numpy_time)
+
+    dataset_size = ethash.dataset_size(BLOCK_NUMBER)
+    nonces = [Bytes8(n.to_bytes(8, "big")) for n in range(args.nonces)]
+    reference_time, results = timed(
+        lambda: [
+            ethash.hashimoto_light(HEADER_HASH, n, cache, dataset_size)
+            for n in nonces
+        ]
+    )
+    numpy_time, numpy_results = timed(
+        lambda: [
+            ethash_numpy.hashimoto_light(HEADER_HASH, n, words, dataset_size)
+            for n in nonces
+        ]
+    )
+    if results != numpy_results:
+        raise Exception("hashimoto_light results differ")
+    report("hashimoto_light", reference_time, numpy_time)
+
+    print(f"{'function':<22} {'reference':>12} {'numpy':>12} {'speedup':>8}")
+    for row in rows:
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
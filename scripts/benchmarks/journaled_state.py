@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Compare the reference (copying) state transactions with the journaled ones
+from `ethereum_optimized.state_journal`.
+
+Each scenario is written out as `t8n` inputs and run through
+`ethereum-spec-evm t8n` in a fresh interpreter per mode, since the journaled
+state has to be patched in before the fork modules are imported.
+
+Scenarios:
+
+* `deep-recursion`: a contract that calls itself `--depth` times, writing one
+  storage slot per frame, against a small pre-state.
+* `large-alloc`: the same contract with a shallow call stack, against a
+  pre-state of `--accounts` accounts holding storage.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+FORK = "Cancun"
+SECRET_KEY = (
+    "0x45a915e4d060149eb4365960e6a7a45f334393093061116b197e3240065ff2d8"
+)
+SENDER = "0xa94f5374fce5edbc8e2a8697c15331677e6ebf0b"
+CONTRACT = "0x" + "c0" * 20
+
+
+def recursive_contract() -> str:
+    """
+    Bytecode which reads a depth from calldata, stores it, and calls itself
+    with the depth decremented until it reaches zero.
+    """
+    code = [
+        "6000",  # PUSH1 0
+        "35",  # CALLDATALOAD
+        "80",  # DUP1
+        "80",  # DUP1
+        "55",  # SSTORE (slot = depth, value = depth)
+        "80",  # DUP1
+        "15",  # ISZERO
+        "6021",  # PUSH1 end
+        "57",  # JUMPI
+        "6001",  # PUSH1 1
+        "90",  # SWAP1
+        "03",  # SUB
+        "6000",  # PUSH1 0
+        "52",  # MSTORE
+        "6000",  # PUSH1 0 (retSize)
+        "6000",  # PUSH1 0 (retOffset)
+        "6020",  # PUSH1 32 (argsSize)
+        "6000",  # PUSH1 0 (argsOffset)
+        "6000",  # PUSH1 0 (value)
+        "30",  # ADDRESS
+        "5a",  # GAS
+        "f1",  # CALL
+        "50",  # POP
+        "00",  # STOP
+        "5b",  # JUMPDEST (end)
+        "00",  # STOP
+    ]
+    bytecode = "".join(code)
+    assert bytes.fromhex(bytecode)[0x21] == 0x5B
+    return "0x" + bytecode
+
+
+def write_inputs(directory: str, accounts: int, depth: int) -> None:
+    """Write the alloc, env and txs for one scenario into `directory`."""
+    alloc: Dict[str, Any] = {
+        SENDER: {"balance": hex(10**24), "nonce": "0x0"},
+        CONTRACT: {"balance": "0x0", "code": recursive_contract()},
+    }
+    for i in range(accounts):
+        alloc["0x" + (0x1000 + i).to_bytes(20, "big").hex()] = {
+            "balance": "0x1",
+            "storage": {"0x01": hex(i + 1), "0x02": hex(i + 2)},
+        }
+
+    env = {
+        "currentCoinbase": "0x" + "ba" * 20,
+        "currentGasLimit": hex(1_000_000_000),
+        "currentNumber": "0x1",
+        "currentTimestamp": "0x3e8",
+        "currentRandom": "0x" + "00" * 32,
+        "currentBaseFee": "0x7",
+        "currentExcessBlobGas": "0x0",
+        "parentBeaconBlockRoot": "0x" + "00" * 32,
+        "withdrawals": [],
+        "blockHashes": {"0": "0x" + "00" * 32},
+    }
+
+    txs = [
+        {
+            "type": "0x0",
+            "chainId": "0x1",
+            "nonce": "0x0",
+            "gasPrice": "0xa",
+            "gas": hex(900_000_000),
+            "to": CONTRACT,
+            "value": "0x0",
+            "input": "0x" + depth.to_bytes(32, "big").hex(),
+            "v": "0x0",
+            "r": "0x0",
+            "s": "0x0",
+            "secretKey": SECRET_KEY,
+        }
+    ]
+
+    for name, data in (("alloc", alloc), ("env", env), ("txs", txs)):
+        with open(os.path.join(directory, f"{name}.json"), "w") as f:
+            json.dump(data, f)
+
+
+def run_child(mode: str, directory: str) -> None:
+    """Run `t8n` once in this process and print the elapsed seconds."""
+    if mode == "journaled":
+        import ethereum_optimized
+        from ethereum_spec_tools.forks import Hardfork
+
+        for fork in Hardfork.discover():
+            ethereum_optimized.monkey_patch_journaled_state(fork.short_name)
+
+    from ethereum_spec_tools.evm_tools import main
+
+    args = [
+        "t8n",
+        f"--input.alloc={directory}/alloc.json",
+        f"--input.env={directory}/env.json",
+        f"--input.txs={directory}/txs.json",
+        f"--output.basedir={directory}",
+        f"--output.alloc=alloc-{mode}.json",
+        f"--output.result=result-{mode}.json",
+        f"--state.fork={FORK}",
+    ]
+
+    with open(os.devnull, "w") as devnull:
+        start = time.perf_counter()
+        exit_code = main(args, out_file=devnull)
+        elapsed = time.perf_counter() - start
+
+    if exit_code:
+        sys.exit(exit_code)
+    print(elapsed)
+
+
+def measure(mode: str, directory: str) -> float:
+    """Run `t8n` in a fresh interpreter and return the elapsed seconds."""
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", mode, directory],
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def state_root(directory: str, mode: str) -> str:
+    """Read the state root produced by a previous run."""
+    with open(os.path.join(directory, f"result-{mode}.json")) as f:
+        return json.load(f)["stateRoot"]
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=150,
+        help="Call depth of the deep-recursion scenario",
+    )
+    parser.add_argument(
+        "--accounts",
+        type=int,
+        default=5000,
+        help="Number of pre-state accounts in the large-alloc scenario",
+    )
+    parser.add_argument(
+        "--child",
+        nargs=2,
+        metavar=("MODE", "DIRECTORY"),
+        help=argparse.SUPPRESS,
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run every scenario in both modes and print a comparison."""
+    args = parse_args()
+    if args.child is not None:
+        run_child(*args.child)
+        return
+
+    scenarios = [
+        ("deep-recursion", 10, args.depth),
+        ("large-alloc", args.accounts, 10),
+        ("both", args.accounts, args.depth),
+    ]
+
+    rows: List[str] = []
+    for name, accounts, depth in scenarios:
+        with tempfile.TemporaryDirectory() as directory:
+            write_inputs(directory, accounts, depth)
+            reference = measure("reference", directory)
+            journaled = measure("journaled", directory)
+            if state_root(directory, "reference") != state_root(
+                directory, "journaled"
+            ):
+                raise Exception(f"state roots differ for {name}")
+
+        rows.append(
+            f"{name:<16} {accounts:>9} {depth:>6} "
+            f"{reference:>11.3f}s {journaled:>11.3f}s "
+            f"{reference / journaled:>7.2f}x"
+        )
+
+    print(
+        f"{'scenario':<16} {'accounts':>9} {'depth':>6} "
+        f"{'reference':>12} {'journaled':>12} {'speedup':>8}"
+    )
+    for row in rows:
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Compare the reference KZG proof verification in `ethereum.crypto.kzg` with
+the precomputed one from `ethereum_optimized.kzg`, checking that both give
+the same results.
+
+Benchmarks:
+
+* `distinct`: `--proofs` verifications of different proofs.
+* `repeated`: `--proofs` verifications of the same proof, as when a test
+  calls the `point_evaluation` precompile many times.
+
+The proofs are well formed but wrong, so that every verification runs the
+full pairing check. The one-time cost of decompressing the trusted setup
+point and building the generator tables is reported separately.
+"""
+
+import argparse
+import time
+from typing import Any, Callable, List, Tuple
+
+from ethereum_types.bytes import Bytes32, Bytes48
+from py_ecc.bls.g2_primitives import G1_to_pubkey
+from py_ecc.optimized_bls12_381 import multiply
+from py_ecc.optimized_bls12_381.optimized_curve import G1
+
+import ethereum.crypto.kzg as kzg
+from ethereum_optimized.kzg import (
+    VerificationCache,
+    get_kzg_patches,
+    get_precomputed,
+)
+
+Proof = Tuple[Bytes48, Bytes32, Bytes32, Bytes48]
+
+
+def timed(f: Callable[[], Any]) -> Tuple[float, Any]:
+    """Call `f` and return the elapsed seconds along with its result."""
+    start = time.perf_counter()
+    result = f()
+    return time.perf_counter() - start, result
+
+
+def make_proofs(count: int) -> List[Proof]:
+    """Make `count` different, well formed, proofs."""
+    proofs: List[Proof] = []
+    for i in range(count):
+        commitment = Bytes48(G1_to_pubkey(multiply(G1, 1000 + i)))
+        proof = Bytes48(G1_to_pubkey(multiply(G1, 2000 + i)))
+        z = Bytes32((3000 + i).to_bytes(32, "big"))
+        y = Bytes32((4000 + i).to_bytes(32, "big"))
+        proofs.append((commitment, z, y, proof))
+    return proofs
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--proofs",
+        type=int,
+        default=4,
+        help="Number of verifications in each benchmark",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run every benchmark with both implementations and print them."""
+    args = parse_args()
+    verify_kzg_proof = get_kzg_patches(VerificationCache())["verify_kzg_proof"]
+
+    rows: List[str] = []
+
+    def report(name: str, reference: float, optimized: float) -> None:
+        rows.append(
+            f"{name:<10} {reference:>11.3f}s {optimized:>11.3f}s "
+            f"{reference / optimized:>7.2f}x"
+        )
+
+    precomputation_time, _ = timed(get_precomputed)
+
+    benchmarks: List[Tuple[str, List[Proof]]] = [
+        ("distinct", make_proofs(args.proofs)),
+        ("repeated", make_proofs(1) * args.proofs),
+    ]
+    for name, proofs in benchmarks:
+        reference_time, expected = timed(
+            lambda: [kzg.verify_kzg_proof(*p) for p in proofs]  # noqa: B023
+        )
+        optimized_time, results = timed(
+            lambda: [verify_kzg_proof(*p) for p in proofs]  # noqa: B023
+        )
+        if results != expected:
+            raise Exception(f"results differ for {name}")
+        report(name, reference_time, optimized_time)
+
+    print(
+        f"{'benchmark':<10} {'reference':>12} {'optimized':>12} {'speedup':>8}"
+    )
+    for row in rows:
+        print(row)
+    print(f"precomputation {precomputation_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Compare the multi-scalar multiplication of the BLS12-381 MSM precompiles,
+which multiplies each point separately and adds up the products, with the
+bucket method from `ethereum_optimized.msm`, checking that both give the
+same point.
+
+Only the multiplication is timed. The precompiles also decode, and check the
+subgroup of, every point, which neither implementation changes.
+"""
+
+import argparse
+import random
+import time
+from typing import Any, List, Tuple
+
+from py_ecc.optimized_bls12_381 import (
+    G1,
+    G2,
+    Z1,
+    Z2,
+    add,
+    curve_order,
+    multiply,
+    normalize,
+)
+
+from ethereum_optimized.msm import msm, window_bits
+
+
+def reference_msm(pairs: List[Tuple[Any, int]]) -> Any:
+    """Multiply each point separately, as the precompiles do."""
+    for i, (point, scalar) in enumerate(pairs):
+        product = multiply(point, scalar)
+        if i == 0:
+            result = product
+        else:
+            result = add(result, product)
+    return result
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--max-pairs",
+        type=int,
+        default=128,
+        help="Largest number of (point, scalar) pairs to multiply",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Multiply with both implementations and print the times."""
+    args = parse_args()
+    rng = random.Random(0)
+
+    groups: List[Tuple[str, Any, Any]] = [("g1", G1, Z1), ("g2", G2, Z2)]
+
+    rows: List[str] = []
+    for name, generator, zero in groups:
+        k = 1
+        while k <= args.max_pairs:
+            pairs = [
+                (
+                    multiply(generator, rng.randrange(1, curve_order)),
+                    rng.randrange(2**256),
+                )
+                for _ in range(k)
+            ]
+
+            start = time.perf_counter()
+            expected = reference_msm(pairs)
+            reference = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = msm(pairs, zero)
+            optimized = time.perf_counter() - start
+
+            if normalize(result) != normalize(expected):
+                raise Exception(f"results differ for {k} {name} pairs")
+
+            rows.append(
+                f"{name:<6} {k:>6} {window_bits(k, 256):>7} "
+                f"{reference:>11.3f}s {optimized:>11.3f}s "
+                f"{reference / optimized:>7.2f}x"
+            )
+            k *= 2
+
+    print(
+        f"{'group':<6} {'pairs':>6} {'window':>7} {'reference':>12} "
+        f"{'pippenger':>12} {'speedup':>8}"
+    )
+    for row in rows:
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Compare the pairing checks of the `alt_bn128` and BLS12-381 pairing
+precompiles, which multiply together one full `py_ecc` pairing per pair, with
+the multi-pairing engine from `ethereum_optimized.pairing`, checking that
+both give the same result.
+
+Each row checks `k` (at least two) pairs whose pairings multiply to one, so
+the reference cost grows linearly with `k`, while the engine's is dominated
+by its single final exponentiation.
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Callable, List, Tuple
+
+import py_ecc.optimized_bls12_381 as bls12_381
+import py_ecc.optimized_bn128 as bn128
+
+from ethereum_optimized.pairing import (
+    PairingEngine,
+    get_bls12_381,
+    get_bn254,
+)
+
+
+def make_pairs(curve: Any, count: int) -> List[Tuple[Any, Any]]:
+    """Make `count` pairs of points whose pairings multiply to one."""
+    rng = random.Random(count)
+    pairs = []
+    total = 0
+    for _ in range(count - 1):
+        a = rng.randrange(1, curve.curve_order)
+        b = rng.randrange(1, curve.curve_order)
+        pairs.append(
+            (curve.multiply(curve.G2, a), curve.multiply(curve.G1, b))
+        )
+        total += a * b
+    pairs.append(
+        (curve.G2, curve.multiply(curve.G1, -total % curve.curve_order))
+    )
+    return pairs
+
+
+def reference_check(curve: Any, pairs: List[Tuple[Any, Any]]) -> bool:
+    """Check the pairs the way the precompiles do."""
+    result = curve.FQ12.one()
+    for q, p in pairs:
+        result *= curve.pairing(q, p)
+    return result == curve.FQ12.one()
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--max-pairs",
+        type=int,
+        default=8,
+        help="Largest number of pairs to check, at least two",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Check pairs with both implementations and print the times."""
+    args = parse_args()
+
+    curves: List[Tuple[str, Any, Callable[[], PairingEngine]]] = [
+        ("bn254", bn128, get_bn254),
+        ("bls12-381", bls12_381, get_bls12_381),
+    ]
+
+    rows: List[str] = []
+    for name, curve, get_engine in curves:
+        start = time.perf_counter()
+        engine = get_engine()
+        setup = time.perf_counter() - start
+        rows.append(f"{name:<10} {'setup':>6} {'':>12} {setup:>11.3f}s")
+
+        k = 2
+        while k <= args.max_pairs:
+            pairs = make_pairs(curve, k)
+
+            start = time.perf_counter()
+            expected = reference_check(curve, pairs)
+            reference = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = engine.pairing_check(pairs)
+            optimized = time.perf_counter() - start
+
+            if result != expected:
+                raise Exception(f"results differ for {k} {name} pairs")
+
+            rows.append(
+                f"{name:<10} {k:>6} {reference:>11.3f}s {optimized:>11.3f}s "
+                f"{reference / optimized:>7.2f}x"
+            )
+            k *= 2
+
+    print(
+        f"{'curve':<10} {'pairs':>6} {'reference':>12} {'multi':>12} "
+        f"{'speedup':>8}"
+    )
+    for row in rows:
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
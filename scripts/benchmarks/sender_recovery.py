@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Compare recovering the senders of a block one by one, as the reference
+`apply_body()` does, with prefetching them in the thread pool from
+`ethereum_optimized.sender_recovery`.
+
+Each block is made of `--transactions` signed [EIP-1559] transactions, and
+every sender is checked against the reference. Only the curve arithmetic
+runs in native code which releases the GIL, so any speed-up depends on the
+number of cores (and `--workers`); on a single core there is nothing to gain.
+
+[EIP-1559]: https://eips.ethereum.org/EIPS/eip-1559
+"""
+
+import argparse
+import os
+import time
+from dataclasses import replace
+from functools import partial
+from typing import Any, Callable, List, Tuple
+
+from ethereum_types.bytes import Bytes
+from ethereum_types.numeric import U64, U256, Uint
+
+import ethereum.forks.prague.fork as prague_fork
+import ethereum.forks.prague.transactions as prague_transactions
+from ethereum.forks.prague.fork_types import Address
+from ethereum_optimized.sender_recovery import (
+    SenderRecovery,
+    get_sender_recovery_patches,
+)
+from ethereum_spec_tools.evm_tools.utils import secp256k1_sign
+
+CHAIN_ID = U64(1)
+CONTRACT = Address(b"\xc0" * 20)
+
+
+class BlockEnvironment:
+    """Just enough of a block environment for recovery."""
+
+    chain_id = CHAIN_ID
+
+
+def sign(nonce: int, secret_key: int) -> Any:
+    """Sign a fee market transaction."""
+    tx = prague_transactions.FeeMarketTransaction(
+        chain_id=CHAIN_ID,
+        nonce=U256(nonce),
+        max_priority_fee_per_gas=Uint(1),
+        max_fee_per_gas=Uint(10),
+        gas=Uint(21000),
+        to=CONTRACT,
+        value=U256(1),
+        data=Bytes(),
+        access_list=(),
+        y_parity=U256(0),
+        r=U256(0),
+        s=U256(0),
+    )
+    r, s, y = secp256k1_sign(
+        prague_transactions.signing_hash_1559(tx), secret_key
+    )
+    return replace(tx, y_parity=U256(y), r=r, s=s)
+
+
+def block(transactions: int) -> Tuple[Any, ...]:
+    """A block of `transactions` transactions from different senders."""
+    return tuple(sign(0, 0x1000 + i) for i in range(transactions))
+
+
+def measure(run: Callable[[], List[Any]], repeat: int) -> Tuple[float, Any]:
+    """Run `run` `repeat` times, returning the fastest time and the result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    """Recover each block both ways and print a comparison."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--transactions",
+        type=int,
+        nargs="+",
+        default=[100, 300, 1000],
+        help="Number of transactions in each block",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of recovery threads",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of runs, of which the fastest is reported",
+    )
+    args = parser.parse_args()
+
+    recovery = SenderRecovery(max_workers=args.workers)
+    patches = get_sender_recovery_patches("prague", recovery)
+    prefetch_senders = patches["prefetch_senders"]
+    recover_sender = patches["recover_sender"]
+
+    def inline(transactions: Tuple[Any, ...]) -> List[Any]:
+        return [
+            prague_fork.recover_sender(CHAIN_ID, tx) for tx in transactions
+        ]
+
+    def prefetched(transactions: Tuple[Any, ...]) -> List[Any]:
+        with prefetch_senders(BlockEnvironment(), transactions) as txs:
+            return [recover_sender(CHAIN_ID, tx) for tx in txs]
+
+    # Start the threads before timing anything.
+    prefetched(block(args.workers))
+
+    print(f"workers: {args.workers}")
+    print(
+        f"{'transactions':>12} {'inline':>10} {'prefetched':>11} "
+        f"{'speedup':>8}"
+    )
+    for transactions in args.transactions:
+        txs = block(transactions)
+        inline_time, expected = measure(partial(inline, txs), args.repeat)
+        prefetched_time, result = measure(
+            partial(prefetched, txs), args.repeat
+        )
+        if result != expected:
+            raise Exception(f"senders differ for {transactions} transactions")
+        print(
+            f"{transactions:>12} {inline_time * 1000:>8.1f}ms "
+            f"{prefetched_time * 1000:>9.1f}ms "
+            f"{inline_time / prefetched_time:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
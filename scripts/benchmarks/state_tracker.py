@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Compare the reference EIP-7928 state change tracking with the journaled one
+from `ethereum_optimized.state_tracker`.
+
+Each scenario is written out as `t8n` inputs and run through
+`ethereum-spec-evm t8n` in a fresh interpreter per mode, since the journaled
+tracker has to be patched in before the fork modules are imported. Both
+modes must produce the same state root and block access list hash.
+
+Scenarios:
+
+* `deep-calls`: `--txs` transactions to a contract that calls itself
+  `--depth` times, writing one storage slot per frame, so the reference
+  copies each slot once per frame above it.
+* `many-calls`: many more transactions to the same contract, with a shallow
+  call stack.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+FORK = "Amsterdam"
+SECRET_KEY = (
+    "0x45a915e4d060149eb4365960e6a7a45f334393093061116b197e3240065ff2d8"
+)
+SENDER = "0xa94f5374fce5edbc8e2a8697c15331677e6ebf0b"
+CONTRACT = "0x" + "c0" * 20
+TX_GAS_LIMIT = 16_000_000
+
+# The system contracts called at the start and end of every block, which
+# only have to hold some code.
+SYSTEM_CONTRACTS = (
+    "0x000f3df6d732807ef1319fb7b8bb8522d0beac02",
+    "0x00000961ef480eb55e80d19ad83579a64c007002",
+    "0x0000bbddc7ce488642fb579f8b00f3a590007251",
+    "0x0000f90827f1c53a10cb7a02335b175320002935",
+)
+
+
+def recursive_contract() -> str:
+    """
+    Bytecode which reads a depth from calldata, stores it, and calls itself
+    with the depth decremented until it reaches zero.
+    """
+    code = [
+        "6000",  # PUSH1 0
+        "35",  # CALLDATALOAD
+        "80",  # DUP1
+        "80",  # DUP1
+        "55",  # SSTORE (slot = depth, value = depth)
+        "80",  # DUP1
+        "15",  # ISZERO
+        "6021",  # PUSH1 end
+        "57",  # JUMPI
+        "6001",  # PUSH1 1
+        "90",  # SWAP1
+        "03",  # SUB
+        "6000",  # PUSH1 0
+        "52",  # MSTORE
+        "6000",  # PUSH1 0 (retSize)
+        "6000",  # PUSH1 0 (retOffset)
+        "6020",  # PUSH1 32 (argsSize)
+        "6000",  # PUSH1 0 (argsOffset)
+        "6000",  # PUSH1 0 (value)
+        "30",  # ADDRESS
+        "5a",  # GAS
+        "f1",  # CALL
+        "50",  # POP
+        "00",  # STOP
+        "5b",  # JUMPDEST (end)
+        "00",  # STOP
+    ]
+    bytecode = "".join(code)
+    assert bytes.fromhex(bytecode)[0x21] == 0x5B
+    return "0x" + bytecode
+
+
+def write_inputs(directory: str, txs: int, depth: int) -> None:
+    """Write the alloc, env and txs for one scenario into `directory`."""
+    alloc: Dict[str, Any] = {
+        SENDER: {"balance": hex(10**24), "nonce": "0x0"},
+        CONTRACT: {"balance": "0x0", "code": recursive_contract()},
+    }
+    for address in SYSTEM_CONTRACTS:
+        alloc[address] = {"balance": "0x0", "code": "0x00"}
+
+    env = {
+        "currentCoinbase": "0x" + "ba" * 20,
+        "currentGasLimit": hex(TX_GAS_LIMIT * txs),
+        "currentNumber": "0x1",
+        "currentTimestamp": "0x3e8",
+        "currentRandom": "0x" + "00" * 32,
+        "currentBaseFee": "0x7",
+        "currentExcessBlobGas": "0x0",
+        "parentBeaconBlockRoot": "0x" + "00" * 32,
+        "withdrawals": [],
+        "blockHashes": {"0": "0x" + "00" * 32},
+    }
+
+    transactions = [
+        {
+            "type": "0x0",
+            "chainId": "0x1",
+            "nonce": hex(nonce),
+            "gasPrice": "0xa",
+            "gas": hex(TX_GAS_LIMIT),
+            "to": CONTRACT,
+            "value": "0x0",
+            # Each transaction writes slots the previous one didn't, so none
+            # of its writes are filtered as net-zero.
+            "input": "0x" + (depth + nonce % 2).to_bytes(32, "big").hex(),
+            "v": "0x0",
+            "r": "0x0",
+            "s": "0x0",
+            "secretKey": SECRET_KEY,
+        }
+        for nonce in range(txs)
+    ]
+
+    for name, data in (
+        ("alloc", alloc),
+        ("env", env),
+        ("txs", transactions),
+    ):
+        with open(os.path.join(directory, f"{name}.json"), "w") as f:
+            json.dump(data, f)
+
+
+def run_child(mode: str, directory: str) -> None:
+    """Run `t8n` once in this process and print the elapsed seconds."""
+    if mode == "journaled":
+        import ethereum_optimized
+        from ethereum_spec_tools.forks import Hardfork
+
+        for fork in Hardfork.discover():
+            ethereum_optimized.monkey_patch_journaled_state_tracker(
+                fork.short_name
+            )
+
+    from ethereum_spec_tools.evm_tools import main
+
+    args = [
+        "t8n",
+        f"--input.alloc={directory}/alloc.json",
+        f"--input.env={directory}/env.json",
+        f"--input.txs={directory}/txs.json",
+        f"--output.basedir={directory}",
+        f"--output.alloc=alloc-{mode}.json",
+        f"--output.result=result-{mode}.json",
+        f"--state.fork={FORK}",
+    ]
+
+    with open(os.devnull, "w") as devnull:
+        start = time.perf_counter()
+        exit_code = main(args, out_file=devnull)
+        elapsed = time.perf_counter() - start
+
+    if exit_code:
+        sys.exit(exit_code)
+    print(elapsed)
+
+
+def measure(mode: str, directory: str) -> float:
+    """Run `t8n` in a fresh interpreter and return the elapsed seconds."""
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", mode, directory],
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def result(directory: str, mode: str) -> Dict[str, Any]:
+    """Read the result produced by a previous run."""
+    with open(os.path.join(directory, f"result-{mode}.json")) as f:
+        return json.load(f)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=300,
+        help="Call depth of the deep-calls scenario",
+    )
+    parser.add_argument(
+        "--txs",
+        type=int,
+        default=10,
+        help="Number of transactions in the deep-calls scenario",
+    )
+    parser.add_argument(
+        "--child",
+        nargs=2,
+        metavar=("MODE", "DIRECTORY"),
+        help=argparse.SUPPRESS,
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run every scenario in both modes and print a comparison."""
+    args = parse_args()
+    if args.child is not None:
+        run_child(*args.child)
+        return
+
+    scenarios = [
+        ("deep-calls", args.txs, args.depth),
+        ("many-calls", args.txs * 20, 5),
+    ]
+
+    rows: List[str] = []
+    for name, txs, depth in scenarios:
+        with tempfile.TemporaryDirectory() as directory:
+            write_inputs(directory, txs, depth)
+            reference = measure("reference", directory)
+            journaled = measure("journaled", directory)
+
+            expected = result(directory, "reference")
+            actual = result(directory, "journaled")
+            if expected.get("rejected") or "blockException" in expected:
+                raise Exception(f"block failed in {name}")
+            for key in ("stateRoot", "blockAccessListHash"):
+                if expected[key] != actual[key]:
+                    raise Exception(f"{key} differs for {name}")
+
+        rows.append(
+            f"{name:<12} {txs:>5} {depth:>6} "
+            f"{reference:>11.3f}s {journaled:>11.3f}s "
+            f"{reference / journaled:>7.2f}x"
+        )
+
+    print(
+        f"{'scenario':<12} {'txs':>5} {'depth':>6} "
+        f"{'reference':>12} {'journaled':>12} {'speedup':>8}"
+    )
+    for row in rows:
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,30 +16,42 @@ function. This must be done before those modules are imported anywhere.
 """
 
 from importlib import import_module
-from typing import Any, Optional, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Tuple,
+    cast,
+)
 
 from ethereum_spec_tools.forks import Hardfork
 
-from .fork import get_optimized_pow_patches
-from .state_db import get_optimized_state_patches
-
 
 def monkey_patch_optimized_state_db(
-    fork_name: str, state_path: Optional[str]
+    fork_name: str, state_path: Optional[str], backend: str = "rust"
 ) -> None:
     """
     Replace the state interface with one that supports high performance
     updates and storing state in a database.
 
+    The `rust` backend needs the optional dependencies. The `sqlite` backend
+    only needs the standard library, but is slower.
+
     This function must be called before the state interface is imported
     anywhere.
     """
+    from .state_db import get_optimized_state_patches
+
     slow_state = cast(
         Any,
         import_module("ethereum.forks." + fork_name + ".state"),
     )
 
-    optimized_state_db_patches = get_optimized_state_patches(fork_name)
+    optimized_state_db_patches = get_optimized_state_patches(
+        fork_name, backend
+    )
 
     for name, value in optimized_state_db_patches.items():
         setattr(slow_state, name, value)
@@ -48,6 +60,21 @@ def monkey_patch_optimized_state_db(
         slow_state.State.default_path = state_path
 
 
+def uses_native_ethash(state_backend: str) -> bool:
+    """
+    Check whether `monkey_patch()` with `state_backend` patches proof-of-work
+    forks with the optional `ethash` package, which is only used alongside
+    the `rust` backend and only if it is installed.
+    """
+    if state_backend == "sqlite":
+        return False
+    try:
+        import_module("ethash")
+    except ImportError:
+        return False
+    return True
+
+
 def monkey_patch_optimized_spec(fork_name: str) -> None:
     """
     Replace the ethash implementation with one that supports higher
@@ -56,6 +83,8 @@ def monkey_patch_optimized_spec(fork_name: str) -> None:
     This function must be called before the spec interface is imported
     anywhere.
     """
+    from .fork import get_optimized_pow_patches
+
     slow_spec = import_module("ethereum.forks." + fork_name + ".fork")
 
     optimized_pow_patches = get_optimized_pow_patches(fork_name)
@@ -64,15 +93,428 @@ def monkey_patch_optimized_spec(fork_name: str) -> None:
         setattr(slow_spec, name, value)
 
 
-def monkey_patch(state_path: Optional[str]) -> None:
+def monkey_patch_ethash_cache(
+    fork_name: str, cache_path: Optional[str]
+) -> None:
+    """
+    Replace the ethash cache generation of a proof-of-work fork with one that
+    generates each epoch's cache only once, optionally storing it in the
+    directory `cache_path`.
+
+    Unlike `monkey_patch_optimized_spec()` this does not need the `ethash`
+    package.
+    """
+    from .ethash_cache import get_ethash_cache_patches, get_store
+
+    slow_spec = import_module("ethereum.forks." + fork_name + ".fork")
+
+    patches = get_ethash_cache_patches(fork_name, get_store(cache_path))
+
+    for name, value in patches.items():
+        setattr(slow_spec, name, value)
+
+
+def monkey_patch_numpy_ethash(fork_name: str) -> None:
+    """
+    Replace the ethash cache generation and light verification of a
+    proof-of-work fork with versions that work on NumPy arrays.
+
+    `monkey_patch_ethash_cache()` can be applied afterwards to also keep the
+    caches, which the NumPy `hashimoto_light()` reads without copying.
+    """
+    from .ethash_numpy import get_numpy_ethash_patches
+
+    slow_spec = import_module("ethereum.forks." + fork_name + ".fork")
+
+    for name, value in get_numpy_ethash_patches(fork_name).items():
+        setattr(slow_spec, name, value)
+
+
+def monkey_patch_sender_recovery(
+    fork_name: str, max_workers: Optional[int] = None
+) -> None:
+    """
+    Recover the senders and authorities of each block in a thread pool of up
+    to `max_workers` threads before executing it.
+
+    The pool is shared by all forks, and is sized by the first call. Patching
+    a fork a second time does nothing.
+    """
+    from .sender_recovery import (
+        get_authority_recovery_patches,
+        get_recovery,
+        get_sender_recovery_patches,
+    )
+
+    slow_spec = import_module("ethereum.forks." + fork_name + ".fork")
+    if hasattr(slow_spec, "prefetch_senders"):
+        return
+
+    recovery = get_recovery(max_workers)
+
+    for name, value in get_sender_recovery_patches(
+        fork_name, recovery
+    ).items():
+        setattr(slow_spec, name, value)
+
+    try:
+        slow_delegation = import_module(
+            "ethereum.forks." + fork_name + ".vm.eoa_delegation"
+        )
+    except ModuleNotFoundError:
+        return
+
+    for name, value in get_authority_recovery_patches(
+        fork_name, recovery
+    ).items():
+        setattr(slow_delegation, name, value)
+
+
+def monkey_patch_jumpdest_cache(
+    fork_name: str, max_bytes: Optional[int] = None
+) -> None:
+    """
+    Replace the jump destination analysis with one that remembers the
+    analysis of codes of up to `max_bytes` bytes in total, as bitmaps.
+
+    The cache is shared by all forks, and is sized by the first call.
+
+    This function must be called before the interpreter is imported
+    anywhere.
+    """
+    from .jumpdest import get_cache, get_jumpdest_cache_patches
+
+    patches = get_jumpdest_cache_patches(fork_name, get_cache(max_bytes))
+
+    for module in ("runtime", "interpreter"):
+        slow_module = import_module(
+            "ethereum.forks." + fork_name + ".vm." + module
+        )
+        for name, value in patches.items():
+            setattr(slow_module, name, value)
+
+
+def monkey_patch_code_store(
+    fork_name: str, max_bytes: Optional[int] = None
+) -> None:
+    """
+    Replace the hashing of code in `encode_account()` and `EXTCODEHASH` with
+    lookups in a store that remembers the hashes of codes of up to
+    `max_bytes` bytes in total.
+
+    The store is shared by all forks, and is sized by the first call.
+
+    This function must be called before the trie interface is imported
+    anywhere.
+    """
+    from .code_store import (
+        get_code_hash_patches,
+        get_code_store_patches,
+        get_store,
+    )
+
+    store = get_store(max_bytes)
+
+    for module in ("fork_types", "trie"):
+        slow_module = import_module(
+            "ethereum.forks." + fork_name + "." + module
+        )
+        for name, value in get_code_store_patches(store).items():
+            setattr(slow_module, name, value)
+
+    # `EXTCODEHASH` only exists from Constantinople.
+    slow_environment = import_module(
+        "ethereum.forks." + fork_name + ".vm.instructions.environment"
+    )
+    if hasattr(slow_environment, "keccak256"):
+        for name, value in get_code_hash_patches(store).items():
+            setattr(slow_environment, name, value)
+
+
+def monkey_patch_dispatch_loop(
+    fork_name: str, max_bytes: Optional[int] = None
+) -> None:
+    """
+    Replace the interpreter loop with one that runs code decoded into a
+    dispatch table, keeping the tables of codes of up to `max_bytes` bytes in
+    total, and that skips opcode trace events while tracing is off.
+
+    Patching a fork a second time does nothing.
+    """
+    from .dispatch import get_dispatch_loop_patches
+
+    slow_interpreter = import_module(
+        "ethereum.forks." + fork_name + ".vm.interpreter"
+    )
+    if hasattr(slow_interpreter, "run_code"):
+        return
+
+    for name, value in get_dispatch_loop_patches(fork_name, max_bytes).items():
+        setattr(slow_interpreter, name, value)
+
+
+def monkey_patch_journaled_state(fork_name: str) -> None:
+    """
+    Replace the snapshotting transactions of the state interface with ones
+    that keep an undo log, so that beginning, committing and rolling back a
+    transaction no longer copies the whole state.
+
+    Unlike `monkey_patch_optimized_state_db()` this does not need any of the
+    optional dependencies, and it must not be combined with it.
+
+    This function must be called before the state interface is imported
+    anywhere.
+    """
+    from .state_journal import get_journaled_state_patches
+
+    slow_state = import_module("ethereum.forks." + fork_name + ".state")
+
+    for name, value in get_journaled_state_patches(fork_name).items():
+        setattr(slow_state, name, value)
+
+
+def monkey_patch_incremental_trie(fork_name: str) -> None:
+    """
+    Replace the trie with one that caches the nodes of its last root, so that
+    `root()` only re-encodes the paths to keys changed since then, and the
+    state root with one that only recomputes the storage roots of accounts
+    whose storage changed.
+
+    Like `monkey_patch_journaled_state()` this does not need any of the
+    optional dependencies.
+
+    This function must be called before the trie interface is imported
+    anywhere.
+    """
+    from .incremental_trie import (
+        get_incremental_state_patches,
+        get_incremental_trie_patches,
+    )
+
+    slow_trie = import_module("ethereum.forks." + fork_name + ".trie")
+
+    for name, value in get_incremental_trie_patches(fork_name).items():
+        setattr(slow_trie, name, value)
+
+    slow_state = import_module("ethereum.forks." + fork_name + ".state")
+    if slow_state.state_root.__module__ != slow_state.__name__:
+        # Replaced by a state that doesn't keep its storage in tries.
+        return
+
+    for name, value in get_incremental_state_patches(fork_name).items():
+        setattr(slow_state, name, value)
+
+
+def monkey_patch_journaled_state_tracker(fork_name: str) -> None:
+    """
+    Replace the [EIP-7928] state change tracking with one that records the
+    changes of each transaction in a flat journal, and builds the block
+    access list from the journal of the block.
+
+    Forks without block access lists are left alone.
+
+    This function must be called before the state tracker is imported
+    anywhere.
+
+    [EIP-7928]: https://eips.ethereum.org/EIPS/eip-7928
+    """
+    from .state_tracker import (
+        get_block_access_list_builder_patches,
+        get_state_tracker_patches,
+    )
+
+    try:
+        slow_tracker = import_module(
+            "ethereum.forks." + fork_name + ".state_tracker"
+        )
+    except ModuleNotFoundError:
+        return
+
+    for name, value in get_state_tracker_patches(fork_name).items():
+        setattr(slow_tracker, name, value)
+
+    builder_patches = get_block_access_list_builder_patches(fork_name)
+    for module in ("block_access_lists.builder", "block_access_lists"):
+        slow_module = import_module(
+            "ethereum.forks." + fork_name + "." + module
+        )
+        for name, value in builder_patches.items():
+            setattr(slow_module, name, value)
+
+
+def monkey_patch_blake2() -> None:
+    """
+    Replace the BLAKE2b compression used by the `blake2f` precompile with one
+    that works on 64-bit `int` words instead of `Uint`.
+
+    `Blake2b` is shared by every fork, so this patches all of them at once,
+    and can be called at any time.
+    """
+    from ethereum.crypto.blake2 import Blake2b
+
+    from .blake2 import get_blake2b_patches
+
+    for name, value in get_blake2b_patches().items():
+        setattr(Blake2b, name, value)
+
+
+def monkey_patch_kzg(
+    fork_name: str, max_entries: Optional[int] = None
+) -> None:
+    """
+    Replace the KZG proof verification with one that decompresses the
+    trusted setup once, multiplies the generators with precomputed tables,
+    and remembers the results of up to `max_entries` verifications.
+
+    The cache is shared by all forks, and is sized by the first call. Forks
+    without the point evaluation precompile only have `ethereum.crypto.kzg`
+    patched.
+    """
+    import ethereum.crypto.kzg as slow_kzg
+
+    from .kzg import get_cache, get_kzg_patches
+
+    patches = get_kzg_patches(get_cache(max_entries))
+
+    for name, value in patches.items():
+        setattr(slow_kzg, name, value)
+
+    try:
+        slow_point_evaluation = cast(
+            Any,
+            import_module(
+                "ethereum.forks."
+                + fork_name
+                + ".vm.precompiled_contracts.point_evaluation"
+            ),
+        )
+    except ModuleNotFoundError:
+        return
+
+    slow_point_evaluation.verify_kzg_proof = patches["verify_kzg_proof"]
+
+
+def _patch_precompiles(
+    fork_name: str,
+    patches: Iterable[Tuple[str, Callable[[str], Dict[str, Any]]]],
+) -> None:
+    """
+    Patch each of the fork's precompile modules named in `patches`, relative
+    to `vm.precompiled_contracts`, with the dictionary returned by calling
+    its function with `fork_name`. The patched precompiles also replace the
+    originals in the precompile mapping. Missing modules are skipped.
+    """
+    package = "ethereum.forks." + fork_name + ".vm.precompiled_contracts"
+    try:
+        mapping = cast(Any, import_module(package + ".mapping"))
+    except ModuleNotFoundError:
+        return
+
+    contracts = mapping.PRE_COMPILED_CONTRACTS
+    for module_name, get_patches in patches:
+        try:
+            slow_module = import_module(package + module_name)
+        except ModuleNotFoundError:
+            continue
+
+        for name, value in get_patches(fork_name).items():
+            original = getattr(slow_module, name)
+            setattr(slow_module, name, value)
+            for address in list(contracts):
+                if contracts[address] is original:
+                    contracts[address] = value
+
+
+def monkey_patch_multi_pairing(fork_name: str) -> None:
+    """
+    Replace the pairing products of the `alt_bn128` and BLS12-381 pairing
+    precompiles, and the pairing check of KZG proof verification, with ones
+    that run the Miller loops of all of their pairs together and share a
+    single final exponentiation. The precompiles' gas and input validation
+    are left to the spec.
+
+    `ethereum.crypto.kzg` is shared by every fork, and is patched each time.
+    Forks without one of the precompiles don't have it patched.
+    """
+    import ethereum.crypto.kzg as slow_kzg
+
+    from .pairing import (
+        get_alt_bn128_patches,
+        get_bls12_pairing_patches,
+        get_kzg_pairing_patches,
+    )
+
+    for name, value in get_kzg_pairing_patches().items():
+        setattr(slow_kzg, name, value)
+
+    _patch_precompiles(
+        fork_name,
+        [
+            (".alt_bn128", get_alt_bn128_patches),
+            (".bls12_381.bls12_381_pairing", get_bls12_pairing_patches),
+        ],
+    )
+
+
+def monkey_patch_pippenger_msm(fork_name: str) -> None:
+    """
+    Replace the BLS12-381 G1 and G2 multi-scalar multiplication precompiles
+    with ones that use the bucket method, instead of multiplying each point
+    separately.
+
+    Forks without the precompiles are not patched.
+    """
+    from .msm import get_bls12_g1_msm_patches, get_bls12_g2_msm_patches
+
+    _patch_precompiles(
+        fork_name,
+        [
+            (".bls12_381.bls12_381_g1", get_bls12_g1_msm_patches),
+            (".bls12_381.bls12_381_g2", get_bls12_g2_msm_patches),
+        ],
+    )
+
+
+def monkey_patch(
+    state_path: Optional[str],
+    state_backend: str = "rust",
+    ethash_cache: Optional[str] = None,
+    sender_recovery_workers: Optional[int] = None,
+) -> None:
     """
     Apply all monkey patches to the specification.
+
+    Senders are only recovered ahead of time, with
+    `monkey_patch_sender_recovery()`, if `sender_recovery_workers` is given.
+
+    Proof-of-work forks use the `ethash` package when `uses_native_ethash()`,
+    and otherwise `monkey_patch_ethash_cache()`, storing the caches in the
+    directory `ethash_cache`.
     """
+    native_ethash = uses_native_ethash(state_backend)
+
+    monkey_patch_blake2()
+
     forks = Hardfork.discover()
 
     for fork in forks:
-        monkey_patch_optimized_state_db(fork.short_name, state_path)
+        monkey_patch_optimized_state_db(
+            fork.short_name, state_path, state_backend
+        )
+        if sender_recovery_workers is not None:
+            monkey_patch_sender_recovery(
+                fork.short_name, sender_recovery_workers
+            )
+        monkey_patch_jumpdest_cache(fork.short_name)
+        monkey_patch_code_store(fork.short_name)
+        monkey_patch_kzg(fork.short_name)
+        monkey_patch_multi_pairing(fork.short_name)
+        monkey_patch_pippenger_msm(fork.short_name)
+        monkey_patch_journaled_state_tracker(fork.short_name)
 
         # Only patch the POW code on POW forks
         if fork.consensus.is_pow():
-            monkey_patch_optimized_spec(fork.short_name)
+            if native_ethash:
+                monkey_patch_optimized_spec(fork.short_name)
+            else:
+                monkey_patch_ethash_cache(fork.short_name, ethash_cache)
@@ -0,0 +1,138 @@
+"""
+Fixed-Width BLAKE2b.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains a version of the BLAKE2b `F` compression function from
+`ethereum.crypto.blake2` which works on plain `int` words masked to 64 bits,
+and which can be monkey patched into `Blake2b`, the class used by the
+`blake2f` precompile of every fork.
+
+The reference mixes `Uint` words and reduces every operation modulo `2**64`,
+so each of the eight mixes in a round creates dozens of `Uint` objects. Here
+the sixteen words of the working vector are kept in local variables, and a
+round costs a fixed number of integer operations, so the cost of the
+precompile grows linearly and slowly with its number of rounds.
+"""
+
+import struct
+from typing import Any, Dict, List, Sequence, Tuple
+
+from ethereum_types.numeric import Uint
+
+from ethereum.crypto.blake2 import Blake2b
+
+from .utils import add_item
+
+MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+IV = tuple(int(word) for word in Blake2b.IV)
+SIGMA = Blake2b.sigma
+
+
+def g(
+    a: int, b: int, c: int, d: int, x: int, y: int
+) -> Tuple[int, int, int, int]:
+    """
+    The mixing function `G` of [RFC 7693], returning the new values of the
+    four mixed words.
+
+    [RFC 7693]: https://datatracker.ietf.org/doc/html/rfc7693#section-3.1
+    """
+    a = (a + b + x) & MASK_64
+    d ^= a
+    d = (d >> 32) | ((d << 32) & MASK_64)
+    c = (c + d) & MASK_64
+    b ^= c
+    b = (b >> 24) | ((b << 40) & MASK_64)
+    a = (a + b + y) & MASK_64
+    d ^= a
+    d = (d >> 16) | ((d << 48) & MASK_64)
+    c = (c + d) & MASK_64
+    b ^= c
+    b = (b >> 63) | ((b << 1) & MASK_64)
+    return a, b, c, d
+
+
+def compress_words(
+    num_rounds: int,
+    h: Sequence[int],
+    m: Sequence[int],
+    t_0: int,
+    t_1: int,
+    f: bool,
+) -> bytes:
+    """
+    'F Compression' from section 3.2 of RFC 7693, on 64-bit words.
+
+    See `ethereum.crypto.blake2.Blake2.compress`.
+    """
+    v0, v1, v2, v3, v4, v5, v6, v7 = h
+    v8, v9, v10, v11, v12, v13, v14, v15 = IV
+
+    v12 ^= t_0
+    v13 ^= t_1
+    if f:
+        v14 ^= MASK_64
+
+    for r in range(num_rounds):
+        s = SIGMA[r % 10]
+
+        v0, v4, v8, v12 = g(v0, v4, v8, v12, m[s[0]], m[s[1]])
+        v1, v5, v9, v13 = g(v1, v5, v9, v13, m[s[2]], m[s[3]])
+        v2, v6, v10, v14 = g(v2, v6, v10, v14, m[s[4]], m[s[5]])
+        v3, v7, v11, v15 = g(v3, v7, v11, v15, m[s[6]], m[s[7]])
+        v0, v5, v10, v15 = g(v0, v5, v10, v15, m[s[8]], m[s[9]])
+        v1, v6, v11, v12 = g(v1, v6, v11, v12, m[s[10]], m[s[11]])
+        v2, v7, v8, v13 = g(v2, v7, v8, v13, m[s[12]], m[s[13]])
+        v3, v4, v9, v14 = g(v3, v4, v9, v14, m[s[14]], m[s[15]])
+
+    return struct.pack(
+        "<8Q",
+        h[0] ^ v0 ^ v8,
+        h[1] ^ v1 ^ v9,
+        h[2] ^ v2 ^ v10,
+        h[3] ^ v3 ^ v11,
+        h[4] ^ v4 ^ v12,
+        h[5] ^ v5 ^ v13,
+        h[6] ^ v6 ^ v14,
+        h[7] ^ v7 ^ v15,
+    )
+
+
+def get_blake2b_patches() -> Dict[str, Any]:
+    """
+    Get a dictionary of functions to be monkey patched into the `Blake2b`
+    class.
+    """
+    patches: Dict[str, Any] = {}
+
+    @add_item(patches)
+    def compress(
+        self: Blake2b,
+        num_rounds: Uint,
+        h: List[Uint],
+        m: List[Uint],
+        t_0: Uint,
+        t_1: Uint,
+        f: bool,
+    ) -> bytes:
+        """
+        See `ethereum.crypto.blake2.Blake2.compress`.
+        """
+        del self
+        return compress_words(
+            int(num_rounds),
+            [int(word) for word in h],
+            [int(word) for word in m],
+            int(t_0),
+            int(t_1),
+            bool(f),
+        )
+
+    return patches
@@ -0,0 +1,164 @@
+"""
+Content-Addressed Code Store.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains a store of code keyed by code hash, and versions of
+`encode_account()` and the `EXTCODEHASH` instruction's hashing that look code
+hashes up in it. They can be monkey patched into the fork's `fork_types`,
+`trie` and `vm.instructions.environment` modules.
+
+The reference hashes the code of every account each time the state trie is
+encoded, and on every `EXTCODEHASH`, so a state holding many copies of a large
+contract hashes the same megabytes again for each state root. The store
+remembers the hashes of codes of up to `max_bytes` bytes in total, least
+recently used first out. It finds a code's hash by the code itself, which
+Python hashes once per `bytes` object and compares with `memcmp()`, both much
+cheaper than `keccak256`. Each hash maps back to one copy of its code, so the
+store can also be read by code hash.
+
+`Account` keeps its `code`, so the forks see exactly the same accounts as
+before.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from ethereum_rlp import rlp
+from ethereum_types.bytes import Bytes
+
+from ethereum.crypto.hash import Hash32, keccak256
+
+from .utils import add_item
+
+# Larger than the other caches' default, since every account's code is hashed
+# for each state root.
+DEFAULT_MAX_BYTES = 1 << 24
+
+
+class CodeStore:
+    """
+    Least recently used store of codes of up to `max_bytes` bytes in total,
+    keyed by their hashes, which remembers the hash of each code.
+    """
+
+    max_bytes: int
+    hits: int
+    misses: int
+    _hashes: "OrderedDict[bytes, Hash32]"
+    _codes: Dict[Hash32, bytes]
+    _bytes: int
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._hashes = OrderedDict()
+        self._codes = {}
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        """Count the stored codes."""
+        return len(self._codes)
+
+    def code_hash(self, code: bytes) -> Hash32:
+        """
+        Get the hash of `code`, hashing and storing it if it isn't stored.
+        """
+        hashes = self._hashes
+        code_hash = hashes.get(code)
+        if code_hash is not None:
+            self.hits += 1
+            hashes.move_to_end(code)
+            return code_hash
+
+        self.misses += 1
+        code_hash = keccak256(code)
+        if len(code) > self.max_bytes:
+            return code_hash
+
+        hashes[code] = code_hash
+        self._codes[code_hash] = code
+        self._bytes += len(code)
+        while self._bytes > self.max_bytes:
+            evicted_code, evicted = hashes.popitem(last=False)
+            del self._codes[evicted]
+            self._bytes -= len(evicted_code)
+        return code_hash
+
+    def get(self, code_hash: Hash32) -> Optional[bytes]:
+        """
+        Get the stored code whose hash is `code_hash`, if there is one.
+        """
+        return self._codes.get(code_hash)
+
+    def clear(self) -> None:
+        """
+        Forget every code, and reset the counters.
+        """
+        self._hashes.clear()
+        self._codes.clear()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+_store: Optional[CodeStore] = None
+
+
+def get_store(max_bytes: Optional[int] = None) -> CodeStore:
+    """
+    Get the store shared by every patched fork, creating it with room for
+    codes of `max_bytes` bytes in total if necessary.
+    """
+    global _store
+    if _store is None:
+        _store = CodeStore(max_bytes or DEFAULT_MAX_BYTES)
+    return _store
+
+
+def get_code_store_patches(store: CodeStore) -> Dict[str, Any]:
+    """
+    Get a dictionary of functions to be monkey patched into the fork's
+    `fork_types` and `trie` modules to hash code with `store`.
+    """
+    patches: Dict[str, Any] = {}
+
+    @add_item(patches)
+    def encode_account(raw_account_data: Any, storage_root: Bytes) -> Bytes:
+        """
+        See `encode_account` in the fork's `fork_types` module.
+        """
+        return rlp.encode(
+            (
+                raw_account_data.nonce,
+                raw_account_data.balance,
+                storage_root,
+                store.code_hash(raw_account_data.code),
+            )
+        )
+
+    return patches
+
+
+def get_code_hash_patches(store: CodeStore) -> Dict[str, Any]:
+    """
+    Get a dictionary of functions to be monkey patched into the fork's
+    `vm.instructions.environment` module, where `keccak256` only hashes code
+    for `EXTCODEHASH`, to hash code with `store`.
+    """
+    patches: Dict[str, Any] = {}
+
+    @add_item(patches)
+    def keccak256(buffer: Bytes) -> Hash32:
+        """
+        See `ethereum.crypto.hash.keccak256`.
+        """
+        return store.code_hash(buffer)
+
+    return patches
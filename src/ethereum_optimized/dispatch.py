@@ -0,0 +1,260 @@
+"""
+Pre-decoded Dispatch Loop.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains a version of the fork's `vm.interpreter.process_message`
+whose main loop runs from a dispatch table instead of decoding each opcode as
+it is executed.
+
+Each code is decoded once into a list with the instruction implementation
+for every `pc`. `PUSH-N` opcodes get an implementation with their immediate
+already parsed. Tables are kept in a least recently used cache, keyed by the
+code. A table takes several times the memory of its code, so the cache is
+bounded by the total length of the codes rather than by their number.
+
+While the active tracer is `ethereum.trace.discard_evm_trace` the `OpStart`
+and `OpEnd` events are not created at all. Otherwise they are emitted exactly
+as before.
+
+The rest of `process_message` differs between forks, so it isn't rewritten
+here. Instead, the loop is replaced in the syntax tree of the fork's own
+function, which is then compiled in the fork's interpreter module.
+"""
+
+import ast
+import inspect
+import textwrap
+from collections import OrderedDict
+from importlib import import_module
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ethereum_types.numeric import U256, Uint, ulen
+
+import ethereum.trace
+from ethereum.trace import OpEnd, OpStart, discard_evm_trace, evm_trace
+
+from .utils import add_item
+
+PUSH1 = 0x60
+PUSH32 = 0x7F
+
+DEFAULT_MAX_BYTES = 1 << 21
+
+LOOP = "evm.running and evm.pc < ulen(evm.code)"
+
+Handler = Callable[[Any], None]
+Table = Tuple[List[Handler], List[Any]]
+
+
+class DispatchTables:
+    """
+    Least recently used cache of the decoded code of one fork, holding codes
+    of up to `max_bytes` bytes in total.
+    """
+
+    max_bytes: int
+    hits: int
+    misses: int
+    _decode: Callable[[bytes], Table]
+    _entries: "OrderedDict[bytes, Table]"
+    _bytes: int
+
+    def __init__(
+        self,
+        decode: Callable[[bytes], Table],
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._decode = decode
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        """Count the cached tables."""
+        return len(self._entries)
+
+    def get(self, code: bytes) -> Table:
+        """
+        Get the handlers and opcodes for each `pc` of `code`, decoding it if
+        it isn't cached.
+        """
+        entries = self._entries
+        table = entries.get(code)
+        if table is not None:
+            self.hits += 1
+            entries.move_to_end(code)
+            return table
+
+        self.misses += 1
+        table = self._decode(code)
+        if len(code) > self.max_bytes:
+            return table
+
+        entries[code] = table
+        self._bytes += len(code)
+        while self._bytes > self.max_bytes:
+            evicted, _ = entries.popitem(last=False)
+            self._bytes -= len(evicted)
+        return table
+
+
+def replace_loop(function: Callable[..., Any], call: str) -> Any:
+    """
+    Compile a copy of `function`, in its own module, with its interpreter
+    loop replaced by the statement `call`.
+    """
+    source = textwrap.dedent(inspect.getsource(function))
+    tree = ast.parse(source)
+
+    loops = [
+        node
+        for node in ast.walk(tree)
+        if isinstance(node, ast.While) and ast.unparse(node.test) == LOOP
+    ]
+    if len(loops) != 1:
+        raise Exception(
+            f"Expected one interpreter loop in `{function.__qualname__}`, "
+            f"found {len(loops)}"
+        )
+    (loop,) = loops
+
+    replacement = ast.parse(call).body[0]
+    ast.copy_location(replacement, loop)
+    for parent in ast.walk(tree):
+        for _, value in ast.iter_fields(parent):
+            if isinstance(value, list) and loop in value:
+                value[value.index(loop)] = replacement
+    ast.fix_missing_locations(tree)
+    ast.increment_lineno(tree, function.__code__.co_firstlineno - 1)
+
+    module = inspect.getmodule(function)
+    assert module is not None
+    namespace: Dict[str, Any] = {}
+    exec(
+        compile(tree, inspect.getsourcefile(function) or "<patched>", "exec"),
+        module.__dict__,
+        namespace,
+    )
+    return namespace[function.__name__]
+
+
+def get_dispatch_loop_patches(
+    fork_name: str, max_bytes: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Get a dictionary of patches to be patched into the fork's
+    `vm.interpreter` module to use the pre-decoded dispatch loop, keeping the
+    tables of codes of up to `max_bytes` bytes in total.
+    """
+    patches: Dict[str, Any] = {}
+
+    mod: Any = import_module("ethereum.forks." + fork_name + ".vm.interpreter")
+    instructions: Any = import_module(
+        "ethereum.forks." + fork_name + ".vm.instructions"
+    )
+    stack_instructions: Any = import_module(
+        "ethereum.forks." + fork_name + ".vm.instructions.stack"
+    )
+
+    ops = instructions.Ops
+    if ops.PUSH1.value != PUSH1 or ops.PUSH32.value != PUSH32:
+        raise Exception(
+            "Attempted to get dispatch loop patches for a fork with "
+            "different push opcodes"
+        )
+
+    charge_gas = stack_instructions.charge_gas
+    push_gas = stack_instructions.GAS_VERY_LOW
+    stack_push = stack_instructions.stack.push
+    invalid_opcode = mod.InvalidOpcode
+
+    def make_invalid(byte: int) -> Handler:
+        def invalid(evm: Any) -> None:
+            del evm
+            raise invalid_opcode(byte)
+
+        return invalid
+
+    def make_push(value: U256, size: int) -> Handler:
+        advance = Uint(1 + size)
+
+        def push_immediate(evm: Any) -> None:
+            charge_gas(evm, push_gas)
+            stack_push(evm.stack, value)
+            evm.pc += advance
+
+        return push_immediate
+
+    by_byte: List[Tuple[Handler, Any]] = []
+
+    def decode(code: bytes) -> Table:
+        """
+        Decode `code` into a handler, and an opcode (or `None` if invalid),
+        for every `pc`.
+        """
+        if not by_byte:
+            # Built on first use, so that patched instructions are used.
+            for byte in range(256):
+                try:
+                    op = ops(byte)
+                except ValueError:
+                    by_byte.append((make_invalid(byte), None))
+                else:
+                    by_byte.append((instructions.op_implementation[op], op))
+
+        handlers = [by_byte[byte][0] for byte in code]
+        opcodes = [by_byte[byte][1] for byte in code]
+
+        # Only the pushes reached by decoding from the start can run: every
+        # jump destination is found the same way.
+        pc = 0
+        length = len(code)
+        while pc < length:
+            byte = code[pc]
+            if PUSH1 <= byte <= PUSH32:
+                size = byte - PUSH1 + 1
+                data = code[pc + 1 : pc + 1 + size].ljust(size, b"\x00")
+                handlers[pc] = make_push(U256.from_be_bytes(data), size)
+                pc += size
+            pc += 1
+
+        return handlers, opcodes
+
+    tables = DispatchTables(decode, max_bytes or DEFAULT_MAX_BYTES)
+
+    @add_item(patches)
+    def run_code(evm: Any) -> None:
+        """
+        Execute `evm.code` from `evm.pc` until it stops.
+        """
+        handlers, opcodes = tables.get(evm.code)
+        length = ulen(evm.code)
+
+        if ethereum.trace._evm_trace is discard_evm_trace:
+            while evm.running and evm.pc < length:
+                handlers[evm.pc](evm)
+            return
+
+        while evm.running and evm.pc < length:
+            handler = handlers[evm.pc]
+            op = opcodes[evm.pc]
+            if op is None:
+                handler(evm)
+
+            evm_trace(evm, OpStart(op))
+            handler(evm)
+            evm_trace(evm, OpEnd())
+
+    add_item(patches)(replace_loop(mod.process_message, "run_code(evm)"))
+
+    patches["dispatch_tables"] = tables
+
+    return patches
@@ -0,0 +1,238 @@
+"""
+Ethash Cache Store.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains a replacement for `generate_cache()` that can be monkey
+patched into the `fork` module of a proof-of-work fork.
+
+The reference `validate_proof_of_work()` regenerates the ethash cache for
+every block, even though it only changes once per epoch. Here generated caches
+are kept in memory, keyed by epoch, and can optionally be written to a
+directory and memory-mapped back in later runs.
+
+Caches are stored as the raw little-endian words, and handed to
+`hashimoto_light()` as a `CacheView`, which only decodes the rows that are
+actually read. Unlike `ethereum_optimized.fork`, nothing here needs the
+native `ethash` package.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+from collections import OrderedDict
+from importlib import import_module
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+    overload,
+)
+
+from ethereum_types.numeric import U32, Uint
+
+import ethereum.ethash as ethash
+from ethereum.utils.numeric import le_uint32_sequence_to_bytes
+
+from .utils import add_item
+
+ROW = struct.Struct("<16I")
+
+Cache = Tuple[Tuple[U32, ...], ...]
+
+
+class CacheView(Sequence[Tuple[U32, ...]]):
+    """
+    Read-only view of an ethash cache stored as little-endian words, with the
+    same rows as the tuple returned by `generate_cache()`.
+    """
+
+    __slots__ = ("buffer", "rows")
+
+    buffer: Union[bytes, mmap.mmap]
+    rows: int
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        if len(buffer) % ROW.size != 0:
+            raise ValueError("ethash cache is not a whole number of rows")
+        self.buffer = buffer
+        self.rows = len(buffer) // ROW.size
+
+    def __len__(self) -> int:
+        """Number of rows in the cache."""
+        return self.rows
+
+    @overload
+    def __getitem__(self, index: int) -> Tuple[U32, ...]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[Tuple[U32, ...]]: ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[Tuple[U32, ...], Sequence[Tuple[U32, ...]]]:
+        """Decode the row (or rows) at `index`."""
+        if isinstance(index, slice):
+            return tuple(self[i] for i in range(*index.indices(self.rows)))
+        # `generate_dataset_item()` indexes with `Uint` and `U32`.
+        index = int(index)
+        if index < 0:
+            index += self.rows
+        if not 0 <= index < self.rows:
+            raise IndexError("ethash cache row out of range")
+        return tuple(
+            U32(word)
+            for word in ROW.unpack_from(self.buffer, index * ROW.size)
+        )
+
+    def __iter__(self) -> Iterator[Tuple[U32, ...]]:
+        """Decode every row in order."""
+        for words in ROW.iter_unpack(self.buffer):
+            yield tuple(U32(word) for word in words)
+
+
+class EthashCacheStore:
+    """
+    Ethash caches keyed by epoch.
+
+    The `max_in_memory` most recently used caches are kept in memory. If
+    `path` is given, generated caches are also written there, and later
+    loaded from there instead of being generated again.
+    """
+
+    path: Optional[str]
+    max_in_memory: int
+    _caches: "OrderedDict[Uint, CacheView]"
+
+    def __init__(self, path: Optional[str] = None, max_in_memory: int = 2):
+        if max_in_memory < 1:
+            raise ValueError("max_in_memory must be at least 1")
+        self.path = path
+        self.max_in_memory = max_in_memory
+        self._caches = OrderedDict()
+
+    def file_name(self, block_number: Uint) -> str:
+        """
+        Get the path of the cache file for the epoch of `block_number`.
+        """
+        assert self.path is not None
+        epoch_number = ethash.epoch(block_number)
+        seed = ethash.generate_seed(block_number)
+        return os.path.join(
+            self.path, f"cache-{epoch_number}-{seed[:8].hex()}.bin"
+        )
+
+    def load(self, block_number: Uint) -> Optional[CacheView]:
+        """
+        Memory map the stored cache for the epoch of `block_number`, if there
+        is a complete one.
+        """
+        if self.path is None:
+            return None
+
+        try:
+            with open(self.file_name(block_number), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size != ethash.cache_size(block_number):
+                    return None
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+        return CacheView(buffer)
+
+    def save(self, block_number: Uint, buffer: bytes) -> None:
+        """
+        Atomically write `buffer` as the cache for the epoch of
+        `block_number`.
+        """
+        if self.path is None:
+            return
+
+        os.makedirs(self.path, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(buffer)
+            os.replace(temp_name, self.file_name(block_number))
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+    def get(self, block_number: Uint) -> CacheView:
+        """
+        Get the cache for the epoch of `block_number`, generating it if it
+        is neither in memory nor on disk.
+        """
+        epoch_number = ethash.epoch(block_number)
+
+        cache = self._caches.get(epoch_number)
+        if cache is not None:
+            self._caches.move_to_end(epoch_number)
+            return cache
+
+        cache = self.load(block_number)
+        if cache is None:
+            buffer = b"".join(
+                le_uint32_sequence_to_bytes(row)
+                for row in ethash.generate_cache(block_number)
+            )
+            self.save(block_number, buffer)
+            cache = CacheView(buffer)
+
+        self._caches[epoch_number] = cache
+        while len(self._caches) > self.max_in_memory:
+            self._caches.popitem(last=False)
+        return cache
+
+
+_stores: Dict[Optional[str], EthashCacheStore] = {}
+
+
+def get_store(path: Optional[str]) -> EthashCacheStore:
+    """
+    Get the store for `path`, so that forks sharing an epoch also share its
+    cache.
+    """
+    store = _stores.get(path)
+    if store is None:
+        store = EthashCacheStore(path)
+        _stores[path] = store
+    return store
+
+
+def get_ethash_cache_patches(
+    fork_name: str, store: EthashCacheStore
+) -> Dict[str, Any]:
+    """
+    Get a dictionary of patches to be patched into the fork to read ethash
+    caches from `store`.
+    """
+    patches: Dict[str, Any] = {}
+
+    mod = import_module("ethereum.forks." + fork_name + ".fork")
+
+    if not hasattr(mod, "validate_proof_of_work"):
+        raise Exception(
+            "Attempted to get ethash cache patches for non-pow fork"
+        )
+
+    @add_item(patches)
+    def generate_cache(block_number: Uint) -> Cache:
+        """
+        See `ethereum.ethash.generate_cache`.
+        """
+        return cast(Cache, store.get(block_number))
+
+    return patches
@@ -0,0 +1,209 @@
+"""
+NumPy Ethash.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains versions of the light ethash functions from
+`ethereum.ethash` that keep the cache as a contiguous `(rows, 16)` array of
+`uint32` words instead of tuples of `U32`, and which can be monkey patched
+into the `fork` module of a proof-of-work fork.
+
+The FNV mixing of whole rows, and the dataset parent lookups, are done as
+array operations. Several dataset items can be generated at once by
+`generate_dataset_items()`, which is how `hashimoto_light()` computes the two
+items read by each access.
+
+Every keccak call still depends on the previous one, so cache generation is
+only helped by XORing whole rows at a time.
+"""
+
+from importlib import import_module
+from typing import Any, Dict, Sequence, Tuple, Union
+
+from ethereum_types.bytes import Bytes, Bytes8
+from ethereum_types.numeric import U32, Uint
+
+import ethereum.ethash as ethash
+from ethereum.crypto.hash import Hash32, Hash64, keccak256, keccak512
+from ethereum.utils.numeric import le_uint32_sequence_to_bytes
+
+from .ethash_cache import CacheView
+from .utils import add_item
+
+try:
+    import numpy as np
+    import numpy.typing as npt
+except ImportError as e:
+    # Add a message, but keep it an ImportError.
+    raise e from Exception("Install `numpy` to enable this module")
+
+Words = npt.NDArray[np.uint32]
+
+FNV_PRIME = np.uint32(0x01000193)
+
+WORDS_PER_HASH = int(ethash.HASH_BYTES) // 4
+
+
+def fnv(a: Words, b: Words) -> Words:
+    """
+    Element-wise `ethereum.ethash.fnv`. Multiplication of `uint32` arrays
+    already wraps around at 2**32.
+    """
+    return (a * FNV_PRIME) ^ b
+
+
+def as_words(
+    cache: Union[Words, CacheView, Sequence[Tuple[U32, ...]]],
+) -> Words:
+    """
+    Get `cache` as a `(rows, 16)` array, without copying if it is already
+    stored as little-endian words.
+    """
+    if isinstance(cache, np.ndarray):
+        return cache
+    if isinstance(cache, CacheView):
+        buffer: Any = cache.buffer
+    else:
+        buffer = b"".join(le_uint32_sequence_to_bytes(row) for row in cache)
+    return np.frombuffer(buffer, dtype="<u4").reshape(-1, WORDS_PER_HASH)
+
+
+def generate_cache(block_number: Uint) -> Words:
+    """
+    See `ethereum.ethash.generate_cache`.
+    """
+    seed = ethash.generate_seed(block_number)
+    rows = int(ethash.cache_size(block_number) // ethash.HASH_BYTES)
+    row_bytes = int(ethash.HASH_BYTES)
+
+    cache = bytearray(rows * row_bytes)
+    item = keccak512(seed)
+    cache[0:row_bytes] = item
+    for index in range(1, rows):
+        item = keccak512(item)
+        cache[index * row_bytes : (index + 1) * row_bytes] = item
+
+    for _ in range(ethash.CACHE_ROUNDS):
+        for index in range(rows):
+            start = index * row_bytes
+            first = ((index - 1) % rows) * row_bytes
+            second = (
+                int.from_bytes(cache[start : start + 4], "little") % rows
+            ) * row_bytes
+            mixed = int.from_bytes(
+                cache[first : first + row_bytes], "little"
+            ) ^ int.from_bytes(cache[second : second + row_bytes], "little")
+            cache[start : start + row_bytes] = keccak512(
+                mixed.to_bytes(row_bytes, "little")
+            )
+
+    return np.frombuffer(cache, dtype="<u4").reshape(-1, WORDS_PER_HASH)
+
+
+def keccak512_rows(words: Words) -> Words:
+    """
+    Hash each row of `words` with `keccak512`.
+    """
+    row_bytes = int(ethash.HASH_BYTES)
+    buffer = words.astype("<u4").tobytes()
+    return np.frombuffer(
+        b"".join(
+            keccak512(buffer[start : start + row_bytes])
+            for start in range(0, len(buffer), row_bytes)
+        ),
+        dtype="<u4",
+    ).reshape(-1, WORDS_PER_HASH)
+
+
+def generate_dataset_items(cache: Words, indices: Words) -> Words:
+    """
+    Generate the dataset items at each of `indices` together. Row `i` of the
+    result is `ethereum.ethash.generate_dataset_item(cache, indices[i])` as
+    words.
+    """
+    rows = np.uint32(cache.shape[0])
+
+    mix = cache[indices % rows]
+    mix[:, 0] ^= indices
+    mix = keccak512_rows(mix)
+
+    for j in range(int(ethash.DATASET_PARENTS)):
+        parents = fnv(indices ^ np.uint32(j), mix[:, j % WORDS_PER_HASH])
+        mix = fnv(mix, cache[parents % rows])
+
+    return keccak512_rows(mix)
+
+
+def generate_dataset_item(
+    cache: Union[Words, CacheView, Sequence[Tuple[U32, ...]]], index: Uint
+) -> Hash64:
+    """
+    See `ethereum.ethash.generate_dataset_item`.
+    """
+    indices = np.array([int(index)], dtype=np.uint32)
+    item = generate_dataset_items(as_words(cache), indices)
+    return Hash64(item.astype("<u4").tobytes())
+
+
+def hashimoto_light(
+    header_hash: Hash32,
+    nonce: Bytes8,
+    cache: Union[Words, CacheView, Sequence[Tuple[U32, ...]]],
+    dataset_size: Uint,
+) -> Tuple[Bytes, Hash32]:
+    """
+    See `ethereum.ethash.hashimoto_light`.
+    """
+    words = as_words(cache)
+
+    nonce_le = Bytes(reversed(nonce))
+    seed_hash = keccak512(header_hash + nonce_le)
+    seed_head = int.from_bytes(seed_hash[:4], "little")
+
+    rows = int(dataset_size // ethash.MIX_BYTES)
+    hashes_per_mix = int(ethash.MIX_BYTES // ethash.HASH_BYTES)
+    mix = np.tile(np.frombuffer(seed_hash, dtype="<u4"), hashes_per_mix)
+    offsets = np.arange(hashes_per_mix, dtype=np.uint32)
+
+    for i in range(ethash.HASHIMOTO_ACCESSES):
+        # Scalar `numpy.uint32` arithmetic warns on overflow, so use `fnv`.
+        parent = (
+            int(ethash.fnv(U32(i ^ seed_head), U32(int(mix[i % len(mix)]))))
+            % rows
+        )
+        items = generate_dataset_items(
+            words, np.uint32(hashes_per_mix * parent) + offsets
+        )
+        mix = fnv(mix, items.reshape(-1))
+
+    compressed_mix = fnv(fnv(fnv(mix[0::4], mix[1::4]), mix[2::4]), mix[3::4])
+
+    mix_digest = Bytes(compressed_mix.astype("<u4").tobytes())
+    result = keccak256(seed_hash + mix_digest)
+
+    return mix_digest, result
+
+
+def get_numpy_ethash_patches(fork_name: str) -> Dict[str, Any]:
+    """
+    Get a dictionary of patches to be patched into the fork to use the NumPy
+    ethash functions.
+    """
+    patches: Dict[str, Any] = {}
+
+    mod = import_module("ethereum.forks." + fork_name + ".fork")
+
+    if not hasattr(mod, "validate_proof_of_work"):
+        raise Exception(
+            "Attempted to get numpy ethash patches for non-pow fork"
+        )
+
+    add_item(patches)(generate_cache)
+    add_item(patches)(hashimoto_light)
+
+    return patches
@@ -0,0 +1,740 @@
+"""
+Incremental Trie.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains functions that can be monkey patched into the fork's
+`trie` module so that `root()` only recomputes the parts of the trie that
+changed since it was last called.
+
+The reference `root()` rebuilds the whole Merkle Patricia Trie from `_data`
+on every call. Here each `Trie` remembers which keys were written since its
+last root, and keeps the previous trie as a tree of immutable nodes that
+cache their own encoding. Updating the tree copies only the nodes on the path
+to each changed key, so untouched subtrees are never encoded or hashed again.
+Because the nodes are never modified, `copy_trie()` can share the tree
+between the copies.
+
+The nodes are encoded with the fork's own `encode_internal_node()`, so the
+roots are identical to the reference implementation.
+"""
+
+import copy
+from dataclasses import dataclass, field
+from importlib import import_module
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+
+from ethereum_rlp import Extended, rlp
+from ethereum_types.bytes import Bytes, Bytes20
+
+from ethereum.crypto.hash import Hash32, keccak256
+
+from .utils import add_item
+
+Address = Bytes20
+Root = Hash32
+
+K = TypeVar("K", bound=Bytes)
+V = TypeVar("V")
+
+
+class TrackedDict(dict):
+    """
+    Dictionary which remembers every key that was written or deleted since
+    `dirty` was last cleared.
+
+    A dictionary can also have an `owner`, a set and a key to add to it on
+    every write, which is how the data of a storage trie tells its
+    `StorageTries` that the account's storage changed.
+    """
+
+    __slots__ = ("dirty", "owner")
+
+    dirty: Set[Any]
+    owner: Optional[Tuple[Set[Any], Any]]
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.dirty = set(self)
+        self.owner = None
+
+    def _mark(self, key: Any) -> None:
+        """Mark `key`, and the key of this dictionary's owner, as dirty."""
+        self.dirty.add(key)
+        owner = self.owner
+        if owner is not None:
+            owner[0].add(owner[1])
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        """Set `key` and mark it as dirty."""
+        self._mark(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        """Delete `key` and mark it as dirty."""
+        super().__delitem__(key)
+        self._mark(key)
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        """Remove `key` and mark it as dirty."""
+        self._mark(key)
+        return super().pop(key, *default)
+
+    def popitem(self) -> Tuple[Any, Any]:
+        """Remove an arbitrary item and mark its key as dirty."""
+        key, value = super().popitem()
+        self._mark(key)
+        return key, value
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        """Set `key` if it is missing, marking it as dirty."""
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        """Set every given key, marking them as dirty."""
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other: Any) -> "TrackedDict":  # type: ignore[misc]
+        """Set every key in `other`, marking them as dirty."""
+        self.update(other)
+        return self
+
+    def clear(self) -> None:
+        """Remove every key, marking them as dirty."""
+        for key in self:
+            self._mark(key)
+        super().clear()
+
+    def __copy__(self) -> "TrackedDict":
+        """Copy the items and the dirty keys, but not the owner."""
+        new = TrackedDict.__new__(TrackedDict)
+        dict.update(new, self)
+        new.dirty = set(self.dirty)
+        new.owner = None
+        return new
+
+    def __reduce__(self) -> Any:
+        """Support pickling."""
+        return (_restore_tracked_dict, (dict(self), set(self.dirty)))
+
+
+def _restore_tracked_dict(items: Dict, dirty: Set) -> TrackedDict:
+    """
+    Recreate a pickled `TrackedDict`.
+    """
+    new = TrackedDict.__new__(TrackedDict)
+    dict.update(new, items)
+    new.dirty = dirty
+    new.owner = None
+    return new
+
+
+class StorageTries(TrackedDict):
+    """
+    The storage tries of a state, by address. The data of every trie stored
+    here is owned by this dictionary, so `dirty` holds the addresses whose
+    storage trie was replaced, removed or written to.
+
+    `cache` is the cache of the main trie as of the last `state_root()`,
+    which `dirty` is relative to.
+    """
+
+    __slots__ = ("cache",)
+
+    cache: Optional["TrieCache"]
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.dirty = set()
+        self.cache = None
+        for address, trie in self.items():
+            self._own(address, trie)
+
+    def _own(self, address: Any, trie: Any) -> None:
+        """Have writes to `trie` mark `address` as dirty."""
+        data = getattr(trie, "_data", None)
+        if isinstance(data, TrackedDict):
+            data.owner = (self.dirty, address)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        """Set the storage trie of `key` and mark it as dirty."""
+        super().__setitem__(key, value)
+        self._own(key, value)
+
+
+class Leaf:
+    """
+    Leaf node. `path` holds the remaining nibbles of the key.
+    """
+
+    __slots__ = ("path", "value", "encoded")
+
+    path: bytes
+    value: Bytes
+    encoded: Optional[Extended]
+
+    def __init__(self, path: bytes, value: Bytes) -> None:
+        self.path = path
+        self.value = value
+        self.encoded = None
+
+
+class Extension:
+    """
+    Extension node. `child` is always a `Branch`.
+    """
+
+    __slots__ = ("path", "child", "encoded")
+
+    path: bytes
+    child: "Branch"
+    encoded: Optional[Extended]
+
+    def __init__(self, path: bytes, child: "Branch") -> None:
+        self.path = path
+        self.child = child
+        self.encoded = None
+
+
+class Branch:
+    """
+    Branch node. An empty `value` means that no key ends at this node.
+    """
+
+    __slots__ = ("children", "value", "encoded")
+
+    children: Tuple[Optional["Node"], ...]
+    value: Bytes
+    encoded: Optional[Extended]
+
+    def __init__(
+        self, children: Tuple[Optional["Node"], ...], value: Bytes
+    ) -> None:
+        self.children = children
+        self.value = value
+        self.encoded = None
+
+
+Node = Union[Leaf, Extension, Branch]
+
+EMPTY_CHILDREN: Tuple[Optional[Node], ...] = (None,) * 16
+
+
+def common_prefix_length(a: bytes, b: bytes) -> int:
+    """
+    Find the longest common prefix of two nibble lists.
+    """
+    length = min(len(a), len(b))
+    for i in range(length):
+        if a[i] != b[i]:
+            return i
+    return length
+
+
+def _join(path: bytes, node: Node) -> Node:
+    """
+    Prefix `node` with `path`, merging it into the node if possible.
+    """
+    if not path:
+        return node
+    if isinstance(node, Leaf):
+        return Leaf(path + node.path, node.value)
+    if isinstance(node, Extension):
+        return Extension(path + node.path, node.child)
+    return Extension(path, node)
+
+
+def _branch_of_two(
+    a_path: bytes, a: Callable[[bytes], Node], b_path: bytes, b: Bytes
+) -> Node:
+    """
+    Make the node holding an existing subtree (built by `a` from the rest of
+    `a_path`) and a new value at `b_path`, where the two paths differ.
+    """
+    prefix_length = common_prefix_length(a_path, b_path)
+    children = list(EMPTY_CHILDREN)
+    value = b""
+
+    if len(a_path) == prefix_length:
+        raise AssertionError("existing subtree cannot end at a branch")
+    children[a_path[prefix_length]] = a(a_path[prefix_length + 1 :])
+
+    if len(b_path) == prefix_length:
+        value = b
+    else:
+        children[b_path[prefix_length]] = Leaf(b_path[prefix_length + 1 :], b)
+
+    return _join(a_path[:prefix_length], Branch(tuple(children), value))
+
+
+def insert(node: Optional[Node], path: bytes, value: Bytes) -> Node:
+    """
+    Return a copy of the tree rooted at `node` with `path` set to `value`.
+    """
+    if node is None:
+        return Leaf(path, value)
+
+    if isinstance(node, Leaf):
+        if node.path == path:
+            return Leaf(path, value)
+        if len(node.path) == common_prefix_length(node.path, path):
+            # The existing key ends where the new one continues.
+            prefix_length = len(node.path)
+            children = list(EMPTY_CHILDREN)
+            children[path[prefix_length]] = Leaf(
+                path[prefix_length + 1 :], value
+            )
+            return _join(node.path, Branch(tuple(children), node.value))
+        leaf_value = node.value
+        return _branch_of_two(
+            node.path,
+            lambda rest: Leaf(rest, leaf_value),
+            path,
+            value,
+        )
+
+    if isinstance(node, Extension):
+        prefix_length = common_prefix_length(node.path, path)
+        if prefix_length == len(node.path):
+            child = insert(node.child, path[prefix_length:], value)
+            assert isinstance(child, Branch)
+            return Extension(node.path, child)
+        subtree = node.child
+        return _branch_of_two(
+            node.path,
+            lambda rest: _join(rest, subtree),
+            path,
+            value,
+        )
+
+    if not path:
+        return Branch(node.children, value)
+    children = list(node.children)
+    children[path[0]] = insert(children[path[0]], path[1:], value)
+    return Branch(tuple(children), node.value)
+
+
+def delete(node: Optional[Node], path: bytes) -> Optional[Node]:
+    """
+    Return a copy of the tree rooted at `node` without `path`.
+    """
+    if node is None:
+        return None
+
+    if isinstance(node, Leaf):
+        if node.path == path:
+            return None
+        return node
+
+    if isinstance(node, Extension):
+        if path[: len(node.path)] != node.path:
+            return node
+        child = delete(node.child, path[len(node.path) :])
+        if child is None:
+            return None
+        return _join(node.path, child)
+
+    children = list(node.children)
+    value = node.value
+    if not path:
+        value = b""
+    else:
+        children[path[0]] = delete(children[path[0]], path[1:])
+
+    remaining = [i for i in range(16) if children[i] is not None]
+    if len(remaining) + (value != b"") >= 2:
+        return Branch(tuple(children), value)
+    if value != b"":
+        return Leaf(b"", value)
+    if remaining:
+        only_child = children[remaining[0]]
+        assert only_child is not None
+        return _join(bytes([remaining[0]]), only_child)
+    return None
+
+
+def build(items: Dict[bytes, Bytes], level: int) -> Optional[Node]:
+    """
+    Build a tree from scratch. Mirrors the reference `patricialize()`.
+    """
+    if len(items) == 0:
+        return None
+
+    arbitrary_key = next(iter(items))
+
+    if len(items) == 1:
+        return Leaf(arbitrary_key[level:], items[arbitrary_key])
+
+    substring = arbitrary_key[level:]
+    prefix_length = len(substring)
+    for key in items:
+        prefix_length = min(
+            prefix_length, common_prefix_length(substring, key[level:])
+        )
+        if prefix_length == 0:
+            break
+
+    if prefix_length > 0:
+        child = build(items, level + prefix_length)
+        assert isinstance(child, Branch)
+        return Extension(
+            arbitrary_key[level : level + prefix_length],
+            child,
+        )
+
+    branches: Tuple[Dict[bytes, Bytes], ...] = tuple({} for _ in range(16))
+    value = b""
+    for key, item in items.items():
+        if len(key) == level:
+            value = item
+        else:
+            branches[key[level]][key] = item
+
+    return Branch(
+        tuple(build(branches[k], level + 1) for k in range(16)),
+        value,
+    )
+
+
+class TrieCache:
+    """
+    The tree of a `Trie` as of its last `root()`, along with the nibble path
+    and encoded value of every key in it.
+
+    A cache is `shared` once `copy_trie()` has handed it to a second trie,
+    after which it must be copied before being updated.
+    """
+
+    __slots__ = ("node", "root", "leaves", "storage_roots", "shared")
+
+    node: Optional[Node]
+    root: Optional[Root]
+    leaves: Dict[Bytes, Tuple[bytes, Bytes]]
+    storage_roots: Dict[Bytes, Root]
+    shared: bool
+
+    def __init__(
+        self,
+        node: Optional[Node],
+        leaves: Dict[Bytes, Tuple[bytes, Bytes]],
+        storage_roots: Dict[Bytes, Root],
+    ) -> None:
+        self.node = node
+        self.root = None
+        self.leaves = leaves
+        self.storage_roots = storage_roots
+        self.shared = False
+
+    def unshare(self) -> "TrieCache":
+        """
+        Return a cache which can be updated without affecting other tries.
+        """
+        if not self.shared:
+            return self
+        new = TrieCache(self.node, dict(self.leaves), dict(self.storage_roots))
+        new.root = self.root
+        return new
+
+
+def get_incremental_trie_patches(fork: str) -> Dict[str, Any]:
+    """
+    Get a dictionary of functions/objects to be monkey patched into the trie
+    to make root calculation incremental.
+    """
+    patches: Dict[str, Any] = {}
+
+    trie_mod = cast(Any, import_module("ethereum.forks." + fork + ".trie"))
+
+    Account = trie_mod.Account  # noqa N806
+    LeafNode = trie_mod.LeafNode  # noqa N806
+    ExtensionNode = trie_mod.ExtensionNode  # noqa N806
+    BranchNode = trie_mod.BranchNode  # noqa N806
+    bytes_to_nibble_list = trie_mod.bytes_to_nibble_list
+    encode_internal_node = trie_mod.encode_internal_node
+    encode_node = trie_mod.encode_node
+    slow_root = trie_mod.root
+
+    @add_item(patches)
+    @dataclass
+    class Trie(Generic[K, V]):
+        """
+        The Merkle Trie, caching the result of its last `root()`.
+        """
+
+        secured: bool
+        default: V
+        _data: Dict[K, V] = field(default_factory=TrackedDict)
+        _cache: Optional[TrieCache] = field(
+            default=None, compare=False, repr=False
+        )
+
+        def __post_init__(self) -> None:
+            if not isinstance(self._data, TrackedDict):
+                self._data = TrackedDict(self._data)
+
+    @add_item(patches)
+    def copy_trie(trie: Trie[K, V]) -> Trie[K, V]:
+        """
+        See `trie`.
+        """
+        new_trie = Trie(trie.secured, trie.default, copy.copy(trie._data))
+        cache = trie._cache
+        if cache is not None and isinstance(trie._data, TrackedDict):
+            cache.shared = True
+            new_trie._cache = cache
+        return new_trie
+
+    def encode(node: Optional[Node]) -> Extended:
+        """
+        Encode `node` with the fork's `encode_internal_node()`, reusing (and
+        filling in) the cached encodings.
+        """
+        if node is None:
+            return b""
+
+        encoded = node.encoded
+        if encoded is not None:
+            return encoded
+
+        if isinstance(node, Leaf):
+            encoded = encode_internal_node(LeafNode(node.path, node.value))
+        elif isinstance(node, Extension):
+            encoded = encode_internal_node(
+                ExtensionNode(node.path, encode(node.child))
+            )
+        else:
+            encoded = encode_internal_node(
+                BranchNode(
+                    tuple(encode(child) for child in node.children),
+                    node.value,
+                )
+            )
+
+        node.encoded = encoded
+        return encoded
+
+    def key_path(trie: Trie[Any, Any], preimage: Bytes) -> bytes:
+        """
+        Compute the nibble path of `preimage` in `trie`.
+        """
+        if trie.secured:
+            # "secure" tries hash keys once before construction
+            return bytes(bytes_to_nibble_list(keccak256(preimage)))
+        return bytes(bytes_to_nibble_list(preimage))
+
+    def rebuild(
+        trie: Trie[Any, Any],
+        get_storage_root: Optional[Callable[[Address], Root]],
+    ) -> TrieCache:
+        """
+        Build the cache for `trie` from scratch.
+        """
+        leaves: Dict[Bytes, Tuple[bytes, Bytes]] = {}
+        storage_roots: Dict[Bytes, Root] = {}
+        mapped: Dict[bytes, Bytes] = {}
+
+        for preimage, value in trie._data.items():
+            if isinstance(value, Account):
+                assert get_storage_root is not None
+                storage_root = get_storage_root(Address(preimage))
+                storage_roots[preimage] = storage_root
+                encoded_value = encode_node(value, storage_root)
+            else:
+                encoded_value = encode_node(value)
+            if encoded_value == b"":
+                raise AssertionError
+            path = key_path(trie, preimage)
+            leaves[preimage] = (path, encoded_value)
+            mapped[path] = encoded_value
+
+        return TrieCache(build(mapped, 0), leaves, storage_roots)
+
+    def update(
+        trie: Trie[Any, Any],
+        cache: TrieCache,
+        get_storage_root: Optional[Callable[[Address], Root]],
+        changed_storage: Optional[Set[Bytes]],
+    ) -> None:
+        """
+        Apply the keys written since the last root to `cache`. The storage
+        roots of accounts are only recomputed for the accounts that were
+        written or are in `changed_storage`, unless it is `None`.
+        """
+        data = cast(TrackedDict, trie._data)
+        dirty = data.dirty
+        leaves = cache.leaves
+        node = cache.node
+
+        def set_leaf(preimage: Bytes, encoded_value: Bytes) -> None:
+            nonlocal node
+            if encoded_value == b"":
+                raise AssertionError
+            leaf = leaves.get(preimage)
+            if leaf is None:
+                path = key_path(trie, preimage)
+            elif leaf[1] == encoded_value:
+                return
+            else:
+                path = leaf[0]
+            node = insert(node, path, encoded_value)
+            leaves[preimage] = (path, encoded_value)
+
+        for preimage in dirty:
+            if preimage not in data:
+                leaf = leaves.pop(preimage, None)
+                if leaf is not None:
+                    node = delete(node, leaf[0])
+                cache.storage_roots.pop(preimage, None)
+                continue
+
+            value = data[preimage]
+            if isinstance(value, Account):
+                # Accounts are handled below, with their storage roots.
+                assert get_storage_root is not None
+                continue
+            set_leaf(preimage, encode_node(value))
+
+        if get_storage_root is not None:
+            # An account also changes when its storage does, which this
+            # trie can't observe. Only re-encode if the storage root moved.
+            storage_roots = cache.storage_roots
+            accounts: Iterable[Bytes]
+            if changed_storage is None:
+                accounts = data.keys()
+            else:
+                accounts = dirty | changed_storage
+            for preimage in accounts:
+                value = data.get(preimage)
+                if not isinstance(value, Account):
+                    continue
+                storage_root = get_storage_root(Address(preimage))
+                if (
+                    preimage not in dirty
+                    and storage_roots.get(preimage) == storage_root
+                ):
+                    continue
+                storage_roots[preimage] = storage_root
+                set_leaf(preimage, encode_node(value, storage_root))
+
+        cache.node = node
+        cache.root = None
+
+    @add_item(patches)
+    def root(
+        trie: Trie[Any, Any],
+        get_storage_root: Optional[Callable[[Address], Root]] = None,
+        *,
+        changed_storage: Optional[Set[Bytes]] = None,
+    ) -> Root:
+        """
+        See `trie`.
+
+        `changed_storage` can hold every address whose storage may have
+        changed since the last root, so that the storage roots of the other
+        accounts are reused.
+        """
+        data = trie._data
+        if not isinstance(data, TrackedDict):
+            # Created by an unpatched module, so changes weren't tracked.
+            return slow_root(trie, get_storage_root)
+
+        cache = getattr(trie, "_cache", None)
+        if (
+            cache is not None
+            and cache.root is not None
+            and not data.dirty
+            and (get_storage_root is None or changed_storage == set())
+        ):
+            return cache.root
+
+        if cache is None or len(data.dirty) > len(data) // 2:
+            cache = rebuild(trie, get_storage_root)
+        else:
+            cache = cache.unshare()
+            update(trie, cache, get_storage_root, changed_storage)
+
+        trie._cache = cache
+        data.dirty.clear()
+
+        root_node = encode(cache.node)
+        if len(rlp.encode(root_node)) < 32:
+            cache.root = keccak256(rlp.encode(root_node))
+        else:
+            assert isinstance(root_node, Bytes)
+            cache.root = Root(root_node)
+        return cache.root
+
+    return patches
+
+
+def get_incremental_state_patches(fork: str) -> Dict[str, Any]:
+    """
+    Get a dictionary of functions/objects to be monkey patched into the
+    state, after the incremental trie has been patched into the trie, so
+    that `state_root()` only recomputes the storage roots that changed.
+    """
+    patches: Dict[str, Any] = {}
+
+    trie_mod = cast(Any, import_module("ethereum.forks." + fork + ".trie"))
+
+    EMPTY_TRIE_ROOT = trie_mod.EMPTY_TRIE_ROOT  # noqa N806
+
+    @add_item(patches)
+    def state_root(state: Any) -> Root:
+        """
+        See `state`.
+        """
+        assert not state._snapshots
+
+        main_trie = state._main_trie
+        storage_tries = state._storage_tries
+
+        def get_storage_root(address: Address) -> Root:
+            trie = storage_tries.get(address)
+            if trie is None:
+                return EMPTY_TRIE_ROOT
+            return trie_mod.root(trie)
+
+        if (
+            type(storage_tries) is StorageTries
+            and storage_tries.cache is not None
+            and storage_tries.cache is getattr(main_trie, "_cache", None)
+        ):
+            result = trie_mod.root(
+                main_trie,
+                get_storage_root,
+                changed_storage=storage_tries.dirty,
+            )
+        else:
+            # Replaced by a rollback or not tracked yet, so every storage
+            # root has to be checked once.
+            result = trie_mod.root(main_trie, get_storage_root)
+            if type(storage_tries) is not StorageTries:
+                storage_tries = StorageTries(storage_tries)
+                state._storage_tries = storage_tries
+
+        storage_tries.dirty.clear()
+        storage_tries.cache = getattr(main_trie, "_cache", None)
+        return result
+
+    return patches
@@ -0,0 +1,197 @@
+"""
+Cached Jump Destination Analysis.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains a version of `get_valid_jump_destinations()` that can be
+monkey patched into the fork's `vm.runtime` and `vm.interpreter` modules.
+
+The analysis of each code is kept in a bounded least recently used cache, so
+a contract that is called many times is only analysed once. The cache is
+keyed by the code itself: the code is already in memory, and hashing it with
+Python's `hash()` (which `bytes` remembers) is much cheaper than `keccak256`.
+Initcode, which has no code hash, is cached in exactly the same way.
+
+Each analysis is stored as a bitmap with one bit per byte of code, rather than
+a set of `Uint`. The analysis is the same in every fork, so one cache is
+shared by all of them.
+"""
+
+from collections import OrderedDict
+from importlib import import_module
+from numbers import Integral
+from typing import Any, Dict, Iterator, Optional
+
+from ethereum_types.bytes import Bytes
+from ethereum_types.numeric import Uint
+
+from .utils import add_item
+
+JUMPDEST = 0x5B
+PUSH1 = 0x60
+PUSH32 = 0x7F
+
+DEFAULT_MAX_BYTES = 1 << 21
+
+
+class JumpDestinations:
+    """
+    Valid jump destinations of some code, as a bitmap. Supports `in`, like
+    the set of `Uint` it replaces.
+    """
+
+    __slots__ = ("bitmap",)
+
+    bitmap: bytes
+
+    def __init__(self, bitmap: bytes) -> None:
+        self.bitmap = bitmap
+
+    def __contains__(self, pc: object) -> bool:
+        """Check whether `pc` is a valid jump destination."""
+        if not isinstance(pc, Integral):
+            return False
+        index = int(pc)
+        if index < 0 or index >> 3 >= len(self.bitmap):
+            return False
+        return bool(self.bitmap[index >> 3] >> (index & 7) & 1)
+
+    def __iter__(self) -> Iterator[Uint]:
+        """Iterate over the valid jump destinations, in order."""
+        for index in range(len(self.bitmap) * 8):
+            if index in self:
+                yield Uint(index)
+
+    def __len__(self) -> int:
+        """Count the valid jump destinations."""
+        return sum(bin(byte).count("1") for byte in self.bitmap)
+
+
+def analyse(code: bytes) -> JumpDestinations:
+    """
+    Find the valid jump destinations of `code`, skipping the data of `PUSH-N`
+    opcodes. See `vm.runtime.get_valid_jump_destinations`.
+    """
+    bitmap = bytearray((len(code) + 7) // 8)
+    if JUMPDEST not in code:
+        return JumpDestinations(bytes(bitmap))
+
+    pc = 0
+    length = len(code)
+    while pc < length:
+        opcode = code[pc]
+        if opcode == JUMPDEST:
+            bitmap[pc >> 3] |= 1 << (pc & 7)
+        elif PUSH1 <= opcode <= PUSH32:
+            pc += opcode - PUSH1 + 1
+        pc += 1
+
+    return JumpDestinations(bytes(bitmap))
+
+
+class JumpDestinationCache:
+    """
+    Least recently used cache of jump destination analyses, holding codes of
+    up to `max_bytes` bytes in total.
+    """
+
+    max_bytes: int
+    hits: int
+    misses: int
+    _entries: "OrderedDict[bytes, JumpDestinations]"
+    _bytes: int
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        """Count the cached analyses."""
+        return len(self._entries)
+
+    def get(self, code: bytes) -> JumpDestinations:
+        """
+        Get the analysis of `code`, analysing it if it isn't cached.
+        """
+        entries = self._entries
+        destinations = entries.get(code)
+        if destinations is not None:
+            self.hits += 1
+            entries.move_to_end(code)
+            return destinations
+
+        self.misses += 1
+        destinations = analyse(code)
+        if len(code) > self.max_bytes:
+            return destinations
+
+        entries[code] = destinations
+        self._bytes += len(code)
+        while self._bytes > self.max_bytes:
+            evicted, _ = entries.popitem(last=False)
+            self._bytes -= len(evicted)
+        return destinations
+
+    def clear(self) -> None:
+        """
+        Forget every analysis, and reset the counters.
+        """
+        self._entries.clear()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+_cache: Optional[JumpDestinationCache] = None
+
+
+def get_cache(max_bytes: Optional[int] = None) -> JumpDestinationCache:
+    """
+    Get the cache shared by every patched fork, creating it with room for
+    codes of `max_bytes` bytes in total if necessary.
+    """
+    global _cache
+    if _cache is None:
+        _cache = JumpDestinationCache(max_bytes or DEFAULT_MAX_BYTES)
+    return _cache
+
+
+def get_jumpdest_cache_patches(
+    fork_name: str, cache: JumpDestinationCache
+) -> Dict[str, Any]:
+    """
+    Get a dictionary of patches to be patched into the fork's `vm.runtime`
+    and `vm.interpreter` modules to use the cached analysis.
+    """
+    patches: Dict[str, Any] = {}
+
+    mod: Any = import_module(
+        "ethereum.forks." + fork_name + ".vm.instructions"
+    )
+    ops = mod.Ops
+    if (
+        ops.JUMPDEST.value != JUMPDEST
+        or ops.PUSH1.value != PUSH1
+        or ops.PUSH32.value != PUSH32
+    ):
+        raise Exception(
+            "Attempted to get jump destination patches for a fork with a "
+            "different analysis"
+        )
+
+    @add_item(patches)
+    def get_valid_jump_destinations(code: Bytes) -> JumpDestinations:
+        """
+        See `vm.runtime`.
+        """
+        return cache.get(code)
+
+    return patches
@@ -0,0 +1,257 @@
+"""
+Precomputed KZG Verification.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains versions of `verify_kzg_proof()` and
+`verify_kzg_proof_impl()` from `ethereum.crypto.kzg` that can be monkey
+patched into that module, and into the `point_evaluation` precompile of each
+fork.
+
+The reference decompresses the trusted setup point, and multiplies the G1
+and G2 generators by double-and-add, on every verification. Here the setup
+point is decompressed once, and each generator gets a table of its multiples
+`d * 16**i`, so that multiplying it by a scalar takes one addition per
+4-bit digit and no doublings. The tables are built on the first
+verification.
+
+The results of verifications are also kept in a bounded least recently used
+cache, keyed by the four inputs, so proofs which are checked repeatedly (for
+example by tests calling the precompile many times) are only verified once.
+Inputs which fail validation raise every time, and are never cached.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from eth_typing.bls import BLSPubkey, BLSSignature
+from ethereum_types.bytes import Bytes32, Bytes48
+from py_ecc.bls.g2_primitives import pubkey_to_G1, signature_to_G2
+from py_ecc.optimized_bls12_381 import Z1, Z2, add, double, neg
+from py_ecc.optimized_bls12_381.optimized_curve import G1, G2
+
+import ethereum.crypto.kzg as kzg
+from ethereum.utils.hexadecimal import hex_to_bytes
+
+from .utils import add_item
+
+DEFAULT_MAX_ENTRIES = 1024
+
+WINDOW_BITS = 4
+SCALAR_BITS = 256
+
+Key = Tuple[bytes, bytes, bytes, bytes]
+
+
+class FixedBaseTable:
+    """
+    Multiples of a fixed point, for multiplying it by scalars of up to
+    `SCALAR_BITS` bits with one addition per `WINDOW_BITS`-bit digit.
+
+    `windows[i][d]` is `d * 2**(WINDOW_BITS * i)` times the point.
+    """
+
+    windows: List[List[Any]]
+
+    def __init__(self, point: Any, zero: Any) -> None:
+        self.windows = []
+        base = point
+        for _ in range(SCALAR_BITS // WINDOW_BITS):
+            window = [zero, base]
+            for _ in range(2, 1 << WINDOW_BITS):
+                window.append(add(window[-1], base))
+            self.windows.append(window)
+            for _ in range(WINDOW_BITS):
+                base = double(base)
+
+    def multiply(self, scalar: int) -> Any:
+        """
+        Multiply the point by `scalar`, which must be less than
+        `2**SCALAR_BITS`.
+        """
+        assert 0 <= scalar < 1 << SCALAR_BITS
+        mask = (1 << WINDOW_BITS) - 1
+        result = None
+        for window in self.windows:
+            digit = scalar & mask
+            scalar >>= WINDOW_BITS
+            if digit:
+                point = window[digit]
+                result = point if result is None else add(result, point)
+            if not scalar:
+                break
+        return self.windows[0][0] if result is None else result
+
+
+class Precomputed:
+    """
+    The decompressed trusted setup point, the negated G2 generator, and the
+    generator tables.
+    """
+
+    setup_g2: Any
+    neg_g2: Any
+    g1: FixedBaseTable
+    g2: FixedBaseTable
+
+    def __init__(self) -> None:
+        self.setup_g2 = signature_to_G2(
+            BLSSignature(hex_to_bytes(kzg.KZG_SETUP_G2_MONOMIAL_1))
+        )
+        self.neg_g2 = neg(G2)
+        self.g1 = FixedBaseTable(G1, Z1)
+        self.g2 = FixedBaseTable(G2, Z2)
+
+
+_precomputed: Optional[Precomputed] = None
+
+
+def get_precomputed() -> Precomputed:
+    """
+    Get the precomputed points, computing them if necessary.
+    """
+    global _precomputed
+    if _precomputed is None:
+        _precomputed = Precomputed()
+    return _precomputed
+
+
+class VerificationCache:
+    """
+    Least recently used cache of KZG proof verification results, holding up
+    to `max_entries` results.
+    """
+
+    max_entries: int
+    hits: int
+    misses: int
+    _entries: "OrderedDict[Key, bool]"
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        """Count the cached results."""
+        return len(self._entries)
+
+    def get(self, key: Key) -> Optional[bool]:
+        """
+        Get the result of verifying `key`, or `None` if it isn't cached.
+        """
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, key: Key, result: bool) -> None:
+        """
+        Remember the result of verifying `key`.
+        """
+        self._entries[key] = result
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Forget every result, and reset the counters.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+_cache: Optional[VerificationCache] = None
+
+
+def get_cache(max_entries: Optional[int] = None) -> VerificationCache:
+    """
+    Get the cache shared by every patched module, creating it with room for
+    `max_entries` results if necessary.
+    """
+    global _cache
+    if _cache is None:
+        _cache = VerificationCache(max_entries or DEFAULT_MAX_ENTRIES)
+    return _cache
+
+
+def get_kzg_patches(cache: VerificationCache) -> Dict[str, Any]:
+    """
+    Get a dictionary of functions to be monkey patched into
+    `ethereum.crypto.kzg`. Only `verify_kzg_proof` needs to be patched into
+    modules which imported it.
+    """
+    patches: Dict[str, Any] = {}
+
+    @add_item(patches)
+    def verify_kzg_proof(
+        commitment_bytes: Bytes48,
+        z_bytes: Bytes32,
+        y_bytes: Bytes32,
+        proof_bytes: Bytes48,
+    ) -> bool:
+        """
+        See `ethereum.crypto.kzg`.
+        """
+        key = (
+            bytes(commitment_bytes),
+            bytes(z_bytes),
+            bytes(y_bytes),
+            bytes(proof_bytes),
+        )
+        result = cache.get(key)
+        if result is None:
+            assert len(commitment_bytes) == kzg.BYTES_PER_COMMITMENT
+            assert len(z_bytes) == kzg.BYTES_PER_FIELD_ELEMENT
+            assert len(y_bytes) == kzg.BYTES_PER_FIELD_ELEMENT
+            assert len(proof_bytes) == kzg.BYTES_PER_PROOF
+
+            result = verify_kzg_proof_impl(
+                kzg.bytes_to_kzg_commitment(commitment_bytes),
+                kzg.bytes_to_bls_field(z_bytes),
+                kzg.bytes_to_bls_field(y_bytes),
+                kzg.bytes_to_kzg_proof(proof_bytes),
+            )
+            cache.put(key, result)
+        return result
+
+    @add_item(patches)
+    def verify_kzg_proof_impl(
+        commitment: kzg.KZGCommitment,
+        z: kzg.BLSFieldElement,
+        y: kzg.BLSFieldElement,
+        proof: kzg.KZGProof,
+    ) -> bool:
+        """
+        See `ethereum.crypto.kzg`.
+        """
+        precomputed = get_precomputed()
+        modulus = int(kzg.BLS_MODULUS)
+
+        # Verify: P - y = Q * (X - z)
+        x_minus_z = add(
+            precomputed.setup_g2,
+            precomputed.g2.multiply((modulus - int(z)) % modulus),
+        )
+        p_minus_y = add(
+            pubkey_to_G1(BLSPubkey(commitment)),
+            precomputed.g1.multiply((modulus - int(y)) % modulus),
+        )
+        return kzg.pairing_check(
+            (
+                (p_minus_y, precomputed.neg_g2),
+                (pubkey_to_G1(BLSPubkey(proof)), x_minus_z),
+            )
+        )
+
+    return patches
@@ -0,0 +1,607 @@
+"""
+Multi-Pairing.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains a pairing check for the BN254 (`alt_bn128`) and
+BLS12-381 curves which evaluates any number of pairings at once, along with
+a version of `pairing_check()` from `ethereum.crypto.kzg`, and stand-ins for
+the `FQ12` and `pairing()` used by the pairing precompiles, that use it and
+can be monkey patched into the spec.
+
+The reference computes a full `py_ecc` pairing for every pair and multiplies
+the results together, so each pair pays for its own Miller loop, with all of
+the arithmetic done in `FQ12`, and its own final exponentiation. Here:
+
+* The Miller loops of all the pairs share one accumulator, so each step
+  squares it once and multiplies in one line per pair.
+* There is a single final exponentiation, which uses the Frobenius map to
+  split the exponent into pieces the size of the field modulus.
+* The multiples of each G2 point are computed in `FQ2`, and the lines
+  through them are kept as the coefficients of `x`, `y` and `1`, so
+  evaluating a line at a G1 point is two scalar multiplications and
+  multiplying it in only touches six of the twelve coefficients. The lines
+  of recently used G2 points, such as the fixed points of KZG verification,
+  are remembered.
+
+The lines differ from the `py_ecc` ones by factors which lie in proper
+subfields of `FQ12` (the denominators, the projective scaling of the
+multiples, and powers of the twisting element `w`). The final exponentiation
+maps all of those factors to one, so the pairings are identical to the
+ones `py_ecc` computes.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import py_ecc.optimized_bls12_381 as bls12_381
+import py_ecc.optimized_bls12_381.optimized_pairing as bls12_381_pairing
+import py_ecc.optimized_bn128 as bn128
+import py_ecc.optimized_bn128.optimized_pairing as bn128_pairing
+
+from .utils import add_item
+
+DEFAULT_MAX_PREPARED = 64
+
+Fq2 = Tuple[int, int]
+Fq12 = List[int]
+Line = Tuple[int, int, int, int, int, int]
+Lines = List[Optional[Line]]
+Projective = Tuple[Fq2, Fq2, Fq2]
+
+
+def fq2_mul(a: Fq2, b: Fq2, p: int) -> Fq2:
+    """
+    Multiply two elements of `FQ2`, where `i**2 == -1`.
+    """
+    return (a[0] * b[0] - a[1] * b[1]) % p, (a[0] * b[1] + a[1] * b[0]) % p
+
+
+def fq2_sub(a: Fq2, b: Fq2, p: int) -> Fq2:
+    """
+    Subtract two elements of `FQ2`.
+    """
+    return (a[0] - b[0]) % p, (a[1] - b[1]) % p
+
+
+def fq2_scale(a: Fq2, k: int, p: int) -> Fq2:
+    """
+    Multiply an element of `FQ2` by an integer.
+    """
+    return a[0] * k % p, a[1] * k % p
+
+
+class PairingEngine:
+    """
+    Products of optimal ate pairings on one of the curves of `py_ecc`,
+    computed exactly as `pairing()` from its `optimized_pairing` module would.
+
+    `FQ12` elements are plain lists of twelve coefficients, reduced with the
+    curve's modulus polynomial. `FQ2` embeds into `FQ12` as
+    `a + b * i -> (a - xi * b) + b * w**6`, and the G2 points are twisted by
+    placing each coordinate at a fixed power of `w`, so a line through
+    multiples of a G2 point has its `x`, `y` and constant coefficients at
+    the powers `line_powers` and those powers plus six.
+    """
+
+    curve: Any
+    p: int
+    xi: int
+    line_powers: Tuple[int, int, int]
+    fq12: Any
+    max_prepared: int
+    _modulus: List[Tuple[int, int]]
+    _schedule: List[bool]
+    _loop: List[int]
+    _frobenius_table: List[Fq12]
+    _frobenius_twist: Optional[Tuple[Fq2, Fq2]]
+    _hard_digits: List[int]
+    _prepared: "OrderedDict[Tuple[int, int, int, int], Lines]"
+
+    def __init__(
+        self,
+        curve: Any,
+        pairing_module: Any,
+        xi: int,
+        line_powers: Tuple[int, int, int],
+        frobenius_lines: bool,
+        max_prepared: int = DEFAULT_MAX_PREPARED,
+    ) -> None:
+        self.curve = curve
+        self.p = curve.field_modulus
+        self.xi = xi
+        self.line_powers = line_powers
+        self.fq12 = curve.FQ12
+        self.max_prepared = max_prepared
+        self._modulus = list(curve.FQ12.one().mc_tuples)
+        self._prepared = OrderedDict()
+
+        encoding = pairing_module.pseudo_binary_encoding
+        self._loop = encoding[pairing_module.log_ate_loop_count :: -1]
+
+        # Whether the accumulator is squared before each line.
+        self._schedule = []
+        for digit in self._loop:
+            self._schedule.append(True)
+            if digit:
+                self._schedule.append(False)
+
+        w = curve.FQ12([0, 1] + [0] * 10)
+        w_p = w**self.p
+        self._frobenius_table = [
+            [int(c) for c in (w_p**i).coeffs] for i in range(12)
+        ]
+
+        # BN curves finish the loop with lines through the images of the
+        # point under the Frobenius map, which on the twist multiplies the
+        # conjugated coordinates by these constants.
+        self._frobenius_twist = None
+        if frobenius_lines:
+            self._schedule += [False, False]
+            self._frobenius_twist = (
+                self._untwist(w_p**2 / w**2),
+                self._untwist(w_p**3 / w**3),
+            )
+
+        # The exponent of the hard part of the final exponentiation, in
+        # base `p`.
+        hard = (self.p**4 - self.p**2 + 1) // curve.curve_order
+        self._hard_digits = []
+        for _ in range(4):
+            hard, digit = divmod(hard, self.p)
+            self._hard_digits.append(digit)
+        assert hard == 0
+
+    def _untwist(self, value: Any) -> Fq2:
+        """
+        Get the element of `FQ2` embedded as `value`.
+        """
+        c = [int(c) for c in value.coeffs]
+        assert not any(c[1:6]) and not any(c[7:])
+        return (c[0] + self.xi * c[6]) % self.p, c[6]
+
+    def _line(self, a: Fq2, b: Fq2, c: Fq2) -> Line:
+        """
+        Embed the coefficients of a line, `a * x + b * y + c`, into `FQ12`.
+        """
+        p, xi = self.p, self.xi
+        return (
+            (a[0] - xi * a[1]) % p,
+            a[1],
+            (b[0] - xi * b[1]) % p,
+            b[1],
+            (c[0] - xi * c[1]) % p,
+            c[1],
+        )
+
+    def _double(self, r: Projective) -> Tuple[Line, Projective]:
+        """
+        Get the tangent line at `r`, and double it.
+        """
+        p = self.p
+        x, y, z = r
+        n = fq2_scale(fq2_mul(x, x, p), 3, p)
+        d = fq2_scale(fq2_mul(y, z, p), 2, p)
+        line = self._line(
+            fq2_mul(n, z, p),
+            fq2_scale(fq2_mul(d, z, p), -1, p),
+            fq2_sub(fq2_mul(d, y, p), fq2_mul(n, x, p), p),
+        )
+
+        s = fq2_mul(y, z, p)
+        b = fq2_mul(fq2_mul(x, y, p), s, p)
+        h = fq2_sub(fq2_mul(n, n, p), fq2_scale(b, 8, p), p)
+        s_squared = fq2_mul(s, s, p)
+        return line, (
+            fq2_scale(fq2_mul(h, s, p), 2, p),
+            fq2_sub(
+                fq2_mul(n, fq2_sub(fq2_scale(b, 4, p), h, p), p),
+                fq2_scale(fq2_mul(fq2_mul(y, y, p), s_squared, p), 8, p),
+                p,
+            ),
+            fq2_scale(fq2_mul(s, s_squared, p), 8, p),
+        )
+
+    def _add(
+        self, r: Optional[Projective], q: Tuple[Fq2, Fq2]
+    ) -> Tuple[Optional[Line], Optional[Projective]]:
+        """
+        Get the line through `r` and the affine point `q`, and add them.
+        Vertical lines are `None`, as are multiples at infinity.
+        """
+        if r is None:
+            return None, None
+        p = self.p
+        x, y, z = r
+        n = fq2_sub(fq2_mul(q[1], z, p), y, p)
+        d = fq2_sub(fq2_mul(q[0], z, p), x, p)
+        if d == (0, 0):
+            if n == (0, 0):
+                return self._double(r)
+            return None, None
+        line = self._line(
+            fq2_mul(n, z, p),
+            fq2_scale(fq2_mul(d, z, p), -1, p),
+            fq2_sub(fq2_mul(d, y, p), fq2_mul(n, x, p), p),
+        )
+
+        d_squared = fq2_mul(d, d, p)
+        d_squared_x = fq2_mul(d_squared, x, p)
+        d_cubed = fq2_mul(d, d_squared, p)
+        a = fq2_sub(
+            fq2_sub(fq2_mul(fq2_mul(n, n, p), z, p), d_cubed, p),
+            fq2_scale(d_squared_x, 2, p),
+            p,
+        )
+        return line, (
+            fq2_mul(d, a, p),
+            fq2_sub(
+                fq2_mul(n, fq2_sub(d_squared_x, a, p), p),
+                fq2_mul(d_cubed, y, p),
+                p,
+            ),
+            fq2_mul(d_cubed, z, p),
+        )
+
+    def _frobenius_point(self, q: Tuple[Fq2, Fq2]) -> Tuple[Fq2, Fq2]:
+        """
+        Apply the Frobenius map to the twisted affine point `q`.
+        """
+        assert self._frobenius_twist is not None
+        p = self.p
+        gamma_x, gamma_y = self._frobenius_twist
+        return (
+            fq2_mul((q[0][0], -q[0][1] % p), gamma_x, p),
+            fq2_mul((q[1][0], -q[1][1] % p), gamma_y, p),
+        )
+
+    def _lines(self, q: Tuple[Fq2, Fq2]) -> Lines:
+        """
+        Compute the lines of the Miller loop of the affine point `q`.
+        """
+        p = self.p
+        negated = (q[0], fq2_scale(q[1], -1, p))
+        r: Optional[Projective] = (q[0], q[1], (1, 0))
+        lines: Lines = []
+        line: Optional[Line]
+        for digit in self._loop:
+            assert r is not None
+            line, r = self._double(r)
+            lines.append(line)
+            if digit:
+                line, r = self._add(r, q if digit == 1 else negated)
+                lines.append(line)
+
+        if self._frobenius_twist is not None:
+            q_1 = self._frobenius_point(q)
+            q_2 = self._frobenius_point(q_1)
+            line, r = self._add(r, q_1)
+            lines.append(line)
+            line, r = self._add(r, (q_2[0], fq2_scale(q_2[1], -1, p)))
+            lines.append(line)
+
+        return lines
+
+    def prepare(self, q: Any) -> Optional[Lines]:
+        """
+        Get the lines of the Miller loop of the G2 point `q`, or `None` if it
+        is the point at infinity. The lines of the last `max_prepared` points
+        are remembered.
+        """
+        if q[2] == q[2].zero():
+            return None
+        x, y = self.curve.normalize(q)
+        key = (
+            int(x.coeffs[0]),
+            int(x.coeffs[1]),
+            int(y.coeffs[0]),
+            int(y.coeffs[1]),
+        )
+        lines = self._prepared.get(key)
+        if lines is None:
+            lines = self._lines(((key[0], key[1]), (key[2], key[3])))
+            self._prepared[key] = lines
+            if len(self._prepared) > self.max_prepared:
+                self._prepared.popitem(last=False)
+        else:
+            self._prepared.move_to_end(key)
+        return lines
+
+    def _reduce(self, b: List[int]) -> Fq12:
+        """
+        Reduce a product of two elements of `FQ12`.
+        """
+        for exp in range(len(b) - 13, -1, -1):
+            top = b.pop()
+            for i, c in self._modulus:
+                b[exp + i] -= top * c
+        p = self.p
+        return [x % p for x in b]
+
+    def _mul(self, f: Fq12, g: Fq12) -> Fq12:
+        """
+        Multiply two elements of `FQ12`.
+        """
+        b = [0] * 23
+        for i, f_i in enumerate(f):
+            if f_i:
+                for j, g_j in enumerate(g):
+                    b[i + j] += f_i * g_j
+        return self._reduce(b)
+
+    def _square(self, f: Fq12) -> Fq12:
+        """
+        Square an element of `FQ12`.
+        """
+        b = [0] * 23
+        for i, f_i in enumerate(f):
+            if f_i:
+                b[2 * i] += f_i * f_i
+                twice = 2 * f_i
+                for j in range(i + 1, 12):
+                    b[i + j] += twice * f[j]
+        return self._reduce(b)
+
+    def _mul_by_line(self, f: Fq12, line: Line, x: int, y: int) -> Fq12:
+        """
+        Multiply `f` by `line` evaluated at the affine G1 point `(x, y)`.
+        """
+        x_power, y_power, c_power = self.line_powers
+        b = [0] * 23
+        for power, k in (
+            (x_power, x * line[0]),
+            (x_power + 6, x * line[1]),
+            (y_power, y * line[2]),
+            (y_power + 6, y * line[3]),
+            (c_power, line[4]),
+            (c_power + 6, line[5]),
+        ):
+            if k:
+                for j, f_j in enumerate(f):
+                    b[power + j] += k * f_j
+        return self._reduce(b)
+
+    def _frobenius(self, f: Fq12) -> Fq12:
+        """
+        Raise an element of `FQ12` to the power `p`.
+        """
+        b = [0] * 12
+        for f_i, row in zip(f, self._frobenius_table, strict=True):
+            if f_i:
+                for j, row_j in enumerate(row):
+                    b[j] += f_i * row_j
+        p = self.p
+        return [x % p for x in b]
+
+    def miller_loop(self, pairs: Sequence[Tuple[Lines, int, int]]) -> Fq12:
+        """
+        Run the Miller loops of several pairs together, each given by the
+        lines of its G2 point and the affine coordinates of its G1 point,
+        and return the product of their (unexponentiated) results.
+        """
+        f = [1] + [0] * 11
+        for index, square in enumerate(self._schedule):
+            if square:
+                f = self._square(f)
+            for lines, x, y in pairs:
+                line = lines[index]
+                if line is not None:
+                    f = self._mul_by_line(f, line, x, y)
+        return f
+
+    def final_exponentiate(self, f: Fq12) -> Fq12:
+        """
+        Raise `f` to the power `(p**12 - 1) // curve_order`.
+        """
+        p = self.p
+
+        # `f ** (p**6 - 1)`, where `f ** p**6` maps `w` to `-w`.
+        conjugate = [c if i % 2 == 0 else -c % p for i, c in enumerate(f)]
+        inverse = [int(c) for c in self.fq12(f).inv().coeffs]
+        f = self._mul(conjugate, inverse)
+
+        # `f ** (p**2 + 1)`.
+        f = self._mul(self._frobenius(self._frobenius(f)), f)
+
+        # `f ** ((p**4 - p**2 + 1) // curve_order)`, as the product of
+        # `f ** (digit * p**i)` for each base `p` digit of the exponent,
+        # with the squarings shared.
+        bases = [f]
+        for _ in range(3):
+            bases.append(self._frobenius(bases[-1]))
+        table = [[1] + [0] * 11]
+        for mask in range(1, 16):
+            low = (mask & -mask).bit_length() - 1
+            table.append(self._mul(table[mask & (mask - 1)], bases[low]))
+
+        result = table[0]
+        bits = max(digit.bit_length() for digit in self._hard_digits)
+        for bit in range(bits - 1, -1, -1):
+            result = self._square(result)
+            mask = 0
+            for i, digit in enumerate(self._hard_digits):
+                mask |= ((digit >> bit) & 1) << i
+            if mask:
+                result = self._mul(result, table[mask])
+        return result
+
+    def _pairs(self, pairs: Sequence[Tuple[Any, Any]]) -> List[Any]:
+        """
+        Prepare `(G2 point, G1 point)` pairs for `miller_loop()`, leaving
+        out pairs with a point at infinity.
+        """
+        prepared = []
+        for q, p in pairs:
+            lines = self.prepare(q)
+            if lines is None or p[2] == p[2].zero():
+                continue
+            x, y = self.curve.normalize(p)
+            prepared.append((lines, int(x), int(y)))
+        return prepared
+
+    def pairing_product(self, pairs: Sequence[Tuple[Any, Any]]) -> Any:
+        """
+        Compute the product of `pairing(q, p)` for each `(q, p)` in `pairs`,
+        as an `FQ12`. The points must be on the curve and its twist.
+        """
+        f = self.miller_loop(self._pairs(pairs))
+        return self.fq12(self.final_exponentiate(f))
+
+    def pairing_check(self, pairs: Sequence[Tuple[Any, Any]]) -> bool:
+        """
+        Check whether the product of `pairing(q, p)` for each `(q, p)` in
+        `pairs` is one. The points must be on the curve and its twist.
+        """
+        f = self.final_exponentiate(self.miller_loop(self._pairs(pairs)))
+        return f == [1] + [0] * 11
+
+
+_bn254: Optional[PairingEngine] = None
+_bls12_381: Optional[PairingEngine] = None
+
+
+def get_bn254() -> PairingEngine:
+    """
+    Get the pairing engine for the `alt_bn128` curve, creating it if
+    necessary.
+    """
+    global _bn254
+    if _bn254 is None:
+        _bn254 = PairingEngine(bn128, bn128_pairing, 9, (1, 0, 3), True)
+    return _bn254
+
+
+def get_bls12_381() -> PairingEngine:
+    """
+    Get the pairing engine for the BLS12-381 curve, creating it if
+    necessary.
+    """
+    global _bls12_381
+    if _bls12_381 is None:
+        _bls12_381 = PairingEngine(
+            bls12_381, bls12_381_pairing, 1, (2, 3, 0), False
+        )
+    return _bls12_381
+
+
+def get_kzg_pairing_patches() -> Dict[str, Any]:
+    """
+    Get a dictionary of functions to be monkey patched into
+    `ethereum.crypto.kzg`.
+    """
+    patches: Dict[str, Any] = {}
+
+    @add_item(patches)
+    def pairing_check(values: Tuple[Tuple[Any, Any], Tuple[Any, Any]]) -> bool:
+        """
+        See `ethereum.crypto.kzg`.
+        """
+        return get_bls12_381().pairing_check([(q, p) for p, q in values])
+
+    return patches
+
+
+class PairingProduct:
+    """
+    Product of pairings, computed by `engine` in one go when it is compared.
+
+    The pairing precompiles multiply `pairing(q, p)` for each of their pairs
+    into `FQ12.one()`, and compare the result with `FQ12.one()`. Patching
+    `FQ12` and `pairing` in their modules with stand-ins producing these
+    products leaves the gas and input validation to the spec's own code.
+    """
+
+    __slots__ = ("engine", "pairs")
+
+    engine: PairingEngine
+    pairs: List[Tuple[Any, Any]]
+
+    def __init__(
+        self, engine: PairingEngine, pairs: List[Tuple[Any, Any]]
+    ) -> None:
+        self.engine = engine
+        self.pairs = pairs
+
+    def __mul__(self, other: object) -> "PairingProduct":
+        """Multiply two products of pairings on the same curve."""
+        if not isinstance(other, PairingProduct) or (
+            other.engine is not self.engine
+        ):
+            return NotImplemented
+        return PairingProduct(self.engine, self.pairs + other.pairs)
+
+    def __imul__(self, other: object) -> "PairingProduct":
+        """Multiply another product of pairings into this one."""
+        if not isinstance(other, PairingProduct) or (
+            other.engine is not self.engine
+        ):
+            return NotImplemented
+        self.pairs.extend(other.pairs)
+        return self
+
+    def value(self) -> Any:
+        """Compute the product as an `FQ12`."""
+        return self.engine.pairing_product(self.pairs)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare the product with another product or an `FQ12`."""
+        if isinstance(other, PairingProduct):
+            if not other.pairs:
+                return self.engine.pairing_check(self.pairs)
+            if not self.pairs:
+                return other.engine.pairing_check(other.pairs)
+            return self.value() == other.value()
+        return self.value() == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+def get_pairing_product_patches(engine: PairingEngine) -> Dict[str, Any]:
+    """
+    Get stand-ins for `FQ12` and `pairing()` which produce products of
+    pairings computed by `engine`.
+    """
+    patches: Dict[str, Any] = {}
+
+    @add_item(patches)
+    class FQ12:
+        """
+        Stand-in for `FQ12`, providing only the empty product of pairings.
+        """
+
+        @staticmethod
+        def one() -> PairingProduct:
+            """Start an empty product of pairings."""
+            return PairingProduct(engine, [])
+
+    @add_item(patches)
+    def pairing(q: Any, p: Any) -> PairingProduct:
+        """
+        Stand-in for `pairing()` from `py_ecc`.
+        """
+        return PairingProduct(engine, [(q, p)])
+
+    return patches
+
+
+def get_alt_bn128_patches(fork_name: str) -> Dict[str, Any]:
+    """
+    Get a dictionary of objects to be monkey patched into the fork's
+    `vm.precompiled_contracts.alt_bn128` module.
+    """
+    del fork_name
+    return get_pairing_product_patches(get_bn254())
+
+
+def get_bls12_pairing_patches(fork_name: str) -> Dict[str, Any]:
+    """
+    Get a dictionary of objects to be monkey patched into the fork's
+    `vm.precompiled_contracts.bls12_381.bls12_381_pairing` module.
+    """
+    del fork_name
+    return get_pairing_product_patches(get_bls12_381())
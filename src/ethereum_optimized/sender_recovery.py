@@ -0,0 +1,270 @@
+"""
+Parallel Sender Recovery.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains functions that can be monkey patched into the fork's
+`fork` and `vm.eoa_delegation` modules so that the signatures in a block are
+recovered ahead of time, in a thread pool.
+
+Recovery doesn't depend on the state, so before a block is executed every
+transaction sender (and every [EIP-7702] authority) is submitted to the pool.
+The patched `recover_sender()` and `recover_authority()` then wait for the
+result for the transaction or authorization they are given, re-raising the
+exception if recovery failed, so the block is processed exactly as before.
+Anything that wasn't prefetched is recovered inline.
+
+Threads are used rather than processes, which would have to pickle every
+transaction. Only the curve arithmetic in `secp256k1_recover()` runs in
+native code that releases the GIL; the `pow()` check before it, and the
+RLP encoding and hashing of the signing hash, hold the GIL. How much is
+gained therefore depends on the number of cores, and on a single core
+prefetching can be slower than recovering inline.
+
+[EIP-7702]: https://eips.ethereum.org/EIPS/eip-7702
+"""
+
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from importlib import import_module
+from inspect import signature
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .utils import add_item
+
+Transaction_ = Any
+Authorization_ = Any
+
+
+class SenderRecovery:
+    """
+    Thread pool, and the pending recoveries of the blocks being processed,
+    keyed by the `id()` of the transaction or authorization.
+    """
+
+    max_workers: Optional[int]
+    _executor: Optional[ThreadPoolExecutor]
+    _senders: Dict[int, Tuple[Tuple[Any, ...], "Future[Any]"]]
+    _authorities: Dict[int, Tuple[Authorization_, "Future[Any]"]]
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self.max_workers = max_workers
+        self._executor = None
+        self._senders = {}
+        self._authorities = {}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Thread pool, started on first use.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers or os.cpu_count(),
+                thread_name_prefix="sender-recovery",
+            )
+        return self._executor
+
+    @contextmanager
+    def prefetch(
+        self,
+        sender_args: List[Tuple[Any, ...]],
+        authorizations: List[Authorization_],
+        recover_sender: Callable[..., Any],
+        recover_authority: Optional[Callable[[Authorization_], Any]],
+    ) -> Iterator[None]:
+        """
+        Start recovering `recover_sender(*args)` for each of `sender_args`,
+        and the authority of each of `authorizations`, keeping the results
+        until the context exits. Recoveries that haven't started by then are
+        cancelled, so that a block which fails early doesn't keep the pool
+        busy.
+        """
+        keys: List[int] = []
+        authority_keys: List[int] = []
+        try:
+            for args in sender_args:
+                future = self.executor.submit(recover_sender, *args)
+                self._senders[id(args[-1])] = (args, future)
+                keys.append(id(args[-1]))
+            if recover_authority is not None:
+                for authorization in authorizations:
+                    future = self.executor.submit(
+                        recover_authority, authorization
+                    )
+                    self._authorities[id(authorization)] = (
+                        authorization,
+                        future,
+                    )
+                    authority_keys.append(id(authorization))
+            yield
+        finally:
+            for key in keys:
+                sender_entry = self._senders.pop(key, None)
+                if sender_entry is not None:
+                    sender_entry[1].cancel()
+            for key in authority_keys:
+                authority_entry = self._authorities.pop(key, None)
+                if authority_entry is not None:
+                    authority_entry[1].cancel()
+
+    def sender(self, args: Tuple[Any, ...]) -> Optional["Future[Any]"]:
+        """
+        Find the pending recovery of `recover_sender(*args)`.
+        """
+        entry = self._senders.get(id(args[-1]))
+        if entry is None:
+            return None
+        pending_args, future = entry
+        if pending_args[-1] is not args[-1] or pending_args[:-1] != args[:-1]:
+            return None
+        return future
+
+    def authority(
+        self, authorization: Authorization_
+    ) -> Optional["Future[Any]"]:
+        """
+        Find the pending recovery of the authority of `authorization`.
+        """
+        entry = self._authorities.get(id(authorization))
+        if entry is None or entry[0] is not authorization:
+            return None
+        return entry[1]
+
+
+_recovery: Optional[SenderRecovery] = None
+
+
+def get_recovery(max_workers: Optional[int] = None) -> SenderRecovery:
+    """
+    Get the thread pool shared by every patched fork, creating it with
+    `max_workers` threads if necessary.
+    """
+    global _recovery
+    if _recovery is None:
+        _recovery = SenderRecovery(max_workers)
+    return _recovery
+
+
+def get_sender_recovery_patches(
+    fork_name: str, recovery: SenderRecovery
+) -> Dict[str, Any]:
+    """
+    Get a dictionary of patches to be patched into the fork's `fork` module
+    to recover the senders of each block in parallel.
+    """
+    patches: Dict[str, Any] = {}
+
+    mod = import_module("ethereum.forks." + fork_name + ".fork")
+    transactions_mod = import_module(
+        "ethereum.forks." + fork_name + ".transactions"
+    )
+
+    slow_apply_body = mod.apply_body
+    slow_recover_sender = mod.recover_sender
+    # Before EIP-155 the sender doesn't depend on the chain id.
+    takes_chain_id = len(signature(slow_recover_sender).parameters) == 2
+    decode_transaction = getattr(transactions_mod, "decode_transaction", None)
+
+    try:
+        delegation_mod: Any = import_module(
+            "ethereum.forks." + fork_name + ".vm.eoa_delegation"
+        )
+        slow_recover_authority = delegation_mod.recover_authority
+    except ModuleNotFoundError:
+        slow_recover_authority = None
+
+    @add_item(patches)
+    @contextmanager
+    def prefetch_senders(
+        block_env: Any, transactions: Tuple[Any, ...]
+    ) -> Iterator[Tuple[Any, ...]]:
+        """
+        Start recovering the senders of `transactions` (and the authorities
+        in them), and provide the transactions to process in their place.
+
+        Decoded transactions are provided in place of encoded ones, so that
+        the recovered senders can be found again. Decoding stops at the first
+        transaction that fails, leaving it to fail in the same place as
+        before.
+        """
+        decoded: List[Transaction_] = []
+        for tx in transactions:
+            if decode_transaction is not None:
+                try:
+                    tx = decode_transaction(tx)
+                except Exception:
+                    break
+            decoded.append(tx)
+
+        sender_args: List[Tuple[Any, ...]] = []
+        authorizations: List[Authorization_] = []
+        for tx in decoded:
+            if takes_chain_id:
+                sender_args.append((block_env.chain_id, tx))
+            else:
+                sender_args.append((tx,))
+            authorizations.extend(getattr(tx, "authorizations", ()))
+
+        with recovery.prefetch(
+            sender_args,
+            authorizations,
+            slow_recover_sender,
+            slow_recover_authority,
+        ):
+            yield tuple(decoded) + tuple(transactions[len(decoded) :])
+
+    @add_item(patches)
+    def apply_body(
+        block_env: Any, transactions: Tuple[Any, ...], *args: Any
+    ) -> Any:
+        """
+        See `fork`.
+        """
+        with prefetch_senders(block_env, transactions) as prefetched:
+            return slow_apply_body(block_env, prefetched, *args)
+
+    @add_item(patches)
+    def recover_sender(*args: Any) -> Any:
+        """
+        See `transactions`.
+        """
+        future = recovery.sender(args)
+        if future is None:
+            return slow_recover_sender(*args)
+        return future.result()
+
+    return patches
+
+
+def get_authority_recovery_patches(
+    fork_name: str, recovery: SenderRecovery
+) -> Dict[str, Any]:
+    """
+    Get a dictionary of patches to be patched into the fork's
+    `vm.eoa_delegation` module to use authorities recovered in parallel.
+    """
+    patches: Dict[str, Any] = {}
+
+    mod: Any = import_module(
+        "ethereum.forks." + fork_name + ".vm.eoa_delegation"
+    )
+    slow_recover_authority = mod.recover_authority
+
+    @add_item(patches)
+    def recover_authority(authorization: Authorization_) -> Any:
+        """
+        See `eoa_delegation`.
+        """
+        future = recovery.authority(authorization)
+        if future is None:
+            return slow_recover_authority(authorization)
+        return future.result()
+
+    return patches
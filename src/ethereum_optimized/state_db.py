@@ -10,6 +10,9 @@ Introduction
 
 This module contains functions that can be monkey patched into the fork's
 `state` module to use an optimized database backed state.
+
+The database is either `rust_pyspec_glue.DB` (the `rust` backend) or, where
+that can't be installed, `state_sqlite.SqliteDB` (the `sqlite` backend).
 """
 
 import logging
@@ -18,15 +21,6 @@ from dataclasses import dataclass
 from importlib import import_module
 from typing import Any, ClassVar, Dict, List, Optional, Set, cast
 
-try:
-    import rust_pyspec_glue
-except ImportError as e:
-    # Add a message, but keep it an ImportError.
-    raise e from Exception(
-        "Install with `pip install 'ethereum[optimized]'` to enable this "
-        "package"
-    )
-
 from ethereum_types.bytes import Bytes, Bytes20, Bytes32
 from ethereum_types.numeric import U256, Uint
 
@@ -49,14 +43,43 @@ class UnmodifiedType:
 
 Unmodified = UnmodifiedType()
 
+BACKENDS = ("rust", "sqlite")
+
 
-def get_optimized_state_patches(fork: str) -> Dict[str, Any]:
+def get_database(backend: str) -> Any:
+    """
+    Get the database class of `backend`, one of `BACKENDS`.
+    """
+    if backend == "rust":
+        try:
+            import rust_pyspec_glue
+        except ImportError as e:
+            # Add a message, but keep it an ImportError.
+            raise e from Exception(
+                "Install with `pip install 'ethereum[optimized]'` to enable "
+                "this package"
+            )
+        return rust_pyspec_glue.DB
+
+    if backend == "sqlite":
+        from .state_sqlite import SqliteDB
+
+        return SqliteDB
+
+    raise ValueError(f"unknown state backend `{backend}`")
+
+
+def get_optimized_state_patches(
+    fork: str, backend: str = "rust"
+) -> Dict[str, Any]:
     """
     Get a dictionary of functions/objects to be monkey patched into the state
-    to make it optimized.
+    to make it optimized, storing it in the database of `backend`.
     """
     patches: Dict[str, Any] = {}
 
+    database = get_database(backend)
+
     types_mod = cast(
         Any, import_module("ethereum.forks." + fork + ".fork_types")
     )
@@ -69,7 +92,7 @@ def get_optimized_state_patches(fork: str) -> Dict[str, Any]:
     @dataclass
     class State:
         """
-        The State, backed by a LMDB database.
+        The State, backed by a database.
 
         When created with `State()` store the db in a temporary directory. When
         created with `State(path)` open or create the db located at `path`.
@@ -91,7 +114,7 @@ def get_optimized_state_patches(fork: str) -> Dict[str, Any]:
             if path is None:
                 path = State.default_path
 
-            self.db = rust_pyspec_glue.DB(path)
+            self.db = database(path)
             self.dirty_accounts = {}
             self.dirty_storage = {}
             self.destroyed_accounts = defaultdict(lambda: Uint(0))
@@ -183,7 +206,7 @@ def get_optimized_state_patches(fork: str) -> Dict[str, Any]:
     @add_item(patches)
     def flush(state: State) -> None:
         """
-        Send everything in the internal caches to the Rust layer.
+        Send everything in the internal caches to the database.
         """
         if state.tx_restore_points:
             raise Exception("In a non-db transaction")
@@ -0,0 +1,388 @@
+"""
+Journaled State.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains functions that can be monkey patched into the fork's
+`state` module to replace the copy-on-snapshot transactions with an undo log.
+
+The reference `begin_transaction()` copies the main trie and every storage
+trie, so each message call costs time proportional to the size of the state.
+Here the tries are updated in place and every write made while a transaction
+is open records the value it overwrote. Beginning and committing a
+transaction are constant time, and rolling back costs time proportional to
+the number of writes made since the matching `begin_transaction()`.
+
+Unlike `ethereum_optimized.state_db`, this module only depends on the
+specification itself.
+"""
+
+from dataclasses import dataclass, field
+from importlib import import_module
+from typing import Any, Dict, List, Optional, Set, Tuple, cast
+
+from ethereum_types.bytes import Bytes20, Bytes32
+from ethereum_types.numeric import U256
+
+from .utils import add_item
+
+Address = Bytes20
+Account_ = Any  # noqa N806
+Trie_ = Any  # noqa N806
+
+
+class MissingType:
+    """
+    Sentinel type to represent a key that was absent from a trie.
+    """
+
+    pass
+
+
+Missing = MissingType()
+
+# Journal entry tags. The remaining fields of each entry are described next to
+# the function which appends it.
+ACCOUNT_WRITE = 0
+STORAGE_WRITE = 1
+STORAGE_DESTROY = 2
+
+
+def get_journaled_state_patches(fork: str) -> Dict[str, Any]:
+    """
+    Get a dictionary of functions/objects to be monkey patched into the state
+    to make transactions journaled rather than copied.
+    """
+    patches: Dict[str, Any] = {}
+
+    # The trie functions are looked up on every call so that other patches
+    # to the fork's `trie` module are picked up regardless of their order.
+    trie_mod = cast(Any, import_module("ethereum.forks." + fork + ".trie"))
+    state_mod = cast(Any, import_module("ethereum.forks." + fork + ".state"))
+
+    has_transient_storage = hasattr(state_mod, "TransientStorage")
+    has_storage_original = hasattr(state_mod, "get_storage_original")
+
+    @add_item(patches)
+    @dataclass
+    class State:
+        """
+        Contains all information that is preserved between transactions.
+
+        `_snapshots` holds the length of `_journal` at each open transaction,
+        and `_original_storage`/`_original_storage_tries` remember the values
+        needed by `get_storage_original()` for the outermost transaction.
+        """
+
+        _main_trie: Trie_ = field(
+            default_factory=lambda: trie_mod.Trie(secured=True, default=None)
+        )
+        _storage_tries: Dict[Address, Trie_] = field(default_factory=dict)
+        _snapshots: List[int] = field(default_factory=list)
+        created_accounts: Set[Address] = field(default_factory=set)
+        _journal: List[Tuple[Any, ...]] = field(
+            default_factory=list, compare=False, repr=False
+        )
+        _original_storage: Dict[Address, Dict[Bytes32, U256]] = field(
+            default_factory=dict, compare=False, repr=False
+        )
+        _original_storage_tries: Dict[Address, Optional[Trie_]] = field(
+            default_factory=dict, compare=False, repr=False
+        )
+
+    @add_item(patches)
+    def close_state(state: State) -> None:
+        """
+        See `state`.
+        """
+        del state._main_trie
+        del state._storage_tries
+        del state._snapshots
+        del state.created_accounts
+        del state._journal
+        del state._original_storage
+        del state._original_storage_tries
+
+    def _end_outermost_transaction(state: State) -> None:
+        """
+        Forget everything that is only meaningful inside a transaction.
+        """
+        state._journal.clear()
+        state._original_storage.clear()
+        state._original_storage_tries.clear()
+        state.created_accounts.clear()
+
+    def _begin_transaction(state: State) -> None:
+        """
+        See `state`.
+        """
+        state._snapshots.append(len(state._journal))
+
+    def _commit_transaction(state: State) -> None:
+        """
+        See `state`.
+        """
+        state._snapshots.pop()
+        if not state._snapshots:
+            _end_outermost_transaction(state)
+
+    def _rollback_transaction(state: State) -> None:
+        """
+        See `state`.
+        """
+        restore_point = state._snapshots.pop()
+        journal = state._journal
+        accounts = state._main_trie._data
+        storage_tries = state._storage_tries
+
+        while len(journal) > restore_point:
+            item = journal.pop()
+            if item[0] == ACCOUNT_WRITE:
+                # (ACCOUNT_WRITE, address, previous account or `Missing`)
+                if item[2] is Missing:
+                    accounts.pop(item[1], None)
+                else:
+                    accounts[item[1]] = item[2]
+            elif item[0] == STORAGE_WRITE:
+                # (STORAGE_WRITE, address, key, previous value)
+                trie = storage_tries.get(item[1])
+                if trie is None:
+                    if item[3] == U256(0):
+                        continue
+                    trie = trie_mod.Trie(secured=True, default=U256(0))
+                    storage_tries[item[1]] = trie
+                trie_mod.trie_set(trie, item[2], item[3])
+                if not trie._data:
+                    del storage_tries[item[1]]
+            else:
+                # (STORAGE_DESTROY, address, destroyed trie or `None`)
+                if item[2] is not None:
+                    storage_tries[item[1]] = item[2]
+
+        if not state._snapshots:
+            _end_outermost_transaction(state)
+
+    if has_transient_storage:
+
+        @add_item(patches)
+        @dataclass
+        class TransientStorage:
+            """
+            Contains all information that is preserved between message calls
+            within a transaction.
+            """
+
+            _tries: Dict[Address, Trie_] = field(default_factory=dict)
+            _snapshots: List[int] = field(default_factory=list)
+            _journal: List[Tuple[Address, Bytes32, U256]] = field(
+                default_factory=list, compare=False, repr=False
+            )
+
+        def _rollback_transient_storage(
+            transient_storage: TransientStorage,
+        ) -> None:
+            """
+            Undo every transient storage write since the last snapshot.
+            """
+            restore_point = transient_storage._snapshots.pop()
+            journal = transient_storage._journal
+            tries = transient_storage._tries
+
+            while len(journal) > restore_point:
+                address, key, previous_value = journal.pop()
+                trie = tries.get(address)
+                if trie is None:
+                    if previous_value == U256(0):
+                        continue
+                    trie = trie_mod.Trie(secured=True, default=U256(0))
+                    tries[address] = trie
+                trie_mod.trie_set(trie, key, previous_value)
+                if not trie._data:
+                    del tries[address]
+
+            if not transient_storage._snapshots:
+                journal.clear()
+
+        @add_item(patches)
+        def begin_transaction(
+            state: State, transient_storage: TransientStorage
+        ) -> None:
+            """
+            See `state`.
+            """
+            _begin_transaction(state)
+            transient_storage._snapshots.append(
+                len(transient_storage._journal)
+            )
+
+        @add_item(patches)
+        def commit_transaction(
+            state: State, transient_storage: TransientStorage
+        ) -> None:
+            """
+            See `state`.
+            """
+            _commit_transaction(state)
+            transient_storage._snapshots.pop()
+            if not transient_storage._snapshots:
+                transient_storage._journal.clear()
+
+        @add_item(patches)
+        def rollback_transaction(
+            state: State, transient_storage: TransientStorage
+        ) -> None:
+            """
+            See `state`.
+            """
+            _rollback_transaction(state)
+            _rollback_transient_storage(transient_storage)
+
+        @add_item(patches)
+        def set_transient_storage(
+            transient_storage: TransientStorage,
+            address: Address,
+            key: Bytes32,
+            value: U256,
+        ) -> None:
+            """
+            See `state`.
+            """
+            trie = transient_storage._tries.get(address)
+            if transient_storage._snapshots:
+                previous_value = (
+                    U256(0) if trie is None else trie_mod.trie_get(trie, key)
+                )
+                transient_storage._journal.append(
+                    (address, key, previous_value)
+                )
+            if trie is None:
+                trie = trie_mod.Trie(secured=True, default=U256(0))
+                transient_storage._tries[address] = trie
+            trie_mod.trie_set(trie, key, value)
+            if trie._data == {}:
+                del transient_storage._tries[address]
+
+    else:
+
+        @add_item(patches)
+        def begin_transaction(state: State) -> None:
+            """
+            See `state`.
+            """
+            _begin_transaction(state)
+
+        @add_item(patches)
+        def commit_transaction(state: State) -> None:
+            """
+            See `state`.
+            """
+            _commit_transaction(state)
+
+        @add_item(patches)
+        def rollback_transaction(state: State) -> None:
+            """
+            See `state`.
+            """
+            _rollback_transaction(state)
+
+    @add_item(patches)
+    def set_account(
+        state: State, address: Address, account: Optional[Account_]
+    ) -> None:
+        """
+        See `state`.
+        """
+        if state._snapshots:
+            state._journal.append(
+                (
+                    ACCOUNT_WRITE,
+                    address,
+                    state._main_trie._data.get(address, Missing),
+                )
+            )
+        trie_mod.trie_set(state._main_trie, address, account)
+
+    @add_item(patches)
+    def destroy_storage(state: State, address: Address) -> None:
+        """
+        See `state`.
+        """
+        trie = state._storage_tries.pop(address, None)
+        if not state._snapshots:
+            return
+
+        state._journal.append((STORAGE_DESTROY, address, trie))
+
+        # Slots written before the first destruction already have their
+        # original value in `_original_storage`. Every other slot is read from
+        # this copy, since the trie itself may be restored and written to.
+        if address not in state._original_storage_tries:
+            state._original_storage_tries[address] = (
+                None if trie is None else trie_mod.copy_trie(trie)
+            )
+
+    @add_item(patches)
+    def set_storage(
+        state: State, address: Address, key: Bytes32, value: U256
+    ) -> None:
+        """
+        See `state`.
+        """
+        assert trie_mod.trie_get(state._main_trie, address) is not None
+
+        trie = state._storage_tries.get(address)
+
+        if state._snapshots:
+            previous_value = (
+                U256(0) if trie is None else trie_mod.trie_get(trie, key)
+            )
+            state._journal.append(
+                (STORAGE_WRITE, address, key, previous_value)
+            )
+            if address not in state._original_storage_tries:
+                state._original_storage.setdefault(address, {}).setdefault(
+                    key, previous_value
+                )
+
+        if trie is None:
+            trie = trie_mod.Trie(secured=True, default=U256(0))
+            state._storage_tries[address] = trie
+        trie_mod.trie_set(trie, key, value)
+        if trie._data == {}:
+            del state._storage_tries[address]
+
+    if has_storage_original:
+
+        @add_item(patches)
+        def get_storage_original(
+            state: State, address: Address, key: Bytes32
+        ) -> U256:
+            """
+            See `state`.
+            """
+            # In the transaction where an account is created, its preexisting
+            # storage is ignored.
+            if address in state.created_accounts:
+                return U256(0)
+
+            written = state._original_storage.get(address)
+            if written is not None and key in written:
+                return written[key]
+
+            if address in state._original_storage_tries:
+                original_trie = state._original_storage_tries[address]
+                if original_trie is None:
+                    return U256(0)
+                original_value = trie_mod.trie_get(original_trie, key)
+            else:
+                original_value = state_mod.get_storage(state, address, key)
+
+            assert isinstance(original_value, U256)
+            return original_value
+
+    return patches
@@ -0,0 +1,458 @@
+"""
+SQLite State Database.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains a database for `state_db` built only on the standard
+library's `sqlite3`, for when `rust_pyspec_glue` isn't available.
+
+Accounts and storage are stored in flat tables, keyed by the hash of the
+address or storage key, so that the keys under any trie path are a range of
+the table.
+
+The root of a trie is computed from a cache of the encoded node at each path,
+stored in the database alongside the state. Writing a key removes the cached
+nodes on its path, and computing a root re-encodes only those nodes, reading
+the keys they cover from the flat tables.
+"""
+
+import os
+import sqlite3
+from typing import Any, Optional, Set, Tuple
+
+from ethereum_rlp import Extended, rlp
+from ethereum_types.bytes import Bytes, Bytes20, Bytes32
+from ethereum_types.numeric import U256, Uint
+
+from ethereum.crypto.hash import Hash32, keccak256
+
+Address = Bytes20
+Root = Hash32
+
+# Owner of the cached nodes of the account trie.
+ACCOUNTS = b""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    hashed BLOB PRIMARY KEY,
+    address BLOB NOT NULL,
+    nonce BLOB NOT NULL,
+    balance BLOB NOT NULL,
+    code BLOB NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS storage (
+    address BLOB NOT NULL,
+    hashed BLOB NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (address, hashed)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS nodes (
+    owner BLOB NOT NULL,
+    path BLOB NOT NULL,
+    node BLOB NOT NULL,
+    PRIMARY KEY (owner, path)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS metadata (
+    key BLOB PRIMARY KEY,
+    value BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def nibbles(key: bytes) -> bytes:
+    """
+    Split `key` into nibbles, one per byte.
+    """
+    out = bytearray(2 * len(key))
+    out[0::2] = bytes(byte >> 4 for byte in key)
+    out[1::2] = bytes(byte & 0x0F for byte in key)
+    return bytes(out)
+
+
+def compact(path: bytes, is_leaf: bool) -> Bytes:
+    """
+    Hex prefix encode a nibble `path`. See `trie.nibble_list_to_compact`.
+    """
+    flag = 2 * is_leaf + len(path) % 2
+    if len(path) % 2:
+        path = bytes([flag]) + path
+    else:
+        path = bytes([flag, 0]) + path
+    return Bytes(
+        bytes(16 * path[i] + path[i + 1] for i in range(0, len(path), 2))
+    )
+
+
+def encode(unencoded: Extended) -> Extended:
+    """
+    Encode a node, hashing it unless it is shorter than 32 bytes. See
+    `trie.encode_internal_node`.
+    """
+    encoded = rlp.encode(unencoded)
+    if len(encoded) < 32:
+        return unencoded
+    return keccak256(encoded)
+
+
+def path_range(path: bytes) -> Tuple[bytes, Optional[bytes]]:
+    """
+    Get the first hashed key under the nibble `path`, and the first one after
+    them (or `None` if there isn't one).
+    """
+    prefix = 0
+    for nibble in path:
+        prefix = 16 * prefix + nibble
+    shift = 4 * (64 - len(path))
+    low = prefix << shift
+    high = (prefix + 1) << shift
+    return (
+        low.to_bytes(32, "big"),
+        high.to_bytes(32, "big") if high < 1 << 256 else None,
+    )
+
+
+class SqliteDB:
+    """
+    Database of the state, and its cached trie nodes, in the SQLite file
+    `FILE_NAME` in the directory `path`. The database is held in memory if
+    `path` is `None`.
+
+    Has the interface `state_db` expects of `rust_pyspec_glue.DB`.
+    """
+
+    FILE_NAME = "state.sqlite3"
+
+    connection: Optional[sqlite3.Connection]
+    _dirty: Set[Tuple[bytes, bytes]]
+
+    def __init__(self, path: Optional[str]) -> None:
+        if path is None:
+            location = ":memory:"
+        else:
+            os.makedirs(path, exist_ok=True)
+            location = os.path.join(path, SqliteDB.FILE_NAME)
+
+        # Transactions are started and ended explicitly.
+        self.connection = sqlite3.connect(
+            location, isolation_level=None, check_same_thread=False
+        )
+        if path is not None:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA cache_size=-262144")
+        self.connection.executescript(SCHEMA)
+        self._dirty = set()
+
+    @staticmethod
+    def delete(path: str) -> None:
+        """
+        Delete the database in the directory `path`, if there is one.
+        """
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(os.path.join(path, SqliteDB.FILE_NAME + suffix))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def copy(source: str, destination: str) -> None:
+        """
+        Copy the database in the directory `source` to the directory
+        `destination`, including the commits still only in its write-ahead
+        log.
+        """
+        source_file = os.path.join(source, SqliteDB.FILE_NAME)
+        if not os.path.exists(source_file):
+            raise FileNotFoundError(source_file)
+        os.makedirs(destination, exist_ok=True)
+
+        source_db = sqlite3.connect(source_file)
+        try:
+            destination_db = sqlite3.connect(
+                os.path.join(destination, SqliteDB.FILE_NAME)
+            )
+            try:
+                source_db.backup(destination_db)
+            finally:
+                destination_db.close()
+        finally:
+            source_db.close()
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self.connection is None:
+            raise Exception("database is closed")
+        return self.connection
+
+    def close(self) -> None:
+        """
+        Close the database, discarding any uncommitted changes.
+        """
+        if self.connection is None:
+            return
+        if self.connection.in_transaction:
+            self.connection.execute("ROLLBACK")
+        self.connection.close()
+        self.connection = None
+
+    def begin_mutable(self) -> None:
+        """
+        Start a transaction, unless one is already open.
+        """
+        if not self._db.in_transaction:
+            self._db.execute("BEGIN")
+
+    def commit_mutable(self) -> None:
+        """
+        Commit the open transaction.
+        """
+        self._invalidate()
+        self._db.execute("COMMIT")
+
+    def rollback_mutable(self) -> None:
+        """
+        Discard the open transaction.
+        """
+        self._dirty.clear()
+        self._db.execute("ROLLBACK")
+
+    def get_metadata(self, key: Bytes) -> Optional[Bytes]:
+        """
+        Get a piece of metadata.
+        """
+        row = self._db.execute(
+            "SELECT value FROM metadata WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else Bytes(row[0])
+
+    def set_metadata(self, key: Bytes, value: Bytes) -> None:
+        """
+        Set a piece of metadata.
+        """
+        self._db.execute(
+            "INSERT OR REPLACE INTO metadata VALUES (?, ?)", (key, value)
+        )
+
+    def get_account_optional(
+        self, address: Address
+    ) -> Optional[Tuple[int, int, bytes]]:
+        """
+        Get the nonce, balance and code of the account at `address`.
+        """
+        row = self._db.execute(
+            "SELECT nonce, balance, code FROM accounts WHERE hashed = ?",
+            (keccak256(address),),
+        ).fetchone()
+        if row is None:
+            return None
+        return (
+            int.from_bytes(row[0], "big"),
+            int.from_bytes(row[1], "big"),
+            bytes(row[2]),
+        )
+
+    def set_account(self, address: Address, account: Any) -> None:
+        """
+        Set, or delete if `account` is `None`, the account at `address`.
+        """
+        hashed = keccak256(address)
+        if account is None:
+            self._db.execute(
+                "DELETE FROM accounts WHERE hashed = ?", (hashed,)
+            )
+        else:
+            self._db.execute(
+                "INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?, ?)",
+                (
+                    hashed,
+                    address,
+                    int(account.nonce).to_bytes(8, "big"),
+                    int(account.balance).to_bytes(32, "big"),
+                    account.code,
+                ),
+            )
+        self._dirty.add((ACCOUNTS, hashed))
+
+    def get_storage(self, address: Address, key: Bytes32) -> int:
+        """
+        Get the value of storage `key` of the account at `address`.
+        """
+        row = self._db.execute(
+            "SELECT value FROM storage WHERE address = ? AND hashed = ?",
+            (address, keccak256(key)),
+        ).fetchone()
+        return 0 if row is None else int.from_bytes(row[0], "big")
+
+    def set_storage(self, address: Address, key: Bytes32, value: U256) -> None:
+        """
+        Set, or delete if `value` is zero, storage `key` of the account at
+        `address`.
+        """
+        hashed = keccak256(key)
+        if value == 0:
+            self._db.execute(
+                "DELETE FROM storage WHERE address = ? AND hashed = ?",
+                (address, hashed),
+            )
+        else:
+            self._db.execute(
+                "INSERT OR REPLACE INTO storage VALUES (?, ?, ?)",
+                (address, hashed, int(value).to_bytes(32, "big")),
+            )
+        self._dirty.add((address, hashed))
+        self._dirty.add((ACCOUNTS, keccak256(address)))
+
+    def destroy_storage(self, address: Address) -> None:
+        """
+        Delete all the storage of the account at `address`.
+        """
+        self._db.execute("DELETE FROM storage WHERE address = ?", (address,))
+        self._db.execute("DELETE FROM nodes WHERE owner = ?", (address,))
+        self._dirty.add((ACCOUNTS, keccak256(address)))
+
+    def has_storage(self, address: Address) -> bool:
+        """
+        Check whether the account at `address` has any storage.
+        """
+        row = self._db.execute(
+            "SELECT 1 FROM storage WHERE address = ? LIMIT 1", (address,)
+        ).fetchone()
+        return row is not None
+
+    def state_root(self) -> Root:
+        """
+        Compute the root of the account trie.
+        """
+        return self._root(ACCOUNTS)
+
+    def storage_root(self, address: Address) -> Root:
+        """
+        Compute the root of the storage trie of the account at `address`.
+        """
+        return self._root(address)
+
+    def _invalidate(self) -> None:
+        """
+        Remove the cached nodes on the paths of the keys written since the
+        last call.
+        """
+        if not self._dirty:
+            return
+        paths: Set[Tuple[bytes, bytes]] = set()
+        for owner, hashed in self._dirty:
+            path = nibbles(hashed)
+            # Once a path is found, so were all of its prefixes.
+            for length in range(len(path), -1, -1):
+                if (owner, path[:length]) in paths:
+                    break
+                paths.add((owner, path[:length]))
+        self._dirty.clear()
+        self._db.executemany(
+            "DELETE FROM nodes WHERE owner = ? AND path = ?", paths
+        )
+
+    def _root(self, owner: bytes) -> Root:
+        self._invalidate()
+        root_node = self._node(owner, b"")
+        encoded = rlp.encode(root_node)
+        if len(encoded) < 32:
+            return keccak256(encoded)
+        assert isinstance(root_node, bytes)
+        return Root(root_node)
+
+    def _edge(
+        self, owner: bytes, path: bytes, last: bool
+    ) -> Optional[Tuple[bytes, ...]]:
+        """
+        Get the first, or the last, row under `path`.
+        """
+        low, high = path_range(path)
+        order = "DESC" if last else "ASC"
+        if owner == ACCOUNTS:
+            query = (
+                "SELECT hashed, address, nonce, balance, code FROM accounts "
+                "WHERE hashed >= ?"
+            )
+            args: Tuple[bytes, ...] = (low,)
+        else:
+            query = (
+                "SELECT hashed, value FROM storage "
+                "WHERE address = ? AND hashed >= ?"
+            )
+            args = (owner, low)
+        if high is not None:
+            query += " AND hashed < ?"
+            args += (high,)
+        query += f" ORDER BY hashed {order} LIMIT 1"
+        return self._db.execute(query, args).fetchone()
+
+    def _leaf_value(self, owner: bytes, row: Tuple[bytes, ...]) -> Bytes:
+        if owner != ACCOUNTS:
+            return rlp.encode(U256.from_be_bytes(row[1]))
+        _, address, nonce, balance, code = row
+        return rlp.encode(
+            (
+                Uint(int.from_bytes(nonce, "big")),
+                U256(int.from_bytes(balance, "big")),
+                self.storage_root(Address(address)),
+                keccak256(code),
+            )
+        )
+
+    def _node(self, owner: bytes, path: bytes) -> Extended:
+        """
+        Get the encoded node of the keys under `path`, which starts at the
+        last nibble of `path`. See `trie.patricialize`.
+        """
+        db = self._db
+        row = db.execute(
+            "SELECT node FROM nodes WHERE owner = ? AND path = ?",
+            (owner, path),
+        ).fetchone()
+        if row is not None:
+            return rlp.decode(row[0])
+
+        first = self._edge(owner, path, False)
+        if first is None:
+            return b""
+        last = self._edge(owner, path, True)
+        assert last is not None
+
+        first_path = nibbles(first[0])
+        level = len(path)
+        if first[0] == last[0]:
+            unencoded: Extended = (
+                compact(first_path[level:], True),
+                self._leaf_value(owner, first),
+            )
+        else:
+            last_path = nibbles(last[0])
+            prefix_length = level
+            while first_path[prefix_length] == last_path[prefix_length]:
+                prefix_length += 1
+
+            if prefix_length > level:
+                unencoded = (
+                    compact(first_path[level:prefix_length], False),
+                    self._node(owner, first_path[:prefix_length]),
+                )
+            else:
+                unencoded = [
+                    self._node(owner, path + bytes([nibble]))
+                    for nibble in range(16)
+                ] + [b""]
+
+        node = encode(unencoded)
+        db.execute(
+            "INSERT INTO nodes VALUES (?, ?, ?)",
+            (owner, path, rlp.encode(node)),
+        )
+        return node
@@ -0,0 +1,561 @@
+"""
+Journaled State Tracker.
+
+.. contents:: Table of Contents
+    :backlinks: none
+    :local:
+
+Introduction
+------------
+
+This module contains functions that can be monkey patched into the
+[EIP-7928] `state_tracker` of a fork, and into its block access list builder,
+to record state changes in flat journals rather than in a dictionary per
+frame.
+
+The reference frames each keep their own sets and dictionaries, and every
+successful call copies its child's entries into the parent, so deep call
+trees copy the same changes once per level. Here a transaction and all of its
+call frames append to one journal, and each call frame only remembers the
+length of the journal when it was created. Merging a successful call is
+constant time, and a failed call truncates the journal, keeping the slots it
+wrote as reads. Committing a transaction filters its net-zero changes in one
+pass and appends the rest to the block's journal, which
+`build_block_access_list()` reads directly.
+
+Accesses that survive both success and failure, the touched addresses and
+storage reads, go straight into sets shared by the transaction.
+
+[EIP-7928]: https://eips.ethereum.org/EIPS/eip-7928
+"""
+
+from importlib import import_module
+from typing import Any, Dict, List, Optional, Set, Tuple, cast
+
+from ethereum_types.bytes import Bytes, Bytes20, Bytes32
+from ethereum_types.numeric import U64, U256, Uint
+
+from .utils import add_item
+
+Address = Bytes20
+BlockAccessIndex = Uint
+
+# Journal entry tags. Every entry is `(tag, block_access_index, address, key,
+# value)`, where `key` is only set for storage writes.
+STORAGE_WRITE = 0
+BALANCE_CHANGE = 1
+NONCE_CHANGE = 2
+CODE_CHANGE = 3
+
+Entry = Tuple[int, BlockAccessIndex, Address, Optional[Bytes32], Any]
+
+
+class Journal:
+    """
+    Changes recorded by a transaction and its call frames, or committed to a
+    block, with the pre-state captures used for net-zero filtering.
+
+    `frames` holds the frames which haven't been merged yet, innermost last.
+    """
+
+    entries: List[Entry]
+    frames: List[Any]
+    touched_addresses: Set[Address]
+    storage_reads: Set[Tuple[Address, Bytes32]]
+    pre_balances: Dict[Address, U256]
+    pre_storage: Dict[Tuple[Address, Bytes32], U256]
+    pre_code: Dict[Address, Bytes]
+
+    def __init__(self) -> None:
+        self.entries = []
+        self.frames = []
+        self.touched_addresses = set()
+        self.storage_reads = set()
+        self.pre_balances = {}
+        self.pre_storage = {}
+        self.pre_code = {}
+
+
+def get_state_tracker_patches(fork: str) -> Dict[str, Any]:
+    """
+    Get a dictionary of functions/objects to be monkey patched into the
+    fork's `state_tracker` module.
+    """
+    patches: Dict[str, Any] = {}
+
+    rlp_types = cast(
+        Any,
+        import_module(
+            "ethereum.forks." + fork + ".block_access_lists.rlp_types"
+        ),
+    )
+    first_block_access_index = rlp_types.BlockAccessIndex(0)
+
+    @add_item(patches)
+    class StateChanges:
+        """
+        A block, transaction or call frame.
+
+        The block frame and each transaction frame own a `Journal`, which
+        call frames share with their transaction. `start` is the length of
+        the journal's entries when the frame was created.
+        """
+
+        __slots__ = (
+            "parent",
+            "block_access_index",
+            "journal",
+            "start",
+            "merged",
+        )
+
+        parent: Optional["StateChanges"]
+        block_access_index: BlockAccessIndex
+        journal: Journal
+        start: int
+        merged: bool
+
+        def __init__(
+            self,
+            parent: Optional["StateChanges"] = None,
+            block_access_index: BlockAccessIndex = first_block_access_index,
+        ) -> None:
+            self.parent = parent
+            self.block_access_index = block_access_index
+            self.merged = False
+
+            if parent is None or parent.parent is None:
+                self.journal = Journal()
+            else:
+                self.journal = parent.journal
+            self.start = len(self.journal.entries)
+            self.journal.frames.append(self)
+
+    def record(state_changes: StateChanges, entry: Entry) -> None:
+        """
+        Append `entry` to the journal, or, while call frames created after
+        `state_changes` haven't been merged, insert it before their entries
+        so that it outlives their failure.
+        """
+        journal = state_changes.journal
+        frames = journal.frames
+        if frames[-1] is state_changes:
+            journal.entries.append(entry)
+            return
+
+        position = frames.index(state_changes) + 1
+        journal.entries.insert(frames[position].start, entry)
+        for frame in frames[position:]:
+            frame.start += 1
+
+    @add_item(patches)
+    def get_block_frame(state_changes: StateChanges) -> StateChanges:
+        """
+        See `state_tracker`.
+        """
+        block_frame = state_changes
+        while block_frame.parent is not None:
+            block_frame = block_frame.parent
+        return block_frame
+
+    @add_item(patches)
+    def increment_block_access_index(root_frame: StateChanges) -> None:
+        """
+        See `state_tracker`.
+        """
+        root_frame.block_access_index = BlockAccessIndex(
+            root_frame.block_access_index + Uint(1)
+        )
+
+    @add_item(patches)
+    def get_transaction_frame(state_changes: StateChanges) -> StateChanges:
+        """
+        See `state_tracker`.
+        """
+        tx_frame = state_changes
+        while (
+            tx_frame.parent is not None and tx_frame.parent.parent is not None
+        ):
+            tx_frame = tx_frame.parent
+        return tx_frame
+
+    @add_item(patches)
+    def capture_pre_balance(
+        tx_frame: StateChanges, address: Address, balance: U256
+    ) -> None:
+        """
+        See `state_tracker`.
+        """
+        assert tx_frame.parent is None or tx_frame.parent.parent is None
+        tx_frame.journal.pre_balances.setdefault(address, balance)
+
+    @add_item(patches)
+    def capture_pre_storage(
+        tx_frame: StateChanges, address: Address, key: Bytes32, value: U256
+    ) -> None:
+        """
+        See `state_tracker`.
+        """
+        assert tx_frame.parent is None or tx_frame.parent.parent is None
+        tx_frame.journal.pre_storage.setdefault((address, key), value)
+
+    @add_item(patches)
+    def capture_pre_code(
+        tx_frame: StateChanges, address: Address, code: Bytes
+    ) -> None:
+        """
+        See `state_tracker`.
+        """
+        assert tx_frame.parent is None or tx_frame.parent.parent is None
+        tx_frame.journal.pre_code.setdefault(address, code)
+
+    @add_item(patches)
+    def track_address(state_changes: StateChanges, address: Address) -> None:
+        """
+        See `state_tracker`.
+        """
+        state_changes.journal.touched_addresses.add(address)
+
+    @add_item(patches)
+    def track_storage_read(
+        state_changes: StateChanges, address: Address, key: Bytes32
+    ) -> None:
+        """
+        See `state_tracker`.
+        """
+        state_changes.journal.storage_reads.add((address, key))
+
+    @add_item(patches)
+    def track_storage_write(
+        state_changes: StateChanges,
+        address: Address,
+        key: Bytes32,
+        value: U256,
+    ) -> None:
+        """
+        See `state_tracker`.
+        """
+        record(
+            state_changes,
+            (
+                STORAGE_WRITE,
+                state_changes.block_access_index,
+                address,
+                key,
+                value,
+            ),
+        )
+
+    @add_item(patches)
+    def track_balance_change(
+        state_changes: StateChanges,
+        address: Address,
+        new_balance: U256,
+    ) -> None:
+        """
+        See `state_tracker`.
+        """
+        record(
+            state_changes,
+            (
+                BALANCE_CHANGE,
+                state_changes.block_access_index,
+                address,
+                None,
+                new_balance,
+            ),
+        )
+
+    @add_item(patches)
+    def track_nonce_change(
+        state_changes: StateChanges,
+        address: Address,
+        new_nonce: U64,
+    ) -> None:
+        """
+        See `state_tracker`.
+        """
+        record(
+            state_changes,
+            (
+                NONCE_CHANGE,
+                state_changes.block_access_index,
+                address,
+                None,
+                new_nonce,
+            ),
+        )
+
+    @add_item(patches)
+    def track_code_change(
+        state_changes: StateChanges,
+        address: Address,
+        new_code: Bytes,
+    ) -> None:
+        """
+        See `state_tracker`.
+        """
+        record(
+            state_changes,
+            (
+                CODE_CHANGE,
+                state_changes.block_access_index,
+                address,
+                None,
+                new_code,
+            ),
+        )
+
+    @add_item(patches)
+    def track_selfdestruct(
+        tx_frame: StateChanges,
+        address: Address,
+    ) -> None:
+        """
+        See `state_tracker`.
+        """
+        assert tx_frame.parent is not None and tx_frame.parent.parent is None
+
+        idx = tx_frame.block_access_index
+        journal = tx_frame.journal
+        entries = journal.entries
+
+        remove_balance = False
+        for tag, i, addr, _, _ in entries:
+            if tag == BALANCE_CHANGE and addr == address and i == idx:
+                # Post balance will be U256(0) after deletion, so if it was
+                # zero before there is nothing to record.
+                remove_balance = journal.pre_balances[address] == U256(0)
+                break
+
+        kept: List[Entry] = []
+        for entry in entries:
+            tag, i, addr, key, _ = entry
+            if addr != address or i != idx:
+                kept.append(entry)
+            elif tag == STORAGE_WRITE:
+                assert key is not None
+                journal.storage_reads.add((addr, key))
+            elif tag == BALANCE_CHANGE and not remove_balance:
+                kept.append(entry)
+        entries[:] = kept
+
+    @add_item(patches)
+    def merge_on_success(child_frame: StateChanges) -> None:
+        """
+        See `state_tracker`.
+
+        The child's entries are already in the journal, so this only stops
+        tracking the child as an unmerged frame.
+        """
+        assert child_frame.parent is not None
+        if child_frame.merged:
+            return
+        child_frame.merged = True
+
+        frames = child_frame.journal.frames
+        while frames.pop() is not child_frame:
+            pass
+
+    @add_item(patches)
+    def merge_on_failure(child_frame: StateChanges) -> None:
+        """
+        See `state_tracker`.
+
+        Drops every entry recorded since the child was created, keeping the
+        written storage slots as reads.
+        """
+        assert child_frame.parent is not None
+        if child_frame.merged:
+            return
+        child_frame.merged = True
+
+        journal = child_frame.journal
+        frames = journal.frames
+        while frames.pop() is not child_frame:
+            pass
+
+        entries = journal.entries
+        start = child_frame.start
+        storage_reads = journal.storage_reads
+        for index in range(start, len(entries)):
+            tag, _, address, key, _ = entries[index]
+            if tag == STORAGE_WRITE:
+                assert key is not None
+                storage_reads.add((address, key))
+        del entries[start:]
+
+    @add_item(patches)
+    def commit_transaction_frame(tx_frame: StateChanges) -> None:
+        """
+        See `state_tracker`.
+        """
+        assert tx_frame.parent is not None
+        block_journal = tx_frame.parent.journal
+
+        filter_net_zero_frame_changes(tx_frame)
+
+        journal = tx_frame.journal
+        block_journal.touched_addresses.update(journal.touched_addresses)
+        block_journal.storage_reads.update(journal.storage_reads)
+        block_journal.entries.extend(journal.entries)
+
+    @add_item(patches)
+    def create_child_frame(parent: StateChanges) -> StateChanges:
+        """
+        See `state_tracker`.
+        """
+        return StateChanges(
+            parent=parent,
+            block_access_index=parent.block_access_index,
+        )
+
+    @add_item(patches)
+    def filter_net_zero_frame_changes(tx_frame: StateChanges) -> None:
+        """
+        See `state_tracker`.
+        """
+        idx = tx_frame.block_access_index
+        journal = tx_frame.journal
+        entries = journal.entries
+        start = tx_frame.start
+
+        # The final value of each changed (tag, address, key) at `idx`.
+        final: Dict[Tuple[int, Address, Optional[Bytes32]], Any] = {}
+        for index in range(start, len(entries)):
+            tag, i, address, key, value = entries[index]
+            if i == idx and tag != NONCE_CHANGE:
+                final[(tag, address, key)] = value
+
+        net_zero = set()
+        for change, post_value in final.items():
+            tag, address, key = change
+            if tag == STORAGE_WRITE:
+                assert key is not None
+                assert (address, key) in journal.pre_storage
+                if journal.pre_storage[(address, key)] == post_value:
+                    # Net-zero write - convert to read
+                    net_zero.add(change)
+                    journal.storage_reads.add((address, key))
+            elif tag == BALANCE_CHANGE:
+                assert address in journal.pre_balances
+                if journal.pre_balances[address] == post_value:
+                    net_zero.add(change)
+            else:
+                assert address in journal.pre_code
+                if journal.pre_code[address] == post_value:
+                    net_zero.add(change)
+
+        if net_zero:
+            entries[start:] = [
+                entry
+                for entry in entries[start:]
+                if entry[1] != idx
+                or (entry[0], entry[2], entry[3]) not in net_zero
+            ]
+
+    return patches
+
+
+def get_block_access_list_builder_patches(fork: str) -> Dict[str, Any]:
+    """
+    Get a dictionary of functions/objects to be monkey patched into the
+    fork's `block_access_lists.builder` module, to build block access lists
+    from the journal of a block frame from `get_state_tracker_patches()`.
+    """
+    patches: Dict[str, Any] = {}
+
+    rlp_types = cast(
+        Any,
+        import_module(
+            "ethereum.forks." + fork + ".block_access_lists.rlp_types"
+        ),
+    )
+
+    @add_item(patches)
+    def build_block_access_list(state_changes: Any) -> Any:
+        """
+        See `block_access_lists.builder`.
+        """
+        journal = state_changes.journal
+
+        # address -> slot -> block access index -> value
+        storage: Dict[Address, Dict[Bytes32, Dict[Uint, U256]]] = {}
+        # address -> block access index -> value, for each other tag
+        changes: Dict[Address, Tuple[Dict[Uint, Any], ...]] = {}
+
+        for address in journal.touched_addresses:
+            changes.setdefault(address, ({}, {}, {}, {}))
+
+        for tag, idx, address, key, value in journal.entries:
+            account = changes.get(address)
+            if account is None:
+                account = changes[address] = ({}, {}, {}, {})
+            if tag == STORAGE_WRITE:
+                assert key is not None
+                storage.setdefault(address, {}).setdefault(key, {})[idx] = (
+                    value
+                )
+            elif tag == NONCE_CHANGE:
+                nonces = account[NONCE_CHANGE]
+                if idx not in nonces or value > nonces[idx]:
+                    nonces[idx] = value
+            else:
+                account[tag][idx] = value
+
+        reads: Dict[Address, List[Bytes32]] = {}
+        for address, key in journal.storage_reads:
+            changes.setdefault(address, ({}, {}, {}, {}))
+            if key not in storage.get(address, ()):
+                reads.setdefault(address, []).append(key)
+
+        block_access_list = []
+        for address in sorted(changes):
+            account = changes[address]
+            slots = storage.get(address, {})
+            block_access_list.append(
+                rlp_types.AccountChanges(
+                    address=address,
+                    storage_changes=tuple(
+                        rlp_types.SlotChanges(
+                            slot=U256.from_be_bytes(key),
+                            changes=tuple(
+                                rlp_types.StorageChange(
+                                    block_access_index=idx,
+                                    new_value=value,
+                                )
+                                for idx, value in sorted(slots[key].items())
+                            ),
+                        )
+                        for key in sorted(slots)
+                    ),
+                    storage_reads=tuple(
+                        U256.from_be_bytes(key)
+                        for key in sorted(reads.get(address, ()))
+                    ),
+                    balance_changes=tuple(
+                        rlp_types.BalanceChange(
+                            block_access_index=idx, post_balance=value
+                        )
+                        for idx, value in sorted(
+                            account[BALANCE_CHANGE].items()
+                        )
+                    ),
+                    nonce_changes=tuple(
+                        rlp_types.NonceChange(
+                            block_access_index=idx, new_nonce=value
+                        )
+                        for idx, value in sorted(account[NONCE_CHANGE].items())
+                    ),
+                    code_changes=tuple(
+                        rlp_types.CodeChange(
+                            block_access_index=idx, new_code=value
+                        )
+                        for idx, value in sorted(account[CODE_CHANGE].items())
+                    ),
+                )
+            )
+
+        return block_access_list
+
+    return patches
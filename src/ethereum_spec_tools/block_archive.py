@@ -0,0 +1,314 @@
+"""
+Block Archive.
+
+An append-only, on-disk store of RLP encoded blocks, so that
+`ethereum-spec-sync` can replay a chain without an RPC provider.
+"""
+
+import argparse
+import json
+import logging
+import os
+from types import TracebackType
+from typing import Any, Dict, Iterator, Optional, Tuple, Type
+
+from ethereum_rlp import rlp
+from ethereum_types.numeric import Uint
+
+INTEGER_SIZE = 8
+
+
+class BlockArchive:
+    """
+    Append-only store of blocks with consecutive numbers.
+
+    The blocks are kept in a directory holding two files:
+
+    - `blocks.rlp`, the RLP encoded blocks one after the other, and
+    - `blocks.idx`, the number of the first block followed by the offset of
+      the end of each block in `blocks.rlp`, as 8 byte big-endian integers.
+
+    Blocks can only be appended. If a write was interrupted, the partially
+    written block is dropped when the archive is next opened for writing.
+    The files are only synced to disk when a writable archive is closed, so
+    an operating system crash or power loss can still lose or corrupt the
+    blocks appended since it was opened.
+    """
+
+    DATA_FILE = "blocks.rlp"
+    INDEX_FILE = "blocks.idx"
+
+    path: str
+    writable: bool
+    first: Optional[Uint]
+    count: int
+
+    _data: int
+    _index: int
+    _end: int
+
+    def __init__(self, path: str, writable: bool = False) -> None:
+        self.path = path
+        self.writable = writable
+
+        if writable:
+            os.makedirs(path, exist_ok=True)
+            flags = os.O_RDWR | os.O_CREAT
+        else:
+            flags = os.O_RDONLY
+
+        self._data = os.open(os.path.join(path, self.DATA_FILE), flags, 0o644)
+        self._index = os.open(
+            os.path.join(path, self.INDEX_FILE), flags, 0o644
+        )
+
+        index_size = os.fstat(self._index).st_size
+        if index_size < INTEGER_SIZE:
+            self.first = None
+            self.count = 0
+            self._end = 0
+        else:
+            self.first = Uint(self._read_integer(0))
+            self.count = index_size // INTEGER_SIZE - 1
+            self._end = 0
+            if self.count > 0:
+                self._end = self._read_integer(INTEGER_SIZE * self.count)
+
+        if writable:
+            os.ftruncate(
+                self._index,
+                0 if self.first is None else INTEGER_SIZE * (self.count + 1),
+            )
+            os.ftruncate(self._data, self._end)
+
+    def __enter__(self) -> "BlockArchive":
+        """
+        Use the archive as a context manager, closing it on exit.
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """
+        Close the archive.
+        """
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the archive's files, syncing them to disk if the archive is
+        writable.
+        """
+        if self.writable:
+            os.fsync(self._data)
+            os.fsync(self._index)
+        os.close(self._data)
+        os.close(self._index)
+
+    @property
+    def next(self) -> Optional[Uint]:
+        """
+        Number of the block that would be appended next, or `None` if the
+        archive is empty.
+        """
+        if self.first is None:
+            return None
+        return self.first + Uint(self.count)
+
+    def __contains__(self, number: Uint) -> bool:
+        """
+        Check whether block `number` is in the archive.
+        """
+        if self.first is None:
+            return False
+        return self.first <= number < self.first + Uint(self.count)
+
+    def _read_integer(self, offset: int) -> int:
+        return int.from_bytes(
+            os.pread(self._index, INTEGER_SIZE, offset), "big"
+        )
+
+    def get(self, number: Uint) -> Optional[bytes]:
+        """
+        Return the RLP encoding of block `number`, or `None` if it isn't in
+        the archive.
+        """
+        if self.first is None or number not in self:
+            return None
+
+        position = int(number - self.first)
+        if position == 0:
+            start = 0
+            end = self._read_integer(INTEGER_SIZE)
+        else:
+            offsets = os.pread(
+                self._index, 2 * INTEGER_SIZE, INTEGER_SIZE * position
+            )
+            start = int.from_bytes(offsets[:INTEGER_SIZE], "big")
+            end = int.from_bytes(offsets[INTEGER_SIZE:], "big")
+
+        return os.pread(self._data, end - start, start)
+
+    def append(self, number: Uint, block_rlp: bytes) -> bool:
+        """
+        Store `block_rlp` as block `number`, returning `False` if that block
+        is already stored. Raises `ValueError` if the block would leave a
+        gap.
+        """
+        if not self.writable:
+            raise ValueError("block archive is read only")
+
+        if self.first is None:
+            self.first = number
+            os.pwrite(
+                self._index, int(number).to_bytes(INTEGER_SIZE, "big"), 0
+            )
+
+        next_number = self.first + Uint(self.count)
+        if number < next_number:
+            return False
+        if number > next_number:
+            raise ValueError(
+                f"block {number} doesn't follow block {next_number - Uint(1)}"
+            )
+
+        os.pwrite(self._data, block_rlp, self._end)
+        self._end += len(block_rlp)
+        self.count += 1
+        os.pwrite(
+            self._index,
+            self._end.to_bytes(INTEGER_SIZE, "big"),
+            INTEGER_SIZE * self.count,
+        )
+        return True
+
+
+def block_number(block_rlp: bytes) -> Uint:
+    """
+    Read the number from the header of an RLP encoded block.
+    """
+    decoded_block = rlp.decode(block_rlp)
+    assert not isinstance(decoded_block, bytes)
+    assert not isinstance(decoded_block[0], bytes)
+    assert isinstance(decoded_block[0][8], bytes)
+    return Uint.from_be_bytes(decoded_block[0][8])
+
+
+def _raw_blocks(value: Any) -> Iterator[bytes]:
+    """
+    Yield the blocks in a decoded JSON value, in order.
+    """
+    values = [value]
+    while values:
+        value = values.pop()
+        if isinstance(value, list):
+            values.extend(reversed(value))
+        elif isinstance(value, str):
+            yield bytes.fromhex(value.removeprefix("0x"))
+        elif value.get("result") is not None:
+            yield bytes.fromhex(value["result"].removeprefix("0x"))
+
+
+def read_raw_blocks(file_name: str) -> Iterator[bytes]:
+    """
+    Read the RLP encoded blocks from a file of `debug_getRawBlock` results,
+    in the order they appear in the file.
+
+    The file holds either a JSON array, or one JSON value per line, which is
+    read a line at a time. Each value is a JSON-RPC reply, a hex string, or
+    an array of either. Replies holding an error are skipped.
+    """
+    with open(file_name) as f:
+        first = True
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except json.JSONDecodeError:
+                if not first:
+                    raise
+                # A JSON array spread over several lines.
+                yield from _raw_blocks(json.loads(line + f.read()))
+                return
+            first = False
+            yield from _raw_blocks(value)
+
+
+def main() -> None:
+    """
+    Import files of `debug_getRawBlock` results into a block archive.
+
+    Blocks are appended as they are read. Only blocks read before the blocks
+    preceding them are held in memory, so files in block order are imported
+    in constant memory.
+    """
+    logging.basicConfig(level=logging.INFO)
+    log = logging.getLogger(__name__)
+
+    parser = argparse.ArgumentParser(
+        description="Add the blocks in files of `debug_getRawBlock` results "
+        "to a block archive, for replaying with `ethereum-spec-sync "
+        "--archive ARCHIVE --from-archive`."
+    )
+    parser.add_argument("archive", metavar="ARCHIVE", help="archive directory")
+    parser.add_argument(
+        "files",
+        metavar="FILE",
+        nargs="+",
+        help="JSON file of `debug_getRawBlock` results",
+    )
+    options = parser.parse_args()
+
+    def read_blocks() -> Iterator[Tuple[Uint, bytes]]:
+        for file_name in options.files:
+            for block_rlp in read_raw_blocks(file_name):
+                yield block_number(block_rlp), block_rlp
+
+    added = 0
+    with BlockArchive(options.archive, writable=True) as archive:
+        next_number = archive.next
+        if next_number is None:
+            # A new archive starts at the lowest block.
+            next_number = min(
+                (number for number, _ in read_blocks()), default=None
+            )
+
+        ahead: Dict[Uint, bytes] = {}
+        try:
+            for number, block_rlp in read_blocks():
+                assert next_number is not None
+                if number > next_number:
+                    ahead[number] = block_rlp
+                    continue
+                added += archive.append(number, block_rlp)
+                next_number = archive.next
+                assert next_number is not None
+                while next_number in ahead:
+                    added += archive.append(
+                        next_number, ahead.pop(next_number)
+                    )
+                    next_number += Uint(1)
+
+            if ahead:
+                # Fails, because the block doesn't follow the archive.
+                number = min(ahead)
+                archive.append(number, ahead[number])
+        except ValueError as e:
+            log.error("%s", e)
+            exit(1)
+
+        log.info(
+            "added %d blocks, archive holds blocks [%s, %s)",
+            added,
+            archive.first,
+            archive.next,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,14 @@ from http.server import BaseHTTPRequestHandler
 from io import StringIO, TextIOWrapper
 from socket import socket
 from threading import Thread
-from typing import Any, Tuple, Union
+from typing import Any, Dict, List, Tuple, Union
 from urllib.parse import parse_qs, urlparse
 
 from typing_extensions import override
 
+from .t8n.pool import T8NPool
+from .utils import FatalError, get_stream_logger
+
 
 def daemon_arguments(subparsers: argparse._SubParsersAction) -> None:
     """
@@ -29,6 +32,13 @@ def daemon_arguments(subparsers: argparse._SubParsersAction) -> None:
         " (0 for no timeout)",
         type=int,
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="serve requests concurrently, and over kept-alive connections,"
+        " with this many worker processes",
+    )
 
 
 class _EvmToolHandler(BaseHTTPRequestHandler):
@@ -39,69 +49,83 @@ class _EvmToolHandler(BaseHTTPRequestHandler):
         """Don't log requests."""
         pass
 
+    def read_request(self) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Read the request body, and return the t8n command line and the JSON
+        object to use as its stdin.
+        """
+        content_length = int(self.headers["Content-Length"])
+        content_bytes = self.rfile.read(content_length)
+        content = json.loads(content_bytes)
+
+        args = [
+            "t8n",
+            "--input.env=stdin",
+            "--input.alloc=stdin",
+            "--input.txs=stdin",
+            "--output.result=stdout",
+            "--output.body=stdout",
+            "--output.alloc=stdout",
+            f"--state.fork={content['state']['fork']}",
+            f"--state.chainid={content['state']['chainid']}",
+            f"--state.reward={content['state']['reward']}",
+        ]
+
+        trace = content.get("trace", False)
+        output_basedir = content.get("output-basedir")
+        if trace:
+            if not output_basedir:
+                raise ValueError(
+                    "`output-basedir` should be provided when `--trace` "
+                    "is enabled."
+                )
+            # send full trace output if ``trace`` is ``True``
+            args.extend(
+                [
+                    "--trace",
+                    "--trace.memory",
+                    "--trace.returndata",
+                    f"--output.basedir={output_basedir}",
+                ]
+            )
+
+        count_opcodes = content.get("count-opcodes", False)
+        if count_opcodes:
+            # send opcode counts if ``count-opcodes`` is ``True``
+            args.extend(["--opcode.count", "stdout"])
+
+        query_string = urlparse(self.path).query
+        if query_string:
+            query = parse_qs(
+                query_string,
+                keep_blank_values=True,
+                strict_parsing=True,
+                errors="strict",
+            )
+            args += query.get("arg", [])
+        return args, content["input"]
+
+    def send_body(self, code: int, content_type: str, body: bytes) -> None:
+        """
+        Send a complete response.
+        """
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_POST(self) -> None:  # noqa N802
         from . import main
 
         try:
-            content_length = int(self.headers["Content-Length"])
-            content_bytes = self.rfile.read(content_length)
-            content = json.loads(content_bytes)
-
-            input_string = json.dumps(content["input"])
-            input = StringIO(input_string)  # noqa A001
-
-            args = [
-                "t8n",
-                "--input.env=stdin",
-                "--input.alloc=stdin",
-                "--input.txs=stdin",
-                "--output.result=stdout",
-                "--output.body=stdout",
-                "--output.alloc=stdout",
-                f"--state.fork={content['state']['fork']}",
-                f"--state.chainid={content['state']['chainid']}",
-                f"--state.reward={content['state']['reward']}",
-            ]
-
-            trace = content.get("trace", False)
-            output_basedir = content.get("output-basedir")
-            if trace:
-                if not output_basedir:
-                    raise ValueError(
-                        "`output-basedir` should be provided when `--trace` "
-                        "is enabled."
-                    )
-                # send full trace output if ``trace`` is ``True``
-                args.extend(
-                    [
-                        "--trace",
-                        "--trace.memory",
-                        "--trace.returndata",
-                        f"--output.basedir={output_basedir}",
-                    ]
-                )
-
-            count_opcodes = content.get("count-opcodes", False)
-            if count_opcodes:
-                # send opcode counts if ``count-opcodes`` is ``True``
-                args.extend(["--opcode.count", "stdout"])
-
-            query_string = urlparse(self.path).query
-            if query_string:
-                query = parse_qs(
-                    query_string,
-                    keep_blank_values=True,
-                    strict_parsing=True,
-                    errors="strict",
-                )
-                args += query.get("arg", [])
+            args, stdin = self.read_request()
         except Exception as e:
-            self.send_response(500)
-            self.send_header("Content-Type", "text/plain")
-            self.end_headers()
-            self.wfile.write(str(e).encode("utf-8"))
+            self.send_body(500, "text/plain", str(e).encode("utf-8"))
             raise
 
+        input = StringIO(json.dumps(stdin))  # noqa A001
+
         self.send_response(200)
         self.send_header("Content-Type", "application/octet-stream")
         self.end_headers()
@@ -153,9 +177,54 @@ class _UnixSocketHttpServer(socketserver.UnixStreamServer):
                 break
 
 
+class _PooledEvmToolHandler(_EvmToolHandler):
+    """
+    Runs each request in the server's pool of t8n workers, and keeps the
+    connection open for further requests.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server: "_ThreadingUnixSocketHttpServer"
+
+    def do_POST(self) -> None:  # noqa N802
+        try:
+            args, stdin = self.read_request()
+            try:
+                output = self.server.pool.run(args, stdin)
+            except FatalError as e:
+                get_stream_logger("T8N").error(str(e))
+                output = {}
+        except (Exception, SystemExit) as e:
+            # t8n exits on some invalid inputs, which shouldn't stop the
+            # daemon.
+            self.log_error("%r", e)
+            self.close_connection = True
+            self.send_body(500, "text/plain", str(e).encode("utf-8"))
+            return
+        finally:
+            self.server.last_response = time.monotonic()
+
+        body = json.dumps(output, indent=4) if output else ""
+        self.send_body(200, "application/octet-stream", body.encode("utf-8"))
+
+
+class _ThreadingUnixSocketHttpServer(
+    socketserver.ThreadingMixIn, _UnixSocketHttpServer
+):
+    daemon_threads = True
+    pool: T8NPool
+
+    def __init__(self, *args: Any, pool: T8NPool, **kwargs: Any) -> None:
+        self.pool = pool
+        super().__init__(*args, **kwargs)
+
+
 class Daemon:
     """
     Converts HTTP requests into ethereum-spec-evm calls.
+
+    With more than one worker, connections are served concurrently, and
+    requests are run in a pool of processes that keep the forks imported.
     """
 
     def __init__(self, options: argparse.Namespace) -> None:
@@ -177,6 +246,15 @@ class Daemon:
             self.uds = options.uds
 
         self.timeout = options.timeout
+        self.workers: int = options.workers
+
+    def _serve(self, server: _UnixSocketHttpServer) -> None:
+        with server:
+            server.timeout = 7.0
+            timer = Thread(target=server.check_timeout, daemon=True)
+            timer.start()
+
+            server.serve_forever()
 
     def _run(self) -> int:
         try:
@@ -184,14 +262,27 @@ class Daemon:
         except IOError:
             pass
 
-        with _UnixSocketHttpServer(
-            (self.uds), _EvmToolHandler, shutdown_timeout=self.timeout
-        ) as server:
-            server.timeout = 7.0
-            timer = Thread(target=server.check_timeout, daemon=True)
-            timer.start()
+        if self.workers <= 1:
+            self._serve(
+                _UnixSocketHttpServer(
+                    (self.uds), _EvmToolHandler, shutdown_timeout=self.timeout
+                )
+            )
+            return 0
 
-            server.serve_forever()
+        pool = T8NPool(self.workers)
+        try:
+            pool.start()
+            self._serve(
+                _ThreadingUnixSocketHttpServer(
+                    (self.uds),
+                    _PooledEvmToolHandler,
+                    shutdown_timeout=self.timeout,
+                    pool=pool,
+                )
+            )
+        finally:
+            pool.shutdown()
 
         return 0
 
@@ -14,11 +14,9 @@ class ForkLoad:
     """
 
     hardfork: Final[Hardfork]
-    _forks: list[Hardfork]
 
     def __init__(self, hardfork: Hardfork):
         self.hardfork = hardfork
-        self._forks = Hardfork.discover()
 
     def _module(self, name: str) -> Any:
         """Imports a module from the fork."""
@@ -278,6 +276,16 @@ class ForkLoad:
         """Check if this fork has a `decode_transaction`."""
         return hasattr(self._module("transactions"), "decode_transaction")
 
+    @property
+    def prefetch_senders(self) -> Any:
+        """prefetch_senders function of the fork, if patched in."""
+        return self._module("fork").prefetch_senders
+
+    @property
+    def has_prefetch_senders(self) -> bool:
+        """Check if parallel sender recovery was patched into the fork."""
+        return hasattr(self._module("fork"), "prefetch_senders")
+
     @property
     def State(self) -> Any:
         """State class of the fork."""
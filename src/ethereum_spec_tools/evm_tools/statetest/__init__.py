@@ -5,15 +5,32 @@ Execute state tests.
 import argparse
 import json
 import logging
+import multiprocessing
 import sys
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import redirect_stderr
 from copy import deepcopy
 from dataclasses import dataclass
 from io import StringIO
-from typing import Any, Dict, Generator, Iterable, List, Optional, TextIO
+from multiprocessing.connection import Connection
+from queue import Queue, SimpleQueue
+from threading import Thread
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
 
 from ethereum.utils.hexadecimal import hex_to_bytes
 
 from ..t8n import T8N, ForkCache
+from ..t8n.pool import Worker
 from ..t8n.t8n_types import Result
 from ..utils import get_supported_forks
 
@@ -184,6 +201,12 @@ def state_test_arguments(subparsers: argparse._SubParsersAction) -> None:
     statetest_parser.add_argument(
         "--nomemory", dest="memory", action="store_false", default=True
     )
+    statetest_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="run the files listed on stdin in this many processes",
+    )
 
 
 class _PrefixFormatter(logging.Formatter):
@@ -192,6 +215,63 @@ class _PrefixFormatter(logging.Formatter):
         return "\n".join("# " + x for x in output.splitlines())
 
 
+def _add_log_handler() -> logging.StreamHandler:
+    logger = logging.getLogger("T8N")
+    logger.setLevel(level=logging.INFO)
+    stream_handler = logging.StreamHandler()
+    formatter = _PrefixFormatter("%(levelname)s:%(name)s:%(message)s")
+    stream_handler.setFormatter(formatter)
+    logger.addHandler(stream_handler)
+    return stream_handler
+
+
+FileResult = Tuple[int, str, str]
+
+
+def serve_state_tests(connection: Connection, options: Any) -> None:
+    """
+    Run the state tests in each file path received on `connection`, and send
+    back either `(True, (code, stdout, stderr))`, with what
+    `StateTest.run_one()` returned and wrote to each stream, or
+    `(False, exception)`, until `None` is received.
+
+    The forks stay imported, and temporary forks stay in a `ForkCache`,
+    between files.
+    """
+    state_test = StateTest(options, StringIO(), StringIO())
+    stream_handler = _add_log_handler()
+
+    with ForkCache() as fork_cache:
+        while True:
+            try:
+                path = connection.recv()
+            except EOFError:
+                break
+            if path is None:
+                break
+
+            out_file = StringIO()
+            err_file = StringIO()
+            state_test.out_file = out_file
+            stream_handler.setStream(err_file)
+            response: Tuple[bool, Any]
+            try:
+                with redirect_stderr(err_file):
+                    code = state_test.run_one(path, fork_cache)
+                response = (
+                    True,
+                    (code, out_file.getvalue(), err_file.getvalue()),
+                )
+            except BaseException as e:
+                response = (False, e)
+
+            try:
+                connection.send(response)
+            except Exception:
+                # The exception couldn't be pickled.
+                connection.send((False, RuntimeError(traceback.format_exc())))
+
+
 class StateTest:
     """
     Run one or more state tests.
@@ -210,17 +290,17 @@ class StateTest:
         self.memory: bool = options.memory
         self.stack: bool = options.stack
         self.return_data: bool = options.return_data
+        self.workers: int = options.workers
+        self.options = options
 
     def run(self) -> int:
         """
         Execute the tests.
         """
-        logger = logging.getLogger("T8N")
-        logger.setLevel(level=logging.INFO)
-        stream_handler = logging.StreamHandler()
-        formatter = _PrefixFormatter("%(levelname)s:%(name)s:%(message)s")
-        stream_handler.setFormatter(formatter)
-        logger.addHandler(stream_handler)
+        if self.file is None and self.workers > 1:
+            return self.run_parallel()
+
+        _add_log_handler()
 
         with ForkCache() as fork_cache:
             if self.file is None:
@@ -301,3 +381,66 @@ class StateTest:
             if result != 0:
                 return result
         return 0
+
+    def run_parallel(self) -> int:
+        """
+        Execute state tests from a line-delimited list of files provided from
+        `self.in_file`, in `self.workers` processes.
+
+        Each file's results are written once it, and every file before it,
+        has finished, so the output is the same as `run_many()`'s.
+        """
+        # Forking a process with running threads isn't safe.
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            Worker(context, serve_state_tests, (self.options,))
+            for _ in range(self.workers)
+        ]
+        idle: "SimpleQueue[Worker]" = SimpleQueue()
+        for worker in workers:
+            idle.put(worker)
+
+        def run_file(path: str) -> FileResult:
+            worker = idle.get()
+            try:
+                ok, value = worker.run(path)
+            finally:
+                idle.put(worker)
+            if not ok:
+                raise value
+            return value
+
+        # Bounded, so that a long list of files isn't read all at once.
+        pending: "Queue[Optional[Future[FileResult]]]" = Queue(
+            maxsize=2 * self.workers
+        )
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        def read_paths() -> None:
+            try:
+                for line in self.in_file:
+                    pending.put(executor.submit(run_file, line[:-1]))
+            except RuntimeError:
+                # The executor was shut down after a failure.
+                return
+            pending.put(None)
+
+        reader = Thread(target=read_paths, daemon=True)
+        reader.start()
+
+        try:
+            while True:
+                future = pending.get()
+                if future is None:
+                    return 0
+                code, out, err = future.result()
+                sys.stderr.write(err)
+                sys.stderr.flush()
+                self.out_file.write(out)
+                self.out_file.flush()
+                if code != 0:
+                    return code
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            for worker in workers:
+                worker.stop()
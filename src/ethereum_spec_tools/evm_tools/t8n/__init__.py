@@ -6,8 +6,18 @@ import argparse
 import fnmatch
 import json
 import os
-from contextlib import AbstractContextManager
-from typing import Any, Final, TextIO, Tuple, Type, TypeVar
+from contextlib import AbstractContextManager, nullcontext
+from typing import (
+    Any,
+    Dict,
+    Final,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 from ethereum_rlp import rlp
 from ethereum_types.numeric import U64, U256, Uint
@@ -28,7 +38,7 @@ from ..utils import (
 )
 from .env import Env
 from .evm_trace.count import CountTracer
-from .evm_trace.eip3155 import Eip3155Tracer
+from .evm_trace.eip3155 import Eip3155Tracer, StreamingEip3155Tracer
 from .evm_trace.group import GroupTracer
 from .t8n_types import Alloc, Result, Txs
 
@@ -84,11 +94,29 @@ def t8n_arguments(subparsers: argparse._SubParsersAction) -> None:
     t8n_parser.add_argument("--trace.noreturndata", action="store_true")
     t8n_parser.add_argument("--trace.nostack", action="store_true")
     t8n_parser.add_argument("--trace.returndata", action="store_true")
+    t8n_parser.add_argument(
+        "--trace.stream",
+        action="store_true",
+        help="write each trace as it completes, instead of per transaction",
+    )
+    t8n_parser.add_argument(
+        "--trace.gzip",
+        action="store_true",
+        help="gzip compress trace files, which implies --trace.stream",
+    )
 
     t8n_parser.add_argument("--opcode.count", dest="opcode_count", type=str)
 
     t8n_parser.add_argument("--state-test", action="store_true")
 
+    t8n_parser.add_argument(
+        "--recovery-threads",
+        dest="recovery_threads",
+        type=int,
+        default=None,
+        help="recover transaction senders in a pool of this many threads",
+    )
+
 
 class ForkCache(AbstractContextManager):
     """
@@ -96,9 +124,19 @@ class ForkCache(AbstractContextManager):
     """
 
     _cache: Final[dict[Tuple[object, ...], TemporaryHardfork]]
+    _forks: Optional[List[Hardfork]]
 
     def __init__(self) -> None:
         self._cache = {}
+        self._forks = None
+
+    def discover(self) -> List[Hardfork]:
+        """
+        Find the hardforks, only searching for them the first time.
+        """
+        if self._forks is None:
+            self._forks = Hardfork.discover()
+        return self._forks
 
     @override
     def __exit__(self, *args: object, **kwargs: object) -> None:
@@ -167,21 +205,24 @@ class T8N(Load):
         out_file: TextIO,
         in_file: TextIO,
         cache: ForkCache,
+        stdin: Optional[Dict[str, Any]] = None,
     ) -> None:
+        """
+        Prepare the transition. Inputs read from `stdin` are read from
+        `in_file`, unless they are given, already decoded, as `stdin`.
+        """
         self.out_file = out_file
         self.in_file = in_file
         self.options = options
-        forks = Hardfork.discover()
+        forks = cache.discover()
 
-        if "stdin" in (
+        if stdin is None and "stdin" in (
             options.input_env,
             options.input_alloc,
             options.input_txs,
             options.blob_parameters,
         ):
             stdin = json.load(in_file)
-        else:
-            stdin = None
 
         fork_module, self.fork_block = find_fork(forks, self.options, stdin)
 
@@ -233,14 +274,26 @@ class T8N(Load):
             trace_memory = getattr(self.options, "trace.memory", False)
             trace_stack = not getattr(self.options, "trace.nostack", False)
             trace_return_data = getattr(self.options, "trace.returndata")
-            tracers.add(
-                Eip3155Tracer(
+            eip3155_tracer: Eip3155Tracer
+            # Only streamed traces can be compressed.
+            if getattr(self.options, "trace.stream", False) or getattr(
+                self.options, "trace.gzip", False
+            ):
+                eip3155_tracer = StreamingEip3155Tracer(
                     trace_memory=trace_memory,
                     trace_stack=trace_stack,
                     trace_return_data=trace_return_data,
                     output_basedir=self.options.output_basedir,
+                    compress=getattr(self.options, "trace.gzip", False),
                 )
-            )
+            else:
+                eip3155_tracer = Eip3155Tracer(
+                    trace_memory=trace_memory,
+                    trace_stack=trace_stack,
+                    trace_return_data=trace_return_data,
+                    output_basedir=self.options.output_basedir,
+                )
+            tracers.add(eip3155_tracer)
 
         if self.options.opcode_count is not None:
             tracers.add(CountTracer())
@@ -256,6 +309,13 @@ class T8N(Load):
 
         self.logger = get_stream_logger("T8N")
 
+        if getattr(self.options, "recovery_threads", None):
+            import ethereum_optimized
+
+            ethereum_optimized.monkey_patch_sender_recovery(
+                fork.short_name, self.options.recovery_threads
+            )
+
         super().__init__(
             self.options.state_fork,
             fork,
@@ -390,26 +450,34 @@ class T8N(Load):
                 data=block_env.parent_beacon_block_root,
             )
 
-        for tx_index, (original_idx, tx) in enumerate(
-            zip(
-                self.txs.successfully_parsed,
-                self.txs.transactions,
-                strict=True,
-            )
-        ):
-            self.backup_state()
-            try:
-                self.fork.process_transaction(
-                    block_env, block_output, tx, Uint(tx_index)
-                )
-            except EthereumException as e:
-                self.txs.rejected_txs[original_idx] = (
-                    f"Failed transaction: {e!r}"
-                )
-                self.restore_state()
-                self.logger.warning(
-                    f"Transaction {original_idx} failed: {e!r}"
+        transactions = tuple(self.txs.transactions)
+        prefetch: AbstractContextManager[Tuple[Any, ...]]
+        if self.fork.has_prefetch_senders:
+            prefetch = self.fork.prefetch_senders(block_env, transactions)
+        else:
+            prefetch = nullcontext(transactions)
+
+        with prefetch as transactions:
+            for tx_index, (original_idx, tx) in enumerate(
+                zip(
+                    self.txs.successfully_parsed,
+                    transactions,
+                    strict=True,
                 )
+            ):
+                self.backup_state()
+                try:
+                    self.fork.process_transaction(
+                        block_env, block_output, tx, Uint(tx_index)
+                    )
+                except EthereumException as e:
+                    self.txs.rejected_txs[original_idx] = (
+                        f"Failed transaction: {e!r}"
+                    )
+                    self.restore_state()
+                    self.logger.warning(
+                        f"Transaction {original_idx} failed: {e!r}"
+                    )
 
         # Post-execution operations use index N+1
         if self.fork.has_block_access_list_hash:
@@ -458,6 +526,22 @@ class T8N(Load):
 
     def run(self) -> int:
         """Run the transition and provide the relevant outputs."""
+        try:
+            json_output = self.transition()
+        except FatalError as e:
+            self.logger.error(str(e))
+            return 1
+
+        if json_output:
+            json.dump(json_output, self.out_file, indent=4)
+
+        return 0
+
+    def transition(self) -> Dict[str, object]:
+        """
+        Run the transition, write the outputs that go to files, and return
+        the outputs that go to stdout.
+        """
         # Clear files that may have been created in a previous
         # run of the t8n tool.
         # Define the specific files and pattern to delete
@@ -466,26 +550,23 @@ class T8N(Load):
             self.options.output_alloc,
             self.options.output_body,
         ]
-        pattern_to_delete = "trace-*.jsonl"
+        patterns_to_delete = ["trace-*.jsonl", "trace-*.jsonl.gz"]
 
         # Iterate through the directory
         for file in os.listdir(self.options.output_basedir):
             file_path = os.path.join(self.options.output_basedir, file)
 
-            # Check if the file matches the specific names or the pattern
-            if file in files_to_delete or fnmatch.fnmatch(
-                file, pattern_to_delete
+            # Check if the file matches the specific names or the patterns
+            if file in files_to_delete or any(
+                fnmatch.fnmatch(file, pattern)
+                for pattern in patterns_to_delete
             ):
                 os.remove(file_path)
 
-        try:
-            if self.options.state_test:
-                self.run_state_test()
-            else:
-                self.run_blockchain_test()
-        except FatalError as e:
-            self.logger.error(str(e))
-            return 1
+        if self.options.state_test:
+            self.run_state_test()
+        else:
+            self.run_blockchain_test()
 
         json_state = self.alloc.to_json()
         json_result = self.result.to_json()
@@ -540,7 +621,4 @@ class T8N(Load):
                 json.dump(opcode_count_results, f, indent=4)
             self.logger.info(f"Wrote opcode counts to {result_output_path}")
 
-        if json_output:
-            json.dump(json_output, self.out_file, indent=4)
-
-        return 0
+        return json_output
@@ -2,11 +2,12 @@
 The module implements the raw EVM tracer for t8n.
 """
 
+import gzip
 import json
 import os
 from contextlib import ExitStack
-from dataclasses import asdict, dataclass, is_dataclass
-from typing import Any, List, Optional, TextIO, Union
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, List, Optional, TextIO, Tuple, Union
 
 from ethereum.exceptions import EthereumException
 from ethereum.trace import (
@@ -23,10 +24,17 @@ from ethereum.trace import (
     TransactionStart,
 )
 
-from .protocols import Evm, EvmWithReturnData, TransactionEnvironment
+from .protocols import (
+    Evm,
+    EvmWithReturnData,
+    TransactionEnvironment,
+    conforms,
+)
 
 EXCLUDE_FROM_OUTPUT = ["gasCostTraced", "errorTraced", "precompile"]
 
+STREAM_BUFFER_SIZE = 1 << 20
+
 
 @dataclass
 class Trace:
@@ -97,6 +105,65 @@ class Eip3155Tracer(EvmTracer):
         self.trace_return_data = trace_return_data
         self.output_basedir = output_basedir
 
+    def start_transaction(self, tx_env: TransactionEnvironment) -> None:
+        """
+        Discard the traces of the previous transaction, and start tracing the
+        transaction described by `tx_env`.
+        """
+        self.active_traces = []
+        self.transaction_environment = tx_env
+
+    def append_trace(self, trace: Trace) -> None:
+        """
+        Record the trace of a newly started opcode or precompile. The trace
+        may still be modified by later events, until the next one starts.
+        """
+        self.active_traces.append(trace)
+
+    def end_transaction(self, final_trace: FinalTrace) -> None:
+        """
+        Output the traces of the current transaction, followed by
+        `final_trace`.
+        """
+        self.active_traces.append(final_trace)
+
+        output_traces(
+            self.active_traces,
+            *self._transaction_key(),
+            self.output_basedir,
+        )
+
+    def _transaction_key(self) -> Tuple[int, bytes]:
+        """
+        Index and hash of the transaction being traced.
+        """
+        tx_env = self.transaction_environment
+        assert tx_env is not None
+        assert tx_env.index_in_block is not None
+        assert tx_env.tx_hash is not None
+        return int(tx_env.index_in_block), tx_env.tx_hash
+
+    def _snapshot(
+        self, evm: Any
+    ) -> Tuple[Optional[str], Optional[List[str]], Optional[str]]:
+        """
+        Format the memory, stack, and return data of `evm` for a new trace,
+        as far as they are traced.
+        """
+        memory = None
+        if self.trace_memory and len(evm.memory) > 0:
+            memory = "0x" + evm.memory.hex()
+
+        stack = None
+        if self.trace_stack:
+            stack = [hex(i) for i in evm.stack]
+
+        return_data = None
+        if self.trace_return_data and conforms(evm, EvmWithReturnData):
+            return_data = "0x" + evm.return_data.hex()
+
+        return memory, stack, return_data
+
     def __call__(self, evm: Any, event: TraceEvent) -> None:
         """
         Create a trace of the event.
@@ -108,11 +175,10 @@ class Eip3155Tracer(EvmTracer):
         ):
             return
 
-        assert isinstance(evm, Evm)
+        assert conforms(evm, Evm)
 
         if self.transaction_environment is not evm.message.tx_env:
-            self.active_traces = []
-            self.transaction_environment = evm.message.tx_env
+            self.start_transaction(evm.message.tx_env)
 
         last_trace = None
         if self.active_traces:
@@ -126,31 +192,13 @@ class Eip3155Tracer(EvmTracer):
 
         len_memory = len(evm.memory)
 
-        return_data = None
-        if isinstance(evm, EvmWithReturnData) and self.trace_return_data:
-            return_data = "0x" + evm.return_data.hex()
-
-        memory = None
-        if self.trace_memory and len_memory > 0:
-            memory = "0x" + evm.memory.hex()
-
-        stack = None
-        if self.trace_stack:
-            stack = [hex(i) for i in evm.stack]
-
         if isinstance(event, TransactionStart):
             pass
         elif isinstance(event, TransactionEnd):
             final_trace = FinalTrace(event.gas_used, event.output, event.error)
-            self.active_traces.append(final_trace)
-
-            output_traces(
-                self.active_traces,
-                evm.message.tx_env.index_in_block,
-                evm.message.tx_env.tx_hash,
-                self.output_basedir,
-            )
+            self.end_transaction(final_trace)
         elif isinstance(event, PrecompileStart):
+            memory, stack, return_data = self._snapshot(evm)
             new_trace = Trace(
                 pc=int(evm.pc),
                 op="0x" + event.address.hex().lstrip("0"),
@@ -166,13 +214,14 @@ class Eip3155Tracer(EvmTracer):
                 precompile=True,
             )
 
-            self.active_traces.append(new_trace)
+            self.append_trace(new_trace)
         elif isinstance(event, PrecompileEnd):
             assert isinstance(last_trace, Trace)
 
             last_trace.gasCostTraced = True
             last_trace.errorTraced = True
         elif isinstance(event, OpStart):
+            memory, stack, return_data = self._snapshot(evm)
             op = event.op.value
             if op == "InvalidOpcode":
                 op = "Invalid"
@@ -190,7 +239,7 @@ class Eip3155Tracer(EvmTracer):
                 opName=str(event.op).split(".")[-1],
             )
 
-            self.active_traces.append(new_trace)
+            self.append_trace(new_trace)
         elif isinstance(event, OpEnd):
             assert isinstance(last_trace, Trace)
 
@@ -219,6 +268,7 @@ class Eip3155Tracer(EvmTracer):
                         "have code"
                     ) from event.error
 
+                memory, stack, return_data = self._snapshot(evm)
                 new_trace = Trace(
                     pc=int(evm.pc),
                     op=event.error.code,
@@ -236,7 +286,7 @@ class Eip3155Tracer(EvmTracer):
                     error=type(event.error).__name__,
                 )
 
-                self.active_traces.append(new_trace)
+                self.append_trace(new_trace)
             elif not last_trace.errorTraced:
                 # If the error for the last trace is not covered
                 # the exception is attributed to the last trace.
@@ -285,10 +335,11 @@ class _TraceJsonEncoder(json.JSONEncoder):
         if not is_dataclass(obj) or isinstance(obj, type):
             return super().default(obj)
 
+        # Unlike `asdict`, this doesn't deep copy the stack of every trace.
         trace = {
-            k: v
-            for k, v in asdict(obj).items()
-            if _TraceJsonEncoder.retain(k, v)
+            field.name: getattr(obj, field.name)
+            for field in fields(obj)
+            if _TraceJsonEncoder.retain(field.name, getattr(obj, field.name))
         }
 
         return trace
@@ -300,8 +351,29 @@ def output_op_trace(
     """
     Output a single trace to a json file.
     """
-    json.dump(trace, json_file, separators=(",", ":"), cls=_TraceJsonEncoder)
-    json_file.write("\n")
+    json_file.write(
+        json.dumps(trace, separators=(",", ":"), cls=_TraceJsonEncoder) + "\n"
+    )
+
+
+def open_trace_file(
+    index_in_block: int,
+    tx_hash: bytes,
+    output_basedir: str,
+    compress: bool = False,
+    buffering: int = -1,
+) -> TextIO:
+    """
+    Open the file the traces of a transaction are written to, gzip
+    compressed if `compress` is set.
+    """
+    tx_hash_str = "0x" + tx_hash.hex()
+    output_path = os.path.join(
+        output_basedir, f"trace-{index_in_block}-{tx_hash_str}.jsonl"
+    )
+    if compress:
+        return gzip.open(output_path + ".gz", "wt")
+    return open(output_path, "w", buffering=buffering)
 
 
 def output_traces(
@@ -317,11 +389,9 @@ def output_traces(
         json_file: TextIO
 
         if isinstance(output_basedir, str):
-            tx_hash_str = "0x" + tx_hash.hex()
-            output_path = os.path.join(
-                output_basedir, f"trace-{index_in_block}-{tx_hash_str}.jsonl"
+            json_file = open_trace_file(
+                index_in_block, tx_hash, output_basedir
             )
-            json_file = open(output_path, "w")
             stack.push(json_file)
         else:
             json_file = output_basedir
@@ -331,3 +401,98 @@ def output_traces(
                 # Traces related to pre-compile are not output.
                 continue
             output_op_trace(trace, json_file)
+
+
+class StreamingEip3155Tracer(Eip3155Tracer):
+    """
+    EVM trace implementation compatible with EIP-3155, which writes each
+    trace as soon as it can no longer change, instead of keeping every trace
+    of a transaction until it ends.
+
+    A trace is only complete once the next opcode starts, so at most one
+    trace is held in `active_traces`. The output is identical to
+    `Eip3155Tracer`, optionally gzip compressed.
+    """
+
+    compress: bool
+    _json_file: TextIO | None
+
+    def __init__(
+        self,
+        /,
+        trace_memory: bool = False,
+        trace_stack: bool = True,
+        trace_return_data: bool = False,
+        output_basedir: str | TextIO = ".",
+        compress: bool = False,
+    ):
+        super().__init__(
+            trace_memory=trace_memory,
+            trace_stack=trace_stack,
+            trace_return_data=trace_return_data,
+            output_basedir=output_basedir,
+        )
+        self.compress = compress
+        self._json_file = None
+
+    def start_transaction(self, tx_env: TransactionEnvironment) -> None:
+        """
+        Close the output of any transaction that didn't end, and start
+        tracing the transaction described by `tx_env`.
+        """
+        self._close()
+        super().start_transaction(tx_env)
+
+    def append_trace(self, trace: Trace) -> None:
+        """
+        Write out the previous trace, which is now complete, and hold on to
+        `trace`.
+        """
+        self._flush()
+        self.active_traces.append(trace)
+
+    def end_transaction(self, final_trace: FinalTrace) -> None:
+        """
+        Write out the last trace of the current transaction, followed by
+        `final_trace`.
+        """
+        self._flush()
+        output_op_trace(final_trace, self._file())
+        self._close()
+
+    def _file(self) -> TextIO:
+        """
+        Get the output of the current transaction, opening it if necessary.
+        """
+        if self._json_file is not None:
+            return self._json_file
+
+        if not isinstance(self.output_basedir, str):
+            return self.output_basedir
+
+        self._json_file = open_trace_file(
+            *self._transaction_key(),
+            self.output_basedir,
+            compress=self.compress,
+            buffering=STREAM_BUFFER_SIZE,
+        )
+        return self._json_file
+
+    def _flush(self) -> None:
+        """
+        Write out and forget the held trace, if any.
+        """
+        for trace in self.active_traces:
+            if getattr(trace, "precompile", False):
+                # Traces related to pre-compile are not output.
+                continue
+            output_op_trace(trace, self._file())
+        self.active_traces = []
+
+    def _close(self) -> None:
+        """
+        Close the output of the current transaction, if it was opened.
+        """
+        if self._json_file is not None:
+            self._json_file.close()
+            self._json_file = None
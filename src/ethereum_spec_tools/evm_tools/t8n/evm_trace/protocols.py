@@ -2,7 +2,7 @@
 Protocol definitions for working with EVM trace events.
 """
 
-from typing import Optional, Protocol, runtime_checkable
+from typing import Dict, Optional, Protocol, Tuple, runtime_checkable
 
 from ethereum_types.bytes import Bytes
 from ethereum_types.numeric import U256, Uint
@@ -52,3 +52,20 @@ class EvmWithReturnData(Evm, Protocol):
     """
 
     return_data: Bytes
+
+
+_CONFORMS: Dict[Tuple[type, type], bool] = {}
+
+
+def conforms(obj: object, protocol: type) -> bool:
+    """
+    Check `isinstance(obj, protocol)`, remembering the answer for the type of
+    `obj`. Checking a runtime protocol looks up every one of its attributes,
+    which is too slow to repeat for every trace event.
+    """
+    key = (type(obj), protocol)
+    result = _CONFORMS.get(key)
+    if result is None:
+        result = isinstance(obj, protocol)
+        _CONFORMS[key] = result
+    return result
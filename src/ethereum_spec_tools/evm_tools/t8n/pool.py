@@ -0,0 +1,184 @@
+"""
+Pool of long-lived processes running the t8n tool in-process.
+"""
+
+import multiprocessing
+import traceback
+from io import StringIO
+from multiprocessing.connection import Connection
+from queue import SimpleQueue
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+Request = Tuple[List[str], Dict[str, Any]]
+Response = Tuple[bool, Any]
+
+
+def serve(connection: Connection) -> None:
+    """
+    Run t8n for each `(args, stdin)` request received on `connection`, and
+    send back either `(True, stdout)` or `(False, exception)`, until `None`
+    is received. `stdin` and `stdout` are decoded JSON objects.
+
+    The forks stay imported, and temporary forks stay in a `ForkCache`,
+    between requests.
+    """
+    from ethereum.trace import discard_evm_trace, set_evm_trace
+
+    from .. import create_parser
+    from . import T8N, ForkCache
+
+    parser = create_parser()
+
+    with ForkCache() as fork_cache:
+        while True:
+            try:
+                request = connection.recv()
+            except EOFError:
+                break
+            if request is None:
+                break
+
+            args, stdin = request
+            response: Response
+            try:
+                t8n = T8N(
+                    parser.parse_known_args(args)[0],
+                    StringIO(),
+                    StringIO(),
+                    fork_cache,
+                    stdin=stdin,
+                )
+                response = (True, t8n.transition())
+            except BaseException as e:
+                response = (False, e)
+            finally:
+                # t8n only sets the tracer when tracing.
+                set_evm_trace(discard_evm_trace)
+
+            try:
+                connection.send(response)
+            except Exception:
+                # The exception couldn't be pickled.
+                connection.send((False, RuntimeError(traceback.format_exc())))
+
+
+class Worker:
+    """
+    A process running `target` (by default `serve()`) with its end of a pipe
+    followed by `args`, and the parent's end of the pipe.
+    """
+
+    process: Any
+    connection: Connection
+
+    def __init__(
+        self,
+        context: Any,
+        target: Callable[..., None] = serve,
+        args: Tuple[Any, ...] = (),
+    ) -> None:
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=target, args=(child, *args), daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def run(self, request: Any) -> Response:
+        """
+        Send `request` to the worker, and wait for its response.
+        """
+        self.connection.send(request)
+        return self.connection.recv()
+
+    def stop(self) -> None:
+        """
+        Ask the worker to exit, terminating it if it doesn't.
+        """
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.connection.close()
+
+
+class T8NPool:
+    """
+    Pool of `workers` processes, started by `start()` or on first use, that
+    each run the t8n tool in-process, so that every request doesn't pay for
+    importing the forks.
+
+    `run()` may be called from several threads at once, to evaluate that
+    many requests in parallel.
+    """
+
+    workers: int
+    _context: Any
+    _started: List[Worker]
+    _idle: "SimpleQueue[Worker]"
+    _lock: Lock
+
+    def __init__(
+        self, workers: int, start_method: Optional[str] = None
+    ) -> None:
+        if workers < 1:
+            raise ValueError("a t8n pool needs at least one worker")
+        self.workers = workers
+        # Forking a process with running threads isn't safe.
+        self._context = multiprocessing.get_context(start_method or "spawn")
+        self._started = []
+        self._idle = SimpleQueue()
+        self._lock = Lock()
+
+    def start(self) -> None:
+        """
+        Start the workers, if they aren't running yet.
+        """
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.workers):
+                worker = Worker(self._context)
+                self._started.append(worker)
+                self._idle.put(worker)
+
+    def run(
+        self, args: Sequence[str], stdin: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Run t8n with the command line `args`, reading `stdin`, in the next
+        idle worker, and return what it would write to stdout.
+        """
+        self.start()
+        worker = self._idle.get()
+        try:
+            ok, value = worker.run((list(args), stdin))
+        except (EOFError, OSError):
+            # The worker died, so replace it.
+            with self._lock:
+                self._started.remove(worker)
+                worker.stop()
+                worker = Worker(self._context)
+                self._started.append(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+
+        if not ok:
+            raise value
+        return value
+
+    def shutdown(self) -> None:
+        """
+        Stop every worker.
+        """
+        with self._lock:
+            for worker in self._started:
+                worker.stop()
+            self._started = []
+            self._idle = SimpleQueue()
@@ -11,10 +11,21 @@ import os
 import pkgutil
 import shutil
 import time
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
 from queue import Empty, Full, Queue
-from threading import Thread
-from typing import Any, Dict, Final, List, Optional, TypeVar, Union, cast
-from urllib import request
+from threading import Condition, Thread, local
+from typing import (
+    Any,
+    Dict,
+    Final,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+from urllib.parse import urlsplit
 
 from ethereum_rlp import rlp
 from ethereum_types.bytes import Bytes0, Bytes256
@@ -30,6 +41,7 @@ from ethereum.utils.hexadecimal import (
     hex_to_uint,
 )
 
+from .block_archive import BlockArchive
 from .forks import Hardfork
 
 T = TypeVar("T")
@@ -105,13 +117,42 @@ class ForkTracking:
 
 
 class BlockDownloader(ForkTracking):
-    """Downloads blocks from the RPC provider."""
+    """
+    Downloads blocks from the RPC provider.
+
+    `workers` threads each claim the next batch of blocks, fetch it over their
+    own keep-alive connection, and leave the undecoded replies in a
+    reassembly buffer. The `download` thread takes the batches out of the
+    buffer in order, decodes them, and queues the blocks.
+
+    The batch size grows while the RPC provider answers within
+    `TARGET_LATENCY` seconds, and shrinks when it doesn't.
+
+    If `archive` is writable, the downloaded blocks are also appended to it.
+    Otherwise, the blocks are read from `archive` instead of the RPC
+    provider.
+    """
+
+    TARGET_LATENCY: Final[float] = 1.0
+    RETRY_DELAY: Final[float] = 12
 
     queue: Queue
     log: logging.Logger
     rpc_url: str
     geth: bool
     headers: Final[dict[str, str]]
+    workers: int
+    batch_size: int
+    max_batch_size: int
+    archive: Optional[BlockArchive]
+
+    _condition: Condition
+    _fetched: Dict[Uint, Tuple[Uint, Union[List[Any], Exception]]]
+    _next_fetch: Uint
+    _next_decode: Uint
+    _generation: int
+    _stopped: bool
+    _local: local
 
     def __init__(
         self,
@@ -123,6 +164,8 @@ class BlockDownloader(ForkTracking):
         first_block_timestamp: U256,
         *,
         headers: dict[str, str] | None = None,
+        workers: int = 4,
+        archive: Optional[BlockArchive] = None,
     ) -> None:
         ForkTracking.__init__(self, forks, first_block, first_block_timestamp)
 
@@ -134,16 +177,31 @@ class BlockDownloader(ForkTracking):
         if self.active_fork_index > 0:
             self.active_fork_index -= 1
 
+        if workers < 1:
+            raise ValueError("the downloader needs at least one worker")
+
         self.queue = Queue(maxsize=512)
         self.log = log
         self.rpc_url = rpc_url
         self.geth = geth
+        self.workers = workers
+        self.archive = archive
+        self.max_batch_size = max(1, self.queue.maxsize // 2)
+        self.batch_size = min(16, self.max_batch_size)
 
         if headers is None:
             headers = {}
 
         self.headers = headers
 
+        self._condition = Condition()
+        self._fetched = {}
+        self._next_fetch = self.block_number + Uint(1)
+        self._next_decode = self._next_fetch
+        self._generation = 0
+        self._stopped = False
+        self._local = local()
+
         Thread(target=self.download, name="download", daemon=True).start()
 
     def take_block(self) -> Optional[Any]:
@@ -159,56 +217,299 @@ class BlockDownloader(ForkTracking):
 
     def download(self) -> None:
         """
-        Fetch chunks of blocks from the RPC provider.
+        Start the fetch workers, then decode the batches they fetch in order,
+        and queue the blocks.
+        """
+        for index in range(self.workers):
+            Thread(
+                target=self.fetch, name=f"fetch-{index}", daemon=True
+            ).start()
+
+        try:
+            running = True
+
+            while running:
+                first = self.block_number + Uint(1)
+                with self._condition:
+                    while first not in self._fetched:
+                        self._condition.wait()
+                    count, replies = self._fetched.pop(first)
+
+                if isinstance(replies, Exception):
+                    raise replies
+
+                blocks = self.decode_blocks(replies)
+
+                for block in blocks:
+                    to_push: Optional[Any]
+
+                    if isinstance(block, RpcError):
+                        if block.code != -32000:
+                            raise block
+
+                        logging.info("reached end of chain", exc_info=block)
+                        running = False
+                        to_push = None
+                    else:
+                        to_push = block
+
+                    # Use a loop+timeout so that KeyboardInterrupt is still
+                    # raised.
+                    while True:
+                        try:
+                            self.queue.put(to_push, timeout=1)
+                            break
+                        except Full:
+                            pass
+
+                    if not running:
+                        break
+
+                if running and Uint(len(blocks)) < count:
+                    # The rest of the batch hasn't been produced yet, so
+                    # throw away everything fetched after it, and try again.
+                    time.sleep(self.RETRY_DELAY)
+                    with self._condition:
+                        self._generation += 1
+                        self._fetched.clear()
+                        self._next_fetch = self.block_number + Uint(1)
+
+                with self._condition:
+                    self._next_decode = self.block_number + Uint(1)
+                    self._condition.notify_all()
+        finally:
+            with self._condition:
+                self._stopped = True
+                self._condition.notify_all()
+
+    def fetch(self) -> None:
+        """
+        Repeatedly claim the next batch of blocks, fetch it, and put the
+        replies in the reassembly buffer, staying at most `queue.maxsize`
+        blocks ahead of the decoder.
         """
-        running = True
+        while True:
+            with self._condition:
+                while not self._stopped and self._next_fetch >= (
+                    self._next_decode + Uint(self.queue.maxsize)
+                ):
+                    self._condition.wait()
 
-        while running:
-            count = Uint(max(1, self.queue.maxsize // 2))
-            replies = self.fetch_blocks(self.block_number + Uint(1), count)
+                if self._stopped:
+                    return
 
-            for reply in replies:
-                to_push: Optional[bytes]
+                generation = self._generation
+                first = self._next_fetch
+                count = Uint(self.batch_size)
+                self._next_fetch += count
 
-                if isinstance(reply, RpcError):
-                    if reply.code != -32000:
-                        raise reply
+            replies: Union[List[Any], Exception]
+            start = time.monotonic()
+            try:
+                replies = self.fetch_blocks(first, count)
+            except Exception as e:
+                replies = e
+            latency = time.monotonic() - start
 
-                    logging.info("reached end of chain", exc_info=reply)
-                    running = False
-                    to_push = None
-                else:
-                    to_push = reply
+            with self._condition:
+                if generation != self._generation:
+                    continue
 
-                # Use a loop+timeout so that KeyboardInterrupt is still raised.
-                while True:
-                    try:
-                        self.queue.put(to_push, timeout=1)
-                        break
-                    except Full:
-                        pass
+                if not isinstance(replies, Exception):
+                    self.adjust_batch_size(int(count), latency)
+
+                self._fetched[first] = (count, replies)
+                self._condition.notify_all()
+
+    def adjust_batch_size(self, count: int, latency: float) -> None:
+        """
+        Double the batch size after a batch of `count` blocks was fetched in
+        under half of `TARGET_LATENCY`, and halve it after one took longer
+        than `TARGET_LATENCY`.
+        """
+        if latency > self.TARGET_LATENCY:
+            self.batch_size = max(1, min(self.batch_size, count // 2))
+        elif latency < self.TARGET_LATENCY / 2 and count >= self.batch_size:
+            self.batch_size = min(self.max_batch_size, 2 * self.batch_size)
+
+    def connection(self) -> HTTPConnection:
+        """
+        Return the calling thread's connection to the RPC provider.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            url = urlsplit(self.rpc_url)
+            if url.scheme == "https":
+                connection = HTTPSConnection(url.netloc)
+            else:
+                connection = HTTPConnection(url.netloc)
+            self._local.connection = connection
+        return connection
+
+    def post(self, calls: List[Any]) -> Any:
+        """
+        Send a batch of JSON-RPC calls to the RPC provider, and return the
+        decoded replies.
+        """
+        data = json.dumps(calls).encode("utf-8")
+
+        headers = {
+            "Content-Length": str(len(data)),
+            "Content-Type": "application/json",
+            "User-Agent": "ethereum-spec-sync",
+        }
+
+        headers.update(self.headers)
+
+        url = urlsplit(self.rpc_url)
+        path = url.path or "/"
+        if url.query:
+            path += "?" + url.query
+
+        # The RPC provider may have closed an idle connection, so retry once
+        # on a new one.
+        for attempt in range(2):
+            connection = self.connection()
+            try:
+                connection.request("POST", path, data, headers)
+                response = connection.getresponse()
+                body = response.read()
+                break
+            except (HTTPException, OSError):
+                connection.close()
+                self._local.connection = None
+                if attempt > 0:
+                    raise
+
+        if response.status != 200:
+            raise Exception(
+                f"RPC provider returned {response.status} {response.reason}"
+            )
+
+        return json.loads(body)
 
     def fetch_blocks(
         self,
         first: Uint,
         count: Uint,
-    ) -> List[Union[Any, RpcError]]:
+    ) -> List[Any]:
         """
-        Fetch the block specified by the given number from the RPC provider.
+        Fetch the blocks `[first, first + count)` from the RPC provider, or
+        the archive, without decoding them.
         """
-        if self.geth:
+        if self.archive is not None and not self.archive.writable:
+            return self.fetch_blocks_archive(first, count)
+        elif self.geth:
             return self.fetch_blocks_debug(first, count)
         else:
             return self.fetch_blocks_eth(first, count)
 
+    def decode_blocks(self, replies: List[Any]) -> List[Union[Any, RpcError]]:
+        """
+        Decode the blocks fetched by `fetch_blocks()`, advancing the block
+        number.
+        """
+        blocks: List[Union[Any, RpcError]] = []
+
+        for reply in replies:
+            block_rlp: Optional[bytes] = None
+
+            if isinstance(reply, RpcError):
+                blocks.append(reply)
+                continue
+            elif isinstance(reply, bytes):
+                block_rlp = reply
+                block = self.decode_block(block_rlp)
+            else:
+                block_json, ommer_jsons = reply
+                self.advance_block(hex_to_u256(block_json["timestamp"]))
+                ommers = tuple(self.make_header(o) for o in ommer_jsons)
+                block = self.make_block(block_json, ommers)
+
+            blocks.append(block)
+
+            if self.archive is not None and self.archive.writable:
+                self.archive_block(block, block_rlp)
+
+        return blocks
+
+    def archive_block(self, block: Any, block_rlp: Optional[bytes]) -> None:
+        """
+        Append the block that was just decoded to the archive, unless it is
+        already there. Stops archiving if the block doesn't follow the end of
+        the archive.
+        """
+        assert self.archive is not None
+
+        if self.block_number in self.archive:
+            return
+
+        if block_rlp is None:
+            block_rlp = rlp.encode(block)
+
+        try:
+            self.archive.append(self.block_number, block_rlp)
+        except ValueError:
+            self.log.warning(
+                "block archive stops before block %d, not archiving",
+                self.block_number,
+            )
+            self.archive = None
+
+    def fetch_blocks_archive(
+        self,
+        first: Uint,
+        count: Uint,
+    ) -> List[Union[bytes, RpcError]]:
+        """
+        Read the blocks `[first, first + count)` from the archive as RLP
+        encoded byte arrays, with an error in place of each missing block.
+        """
+        assert self.archive is not None
+
+        blocks: List[Union[bytes, RpcError]] = []
+
+        for number in range(first, first + count):
+            block_rlp = self.archive.get(Uint(number))
+            if block_rlp is None:
+                blocks.append(
+                    RpcError(-32000, f"block {number} is not in the archive")
+                )
+            else:
+                blocks.append(block_rlp)
+
+        return blocks
+
+    def decode_block(self, block_rlp: bytes) -> Any:
+        """
+        Decode an RLP encoded block, advancing the block number.
+        """
+        decoded_block = rlp.decode(block_rlp)
+        assert not isinstance(decoded_block, bytes)
+        assert not isinstance(decoded_block[0], bytes)
+        assert isinstance(decoded_block[0][11], bytes)
+        timestamp = U256.from_be_bytes(decoded_block[0][11])
+        self.advance_block(timestamp)
+        try:
+            return rlp.deserialize_to(
+                self.module("blocks").Block, decoded_block
+            )
+        except Exception:
+            self.log.exception(
+                "failed to decode block %d with timestamp %d",
+                self.block_number,
+                timestamp,
+            )
+            raise
+
     def fetch_blocks_debug(
         self,
         first: Uint,
         count: Uint,
     ) -> List[Union[bytes, RpcError]]:
         """
-        Fetch the block specified by the given number from the RPC provider as
-        an RLP encoded byte array.
+        Fetch the blocks `[first, first + count)` from the RPC provider as RLP
+        encoded byte arrays.
         """
         if count == 0:
             return []
@@ -225,88 +526,43 @@ class BlockDownloader(ForkTracking):
                 }
             )
 
-        data = json.dumps(calls).encode("utf-8")
-
         self.log.debug("fetching blocks [%d, %d)...", first, first + count)
 
-        headers = {
-            "Content-Length": str(len(data)),
-            "Content-Type": "application/json",
-            "User-Agent": "ethereum-spec-sync",
-        }
-
-        headers.update(self.headers)
-
-        post = request.Request(
-            self.rpc_url,
-            data=data,
-            headers=headers,
-        )
-
-        with request.urlopen(post) as response:
-            replies = json.load(response)
-            if not isinstance(replies, list):
-                self.log.error(
-                    "got non-list JSON-RPC response. replies=%r", replies
-                )
-                raise ValueError
-
-            block_rlps: Dict[Uint, Union[RpcError, bytes]] = {}
+        replies = self.post(calls)
+        if not isinstance(replies, list):
+            self.log.error(
+                "got non-list JSON-RPC response. replies=%r", replies
+            )
+            raise ValueError
 
-            for reply in replies:
-                try:
-                    reply_id = Uint(int(reply["id"], 0))
-                except Exception:
-                    self.log.exception(
-                        "unable to parse RPC id. reply=%r", reply
-                    )
-                    raise
+        block_rlps: Dict[Uint, Union[RpcError, bytes]] = {}
 
-                if reply_id < first or reply_id >= first + count:
-                    raise Exception("mismatched request id")
+        for reply in replies:
+            try:
+                reply_id = Uint(int(reply["id"], 0))
+            except Exception:
+                self.log.exception("unable to parse RPC id. reply=%r", reply)
+                raise
 
-                if "error" in reply:
-                    block_rlps[reply_id] = RpcError(
-                        reply["error"]["code"],
-                        reply["error"]["message"],
-                    )
-                else:
-                    block_rlps[reply_id] = bytes.fromhex(reply["result"][2:])
+            if reply_id < first or reply_id >= first + count:
+                raise Exception("mismatched request id")
 
-            if len(block_rlps) != count:
-                raise Exception(
-                    f"expected {count} blocks but only got {len(block_rlps)}"
+            if "error" in reply:
+                block_rlps[reply_id] = RpcError(
+                    reply["error"]["code"],
+                    reply["error"]["message"],
                 )
+            else:
+                block_rlps[reply_id] = bytes.fromhex(reply["result"][2:])
 
-            self.log.info("blocks [%d, %d) fetched", first, first + count)
-
-            blocks: List[Union[RpcError, Any]] = []
-            for _, block_rlp in sorted(block_rlps.items()):
-                if isinstance(block_rlp, RpcError):
-                    blocks.append(block_rlp)
-                else:
-                    # Unfortunately we have to decode the RLP twice.
-                    decoded_block = rlp.decode(block_rlp)
-                    assert not isinstance(decoded_block, bytes)
-                    assert not isinstance(decoded_block[0], bytes)
-                    assert isinstance(decoded_block[0][11], bytes)
-                    timestamp = U256.from_be_bytes(decoded_block[0][11])
-                    self.advance_block(timestamp)
-                    try:
-                        blocks.append(
-                            rlp.decode_to(
-                                self.module("blocks").Block, block_rlp
-                            )
-                        )
-                    except Exception:
-                        self.log.exception(
-                            "failed to decode block %d with timestamp %d",
-                            self.block_number,
-                            timestamp,
-                        )
-                        raise
+        if len(block_rlps) != count:
+            raise Exception(
+                f"expected {count} blocks but only got {len(block_rlps)}"
+            )
 
-            return blocks
+        self.log.info("blocks [%d, %d) fetched", first, first + count)
+
+        return [v for (_, v) in sorted(block_rlps.items())]
 
     def load_transaction(self, t: Any) -> Any:
         """
@@ -400,10 +656,11 @@ class BlockDownloader(ForkTracking):
         self,
         first: Uint,
         count: Uint,
-    ) -> List[Union[Any, RpcError]]:
+    ) -> List[Union[Tuple[Any, Tuple[Any, ...]], RpcError]]:
         """
-        Fetch the block specified by the given number from the RPC provider
-        using only standard endpoints.
+        Fetch the blocks `[first, first + count)`, and their ommers, from the
+        RPC provider as JSON using only standard endpoints. Stops at the first
+        block that doesn't exist yet.
         """
         if count == 0:
             return []
@@ -420,66 +677,43 @@ class BlockDownloader(ForkTracking):
                 }
             )
 
-        data = json.dumps(calls).encode("utf-8")
-
         self.log.debug("fetching blocks [%d, %d)...", first, first + count)
 
-        headers = {
-            "Content-Length": str(len(data)),
-            "Content-Type": "application/json",
-            "User-Agent": "ethereum-spec-sync",
-        }
+        replies = self.post(calls)
+        block_jsons: Dict[Uint, Any] = {}
+        ommers_needed: Dict[Uint, int] = {}
+        blocks: Dict[Uint, Union[Tuple[Any, Tuple[Any, ...]], RpcError]] = {}
 
-        headers.update(self.headers)
-
-        post = request.Request(
-            self.rpc_url,
-            data=data,
-            headers=headers,
-        )
+        for reply in sorted(replies, key=lambda r: int(r["id"], 0)):
+            reply_id = Uint(int(reply["id"], 0))
 
-        with request.urlopen(post) as response:
-            replies = json.load(response)
-            block_jsons: Dict[Uint, Any] = {}
-            ommers_needed: Dict[Uint, int] = {}
-            blocks: Dict[Uint, Union[Any, RpcError]] = {}
+            if reply_id < first or reply_id >= first + count:
+                raise Exception("mismatched request id")
 
-            for reply in replies:
-                reply_id = Uint(int(reply["id"], 0))
-
-                if reply_id < first or reply_id >= first + count:
-                    raise Exception("mismatched request id")
-
-                if "error" in reply:
-                    blocks[reply_id] = RpcError(
-                        reply["error"]["code"],
-                        reply["error"]["message"],
-                    )
-                else:
-                    res = reply["result"]
-                    if res is None:
-                        from time import sleep
-
-                        sleep(12)
-                        break
+            if "error" in reply:
+                blocks[reply_id] = RpcError(
+                    reply["error"]["code"],
+                    reply["error"]["message"],
+                )
+            else:
+                res = reply["result"]
+                if res is None:
+                    break
 
-                    block_jsons[reply_id] = res
-                    ommers_needed[reply_id] = len(res["uncles"])
+                block_jsons[reply_id] = res
+                ommers_needed[reply_id] = len(res["uncles"])
 
-            ommers = self.fetch_ommers(ommers_needed)
-            for id in block_jsons:  # noqa A001
-                self.advance_block(hex_to_u256(block_jsons[id]["timestamp"]))
-                blocks[id] = self.make_block(
-                    block_jsons[id], ommers.get(id, ())
-                )
+        ommers = self.fetch_ommers(ommers_needed)
+        for id in block_jsons:  # noqa A001
+            blocks[id] = (block_jsons[id], ommers.get(id, ()))
 
-            self.log.info("blocks [%d, %d) fetched", first, first + count)
+        self.log.info("blocks [%d, %d) fetched", first, first + count)
 
-            return [v for (_, v) in sorted(blocks.items())]
+        return [v for (_, v) in sorted(blocks.items())]
 
     def fetch_ommers(self, ommers_needed: Dict[Uint, int]) -> Dict[Uint, Any]:
         """
-        Fetch the ommers for a given block from the RPC provider.
+        Fetch the ommers for a given block from the RPC provider as JSON.
         """
         calls = []
 
@@ -497,59 +731,40 @@ class BlockDownloader(ForkTracking):
         if calls == []:
             return {}
 
-        data = json.dumps(calls).encode("utf-8")
-
         self.log.debug(
             "fetching ommers [%d, %d]...",
             min(ommers_needed),
             max(ommers_needed),
         )
 
-        headers = {
-            "Content-Length": str(len(data)),
-            "Content-Type": "application/json",
-            "User-Agent": "ethereum-spec-sync",
-        }
-
-        headers.update(self.headers)
-
-        post = request.Request(
-            self.rpc_url,
-            data=data,
-            headers=headers,
-        )
-
-        with request.urlopen(post) as response:
-            replies = json.load(response)
-            ommers: Dict[Uint, Dict[Uint, Any]] = {}
+        replies = self.post(calls)
+        ommers: Dict[Uint, Dict[Uint, Any]] = {}
 
-            twenty = Uint(20)
-            for reply in replies:
-                reply_id = Uint(int(reply["id"], 0))
+        twenty = Uint(20)
+        for reply in replies:
+            reply_id = Uint(int(reply["id"], 0))
 
-                if reply_id // twenty not in ommers:
-                    ommers[reply_id // twenty] = {}
+            if reply_id // twenty not in ommers:
+                ommers[reply_id // twenty] = {}
 
-                if "error" in reply:
-                    raise RpcError(
-                        reply["error"]["code"],
-                        reply["error"]["message"],
-                    )
-                else:
-                    ommers[reply_id // twenty][reply_id % twenty] = (
-                        self.make_header(reply["result"])
-                    )
+            if "error" in reply:
+                raise RpcError(
+                    reply["error"]["code"],
+                    reply["error"]["message"],
+                )
+            else:
+                ommers[reply_id // twenty][reply_id % twenty] = reply["result"]
 
-            self.log.info(
-                "ommers [%d, %d] fetched",
-                min(ommers_needed),
-                max(ommers_needed),
-            )
+        self.log.info(
+            "ommers [%d, %d] fetched",
+            min(ommers_needed),
+            max(ommers_needed),
+        )
 
-            return {
-                k: tuple(x for (_, x) in sorted(v.items()))
-                for (k, v) in ommers.items()
-            }
+        return {
+            k: tuple(x for (_, x) in sorted(v.items()))
+            for (k, v) in ommers.items()
+        }
 
     def make_header(self, json: Any) -> Any:
         """
@@ -643,12 +858,51 @@ class Sync(ForkTracking):
             help="store the state in a db in this file",
         )
 
+        parser.add_argument(
+            "--state-backend",
+            help="database to store the optimized state in",
+            choices=["rust", "sqlite"],
+            default="rust",
+        )
+
+        parser.add_argument(
+            "--sender-recovery-workers",
+            help="recover the senders of each block ahead of time in this "
+            "many threads, which only helps with several cores",
+            type=int,
+        )
+
+        parser.add_argument(
+            "--ethash-cache",
+            help="store ethash caches in this directory, unless the "
+            "ethash package is used (only with --state-backend rust)",
+        )
+
         parser.add_argument(
             "--geth",
             help="use geth specific RPC endpoints while fetching blocks",
             action="store_true",
         )
 
+        parser.add_argument(
+            "--archive",
+            help="also append the downloaded blocks to the block archive in "
+            "this directory",
+        )
+
+        parser.add_argument(
+            "--from-archive",
+            help="read the blocks from --archive instead of the RPC provider",
+            action="store_true",
+        )
+
+        parser.add_argument(
+            "--download-workers",
+            help="number of batches of blocks to fetch concurrently",
+            type=int,
+            default=4,
+        )
+
         parser.add_argument(
             "--reset",
             help="delete the db and start from scratch",
@@ -722,8 +976,32 @@ class Sync(ForkTracking):
         if not self.options.unoptimized:
             import ethereum_optimized
 
-            ethereum_optimized.monkey_patch(state_path=self.options.persist)
+            if (
+                self.options.ethash_cache is not None
+                and ethereum_optimized.uses_native_ethash(
+                    self.options.state_backend
+                )
+            ):
+                self.log.error(
+                    "--ethash-cache is not supported with the ethash package"
+                )
+                exit(1)
+
+            ethereum_optimized.monkey_patch(
+                state_path=self.options.persist,
+                state_backend=self.options.state_backend,
+                ethash_cache=self.options.ethash_cache,
+                sender_recovery_workers=(self.options.sender_recovery_workers),
+            )
         else:
+            import ethereum_optimized
+
+            for fork in Hardfork.discover():
+                if fork.consensus.is_pow():
+                    ethereum_optimized.monkey_patch_ethash_cache(
+                        fork.short_name, self.options.ethash_cache
+                    )
+
             if self.options.persist is not None:
                 self.log.error("--persist is not supported with --unoptimized")
                 exit(1)
@@ -735,6 +1013,12 @@ class Sync(ForkTracking):
             if self.options.reset:
                 self.log.error("--reset is not supported with --unoptimized")
                 exit(1)
+            if self.options.sender_recovery_workers is not None:
+                self.log.error(
+                    "--sender-recovery-workers is not supported with "
+                    "--unoptimized"
+                )
+                exit(1)
 
         if self.options.persist is None:
             if self.options.initial_state is not None:
@@ -746,6 +1030,21 @@ class Sync(ForkTracking):
                 self.log.error("--reset is not supported without --persist")
                 exit(1)
 
+        if self.options.from_archive and self.options.archive is None:
+            self.log.error("--from-archive is not supported without --archive")
+            exit(1)
+
+        archive = None
+        if self.options.archive is not None:
+            try:
+                archive = BlockArchive(
+                    self.options.archive,
+                    writable=not self.options.from_archive,
+                )
+            except FileNotFoundError:
+                self.log.error("no block archive in %s", self.options.archive)
+                exit(1)
+
         config_str = cast(
             bytes,
             pkgutil.get_data("ethereum", f"assets/{self.options.chain}.json"),
@@ -760,14 +1059,25 @@ class Sync(ForkTracking):
         ForkTracking.__init__(self, forks, Uint(0), U256(0))
 
         if self.options.reset:
-            import rust_pyspec_glue
+            from ethereum_optimized.state_db import get_database
 
             assert self.options.persist is not None
-            rust_pyspec_glue.DB.delete(self.options.persist)
+            get_database(self.options.state_backend).delete(
+                self.options.persist
+            )
 
         if self.options.initial_state is not None:
             assert self.options.persist is not None
-            if not os.path.exists(
+            if self.options.state_backend == "sqlite":
+                from ethereum_optimized.state_sqlite import SqliteDB
+
+                if not os.path.exists(
+                    os.path.join(self.options.persist, SqliteDB.FILE_NAME)
+                ):
+                    SqliteDB.copy(
+                        self.options.initial_state, self.options.persist
+                    )
+            elif not os.path.exists(
                 os.path.join(self.options.persist, "mdbx.dat")
             ):
                 try:
@@ -838,6 +1148,8 @@ class Sync(ForkTracking):
                 Uint(0),
                 genesis_configuration.timestamp,
                 headers=headers,
+                workers=self.options.download_workers,
+                archive=archive,
             )
             self.set_block(Uint(0), genesis_configuration.timestamp)
         else:
@@ -854,6 +1166,8 @@ class Sync(ForkTracking):
                 persisted_block - initial_blocks_length,
                 persisted_block_timestamp,
                 headers=headers,
+                workers=self.options.download_workers,
+                archive=archive,
             )
             blocks = []
             for _ in range(initial_blocks_length):
@@ -0,0 +1,181 @@
+"""
+Test that the daemon gives the same responses with a pool of workers as
+without, over kept-alive and concurrent connections.
+"""
+
+import json
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.client import HTTPConnection
+from pathlib import Path
+from threading import Thread
+from typing import Any, Dict, Iterator, Tuple
+
+import pytest
+
+from ethereum_spec_tools.evm_tools.daemon import (
+    _EvmToolHandler,
+    _PooledEvmToolHandler,
+    _ThreadingUnixSocketHttpServer,
+    _UnixSocketHttpServer,
+)
+from ethereum_spec_tools.evm_tools.t8n.pool import T8NPool
+
+SENDER = "0xa94f5374fce5edbc8e2a8697c15331677e6ebf0b"
+SECRET_KEY = (
+    "0x45a915e4d060149eb4365960e6a7a45f334393093061116b197e3240065ff2d8"
+)
+CONTRACT = "0x00000000000000000000000000000000000000c0"
+
+
+def daemon_request(value: int, fork: str = "Berlin") -> Dict[str, Any]:
+    """A request for a transaction storing `value` in a contract."""
+    return {
+        "state": {"fork": fork, "chainid": 1, "reward": 0},
+        "input": {
+            "alloc": {
+                SENDER: {"balance": "0x3635c9adc5dea00000", "nonce": "0x0"},
+                CONTRACT: {
+                    "balance": "0x0",
+                    "nonce": "0x1",
+                    "code": f"0x61{value:04x}600055",
+                },
+            },
+            "env": {
+                "currentCoinbase": "0x" + "00" * 19 + "ff",
+                "currentDifficulty": "0x20000",
+                "currentGasLimit": "0x1000000",
+                "currentNumber": "0x1",
+                "currentTimestamp": "0x3e8",
+                "blockHashes": {"0": "0x" + "00" * 32},
+            },
+            "txs": [
+                {
+                    "nonce": "0x0",
+                    "gasPrice": "0xa",
+                    "gas": "0x100000",
+                    "to": CONTRACT,
+                    "value": "0x0",
+                    "input": "0x",
+                    "v": "0x0",
+                    "r": "0x0",
+                    "s": "0x0",
+                    "secretKey": SECRET_KEY,
+                }
+            ],
+        },
+    }
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """An HTTP connection over a Unix domain socket."""
+
+    def __init__(self, uds: str) -> None:
+        super().__init__("localhost")
+        self.uds = uds
+
+    def connect(self) -> None:
+        """Connect to the socket."""
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.uds)
+
+
+def post(
+    connection: HTTPConnection, request: Dict[str, Any]
+) -> Tuple[int, bytes]:
+    """Send `request` and return the response's status and body."""
+    connection.request(
+        "POST",
+        "/",
+        json.dumps(request),
+        {"Content-Type": "application/json"},
+    )
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+@contextmanager
+def serving(server: _UnixSocketHttpServer) -> Iterator[str]:
+    """Serve in a thread, and yield the server's socket path."""
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address  # type: ignore[misc]
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+@pytest.fixture(scope="module")
+def pool() -> Iterator[T8NPool]:
+    """A pool of two workers."""
+    t8n_pool = T8NPool(2)
+    t8n_pool.start()
+    yield t8n_pool
+    t8n_pool.shutdown()
+
+
+def test_matches_in_process(pool: T8NPool, tmp_path: Path) -> None:
+    """
+    Requests over one kept-alive connection, and over concurrent
+    connections, get the same responses as from the single-threaded daemon.
+    """
+    values = range(6)
+
+    server = _UnixSocketHttpServer(
+        str(tmp_path / "single.sock"), _EvmToolHandler, shutdown_timeout=0
+    )
+    with serving(server) as uds:
+        expected = [
+            post(UnixHTTPConnection(uds), daemon_request(value))
+            for value in values
+        ]
+    assert all(status == 200 for status, _ in expected)
+
+    server = _ThreadingUnixSocketHttpServer(
+        str(tmp_path / "pooled.sock"),
+        _PooledEvmToolHandler,
+        shutdown_timeout=0,
+        pool=pool,
+    )
+    with serving(server) as uds:
+        connection = UnixHTTPConnection(uds)
+        responses = [
+            post(connection, daemon_request(value)) for value in values
+        ]
+        kept_alive = connection.sock is not None
+        connection.close()
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            concurrent = list(
+                executor.map(
+                    lambda v: post(UnixHTTPConnection(uds), daemon_request(v)),
+                    values,
+                )
+            )
+
+    assert kept_alive
+    assert responses == expected
+    assert concurrent == expected
+
+
+def test_error(pool: T8NPool, tmp_path: Path) -> None:
+    """Failed requests get an error, and the daemon stays usable."""
+    server = _ThreadingUnixSocketHttpServer(
+        str(tmp_path / "pooled.sock"),
+        _PooledEvmToolHandler,
+        shutdown_timeout=0,
+        pool=pool,
+    )
+    with serving(server) as uds:
+        status, body = post(
+            UnixHTTPConnection(uds), daemon_request(0, "Florence")
+        )
+        assert status == 500
+        assert b"Unsupported state fork" in body
+
+        status, body = post(UnixHTTPConnection(uds), daemon_request(1))
+        assert status == 200
+        assert json.loads(body)["result"]["receipts"]
@@ -0,0 +1,118 @@
+"""
+Test that streamed EIP-3155 traces match the traces written per transaction.
+"""
+
+import gzip
+import json
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from ethereum_spec_tools.evm_tools import create_parser
+from ethereum_spec_tools.evm_tools.t8n import T8N, ForkCache
+
+parser = create_parser()
+
+SENDER = "0xa94f5374fce5edbc8e2a8697c15331677e6ebf0b"
+SECRET_KEY = (
+    "0x45a915e4d060149eb4365960e6a7a45f334393093061116b197e3240065ff2d8"
+)
+CONTRACT = "0x00000000000000000000000000000000000000c0"
+
+# Store to memory, call the identity precompile, store to storage, and end
+# with an invalid opcode.
+CODE = "0x602a6000526020602060206000600060045af1506001600055fe"
+
+
+def t8n_input() -> Dict[str, Any]:
+    """Two transactions calling a contract that exercises the tracer."""
+    return {
+        "alloc": {
+            SENDER: {"balance": "0x3635c9adc5dea00000", "nonce": "0x0"},
+            CONTRACT: {"balance": "0x0", "nonce": "0x1", "code": CODE},
+        },
+        "env": {
+            "currentCoinbase": "0x" + "00" * 19 + "ff",
+            "currentDifficulty": "0x20000",
+            "currentGasLimit": "0x1000000",
+            "currentNumber": "0x1",
+            "currentTimestamp": "0x3e8",
+            "blockHashes": {"0": "0x" + "00" * 32},
+        },
+        "txs": [
+            {
+                "nonce": hex(nonce),
+                "gasPrice": "0xa",
+                "gas": "0x100000",
+                "to": CONTRACT,
+                "value": "0x0",
+                "input": "0x",
+                "v": "0x0",
+                "r": "0x0",
+                "s": "0x0",
+                "secretKey": SECRET_KEY,
+            }
+            for nonce in range(2)
+        ],
+    }
+
+
+def run_t8n(output_basedir: Path, extra: List[str]) -> None:
+    """Run the transition, tracing into `output_basedir`."""
+    options = parser.parse_args(
+        [
+            "t8n",
+            "--input.env=stdin",
+            "--input.alloc=stdin",
+            "--input.txs=stdin",
+            "--output.result=stdout",
+            "--output.alloc=stdout",
+            f"--output.basedir={output_basedir}",
+            "--state.fork=Berlin",
+            "--trace",
+            "--trace.memory",
+            "--trace.returndata",
+            *extra,
+        ]
+    )
+
+    in_file = StringIO(json.dumps(t8n_input()))
+    out_file = StringIO()
+
+    with ForkCache() as fork_cache:
+        t8n_tool = T8N(
+            options, out_file=out_file, in_file=in_file, cache=fork_cache
+        )
+        assert 0 == t8n_tool.run()
+
+
+@pytest.mark.evm_tools
+def test_streamed_trace(tmp_path: Path) -> None:
+    """Streamed traces, compressed or not, match the buffered ones."""
+    buffered = tmp_path / "buffered"
+    streamed = tmp_path / "streamed"
+    compressed = tmp_path / "compressed"
+    for path in (buffered, streamed, compressed):
+        path.mkdir()
+
+    run_t8n(buffered, [])
+    run_t8n(streamed, ["--trace.stream"])
+    # Compressing implies streaming.
+    run_t8n(compressed, ["--trace.gzip"])
+
+    names = sorted(path.name for path in buffered.iterdir())
+    assert len(names) == 2
+
+    for name in names:
+        expected = (buffered / name).read_text()
+        lines = [json.loads(line) for line in expected.splitlines()]
+        assert {"InvalidOpcode", "CALL"} <= {
+            line.get("opName") for line in lines
+        }
+        assert "gasUsed" in lines[-1]
+
+        assert (streamed / name).read_text() == expected
+        with gzip.open(compressed / (name + ".gz"), "rt") as f:
+            assert f.read() == expected
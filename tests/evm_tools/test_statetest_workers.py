@@ -0,0 +1,101 @@
+"""
+Test that running state tests in several processes gives the same output as
+running them one after another.
+"""
+
+import json
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from ethereum_spec_tools.evm_tools import create_parser
+from ethereum_spec_tools.evm_tools.statetest import StateTest
+
+SENDER = "0xa94f5374fce5edbc8e2a8697c15331677e6ebf0b"
+SECRET_KEY = (
+    "0x45a915e4d060149eb4365960e6a7a45f334393093061116b197e3240065ff2d8"
+)
+CONTRACT = "0x00000000000000000000000000000000000000c0"
+
+
+def state_test(value: int) -> Dict[str, Any]:
+    """
+    A state test storing `value` in a contract, under two gas limits, with
+    a post-state root that never matches.
+    """
+    return {
+        f"store_{value}": {
+            "env": {
+                "currentCoinbase": "0x" + "00" * 19 + "ff",
+                "currentDifficulty": "0x20000",
+                "currentGasLimit": "0x1000000",
+                "currentNumber": "0x1",
+                "currentTimestamp": "0x3e8",
+                "previousHash": "0x" + "00" * 32,
+            },
+            "pre": {
+                SENDER: {
+                    "balance": "0x3635c9adc5dea00000",
+                    "nonce": "0x0",
+                    "code": "0x",
+                    "storage": {},
+                },
+                CONTRACT: {
+                    "balance": "0x0",
+                    "nonce": "0x1",
+                    "code": f"0x61{value:04x}600055",
+                    "storage": {},
+                },
+            },
+            "transaction": {
+                "nonce": "0x0",
+                "gasPrice": "0xa",
+                "gasLimit": ["0x100000", "0x5208"],
+                "to": CONTRACT,
+                "value": ["0x0"],
+                "data": ["0x"],
+                "secretKey": SECRET_KEY,
+            },
+            "post": {
+                "Berlin": [
+                    {
+                        "hash": "0x" + "00" * 32,
+                        "logs": "0x" + "00" * 32,
+                        "indexes": {"data": 0, "gas": gas, "value": 0},
+                    }
+                    for gas in (0, 1)
+                ]
+            },
+        }
+    }
+
+
+def run_statetest(
+    paths: List[Path], args: List[str], capsys: pytest.CaptureFixture[str]
+) -> Tuple[str, str]:
+    """Run `statetest` on the files in `paths`, returning stdout and stderr."""
+    options = create_parser().parse_args(["statetest", *args])
+    out_file = StringIO()
+    in_file = StringIO("".join(f"{path}\n" for path in paths))
+    capsys.readouterr()
+    assert StateTest(options, out_file, in_file).run() == 0
+    return out_file.getvalue(), capsys.readouterr().err
+
+
+def test_workers(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Results come out in the order of the input files."""
+    paths = []
+    for value in range(6):
+        path = tmp_path / f"test_{value}.json"
+        path.write_text(json.dumps(state_test(value)))
+        paths.append(path)
+
+    expected_out, expected_err = run_statetest(paths, [], capsys)
+    out, err = run_statetest(paths, ["--workers", "3"], capsys)
+
+    assert out == expected_out
+    assert err == expected_err
+    assert expected_out.count('"fork": "Berlin"') == 12
+    assert expected_err.count("stateRoot") == 12
@@ -0,0 +1,120 @@
+"""
+Test that a pool of t8n workers gives the same results as running in-process.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+import ethereum.trace
+from ethereum_spec_tools.evm_tools import create_parser
+from ethereum_spec_tools.evm_tools.t8n import T8N, ForkCache
+from ethereum_spec_tools.evm_tools.t8n.pool import T8NPool
+
+SENDER = "0xa94f5374fce5edbc8e2a8697c15331677e6ebf0b"
+SECRET_KEY = (
+    "0x45a915e4d060149eb4365960e6a7a45f334393093061116b197e3240065ff2d8"
+)
+CONTRACT = "0x00000000000000000000000000000000000000c0"
+
+
+def t8n_input(value: int) -> Dict[str, Any]:
+    """A transaction storing `value` in a contract."""
+    stdin: Dict[str, Any] = {
+        "alloc": {
+            SENDER: {"balance": "0x3635c9adc5dea00000", "nonce": "0x0"},
+            CONTRACT: {
+                "balance": "0x0",
+                "nonce": "0x1",
+                "code": f"0x61{value:04x}600055",
+            },
+        },
+        "env": {
+            "currentCoinbase": "0x" + "00" * 19 + "ff",
+            "currentDifficulty": "0x20000",
+            "currentGasLimit": "0x1000000",
+            "currentNumber": "0x1",
+            "currentTimestamp": "0x3e8",
+            "blockHashes": {"0": "0x" + "00" * 32},
+        },
+        "txs": [
+            {
+                "nonce": "0x0",
+                "gasPrice": "0xa",
+                "gas": "0x100000",
+                "to": CONTRACT,
+                "value": "0x0",
+                "input": "0x",
+                "v": "0x0",
+                "r": "0x0",
+                "s": "0x0",
+                "secretKey": SECRET_KEY,
+            }
+        ],
+    }
+    return stdin
+
+
+def t8n_args(output_basedir: Path, fork: str = "Berlin") -> List[str]:
+    """Command line reading from stdin and writing to stdout."""
+    return [
+        "t8n",
+        "--input.env=stdin",
+        "--input.alloc=stdin",
+        "--input.txs=stdin",
+        "--output.result=stdout",
+        "--output.alloc=stdout",
+        f"--output.basedir={output_basedir}",
+        f"--state.fork={fork}",
+    ]
+
+
+def run_in_process(args: List[str], stdin: Dict[str, Any]) -> Any:
+    """Run t8n in this process, reading and writing JSON."""
+    out_file = StringIO()
+    with ForkCache() as fork_cache:
+        t8n = T8N(
+            create_parser().parse_args(args),
+            out_file,
+            StringIO(json.dumps(stdin)),
+            fork_cache,
+        )
+        assert t8n.run() == 0
+    ethereum.trace.set_evm_trace(ethereum.trace.discard_evm_trace)
+    return json.loads(out_file.getvalue())
+
+
+@pytest.fixture(scope="module")
+def pool() -> Iterator[T8NPool]:
+    """A pool of two workers."""
+    t8n_pool = T8NPool(2)
+    yield t8n_pool
+    t8n_pool.shutdown()
+
+
+def test_matches_in_process(pool: T8NPool, tmp_path: Path) -> None:
+    """Concurrent requests give the same output as running in-process."""
+    args = t8n_args(tmp_path)
+    values = range(8)
+    expected = [run_in_process(args, t8n_input(value)) for value in values]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        outputs = list(
+            executor.map(lambda v: pool.run(args, t8n_input(v)), values)
+        )
+
+    assert outputs == expected
+    assert len(pool._started) == 2
+
+
+def test_error(pool: T8NPool, tmp_path: Path) -> None:
+    """Errors are raised in the caller, and the worker stays usable."""
+    with pytest.raises(SystemExit, match="Unsupported state fork"):
+        pool.run(t8n_args(tmp_path, "Florence"), t8n_input(0))
+
+    args = t8n_args(tmp_path)
+    assert pool.run(args, t8n_input(1)) == run_in_process(args, t8n_input(1))
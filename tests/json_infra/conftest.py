@@ -65,6 +65,138 @@ def pytest_addoption(parser: Parser) -> None:
         help="Use optimized state and ethash",
     )
 
+    parser.addoption(
+        "--state-backend",
+        dest="state_backend",
+        default="rust",
+        choices=["rust", "sqlite"],
+        help="Database to store the state in with --optimized",
+    )
+
+    parser.addoption(
+        "--journaled-state",
+        dest="journaled_state",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Use journaled state transactions instead of trie copies",
+    )
+
+    parser.addoption(
+        "--journaled-state-tracker",
+        dest="journaled_state_tracker",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Track block access list changes in flat journals",
+    )
+
+    parser.addoption(
+        "--incremental-trie",
+        dest="incremental_trie",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Only recompute the changed paths of a trie in root()",
+    )
+
+    parser.addoption(
+        "--jumpdest-cache",
+        dest="jumpdest_cache",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Cache the jump destination analysis of each code",
+    )
+
+    parser.addoption(
+        "--code-store",
+        dest="code_store",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Look code hashes up in a store instead of rehashing code",
+    )
+
+    parser.addoption(
+        "--dispatch-loop",
+        dest="dispatch_loop",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Run the interpreter from pre-decoded dispatch tables",
+    )
+
+    parser.addoption(
+        "--fast-blake2",
+        dest="fast_blake2",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Run the BLAKE2b compression on 64-bit int words",
+    )
+
+    parser.addoption(
+        "--precomputed-kzg",
+        dest="precomputed_kzg",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Verify KZG proofs with precomputed tables and a result cache",
+    )
+
+    parser.addoption(
+        "--sender-recovery",
+        dest="sender_recovery",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Recover the senders of each block ahead of time in threads",
+    )
+
+    parser.addoption(
+        "--multi-pairing",
+        dest="multi_pairing",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Check pairings with one Miller loop and final exponentiation",
+    )
+
+    parser.addoption(
+        "--pippenger-msm",
+        dest="pippenger_msm",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Run the BLS12-381 MSM precompiles with the bucket method",
+    )
+
+    parser.addoption(
+        "--numpy-ethash",
+        dest="numpy_ethash",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Use the NumPy ethash cache generation and verification",
+    )
+
+    parser.addoption(
+        "--ethash-cache",
+        dest="ethash_cache",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Generate each ethash cache once instead of once per block",
+    )
+
+    parser.addoption(
+        "--ethash-cache-dir",
+        dest="ethash_cache_dir",
+        default=None,
+        help="Store ethash caches in this directory (implies --ethash-cache)",
+    )
+
     parser.addoption(
         "--evm_trace",
         dest="evm_trace",
@@ -126,7 +258,94 @@ def pytest_configure(config: Config) -> None:
     if config.getoption("optimized"):
         import ethereum_optimized
 
-        ethereum_optimized.monkey_patch(None)
+        ethereum_optimized.monkey_patch(
+            None, config.getoption("state_backend")
+        )
+
+    # The trie must be patched before the state imports it.
+    if config.getoption("incremental_trie"):
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            ethereum_optimized.monkey_patch_incremental_trie(fork.short_name)
+
+    if config.getoption("journaled_state"):
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            ethereum_optimized.monkey_patch_journaled_state(fork.short_name)
+
+    if config.getoption("journaled_state_tracker"):
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            ethereum_optimized.monkey_patch_journaled_state_tracker(
+                fork.short_name
+            )
+
+    if config.getoption("jumpdest_cache"):
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            ethereum_optimized.monkey_patch_jumpdest_cache(fork.short_name)
+
+    if config.getoption("code_store"):
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            ethereum_optimized.monkey_patch_code_store(fork.short_name)
+
+    if config.getoption("dispatch_loop"):
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            ethereum_optimized.monkey_patch_dispatch_loop(fork.short_name)
+
+    if config.getoption("sender_recovery"):
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            ethereum_optimized.monkey_patch_sender_recovery(fork.short_name)
+
+    if config.getoption("fast_blake2"):
+        import ethereum_optimized
+
+        ethereum_optimized.monkey_patch_blake2()
+
+    if config.getoption("precomputed_kzg"):
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            ethereum_optimized.monkey_patch_kzg(fork.short_name)
+
+    if config.getoption("multi_pairing"):
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            ethereum_optimized.monkey_patch_multi_pairing(fork.short_name)
+
+    if config.getoption("pippenger_msm"):
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            ethereum_optimized.monkey_patch_pippenger_msm(fork.short_name)
+
+    if config.getoption("numpy_ethash"):
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            if fork.consensus.is_pow():
+                ethereum_optimized.monkey_patch_numpy_ethash(fork.short_name)
+
+    ethash_cache_dir = config.getoption("ethash_cache_dir")
+    if config.getoption("ethash_cache") or ethash_cache_dir is not None:
+        import ethereum_optimized
+
+        for fork in FORKS.values():
+            if fork.consensus.is_pow():
+                ethereum_optimized.monkey_patch_ethash_cache(
+                    fork.short_name, ethash_cache_dir
+                )
 
     if config.getoption("evm_trace"):
         import ethereum.trace
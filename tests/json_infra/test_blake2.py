@@ -0,0 +1,58 @@
+"""Tests for the fixed-width BLAKE2b compression."""
+
+import random
+from typing import Any, cast
+
+import pytest
+
+from ethereum.crypto.blake2 import Blake2b
+from ethereum_optimized.blake2 import get_blake2b_patches
+
+# Test vector 5 of EIP-152: 12 rounds over the message "abc".
+EIP_152_INPUT = (
+    (12).to_bytes(4, "big")
+    + bytes.fromhex(
+        "48c9bdf267e6096a3ba7ca8485ae67bb2bf894fe72f36e3cf1361d5f3af54fa5"
+        "d182e6ad7f520e511f6c3e2b8c68059b6bbd41fbabd9831f79217e1319cde05b"
+    )
+    + b"abc".ljust(128, b"\x00")
+    + (3).to_bytes(8, "little")
+    + (0).to_bytes(8, "little")
+    + b"\x01"
+)
+EIP_152_OUTPUT = bytes.fromhex(
+    "ba80a53f981c4d0d6a2797b69f12f6e94c212f14685ac4b74b12bb6fdbffa2d1"
+    "7d87c5392aab792dc252d5de4533cc9518d38aa8dbf1925ab92386edd4009923"
+)
+
+
+class FastBlake2b(Blake2b):
+    """`Blake2b` with the fixed-width compression."""
+
+    pass
+
+
+for name, value in get_blake2b_patches().items():
+    setattr(FastBlake2b, name, value)
+
+
+def test_eip_152_vector() -> None:
+    """The compression matches a test vector from EIP-152."""
+    blake2b = cast(Any, FastBlake2b())
+    parameters = blake2b.get_blake2_parameters(EIP_152_INPUT)
+    assert blake2b.compress(*parameters) == EIP_152_OUTPUT
+
+
+@pytest.mark.parametrize("rounds", [0, 1, 10, 12, 25])
+def test_matches_reference(rounds: int) -> None:
+    """Random inputs give the same output as the reference."""
+    rng = random.Random(rounds)
+    for final in (b"\x00", b"\x01"):
+        data = rounds.to_bytes(4, "big") + rng.randbytes(208) + final
+
+        reference = Blake2b()
+        parameters = reference.get_blake2_parameters(data)
+
+        assert FastBlake2b().compress(*parameters) == reference.compress(
+            *parameters
+        )
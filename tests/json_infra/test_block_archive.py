@@ -0,0 +1,120 @@
+"""Tests for the block archive used by `ethereum-spec-sync`."""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from ethereum_rlp import rlp
+from ethereum_types.numeric import Uint
+
+from ethereum_spec_tools import block_archive
+from ethereum_spec_tools.block_archive import BlockArchive
+
+from .test_sync_downloader import make_block
+
+
+def test_append(tmp_path: Path) -> None:
+    """Blocks are stored in order, and survive reopening."""
+    with BlockArchive(str(tmp_path), writable=True) as archive:
+        assert archive.next is None
+        assert archive.get(Uint(5)) is None
+
+        assert archive.append(Uint(5), b"five")
+        assert archive.append(Uint(6), b"")
+        assert archive.append(Uint(7), b"seven")
+        assert not archive.append(Uint(6), b"six")
+        with pytest.raises(ValueError, match="doesn't follow block 7"):
+            archive.append(Uint(9), b"nine")
+
+    with BlockArchive(str(tmp_path)) as archive:
+        assert (archive.first, archive.next) == (Uint(5), Uint(8))
+        assert [archive.get(Uint(n)) for n in range(4, 9)] == [
+            None,
+            b"five",
+            b"",
+            b"seven",
+            None,
+        ]
+        with pytest.raises(ValueError, match="read only"):
+            archive.append(Uint(8), b"eight")
+
+
+def test_interrupted_write(tmp_path: Path) -> None:
+    """A partially written block is dropped."""
+    with BlockArchive(str(tmp_path), writable=True) as archive:
+        archive.append(Uint(0), b"zero")
+        archive.append(Uint(1), b"one")
+
+    with open(tmp_path / BlockArchive.DATA_FILE, "ab") as f:
+        f.write(b"tw")
+    with open(tmp_path / BlockArchive.INDEX_FILE, "ab") as f:
+        f.write(b"\x00\x00")
+
+    with BlockArchive(str(tmp_path), writable=True) as archive:
+        assert archive.next == Uint(2)
+        archive.append(Uint(2), b"two")
+        assert archive.get(Uint(2)) == b"two"
+
+    assert os.path.getsize(tmp_path / BlockArchive.DATA_FILE) == 10
+
+
+def test_import(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Blocks are imported from files of `debug_getRawBlock` results."""
+    block_rlps = [rlp.encode(make_block(number)) for number in range(6)]
+
+    def reply(number: int) -> object:
+        return {
+            "jsonrpc": "2.0",
+            "id": hex(number),
+            "result": "0x" + block_rlps[number].hex(),
+        }
+
+    batch = tmp_path / "batch.json"
+    batch.write_text(json.dumps([reply(2), reply(0), reply(1)], indent=2))
+    lines = tmp_path / "lines.jsonl"
+    lines.write_text(
+        json.dumps(reply(4))
+        + "\n"
+        + json.dumps({"jsonrpc": "2.0", "id": "0x6", "error": {}})
+        + "\n"
+        + json.dumps([reply(5), reply(3)])
+        + "\n"
+    )
+
+    archive_path = str(tmp_path / "archive")
+    monkeypatch.setattr(
+        sys, "argv", ["import", archive_path, str(batch), str(lines)]
+    )
+    block_archive.main()
+
+    with BlockArchive(archive_path) as archive:
+        assert (archive.first, archive.next) == (Uint(0), Uint(6))
+        assert [archive.get(Uint(n)) for n in range(6)] == block_rlps
+
+
+def test_import_gap(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Importing stops with an error at a missing block, keeping the blocks
+    before it, and an existing archive is extended from its last block.
+    """
+    block_rlps = [rlp.encode(make_block(number)) for number in range(6)]
+    archive_path = str(tmp_path / "archive")
+    with BlockArchive(archive_path, writable=True) as archive:
+        archive.append(Uint(0), block_rlps[0])
+
+    blocks = tmp_path / "blocks.jsonl"
+    blocks.write_text(
+        "\n".join(
+            json.dumps("0x" + block_rlps[number].hex())
+            for number in (1, 0, 2, 5, 4)
+        )
+    )
+    monkeypatch.setattr(sys, "argv", ["import", archive_path, str(blocks)])
+    with pytest.raises(SystemExit):
+        block_archive.main()
+
+    with BlockArchive(archive_path) as archive:
+        assert (archive.first, archive.next) == (Uint(0), Uint(3))
+        assert [archive.get(Uint(n)) for n in range(3)] == block_rlps[:3]
@@ -0,0 +1,58 @@
+"""Tests for the content-addressed code store."""
+
+from ethereum_types.numeric import U256, Uint
+
+from ethereum.crypto.hash import keccak256
+from ethereum.forks.osaka.fork_types import Account, encode_account
+from ethereum_optimized.code_store import (
+    CodeStore,
+    get_code_hash_patches,
+    get_code_store_patches,
+)
+
+
+def test_code_hash() -> None:
+    """
+    Hashes are the same as the reference, and each code is only hashed once
+    while it is stored.
+    """
+    store = CodeStore(max_bytes=4)
+    codes = [b"\x5b", b"\x60\x00\x55", b"\x00"]
+
+    for code in codes:
+        assert store.code_hash(code) == keccak256(code)
+        # An equal code in another object is found too.
+        assert store.code_hash(bytes(bytearray(code))) == keccak256(code)
+    assert (store.hits, store.misses, len(store)) == (3, 3, 2)
+
+    # The codes added up to more than `max_bytes`, so the least recently
+    # used was evicted.
+    assert store.get(keccak256(codes[0])) is None
+    assert store.get(keccak256(codes[1])) == codes[1]
+    assert store.get(keccak256(codes[2])) == codes[2]
+
+    # Codes longer than `max_bytes` aren't stored at all.
+    long_code = bytes(range(256)) * 100
+    assert store.code_hash(long_code) == keccak256(long_code)
+    assert store.get(keccak256(long_code)) is None
+    assert len(store) == 2
+
+    store.clear()
+    assert (store.hits, store.misses, len(store)) == (0, 0, 0)
+
+
+def test_patches() -> None:
+    """The patched functions give the same results as the reference."""
+    store = CodeStore()
+    patched_encode_account = get_code_store_patches(store)["encode_account"]
+    patched_keccak256 = get_code_hash_patches(store)["keccak256"]
+
+    storage_root = keccak256(b"storage")
+    for code in (b"", b"\x60\x01\x60\x00\x55"):
+        account = Account(nonce=Uint(1), balance=U256(10**18), code=code)
+        for _ in range(2):
+            assert patched_encode_account(
+                account, storage_root
+            ) == encode_account(account, storage_root)
+            assert patched_keccak256(code) == keccak256(code)
+    assert (store.hits, store.misses) == (6, 2)
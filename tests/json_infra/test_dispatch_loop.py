@@ -0,0 +1,179 @@
+"""Tests for the pre-decoded dispatch loop."""
+
+import json
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import pytest
+
+import ethereum.forks.berlin.vm.interpreter as interpreter
+import ethereum.trace
+from ethereum.forks.berlin.vm.instructions import Ops, op_implementation
+from ethereum_optimized.dispatch import get_dispatch_loop_patches
+from ethereum_spec_tools.evm_tools import create_parser
+from ethereum_spec_tools.evm_tools.t8n import T8N, ForkCache
+
+SENDER = "0xa94f5374fce5edbc8e2a8697c15331677e6ebf0b"
+SECRET_KEY = (
+    "0x45a915e4d060149eb4365960e6a7a45f334393093061116b197e3240065ff2d8"
+)
+CONTRACT = "0x00000000000000000000000000000000000000c0"
+CALLEE = "0x00000000000000000000000000000000000000c1"
+
+CODES = {
+    # Count down from 100, storing the counter in memory.
+    "loop": "0x60645b8060005260019003806002570000",
+    # Call a contract that reverts, and the identity precompile.
+    "call": "0x6000600060006000600061c1005af1"
+    "6020602060206000600060045af1500060206000fd",
+    # Jump into push data.
+    "bad_jump": "0x6003565b",
+    # Invalid opcode after a PUSH1 whose data looks like a JUMPDEST.
+    "invalid": "0x605b0c",
+    # PUSH32 running past the end of the code.
+    "truncated_push": "0x7f01020304",
+    # Overflow the stack.
+    "stack_overflow": "0x5b5a600056",
+    # Run out of gas in an infinite loop.
+    "out_of_gas": "0x5b600056",
+}
+
+
+def run_t8n(code: str, tmp_path: Path, trace: bool) -> Tuple[Any, str]:
+    """
+    Call `code` twice, returning the result and, if `trace` is set, the
+    traces.
+    """
+    stdin: Dict[str, Any] = {
+        "alloc": {
+            SENDER: {"balance": "0x3635c9adc5dea00000", "nonce": "0x0"},
+            CONTRACT: {"balance": "0x0", "nonce": "0x1", "code": code},
+            CALLEE: {"balance": "0x0", "nonce": "0x1", "code": "0x60006000fd"},
+        },
+        "env": {
+            "currentCoinbase": "0x" + "00" * 19 + "ff",
+            "currentDifficulty": "0x20000",
+            "currentGasLimit": "0x1000000",
+            "currentNumber": "0x1",
+            "currentTimestamp": "0x3e8",
+            "blockHashes": {"0": "0x" + "00" * 32},
+        },
+        "txs": [
+            {
+                "nonce": hex(nonce),
+                "gasPrice": "0xa",
+                "gas": "0x10000",
+                "to": CONTRACT,
+                "value": "0x0",
+                "input": "0x",
+                "v": "0x0",
+                "r": "0x0",
+                "s": "0x0",
+                "secretKey": SECRET_KEY,
+            }
+            for nonce in range(2)
+        ],
+    }
+
+    args = [
+        "t8n",
+        "--input.env=stdin",
+        "--input.alloc=stdin",
+        "--input.txs=stdin",
+        "--output.result=stdout",
+        "--output.alloc=stdout",
+        f"--output.basedir={tmp_path}",
+        "--state.fork=Berlin",
+    ]
+    traces = StringIO()
+    if trace:
+        args += ["--trace", "--trace.memory", "--trace.returndata"]
+
+    out_file = StringIO()
+    try:
+        with ForkCache() as fork_cache:
+            t8n_tool = T8N(
+                create_parser().parse_args(args),
+                out_file=out_file,
+                in_file=StringIO(json.dumps(stdin)),
+                cache=fork_cache,
+            )
+            assert 0 == t8n_tool.run()
+    finally:
+        # t8n only sets the tracer when tracing.
+        ethereum.trace.set_evm_trace(ethereum.trace.discard_evm_trace)
+
+    for path in sorted(tmp_path.glob("trace-*.jsonl")):
+        traces.write(path.read_text())
+        path.unlink()
+
+    return json.loads(out_file.getvalue()), traces.getvalue()
+
+
+@pytest.mark.parametrize("trace", [False, True])
+@pytest.mark.parametrize("name", CODES)
+def test_matches_reference(
+    name: str, trace: bool, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Results and traces are the same as the reference loop."""
+    expected = run_t8n(CODES[name], tmp_path, trace)
+
+    patches = get_dispatch_loop_patches("berlin")
+    for patch_name, value in patches.items():
+        monkeypatch.setattr(interpreter, patch_name, value, raising=False)
+
+    assert run_t8n(CODES[name], tmp_path, trace) == expected
+    assert patches["dispatch_tables"].hits > 0
+
+
+def test_tables() -> None:
+    """Pushes reachable from the start have their immediate parsed."""
+    patches = get_dispatch_loop_patches("berlin", max_bytes=5)
+    tables = patches["dispatch_tables"]
+
+    handlers, opcodes = tables.get(bytes.fromhex("61605b7f0c"))
+    assert [op.name if op else None for op in opcodes] == [
+        "PUSH2",
+        "PUSH1",
+        "JUMPDEST",
+        "PUSH32",
+        None,
+    ]
+    assert handlers[0].__name__ == "push_immediate"
+    # Push data, so not pre-parsed.
+    assert handlers[1] is op_implementation[Ops.PUSH1]
+    assert handlers[3].__name__ == "push_immediate"
+    assert handlers[4].__name__ == "invalid"
+
+    assert tables.get(bytes.fromhex("61605b7f0c")) is not None
+    tables.get(b"\x00")
+    assert len(tables) == 1
+    assert (tables.hits, tables.misses) == (1, 2)
+
+
+def test_tables_bounded_by_code_length() -> None:
+    """
+    The least recently used tables are evicted once the codes add up to more
+    than `max_bytes`, and codes longer than that aren't kept at all.
+    """
+    tables = get_dispatch_loop_patches("berlin", max_bytes=10)[
+        "dispatch_tables"
+    ]
+
+    tables.get(b"\x01" * 4)
+    tables.get(b"\x02" * 4)
+    tables.get(b"\x01" * 4)
+    assert len(tables) == 2
+
+    tables.get(b"\x03" * 4)
+    assert len(tables) == 2
+    tables.get(b"\x01" * 4)
+    assert (tables.hits, tables.misses) == (2, 3)
+    tables.get(b"\x02" * 4)
+    assert tables.misses == 4
+
+    tables.get(b"\x04" * 11)
+    tables.get(b"\x04" * 11)
+    assert tables.misses == 6
+    assert len(tables) == 2
@@ -0,0 +1,133 @@
+"""Tests for the epoch keyed ethash cache store."""
+
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple, cast
+
+import pytest
+from ethereum_types.bytes import Bytes8
+from ethereum_types.numeric import U32, Uint
+
+import ethereum.ethash as ethash
+from ethereum.crypto.hash import Hash32
+from ethereum_optimized.ethash_cache import (
+    CacheView,
+    EthashCacheStore,
+    get_ethash_cache_patches,
+)
+
+# A cache of 17 rows (a prime number, like the real cache sizes) keeps the
+# reference generation fast enough for unit tests.
+SMALL_CACHE_SIZE = Uint(17 * 64)
+
+
+@pytest.fixture
+def generated(monkeypatch: pytest.MonkeyPatch) -> List[Uint]:
+    """
+    Shrink the ethash cache and record the blocks it is generated for.
+    """
+    calls: List[Uint] = []
+    slow_generate_cache = ethash.generate_cache
+
+    def generate_cache(block_number: Uint) -> Tuple[Tuple[U32, ...], ...]:
+        calls.append(block_number)
+        return slow_generate_cache(block_number)
+
+    monkeypatch.setattr(ethash, "cache_size", lambda _: SMALL_CACHE_SIZE)
+    monkeypatch.setattr(ethash, "generate_cache", generate_cache)
+    return calls
+
+
+def test_view_matches_reference(generated: List[Uint]) -> None:
+    """The view has the same rows and hashimoto results as the tuple."""
+    block_number = Uint(30001)
+    cache = ethash.generate_cache(block_number)
+    view = EthashCacheStore().get(block_number)
+
+    assert isinstance(view, CacheView)
+    assert len(view) == len(cache)
+    assert tuple(view) == cache
+    assert view[-1] == cache[-1]
+    assert view[2:5] == cache[2:5]
+    with pytest.raises(IndexError):
+        view[len(cache)]
+
+    header_hash = Hash32(b"\x12" * 32)
+    nonce = Bytes8(b"\x34" * 8)
+    size = Uint(1031 * 128)
+    assert ethash.hashimoto_light(
+        header_hash, nonce, cast(Tuple[Tuple[U32, ...], ...], view), size
+    ) == ethash.hashimoto_light(header_hash, nonce, cache, size)
+
+
+def test_generated_once_per_epoch(generated: List[Uint]) -> None:
+    """Blocks in the same epoch share a cache, and old epochs are evicted."""
+    store = EthashCacheStore(max_in_memory=2)
+
+    assert store.get(Uint(1)) is store.get(Uint(29999))
+    store.get(Uint(30000))
+    store.get(Uint(60000))
+    store.get(Uint(30001))
+    store.get(Uint(2))
+
+    assert generated == [Uint(1), Uint(30000), Uint(60000), Uint(2)]
+
+
+def test_disk_store(tmp_path: Path, generated: List[Uint]) -> None:
+    """Caches written by one store are memory mapped by the next."""
+    path = str(tmp_path / "ethash")
+    first = EthashCacheStore(path).get(Uint(30000))
+
+    second = EthashCacheStore(path).get(Uint(59999))
+    assert generated == [Uint(30000)]
+    assert tuple(second) == tuple(first)
+    assert not isinstance(second.buffer, bytes)
+
+    # Truncated files are ignored and regenerated.
+    cache_file = EthashCacheStore(path).file_name(Uint(30000))
+    with open(cache_file, "r+b") as f:
+        f.truncate(64)
+    EthashCacheStore(path).get(Uint(30000))
+    assert generated == [Uint(30000), Uint(30000)]
+    assert len(list(tmp_path.joinpath("ethash").iterdir())) == 1
+
+
+def test_patches(generated: List[Uint]) -> None:
+    """The patched `generate_cache` reads from the store."""
+    store = EthashCacheStore()
+    patches = get_ethash_cache_patches("frontier", store)
+
+    assert patches["generate_cache"](Uint(7)) is store.get(Uint(8))
+    with pytest.raises(Exception, match="non-pow"):
+        get_ethash_cache_patches("paris", store)
+
+
+MONKEY_PATCH_WITHOUT_ETHASH = """
+import sys
+
+sys.modules["ethash"] = None
+
+import ethereum_optimized
+
+assert not ethereum_optimized.uses_native_ethash("rust")
+ethereum_optimized.monkey_patch(None, "sqlite", sys.argv[1])
+
+import ethereum.forks.frontier.fork as fork
+
+print(fork.generate_cache.__module__)
+"""
+
+
+def test_monkey_patch_without_ethash(tmp_path: Path) -> None:
+    """
+    `monkey_patch()` uses the cache store when `ethash` can't be imported.
+    """
+    # Patching replaces the state of every fork, so run it in a new process.
+    result = subprocess.run(
+        [sys.executable, "-c", MONKEY_PATCH_WITHOUT_ETHASH, str(tmp_path)],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert result.stdout.strip() == "ethereum_optimized.ethash_cache"
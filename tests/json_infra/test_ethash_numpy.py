@@ -0,0 +1,80 @@
+"""Tests for the NumPy ethash backend."""
+
+import pytest
+from ethereum_types.bytes import Bytes8
+from ethereum_types.numeric import Uint
+
+import ethereum.ethash as ethash
+from ethereum.crypto.hash import Hash32
+from ethereum.utils.numeric import le_uint32_sequence_to_bytes
+from ethereum_optimized.ethash_cache import EthashCacheStore
+
+np = pytest.importorskip("numpy")
+ethash_numpy = pytest.importorskip("ethereum_optimized.ethash_numpy")
+
+# A cache of 17 rows (a prime number, like the real cache sizes) keeps the
+# reference generation fast enough for unit tests.
+SMALL_CACHE_SIZE = Uint(17 * 64)
+
+
+@pytest.fixture(autouse=True)
+def small_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Shrink the ethash cache."""
+    monkeypatch.setattr(ethash, "cache_size", lambda _: SMALL_CACHE_SIZE)
+
+
+@pytest.mark.parametrize("block_number", [Uint(0), Uint(30000 * 5 + 1)])
+def test_generate_cache(block_number: Uint) -> None:
+    """The cache has the same words as the reference."""
+    cache = ethash_numpy.generate_cache(block_number)
+    expected = ethash.generate_cache(block_number)
+
+    assert cache.dtype == np.uint32
+    assert cache.shape == (len(expected), 16)
+    assert cache.tobytes() == b"".join(
+        le_uint32_sequence_to_bytes(row) for row in expected
+    )
+
+
+def test_generate_dataset_item() -> None:
+    """Single and batched dataset items match the reference."""
+    cache = ethash.generate_cache(Uint(0))
+    words = ethash_numpy.as_words(cache)
+    indices = [0, 1, 16, 17, 1000, 2**31 + 5]
+
+    batched = ethash_numpy.generate_dataset_items(
+        words, np.array(indices, dtype=np.uint32)
+    )
+    for row, index in zip(batched, indices, strict=True):
+        expected = ethash.generate_dataset_item(cache, Uint(index))
+        assert ethash_numpy.generate_dataset_item(cache, Uint(index)) == (
+            expected
+        )
+        assert row.astype("<u4").tobytes() == expected
+
+
+@pytest.mark.parametrize("nonce", [b"\x00" * 8, b"\xde\xad\xbe\xef" * 2])
+def test_hashimoto_light(nonce: bytes) -> None:
+    """
+    The mix digest and result match the reference, for every form of cache.
+    """
+    block_number = Uint(30000)
+    cache = ethash.generate_cache(block_number)
+    header_hash = Hash32(b"\x5a" * 32)
+    dataset_size = Uint(1031 * 128)
+
+    expected = ethash.hashimoto_light(
+        header_hash, Bytes8(nonce), cache, dataset_size
+    )
+
+    for form in (
+        cache,
+        ethash_numpy.generate_cache(block_number),
+        EthashCacheStore().get(block_number),
+    ):
+        assert (
+            ethash_numpy.hashimoto_light(
+                header_hash, Bytes8(nonce), form, dataset_size
+            )
+            == expected
+        )
@@ -0,0 +1,267 @@
+"""Tests for the incremental trie root implementation."""
+
+import copy
+import random
+from typing import Any, Dict, List
+
+import pytest
+from ethereum_types.bytes import Bytes
+from ethereum_types.numeric import U256, Uint
+
+import ethereum.forks.cancun.state as cancun_state
+import ethereum.forks.cancun.trie as cancun_trie
+import ethereum.forks.frontier.trie as frontier_trie
+from ethereum.forks.cancun.fork_types import Account, Address, Root
+from ethereum_optimized.incremental_trie import (
+    StorageTries,
+    get_incremental_state_patches,
+    get_incremental_trie_patches,
+)
+
+# Short keys that are prefixes of each other exercise values stored in
+# branch nodes, which only happens in unsecured tries.
+PLAIN_KEYS = [
+    b"",
+    b"\x01",
+    b"\x01\x23",
+    b"\x01\x23\x45",
+    b"\x01\x24",
+    b"\x10",
+    b"\x11\x11",
+    b"\xff",
+    b"\xff\xff",
+    b"do",
+    b"dog",
+    b"doge",
+    b"horse",
+]
+VALUES = [b"", b"", b"a", b"verb", b"puppy", b"x" * 40]
+
+
+class IncrementalTrie:
+    """Placeholder for the incremental trie module."""
+
+    pass
+
+
+def incremental(fork: str, reference: Any) -> Any:
+    """
+    Build a module-like object holding the incremental trie, falling back to
+    the reference implementation for everything that isn't patched.
+    """
+    module: Any = IncrementalTrie()
+    for name in dir(reference):
+        if not name.startswith("__"):
+            setattr(module, name, getattr(reference, name))
+    for name, value in get_incremental_trie_patches(fork).items():
+        setattr(module, name, value)
+    return module
+
+
+def reference_root(reference: Any, trie: Any, *args: Any) -> Bytes:
+    """Compute the root of `trie` with the reference implementation."""
+    plain = reference.Trie(trie.secured, trie.default, dict(trie._data))
+    return reference.root(plain, *args)
+
+
+@pytest.mark.parametrize("secured", [False, True])
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_reference(secured: bool, seed: int) -> None:
+    """
+    Random writes, deletes and copies give the same roots as rebuilding the
+    trie from scratch.
+    """
+    rng = random.Random(seed)
+    optimized = incremental("frontier", frontier_trie)
+    tries: List[Any] = [optimized.Trie(secured=secured, default=b"")]
+
+    for _ in range(300):
+        trie = rng.choice(tries)
+        action = rng.randrange(10)
+        if action == 0:
+            tries.append(optimized.copy_trie(trie))
+        elif action == 1:
+            trie._data.pop(rng.choice(PLAIN_KEYS), None)
+        else:
+            optimized.trie_set(
+                trie, rng.choice(PLAIN_KEYS), rng.choice(VALUES)
+            )
+
+        if rng.randrange(3) == 0:
+            trie = rng.choice(tries)
+            assert optimized.root(trie) == reference_root(frontier_trie, trie)
+
+    for trie in tries:
+        assert optimized.root(trie) == reference_root(frontier_trie, trie)
+
+
+def test_many_keys() -> None:
+    """
+    Small updates to a large secured trie match the reference and only
+    re-encode the changed paths.
+    """
+    optimized = incremental("frontier", frontier_trie)
+    trie = optimized.Trie(secured=True, default=b"")
+    for i in range(2000):
+        optimized.trie_set(trie, i.to_bytes(4, "big"), b"value" * (i % 7))
+    assert optimized.root(trie) == reference_root(frontier_trie, trie)
+
+    untouched = trie._cache.node
+    for i in range(0, 2000, 97):
+        optimized.trie_set(trie, i.to_bytes(4, "big"), b"")
+        optimized.trie_set(trie, (i + 5000).to_bytes(4, "big"), b"new")
+    assert optimized.root(trie) == reference_root(frontier_trie, trie)
+    assert trie._cache.node is not untouched
+
+    assert not trie._data.dirty
+    assert optimized.root(trie) is trie._cache.root
+
+
+def test_state_trie() -> None:
+    """
+    Accounts are re-encoded when their storage root changes, even if the
+    account itself wasn't written.
+    """
+    optimized = incremental("cancun", cancun_trie)
+    main_trie = optimized.Trie(secured=True, default=None)
+    storage_tries: Dict[Bytes, Any] = {}
+
+    def get_storage_root(address: Bytes) -> Bytes:
+        if address in storage_tries:
+            return optimized.root(storage_tries[address])
+        return cancun_trie.EMPTY_TRIE_ROOT
+
+    def reference_storage_root(address: Bytes) -> Bytes:
+        if address in storage_tries:
+            return reference_root(cancun_trie, storage_tries[address])
+        return cancun_trie.EMPTY_TRIE_ROOT
+
+    rng = random.Random(0)
+    addresses = [bytes([i]) * 20 for i in range(1, 30)]
+    for _ in range(20):
+        for _ in range(20):
+            address = rng.choice(addresses)
+            if rng.randrange(4) == 0:
+                optimized.trie_set(
+                    main_trie,
+                    address,
+                    Account(
+                        nonce=Uint(rng.randrange(3)),
+                        balance=U256(rng.randrange(100)),
+                        code=b"",
+                    ),
+                )
+            elif address in main_trie._data:
+                trie = storage_tries.setdefault(
+                    address, optimized.Trie(secured=True, default=U256(0))
+                )
+                optimized.trie_set(
+                    trie,
+                    U256(rng.randrange(8)).to_be_bytes32(),
+                    U256(rng.randrange(3)),
+                )
+
+        assert optimized.root(main_trie, get_storage_root) == reference_root(
+            cancun_trie, main_trie, reference_storage_root
+        )
+
+
+def test_copy() -> None:
+    """
+    Copies share the cached tree without seeing each other's writes, and the
+    cache survives `deepcopy()`.
+    """
+    optimized = incremental("frontier", frontier_trie)
+    trie = optimized.Trie(secured=False, default=b"")
+    for key in PLAIN_KEYS:
+        optimized.trie_set(trie, key, b"value")
+    root_before = optimized.root(trie)
+
+    copied = optimized.copy_trie(trie)
+    optimized.trie_set(copied, b"dog", b"")
+    optimized.trie_set(copied, b"cat", b"meow")
+    assert optimized.root(copied) == reference_root(frontier_trie, copied)
+    assert optimized.root(trie) == root_before
+
+    restored = copy.deepcopy(trie)
+    optimized.trie_set(restored, b"dog", b"woof")
+    assert optimized.root(restored) == reference_root(frontier_trie, restored)
+    assert optimized.root(trie) == root_before
+
+
+def test_state_root(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    The patched `state_root()` matches the reference through commits,
+    rollbacks and destroyed storage, and only recomputes the storage roots
+    of accounts whose storage changed.
+    """
+    slow_trie, slow_root = cancun_trie.Trie, cancun_trie.root
+    storage_root_calls: List[Bytes] = []
+    patches = get_incremental_trie_patches("cancun")
+
+    def counting_root(trie: Any, *args: Any, **kwargs: Any) -> Bytes:
+        if trie.default == U256(0):
+            storage_root_calls.append(trie)
+        return patches["root"](trie, *args, **kwargs)
+
+    for name in ("Trie", "copy_trie"):
+        monkeypatch.setattr(cancun_trie, name, patches[name])
+        monkeypatch.setattr(cancun_state, name, patches[name])
+    monkeypatch.setattr(cancun_trie, "root", counting_root)
+    monkeypatch.setattr(cancun_state, "root", counting_root)
+    state_root = get_incremental_state_patches("cancun")["state_root"]
+
+    def reference_state_root(state: Any) -> Bytes:
+        def get_storage_root(address: Address) -> Root:
+            if address in state._storage_tries:
+                trie = state._storage_tries[address]
+                return slow_root(
+                    slow_trie(trie.secured, trie.default, dict(trie._data))
+                )
+            return cancun_trie.EMPTY_TRIE_ROOT
+
+        main_trie = state._main_trie
+        plain = slow_trie(
+            main_trie.secured, main_trie.default, dict(main_trie._data)
+        )
+        return slow_root(plain, get_storage_root)
+
+    state = cancun_state.State()
+    addresses = [Address(bytes([i]) * 20) for i in range(1, 60)]
+    for address in addresses:
+        cancun_state.set_account(
+            state, address, Account(nonce=Uint(1), balance=U256(0), code=b"")
+        )
+        cancun_state.set_storage(
+            state, address, U256(1).to_be_bytes32(), U256(1)
+        )
+    assert state_root(state) == reference_state_root(state)
+    assert type(state._storage_tries) is StorageTries
+
+    storage_root_calls.clear()
+    cancun_state.set_storage(
+        state, addresses[0], U256(2).to_be_bytes32(), U256(2)
+    )
+    assert state_root(state) == reference_state_root(state)
+    assert storage_root_calls == [state._storage_tries[addresses[0]]]
+
+    rng = random.Random(0)
+    for _ in range(30):
+        transient_storage = cancun_state.TransientStorage()
+        cancun_state.begin_transaction(state, transient_storage)
+        for _ in range(10):
+            address = rng.choice(addresses)
+            if rng.randrange(10) == 0:
+                cancun_state.destroy_storage(state, address)
+            else:
+                cancun_state.set_storage(
+                    state,
+                    address,
+                    U256(rng.randrange(4)).to_be_bytes32(),
+                    U256(rng.randrange(3)),
+                )
+        if rng.randrange(3) == 0:
+            cancun_state.rollback_transaction(state, transient_storage)
+        else:
+            cancun_state.commit_transaction(state, transient_storage)
+        assert state_root(state) == reference_state_root(state)
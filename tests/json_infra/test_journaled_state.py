@@ -0,0 +1,220 @@
+"""Tests for the journaled state implementation."""
+
+import random
+from typing import Any, Callable, Dict, Tuple, cast
+
+import pytest
+from ethereum_types.numeric import U256, Uint
+
+import ethereum.forks.cancun.state as cancun_state
+import ethereum.forks.frontier.state as frontier_state
+from ethereum.forks.cancun.fork_types import Account
+from ethereum_optimized.state_journal import get_journaled_state_patches
+
+ADDRESSES = [bytes([i]) * 20 for i in range(1, 6)]
+KEYS = [U256(i).to_be_bytes32() for i in range(4)]
+
+
+class JournaledState:
+    """Placeholder for the journaled state module."""
+
+    pass
+
+
+def journaled(fork: str, reference: Any) -> Any:
+    """
+    Build a module-like object holding the journaled state, falling back to
+    the reference implementation for everything that isn't patched.
+    """
+    module = cast(Any, JournaledState())
+    for name in dir(reference):
+        if not name.startswith("__"):
+            setattr(module, name, getattr(reference, name))
+    for name, value in get_journaled_state_patches(fork).items():
+        setattr(module, name, value)
+    return module
+
+
+def storage_of(state: Any) -> Dict[bytes, Dict[bytes, U256]]:
+    """Flatten all storage tries of `state` into plain dictionaries."""
+    return {
+        address: dict(trie._data)
+        for address, trie in state._storage_tries.items()
+    }
+
+
+def random_operation(
+    rng: random.Random,
+) -> Tuple[str, Callable[[Any, Any, Any], None]]:
+    """Pick one state mutating operation at random."""
+    address = rng.choice(ADDRESSES)
+    key = rng.choice(KEYS)
+    value = U256(rng.choice([0, 0, 1, 2, 3]))
+    choice = rng.randrange(5)
+
+    if choice == 0:
+        account = rng.choice(
+            [
+                None,
+                Account(nonce=Uint(1), balance=U256(5), code=b""),
+                Account(nonce=Uint(0), balance=U256(9), code=b"\x00"),
+            ]
+        )
+
+        def set_account(impl: Any, state: Any, _: Any) -> None:
+            impl.set_account(state, address, account)
+
+        return "set_account", set_account
+    elif choice == 1:
+
+        def set_storage(impl: Any, state: Any, _: Any) -> None:
+            if impl.get_account_optional(state, address) is None:
+                impl.set_account(
+                    state,
+                    address,
+                    Account(nonce=Uint(1), balance=U256(0), code=b""),
+                )
+            impl.set_storage(state, address, key, value)
+
+        return "set_storage", set_storage
+    elif choice == 2:
+
+        def destroy_account(impl: Any, state: Any, _: Any) -> None:
+            # Spelled out, since the reference `destroy_account()` always
+            # calls the reference `destroy_storage()`.
+            impl.destroy_storage(state, address)
+            impl.set_account(state, address, None)
+
+        return "destroy_account", destroy_account
+    elif choice == 3:
+
+        def mark_account_created(impl: Any, state: Any, _: Any) -> None:
+            impl.mark_account_created(state, address)
+
+        return "mark_account_created", mark_account_created
+    else:
+
+        def set_transient_storage(
+            impl: Any, _: Any, transient_storage: Any
+        ) -> None:
+            impl.set_transient_storage(transient_storage, address, key, value)
+
+        return "set_transient_storage", set_transient_storage
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_reference(seed: int) -> None:
+    """
+    Random nested transactions give the same state, original storage and
+    transient storage as the copying implementation.
+    """
+    rng = random.Random(seed)
+    reference = cancun_state
+    optimized = journaled("cancun", reference)
+
+    impls = [
+        (reference, reference.State(), reference.TransientStorage()),
+        (optimized, optimized.State(), optimized.TransientStorage()),
+    ]
+
+    def check() -> None:
+        (ref, ref_state, ref_ts), (opt, opt_state, opt_ts) = impls
+        assert ref_state._main_trie._data == opt_state._main_trie._data
+        assert storage_of(ref_state) == storage_of(opt_state)
+        assert ref_state.created_accounts == opt_state.created_accounts
+        assert {a: dict(t._data) for a, t in ref_ts._tries.items()} == {
+            a: dict(t._data) for a, t in opt_ts._tries.items()
+        }
+        if ref_state._snapshots:
+            for address in ADDRESSES:
+                for key in KEYS:
+                    assert ref.get_storage_original(
+                        ref_state, address, key
+                    ) == opt.get_storage_original(opt_state, address, key)
+
+    for _ in range(10):
+        depth = 0
+        for _ in range(60):
+            action = rng.randrange(6)
+            if action == 0 and depth < 8:
+                for impl, state, ts in impls:
+                    impl.begin_transaction(state, ts)
+                depth += 1
+            elif action == 1 and depth > 0:
+                for impl, state, ts in impls:
+                    impl.commit_transaction(state, ts)
+                depth -= 1
+            elif action == 2 and depth > 0:
+                for impl, state, ts in impls:
+                    impl.rollback_transaction(state, ts)
+                depth -= 1
+            else:
+                _, operation = random_operation(rng)
+                for impl, state, ts in impls:
+                    operation(impl, state, ts)
+            check()
+
+        while depth > 0:
+            for impl, state, ts in impls:
+                impl.rollback_transaction(state, ts)
+            depth -= 1
+            check()
+
+        assert not impls[1][1]._journal
+        assert reference.state_root(impls[0][1]) == optimized.state_root(
+            impls[1][1]
+        )
+
+
+def test_no_transient_storage_fork() -> None:
+    """Forks without transient storage take only the state."""
+    optimized = journaled("frontier", frontier_state)
+    state = optimized.State()
+    address = ADDRESSES[0]
+    account = frontier_state.EMPTY_ACCOUNT
+
+    optimized.set_account(state, address, account)
+    optimized.set_storage(state, address, KEYS[1], U256(7))
+    root_before = optimized.state_root(state)
+
+    optimized.begin_transaction(state)
+    optimized.set_storage(state, address, KEYS[1], U256(8))
+    optimized.destroy_storage(state, address)
+    optimized.set_account(state, address, None)
+    optimized.rollback_transaction(state)
+
+    assert optimized.get_storage(state, address, KEYS[1]) == U256(7)
+    assert optimized.state_root(state) == root_before
+    assert "get_storage_original" not in get_journaled_state_patches(
+        "frontier"
+    )
+
+
+def test_rollback_is_proportional_to_writes() -> None:
+    """
+    Opening and rolling back a transaction doesn't touch untouched accounts.
+    """
+    optimized = journaled("cancun", cancun_state)
+    state = optimized.State()
+    transient_storage = optimized.TransientStorage()
+    account = Account(nonce=Uint(1), balance=U256(1), code=b"")
+
+    for i in range(1000):
+        address = i.to_bytes(20, "big")
+        optimized.set_account(state, address, account)
+        optimized.set_storage(state, address, KEYS[1], U256(i + 1))
+
+    storage_tries = dict(state._storage_tries)
+
+    optimized.begin_transaction(state, transient_storage)
+    optimized.begin_transaction(state, transient_storage)
+    optimized.set_storage(state, (0).to_bytes(20, "big"), KEYS[0], U256(1))
+    assert len(state._journal) == 1
+    optimized.rollback_transaction(state, transient_storage)
+    optimized.commit_transaction(state, transient_storage)
+
+    assert not state._journal
+    assert all(
+        state._storage_tries[address] is trie
+        for address, trie in storage_tries.items()
+    )
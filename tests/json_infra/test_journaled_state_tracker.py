@@ -0,0 +1,145 @@
+"""Tests for the journaled EIP-7928 state tracker."""
+
+import random
+from typing import Any, List, Tuple, cast
+
+import pytest
+from ethereum_types.numeric import U64, U256
+
+import ethereum.forks.amsterdam.state_tracker as reference
+from ethereum.forks.amsterdam.block_access_lists import (
+    build_block_access_list,
+)
+from ethereum_optimized.state_tracker import (
+    get_block_access_list_builder_patches,
+    get_state_tracker_patches,
+)
+
+
+class JournaledStateTracker:
+    """Placeholder for the journaled state tracker module."""
+
+    pass
+
+
+def journaled_state_tracker() -> Any:
+    """Build a module-like object holding the journaled state tracker."""
+    module = cast(Any, JournaledStateTracker())
+    for name, value in get_state_tracker_patches("amsterdam").items():
+        setattr(module, name, value)
+    for name, value in get_block_access_list_builder_patches(
+        "amsterdam"
+    ).items():
+        setattr(module, name, value)
+    return module
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_reference(seed: int) -> None:
+    """
+    Random accesses, in nested frames that succeed or fail, give the same
+    block access list as the reference.
+    """
+    rng = random.Random(seed)
+    optimized = journaled_state_tracker()
+    addresses = [rng.randbytes(20) for _ in range(8)]
+    keys = [rng.randbytes(32) for _ in range(6)]
+    codes = [b"", b"\x00", b"\x60\x00"]
+
+    impls = [reference, optimized]
+    blocks = [impl.StateChanges() for impl in impls]
+
+    def write(frames: List[Any], tx_frames: List[Any]) -> None:
+        """Make the same random write in each implementation."""
+        address = rng.choice(addresses)
+        key = rng.choice(keys)
+        action = rng.randrange(4)
+        value = rng.randrange(3)
+        for impl, frame, tx_frame in zip(
+            impls, frames, tx_frames, strict=True
+        ):
+            impl.track_address(frame, address)
+            if action == 0:
+                impl.capture_pre_storage(tx_frame, address, key, U256(1))
+                impl.track_storage_write(frame, address, key, U256(value))
+            elif action == 1:
+                impl.capture_pre_balance(tx_frame, address, U256(1))
+                impl.track_balance_change(frame, address, U256(value))
+            elif action == 2:
+                impl.track_nonce_change(frame, address, U64(value))
+            else:
+                impl.capture_pre_code(tx_frame, address, codes[1])
+                impl.track_code_change(frame, address, codes[value])
+
+    def read(frames: List[Any]) -> None:
+        """Make the same random read in each implementation."""
+        address = rng.choice(addresses)
+        key = rng.choice(keys)
+        for impl, frame in zip(impls, frames, strict=True):
+            impl.track_address(frame, address)
+            impl.track_storage_read(frame, address, key)
+
+    for _ in range(6):
+        for impl, block in zip(impls, blocks, strict=True):
+            impl.increment_block_access_index(block)
+        tx_frames = [
+            impl.create_child_frame(block)
+            for impl, block in zip(impls, blocks, strict=True)
+        ]
+
+        # Each entry holds one frame per implementation.
+        stack: List[Tuple[Any, ...]] = [tuple(tx_frames)]
+        for _ in range(60):
+            action = rng.randrange(8)
+            if action == 0 and len(stack) < 5:
+                stack.append(
+                    tuple(
+                        impl.create_child_frame(frame)
+                        for impl, frame in zip(impls, stack[-1], strict=True)
+                    )
+                )
+            elif action in (1, 2) and len(stack) > 1:
+                children = stack.pop()
+                merge = (
+                    "merge_on_success" if action == 1 else "merge_on_failure"
+                )
+                # Frames may be merged again as their call returns.
+                for _ in range(rng.randrange(1, 3)):
+                    for impl, child in zip(impls, children, strict=True):
+                        getattr(impl, merge)(child)
+            elif action == 3:
+                read(list(stack[-1]))
+            elif action == 4:
+                # Write to an outer frame while inner frames are running.
+                write(list(rng.choice(stack)), tx_frames)
+            else:
+                write(list(stack[-1]), tx_frames)
+
+        while len(stack) > 1:
+            for impl, child in zip(impls, stack.pop(), strict=True):
+                impl.merge_on_success(child)
+
+        if rng.randrange(4) == 0:
+            # Rejected transactions are never committed.
+            continue
+
+        if rng.randrange(2) == 0:
+            address = rng.choice(addresses)
+            pre_balance = rng.randrange(2)
+            for impl, tx_frame in zip(impls, tx_frames, strict=True):
+                impl.capture_pre_balance(tx_frame, address, U256(pre_balance))
+                impl.track_selfdestruct(tx_frame, address)
+
+        for impl, tx_frame in zip(impls, tx_frames, strict=True):
+            impl.commit_transaction_frame(tx_frame)
+
+    for impl, block in zip(impls, blocks, strict=True):
+        impl.increment_block_access_index(block)
+    for _ in range(5):
+        write(blocks, blocks)
+    for impl, block in zip(impls, blocks, strict=True):
+        impl.filter_net_zero_frame_changes(block)
+
+    assert optimized.build_block_access_list(
+        blocks[1]
+    ) == build_block_access_list(blocks[0])
@@ -0,0 +1,95 @@
+"""Tests for the cached jump destination analysis."""
+
+import random
+
+import pytest
+from ethereum_types.bytes import Bytes
+from ethereum_types.numeric import U256, Uint
+
+from ethereum.forks.frontier.vm.runtime import (
+    get_valid_jump_destinations as frontier_jump_destinations,
+)
+from ethereum.forks.prague.vm.runtime import get_valid_jump_destinations
+from ethereum_optimized.jumpdest import (
+    JumpDestinationCache,
+    analyse,
+    get_jumpdest_cache_patches,
+)
+
+CODES = [
+    b"",
+    b"\x5b",
+    b"\x00\x5b\x5b",
+    # JUMPDEST hidden in PUSH2 data, then a real one.
+    b"\x61\x5b\x5b\x5b",
+    # PUSH32 running past the end of the code.
+    b"\x7f" + b"\x5b" * 8,
+    # Invalid opcodes and PUSH0.
+    b"\x0c\x5f\x5b\xfe\x5b",
+]
+
+
+@pytest.mark.parametrize("code", CODES)
+def test_analyse(code: bytes) -> None:
+    """Known codes give the same destinations as the reference."""
+    assert set(analyse(code)) == get_valid_jump_destinations(Bytes(code))
+
+
+def test_analyse_random() -> None:
+    """Random codes give the same destinations as the reference."""
+    rng = random.Random(7)
+    for _ in range(200):
+        # Favour JUMPDEST and PUSH-N, so that they overlap often.
+        code = bytes(
+            rng.choice([0x5B, rng.randrange(0x60, 0x80), rng.randrange(256)])
+            for _ in range(rng.randrange(100))
+        )
+        expected = get_valid_jump_destinations(Bytes(code))
+        assert frontier_jump_destinations(Bytes(code)) == expected
+
+        destinations = analyse(code)
+        assert set(destinations) == expected
+        assert len(destinations) == len(expected)
+        for pc in range(len(code) + 9):
+            assert (Uint(pc) in destinations) == (Uint(pc) in expected)
+
+
+def test_membership() -> None:
+    """Out of range and non-integer destinations are not valid."""
+    destinations = analyse(b"\x5b")
+    assert Uint(0) in destinations
+    assert U256(0) in destinations
+    assert Uint(8) not in destinations
+    assert U256(2**255) not in destinations
+    assert "0" not in destinations
+
+
+def test_cache() -> None:
+    """
+    The cache counts hits and misses, and evicts the least recently used
+    analyses once their codes add up to more than `max_bytes`.
+    """
+    cache = JumpDestinationCache(max_bytes=5)
+    patches = get_jumpdest_cache_patches("prague", cache)
+    get = patches["get_valid_jump_destinations"]
+
+    first = get(Bytes(b"\x5b"))
+    assert get(Bytes(b"\x5b")) is first
+    get(Bytes(b"\x00\x5b"))
+    get(Bytes(b"\x5b"))
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    # Evicts b"\x00\x5b", which was used least recently.
+    get(Bytes(b"\x00\x00\x5b"))
+    assert len(cache) == 2
+    assert get(Bytes(b"\x5b")) is first
+    get(Bytes(b"\x00\x5b"))
+    assert (cache.hits, cache.misses) == (3, 4)
+
+    # Codes longer than `max_bytes` aren't kept at all.
+    get(Bytes(b"\x00" * 5 + b"\x5b"))
+    get(Bytes(b"\x00" * 5 + b"\x5b"))
+    assert (len(cache), cache.misses) == (2, 6)
+
+    cache.clear()
+    assert (len(cache), cache.hits, cache.misses) == (0, 0, 0)
@@ -0,0 +1,69 @@
+"""Tests for the precomputed KZG verification."""
+
+import random
+from typing import Any
+
+import pytest
+from ethereum_types.bytes import Bytes32, Bytes48
+from py_ecc.bls.g2_primitives import G1_to_pubkey
+from py_ecc.optimized_bls12_381 import Z1, Z2, eq, multiply
+from py_ecc.optimized_bls12_381.optimized_curve import G1, G2
+
+import ethereum.crypto.kzg as kzg
+from ethereum_optimized.kzg import (
+    FixedBaseTable,
+    VerificationCache,
+    get_kzg_patches,
+)
+
+
+@pytest.mark.parametrize("point, zero", [(G1, Z1), (G2, Z2)])
+def test_fixed_base_table(point: Any, zero: Any) -> None:
+    """Table multiplication agrees with double-and-add."""
+    rng = random.Random(0)
+    table = FixedBaseTable(point, zero)
+    scalars = [0, 1, 15, 16, 2**255 + 3, int(kzg.BLS_MODULUS) - 1]
+    scalars += [rng.randrange(int(kzg.BLS_MODULUS)) for _ in range(3)]
+    for scalar in scalars:
+        assert eq(table.multiply(scalar), multiply(point, scalar))
+
+
+def test_verify_kzg_proof() -> None:
+    """
+    Proofs give the same results as the reference, and each result is only
+    computed once.
+    """
+    cache = VerificationCache(max_entries=2)
+    verify_kzg_proof = get_kzg_patches(cache)["verify_kzg_proof"]
+
+    # The constant polynomial 7 evaluates to 7 everywhere, with an empty
+    # proof.
+    commitment = Bytes48(G1_to_pubkey(multiply(G1, 7)))
+    empty_proof = Bytes48(kzg.G1_POINT_AT_INFINITY)
+    other_proof = Bytes48(G1_to_pubkey(multiply(G1, 3)))
+    z = Bytes32((12345).to_bytes(32, "big"))
+    seven = Bytes32((7).to_bytes(32, "big"))
+    eight = Bytes32((8).to_bytes(32, "big"))
+
+    cases = [
+        (commitment, z, seven, empty_proof),
+        (commitment, z, eight, empty_proof),
+        (commitment, z, seven, other_proof),
+    ]
+    for case in cases:
+        expected = kzg.verify_kzg_proof(*case)
+        assert verify_kzg_proof(*case) == expected
+        assert verify_kzg_proof(*case) == expected
+    assert [kzg.verify_kzg_proof(*case) for case in cases] == [
+        True,
+        False,
+        False,
+    ]
+    assert (cache.hits, cache.misses, len(cache)) == (3, 3, 2)
+
+    # Invalid inputs raise every time.
+    out_of_range = Bytes32(bytes([0xFF] * 32))
+    for _ in range(2):
+        with pytest.raises(AssertionError):
+            verify_kzg_proof(commitment, out_of_range, seven, other_proof)
+    assert len(cache) == 2
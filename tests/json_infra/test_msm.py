@@ -0,0 +1,118 @@
+"""Tests for the Pippenger multi-scalar multiplication."""
+
+import random
+from types import SimpleNamespace
+from typing import Any, Callable, List, Tuple
+
+import pytest
+from ethereum_types.numeric import Uint
+from py_ecc.optimized_bls12_381 import (
+    G1,
+    G2,
+    Z1,
+    Z2,
+    add,
+    curve_order,
+    multiply,
+    normalize,
+)
+
+from ethereum.forks.osaka.vm.precompiled_contracts.bls12_381 import (
+    bls12_381_g1,
+    bls12_381_g2,
+    g1_to_bytes,
+    g2_to_bytes,
+)
+from ethereum_optimized.msm import (
+    get_bls12_g1_msm_patches,
+    get_bls12_g2_msm_patches,
+    msm,
+    window_bits,
+)
+
+
+def naive_msm(pairs: List[Tuple[Any, int]], zero: Any) -> Any:
+    """Multiply each point separately, as the reference does."""
+    result = zero
+    for point, scalar in pairs:
+        result = add(result, multiply(point, scalar))
+    return result
+
+
+def test_window_bits() -> None:
+    """Windows grow with the number of points."""
+    sizes = [window_bits(k, 256) for k in (1, 2, 16, 128, 4096)]
+    assert sizes == sorted(sizes)
+    assert sizes[0] < sizes[-1]
+
+
+@pytest.mark.parametrize("generator, zero", [(G1, Z1), (G2, Z2)])
+@pytest.mark.parametrize("count", [0, 1, 2, 5, 40])
+def test_msm(generator: Any, zero: Any, count: int) -> None:
+    """The sum matches multiplying each point separately."""
+    rng = random.Random(count)
+    pairs = [
+        (
+            multiply(generator, rng.randrange(1, curve_order)),
+            rng.randrange(2**256),
+        )
+        for _ in range(count)
+    ]
+    if count > 2:
+        # Zero and small scalars, repeated points, and infinity.
+        pairs[0] = (pairs[0][0], 0)
+        pairs[1] = (pairs[2][0], 1)
+        pairs.append((zero, 12345))
+    assert normalize(msm(pairs, zero)) == normalize(naive_msm(pairs, zero))
+
+
+def run_precompile(precompile: Callable[[Any], None], data: bytes) -> Any:
+    """Run `precompile`, returning its output and gas, or exception type."""
+    evm = SimpleNamespace(
+        message=SimpleNamespace(data=data),
+        gas_left=Uint(10_000_000),
+        output=b"",
+    )
+    try:
+        precompile(evm)
+    except Exception as e:
+        return type(e)
+    return evm.output, evm.gas_left
+
+
+@pytest.mark.parametrize(
+    "module, get_patches, generator, to_bytes",
+    [
+        (bls12_381_g1, get_bls12_g1_msm_patches, G1, g1_to_bytes),
+        (bls12_381_g2, get_bls12_g2_msm_patches, G2, g2_to_bytes),
+    ],
+)
+def test_msm_precompile(
+    module: Any,
+    get_patches: Callable[[str], Any],
+    generator: Any,
+    to_bytes: Callable[[Any], bytes],
+) -> None:
+    """The patched precompiles behave exactly like the reference."""
+    name = "bls12_g1_msm" if generator is G1 else "bls12_g2_msm"
+    reference = getattr(module, name)
+    patched = get_patches("osaka")[name]
+
+    rng = random.Random(0)
+    data = b"".join(
+        to_bytes(multiply(generator, rng.randrange(1, curve_order)))
+        + rng.randrange(2**256).to_bytes(32, "big")
+        for _ in range(3)
+    )
+    cancelling = (
+        to_bytes(generator)
+        + (1).to_bytes(32, "big")
+        + to_bytes(generator)
+        + (curve_order - 1).to_bytes(32, "big")
+    )
+    for case in (b"", data, data[: module.LENGTH_PER_PAIR], data[:-1]):
+        expected = run_precompile(reference, case)
+        assert run_precompile(patched, case) == expected
+    assert run_precompile(patched, cancelling) == run_precompile(
+        reference, cancelling
+    )
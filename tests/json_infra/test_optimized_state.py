@@ -1,43 +1,44 @@
 """Tests for the optimized state implementation."""
 
-import sys
 from typing import Any, cast
 
 import pytest
 from ethereum_types.numeric import U256
 
 import ethereum.forks.frontier.state as state
+import ethereum_optimized.state_db as state_db
 from ethereum.forks.frontier.fork_types import EMPTY_ACCOUNT
 from ethereum.forks.tangerine_whistle.utils.hexadecimal import hex_to_address
 
-try:
-    import ethereum_optimized.state_db as state_db
-
-    class OptimizedState:
-        """Placeholder for the optimized state class."""
-
-        pass
+ADDRESS_FOO = hex_to_address("0x00000000219ab540356cbb839cbe05303d7705fa")
+STORAGE_FOO = U256(101).to_be_bytes32()
 
-    optimized_state = cast(Any, OptimizedState())
 
-    for name, value in state_db.get_optimized_state_patches(
-        "frontier"
-    ).items():
-        setattr(optimized_state, name, value)
+class OptimizedState:
+    """Placeholder for the optimized state class."""
 
-except ImportError:
     pass
 
 
-ADDRESS_FOO = hex_to_address("0x00000000219ab540356cbb839cbe05303d7705fa")
-STORAGE_FOO = U256(101).to_be_bytes32()
+@pytest.fixture(params=state_db.BACKENDS)
+def optimized_state(request: pytest.FixtureRequest) -> Any:
+    """The optimized state patches, for each backend."""
+    try:
+        patches = state_db.get_optimized_state_patches(
+            "frontier", request.param
+        )
+    except ImportError:
+        pytest.skip(
+            "missing dependency (use `pip install 'ethereum[optimized]'`)"
+        )
+
+    optimized_state = cast(Any, OptimizedState())
+    for name, value in patches.items():
+        setattr(optimized_state, name, value)
+    return optimized_state
 
 
-@pytest.mark.skipif(
-    "ethereum_optimized.state_db" not in sys.modules,
-    reason="missing dependency (use `pip install 'ethereum[optimized]'`)",
-)
-def test_storage_key() -> None:
+def test_storage_key(optimized_state: Any) -> None:
     """
     Tests that optimized state storage operations match the normal
     implementation.
@@ -60,11 +61,7 @@ def test_storage_key() -> None:
     )
 
 
-@pytest.mark.skipif(
-    "ethereum_optimized.state_db" not in sys.modules,
-    reason="missing dependency (use `pip install 'ethereum[optimized]'`)",
-)
-def test_resurrection() -> None:
+def test_resurrection(optimized_state: Any) -> None:
     """Tests that optimized state handles storage resurrection correctly."""
 
     def actions(impl: Any) -> Any:
@@ -0,0 +1,166 @@
+"""Tests for the multi-pairing engine."""
+
+import random
+from types import SimpleNamespace
+from typing import Any, Callable, List, Tuple
+
+import py_ecc.optimized_bls12_381 as bls12_381
+import py_ecc.optimized_bn128 as bn128
+import pytest
+from ethereum_types.numeric import Uint
+
+from ethereum.forks.osaka.vm.exceptions import (
+    InvalidParameter,
+    OutOfGasError,
+)
+from ethereum.forks.osaka.vm.precompiled_contracts import alt_bn128
+from ethereum.forks.osaka.vm.precompiled_contracts.bls12_381 import (
+    bls12_381_pairing,
+    g1_to_bytes,
+    g2_to_bytes,
+)
+from ethereum_optimized.pairing import (
+    PairingEngine,
+    get_alt_bn128_patches,
+    get_bls12_381,
+    get_bls12_pairing_patches,
+    get_bn254,
+)
+
+CURVES = [(bn128, get_bn254), (bls12_381, get_bls12_381)]
+
+
+def random_pairs(curve: Any, count: int, seed: int) -> List[Tuple[Any, Any]]:
+    """Make `count` pairs of random multiples of the generators."""
+    rng = random.Random(seed)
+    return [
+        (
+            curve.multiply(curve.G2, rng.randrange(1, curve.curve_order)),
+            curve.multiply(curve.G1, rng.randrange(1, curve.curve_order)),
+        )
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("curve, get_engine", CURVES)
+def test_pairing_product(
+    curve: Any, get_engine: Callable[[], PairingEngine]
+) -> None:
+    """Products of pairings are identical to the `py_ecc` ones."""
+    engine = get_engine()
+    pairs = random_pairs(curve, 3, 0)
+    pairs.append((curve.Z2, curve.G1))
+    pairs.append((curve.G2, curve.Z1))
+
+    expected = curve.FQ12.one()
+    for q, p in pairs:
+        expected *= curve.pairing(q, p, final_exponentiate=False)
+    assert engine.pairing_product(pairs) == curve.final_exponentiate(expected)
+
+    # A second time, with the lines of the G2 points remembered.
+    assert engine.pairing_product(pairs[:1]) == curve.final_exponentiate(
+        curve.pairing(*pairs[0], final_exponentiate=False)
+    )
+
+
+@pytest.mark.parametrize("curve, get_engine", CURVES)
+def test_pairing_check(
+    curve: Any, get_engine: Callable[[], PairingEngine]
+) -> None:
+    """The pairing check recognizes bilinearity."""
+    engine = get_engine()
+    a, b = 1234567, 7654321
+    q = curve.multiply(curve.G2, a)
+    p = curve.multiply(curve.G1, b)
+    ab = curve.multiply(curve.G1, a * b)
+
+    assert engine.pairing_check([])
+    assert engine.pairing_check([(q, p), (curve.neg(curve.G2), ab)])
+    assert engine.pairing_check([(q, p), (curve.G2, curve.neg(ab))])
+    assert not engine.pairing_check([(q, p), (curve.G2, ab)])
+    assert not engine.pairing_check([(q, p)])
+
+
+def make_evm(data: bytes) -> Any:
+    """Make just enough of an `Evm` to run a precompile."""
+    return SimpleNamespace(
+        message=SimpleNamespace(data=data),
+        gas_left=Uint(10_000_000),
+        output=b"",
+    )
+
+
+def run_precompile(precompile: Callable[[Any], None], data: bytes) -> Any:
+    """Run `precompile`, returning its output and gas, or exception type."""
+    evm = make_evm(data)
+    try:
+        precompile(evm)
+    except Exception as e:
+        return type(e)
+    return evm.output, evm.gas_left
+
+
+def bn128_to_bytes(q: Any, p: Any) -> bytes:
+    """Encode a pair of points as input to the `alt_bn128` pairing."""
+    x, y = bn128.normalize(p)
+    (qx0, qx1), (qy0, qy1) = (c.coeffs for c in bn128.normalize(q))
+    return b"".join(
+        int(n).to_bytes(32, "big") for n in (x, y, qx1, qx0, qy1, qy0)
+    )
+
+
+def run_patched(
+    monkeypatch: pytest.MonkeyPatch,
+    module: Any,
+    patches: Any,
+    precompile: Callable[[Any], None],
+    inputs: List[bytes],
+) -> List[Any]:
+    """
+    Run `precompile` on each of `inputs` before and after patching `module`,
+    returning the results of the patched runs after checking they match.
+    """
+    expected = [run_precompile(precompile, data) for data in inputs]
+    for name, value in patches.items():
+        monkeypatch.setattr(module, name, value)
+    results = [run_precompile(precompile, data) for data in inputs]
+    assert results == expected
+    return results
+
+
+def test_alt_bn128_pairing_check(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The patched precompile behaves exactly like the reference."""
+    q, p = random_pairs(bn128, 1, 1)[0]
+    valid = bn128_to_bytes(q, p) + bn128_to_bytes(bn128.neg(q), p)
+    invalid_point = bytes(64) + b"\x01" * 128
+    results = run_patched(
+        monkeypatch,
+        alt_bn128,
+        get_alt_bn128_patches("osaka"),
+        alt_bn128.alt_bn128_pairing_check,
+        [b"", valid, bn128_to_bytes(q, p), valid[:-1], invalid_point],
+    )
+    assert results[1][0] == (1).to_bytes(32, "big")
+    assert results[2][0] == bytes(32)
+    assert results[3] is OutOfGasError
+
+
+def test_bls12_pairing(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The patched precompile behaves exactly like the reference."""
+    q, p = random_pairs(bls12_381, 1, 2)[0]
+    valid = (
+        g1_to_bytes(p)
+        + g2_to_bytes(q)
+        + g1_to_bytes(bls12_381.neg(p))
+        + g2_to_bytes(q)
+    )
+    results = run_patched(
+        monkeypatch,
+        bls12_381_pairing,
+        get_bls12_pairing_patches("osaka"),
+        bls12_381_pairing.bls12_pairing,
+        [b"", valid, valid[:384], valid[:-1]],
+    )
+    assert results[1][0] == (1).to_bytes(32, "big")
+    assert results[2][0] == bytes(32)
+    assert results[3] is InvalidParameter
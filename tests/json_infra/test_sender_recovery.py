@@ -0,0 +1,246 @@
+"""Tests for recovering transaction senders in parallel."""
+
+import threading
+from dataclasses import replace
+from typing import Any, List, Tuple
+
+import pytest
+from ethereum_rlp import rlp
+from ethereum_types.bytes import Bytes, Bytes0
+from ethereum_types.numeric import U8, U64, U256, Uint
+
+import ethereum.forks.frontier.fork as frontier_fork
+import ethereum.forks.frontier.transactions as frontier_transactions
+import ethereum.forks.prague.fork as prague_fork
+import ethereum.forks.prague.transactions as prague_transactions
+import ethereum.forks.prague.vm.eoa_delegation as prague_delegation
+from ethereum.crypto.hash import keccak256
+from ethereum.exceptions import InvalidSignatureError
+from ethereum.forks.prague.fork_types import Authorization
+from ethereum_optimized.sender_recovery import (
+    SenderRecovery,
+    get_authority_recovery_patches,
+    get_sender_recovery_patches,
+)
+from ethereum_spec_tools.evm_tools.utils import secp256k1_sign
+
+CHAIN_ID = U64(1)
+SECRET_KEY = 0x45A915E4D060149EB4365960E6A7A45F334393093061116B197E3240065FF2D8
+
+
+class BlockEnvironment:
+    """Just enough of a block environment for recovery."""
+
+    chain_id = CHAIN_ID
+
+
+def sign_legacy(nonce: int) -> prague_transactions.LegacyTransaction:
+    """Sign a legacy transaction with a pre-EIP-155 signature."""
+    tx = prague_transactions.LegacyTransaction(
+        nonce=U256(nonce),
+        gas_price=Uint(10),
+        gas=Uint(21000),
+        to=Bytes0(),
+        value=U256(0),
+        data=Bytes(),
+        v=U256(0),
+        r=U256(0),
+        s=U256(0),
+    )
+    r, s, y = secp256k1_sign(
+        prague_transactions.signing_hash_pre155(tx), SECRET_KEY
+    )
+    return replace(tx, v=U256(27) + y, r=r, s=s)
+
+
+def sign_authorization(nonce: int) -> Authorization:
+    """Sign an EIP-7702 authorization."""
+    authorization = Authorization(
+        chain_id=U256(CHAIN_ID),
+        address=prague_delegation.NULL_ADDRESS,
+        nonce=U64(nonce),
+        y_parity=U8(0),
+        r=U256(0),
+        s=U256(0),
+    )
+    signing_hash = keccak256(
+        prague_delegation.SET_CODE_TX_MAGIC
+        + rlp.encode(
+            (
+                authorization.chain_id,
+                authorization.address,
+                authorization.nonce,
+            )
+        )
+    )
+    r, s, y = secp256k1_sign(signing_hash, SECRET_KEY)
+    return replace(authorization, y_parity=U8(y), r=r, s=s)
+
+
+def recovered(patches: Any, transactions: Tuple[Any, ...]) -> List[Any]:
+    """
+    Recover every sender inside `prefetch_senders()`, recording the exception
+    type and message on failure.
+    """
+    results: List[Any] = []
+    with patches["prefetch_senders"](
+        BlockEnvironment(), transactions
+    ) as prefetched:
+        for tx in prefetched:
+            try:
+                results.append(patches["recover_sender"](CHAIN_ID, tx))
+            except InvalidSignatureError as e:
+                results.append((type(e), str(e)))
+    return results
+
+
+def test_matches_reference() -> None:
+    """Senders, and failures, match the inline recovery."""
+    recovery = SenderRecovery(max_workers=4)
+    patches = get_sender_recovery_patches("prague", recovery)
+
+    transactions: List[Any] = [sign_legacy(i) for i in range(20)]
+    transactions[3] = replace(transactions[3], s=U256(0))
+    transactions[7] = replace(transactions[7], v=U256(99))
+    transactions[11] = replace(transactions[11], r=U256(5))
+
+    expected: List[Any] = []
+    for tx in transactions:
+        try:
+            expected.append(prague_fork.recover_sender(CHAIN_ID, tx))
+        except InvalidSignatureError as e:
+            expected.append((type(e), str(e)))
+
+    assert recovered(patches, tuple(transactions)) == expected
+    assert not recovery._senders
+
+
+def test_recovered_in_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Prefetched senders are recovered by the pool, not inline."""
+    recovery = SenderRecovery(max_workers=2)
+    threads: List[str] = []
+    slow_recover_sender = prague_fork.recover_sender
+
+    def recover_sender(chain_id: U64, tx: Any) -> Any:
+        threads.append(threading.current_thread().name)
+        return slow_recover_sender(chain_id, tx)
+
+    monkeypatch.setattr(prague_fork, "recover_sender", recover_sender)
+    patches = get_sender_recovery_patches("prague", recovery)
+
+    tx = sign_legacy(0)
+    recovered(patches, (tx, sign_legacy(1)))
+    assert len(threads) == 2
+    assert all(name.startswith("sender-recovery") for name in threads)
+
+    # Not prefetched, or prefetched for another chain. The pool may still be
+    # recovering the prefetched sender when the block is done with it.
+    del threads[:]
+    patches["recover_sender"](CHAIN_ID, tx)
+    with patches["prefetch_senders"](BlockEnvironment(), (tx,)):
+        patches["recover_sender"](U64(5), tx)
+    main = threading.current_thread().name
+    assert [name for name in threads if name == main] == [main] * 2
+
+
+def test_unused_recoveries_cancelled(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Recoveries which haven't started when the block is done are cancelled.
+    """
+    recovery = SenderRecovery(max_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+    slow_recover_sender = prague_fork.recover_sender
+
+    def recover_sender(chain_id: U64, tx: Any) -> Any:
+        started.set()
+        release.wait()
+        return slow_recover_sender(chain_id, tx)
+
+    monkeypatch.setattr(prague_fork, "recover_sender", recover_sender)
+    patches = get_sender_recovery_patches("prague", recovery)
+
+    transactions = tuple(sign_legacy(i) for i in range(4))
+    with patches["prefetch_senders"](BlockEnvironment(), transactions):
+        futures: List[Any] = [
+            recovery.sender((CHAIN_ID, tx)) for tx in transactions
+        ]
+        started.wait()
+    release.set()
+
+    assert not futures[0].cancelled()
+    assert all(future.cancelled() for future in futures[1:])
+    assert futures[0].result() == slow_recover_sender(
+        CHAIN_ID, transactions[0]
+    )
+
+
+def test_undecodable_transaction() -> None:
+    """
+    Decoding stops at an invalid transaction, which is left to fail where it
+    did before.
+    """
+    patches = get_sender_recovery_patches("prague", SenderRecovery())
+    tx = sign_legacy(0)
+    invalid = Bytes(b"\x09\xc0")
+
+    with patches["prefetch_senders"](
+        BlockEnvironment(), (tx, invalid, tx)
+    ) as prefetched:
+        assert prefetched == (tx, invalid, tx)
+        assert prefetched[0] is tx
+
+
+def test_authorities() -> None:
+    """Authorities of set code transactions are recovered too."""
+    recovery = SenderRecovery()
+    patches = get_sender_recovery_patches("prague", recovery)
+    authority_patches = get_authority_recovery_patches("prague", recovery)
+    good = sign_authorization(0)
+    bad = replace(sign_authorization(1), y_parity=U8(3))
+
+    tx = prague_transactions.SetCodeTransaction(
+        chain_id=CHAIN_ID,
+        nonce=U64(0),
+        max_priority_fee_per_gas=Uint(1),
+        max_fee_per_gas=Uint(10),
+        gas=Uint(100000),
+        to=prague_delegation.NULL_ADDRESS,
+        value=U256(0),
+        data=Bytes(),
+        access_list=(),
+        authorizations=(good, bad),
+        y_parity=U256(0),
+        r=U256(1),
+        s=U256(1),
+    )
+    encoded = prague_transactions.encode_transaction(tx)
+
+    with patches["prefetch_senders"](BlockEnvironment(), (encoded,)) as (
+        decoded,
+    ):
+        assert decoded == tx
+        good, bad = decoded.authorizations
+        assert recovery.authority(good) is not None
+        assert authority_patches["recover_authority"](
+            good
+        ) == prague_delegation.recover_authority(good)
+        with pytest.raises(InvalidSignatureError, match="y_parity"):
+            authority_patches["recover_authority"](bad)
+    assert not recovery._authorities
+
+
+def test_frontier() -> None:
+    """Forks before EIP-155 recover without a chain id."""
+    patches = get_sender_recovery_patches("frontier", SenderRecovery())
+    tx = frontier_transactions.Transaction(
+        **{
+            name: getattr(sign_legacy(0), name)
+            for name in frontier_transactions.Transaction.__annotations__
+        }
+    )
+
+    with patches["prefetch_senders"](BlockEnvironment(), (tx,)):
+        assert patches["recover_sender"](tx) == frontier_fork.recover_sender(
+            tx
+        )
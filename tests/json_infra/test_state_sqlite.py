@@ -0,0 +1,177 @@
+"""Tests for the SQLite backend of the optimized state."""
+
+import random
+from pathlib import Path
+from typing import Any, cast
+
+import pytest
+from ethereum_types.numeric import U256, Uint
+
+import ethereum.forks.cancun.state as reference
+from ethereum.forks.cancun.fork_types import Account, Address
+from ethereum_optimized.state_db import get_optimized_state_patches
+from ethereum_optimized.state_sqlite import SqliteDB, path_range
+
+
+class SqliteState:
+    """Placeholder for the optimized state module."""
+
+    pass
+
+
+def sqlite_state() -> Any:
+    """Build a module-like object holding the SQLite backed state."""
+    module = cast(Any, SqliteState())
+    for name, value in get_optimized_state_patches("cancun", "sqlite").items():
+        setattr(module, name, value)
+    return module
+
+
+def random_account(rng: random.Random) -> Account:
+    """Make an account, sometimes with code."""
+    return Account(
+        nonce=Uint(rng.randrange(3)),
+        balance=U256(rng.randrange(2**70)),
+        code=rng.choice([b"", b"\x00", bytes(range(40))]),
+    )
+
+
+def test_path_range() -> None:
+    """Nibble paths map to the range of hashed keys under them."""
+    assert path_range(b"") == (bytes(32), None)
+    assert path_range(b"\x0a") == (
+        b"\xa0" + bytes(31),
+        b"\xb0" + bytes(31),
+    )
+    assert path_range(b"\x0f\x0f") == (b"\xff" + bytes(31), None)
+    assert path_range(b"\x01\x02\x03") == (
+        b"\x12\x30" + bytes(30),
+        b"\x12\x40" + bytes(30),
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_reference(seed: int) -> None:
+    """
+    Random writes, in nested transactions, give the same state and storage
+    roots as the reference.
+    """
+    rng = random.Random(seed)
+    optimized = sqlite_state()
+    addresses = [Address(rng.randbytes(20)) for _ in range(60)]
+    keys = [rng.randbytes(32) for _ in range(30)]
+
+    impls = [
+        (reference, reference.State(), reference.TransientStorage()),
+        (optimized, optimized.State(), reference.TransientStorage()),
+    ]
+
+    for _ in range(8):
+        depth = 0
+        for _ in range(150):
+            address = rng.choice(addresses)
+            action = rng.randrange(10)
+            if action == 0 and depth < 4:
+                for impl, state, ts in impls:
+                    impl.begin_transaction(state, ts)
+                depth += 1
+            elif action == 1 and depth > 0:
+                for impl, state, ts in impls:
+                    impl.commit_transaction(state, ts)
+                depth -= 1
+            elif action == 2 and depth > 0:
+                for impl, state, ts in impls:
+                    impl.rollback_transaction(state, ts)
+                depth -= 1
+            elif action == 3:
+                account = rng.choice([None, random_account(rng)])
+                for impl, state, _ in impls:
+                    if account is None:
+                        impl.destroy_storage(state, address)
+                    impl.set_account(state, address, account)
+            elif action == 4:
+                for impl, state, _ in impls:
+                    impl.destroy_storage(state, address)
+            else:
+                account = random_account(rng)
+                key = rng.choice(keys)
+                value = U256(rng.choice([0, 1, 2**255]))
+                for impl, state, _ in impls:
+                    if impl.get_account_optional(state, address) is None:
+                        impl.set_account(state, address, account)
+                    impl.set_storage(state, address, key, value)
+
+            (_, ref_state, _), (_, opt_state, _) = impls
+            assert reference.get_account_optional(
+                ref_state, address
+            ) == optimized.get_account_optional(opt_state, address)
+
+        while depth > 0:
+            for impl, state, ts in impls:
+                impl.rollback_transaction(state, ts)
+            depth -= 1
+
+        (_, ref_state, _), (_, opt_state, _) = impls
+        for address in addresses[:10]:
+            assert reference.storage_root(
+                ref_state, address
+            ) == optimized.storage_root(opt_state, address)
+        assert reference.state_root(ref_state) == optimized.state_root(
+            opt_state
+        )
+
+
+def test_persisted(tmp_path: Path) -> None:
+    """Committed state and metadata survive reopening the database."""
+    optimized = sqlite_state()
+    path = str(tmp_path / "db")
+    address = b"\x01" * 20
+    key = U256(1).to_be_bytes32()
+
+    with optimized.State(path) as state:
+        optimized.set_account(state, address, random_account(random.Random()))
+        optimized.set_storage(state, address, key, U256(7))
+        optimized.set_metadata(state, b"block_number", b"12")
+        optimized.commit_db_transaction(state)
+        root = optimized.state_root(state)
+
+        optimized.begin_db_transaction(state)
+        optimized.set_storage(state, address, key, U256(8))
+        assert optimized.state_root(state) != root
+        optimized.rollback_db_transaction(state)
+
+    with optimized.State(path) as state:
+        assert optimized.get_metadata(state, b"block_number") == b"12"
+        assert optimized.get_storage(state, address, key) == U256(7)
+        assert optimized.state_root(state) == root
+
+    SqliteDB.delete(path)
+    with optimized.State(path) as state:
+        assert optimized.state_root(state) == reference.state_root(
+            reference.State()
+        )
+
+
+def test_copy(tmp_path: Path) -> None:
+    """A copy includes the commits not yet checkpointed from the log."""
+    optimized = sqlite_state()
+    source = str(tmp_path / "source")
+    destination = str(tmp_path / "destination")
+    address = b"\x01" * 20
+
+    state = optimized.State(source)
+    optimized.set_account(state, address, random_account(random.Random()))
+    optimized.set_metadata(state, b"block_number", b"12")
+    optimized.commit_db_transaction(state)
+    root = optimized.state_root(state)
+    assert (tmp_path / "source" / (SqliteDB.FILE_NAME + "-wal")).exists()
+
+    # The source is still open, so nothing has been checkpointed.
+    SqliteDB.copy(source, destination)
+    with optimized.State(destination) as copied:
+        assert optimized.get_metadata(copied, b"block_number") == b"12"
+        assert optimized.state_root(copied) == root
+    optimized.close_state(state)
+
+    with pytest.raises(FileNotFoundError):
+        SqliteDB.copy(str(tmp_path / "missing"), destination)
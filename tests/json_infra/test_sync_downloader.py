@@ -0,0 +1,239 @@
+"""Tests for the block downloader of `ethereum-spec-sync`."""
+
+import json
+import logging
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Thread
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytest
+from ethereum_rlp import rlp
+from ethereum_types.bytes import Bytes8, Bytes20, Bytes32, Bytes256
+from ethereum_types.numeric import U256, Uint
+
+from ethereum.forks.frontier.blocks import Block, Header
+from ethereum_spec_tools.block_archive import BlockArchive
+from ethereum_spec_tools.forks import Hardfork
+from ethereum_spec_tools.sync import BlockDownloader
+
+CHAIN_LENGTH = 300
+
+
+def make_block(number: int) -> Block:
+    """Make an empty Frontier block."""
+    header = Header(
+        parent_hash=Bytes32(number.to_bytes(32, "big")),
+        ommers_hash=Bytes32(bytes(32)),
+        coinbase=Bytes20(bytes(20)),
+        state_root=Bytes32(bytes(32)),
+        transactions_root=Bytes32(bytes(32)),
+        receipt_root=Bytes32(bytes(32)),
+        bloom=Bytes256(bytes(256)),
+        difficulty=Uint(0x20000),
+        number=Uint(number),
+        gas_limit=Uint(5000),
+        gas_used=Uint(0),
+        timestamp=U256(1000 + number),
+        extra_data=b"",
+        mix_digest=Bytes32(bytes(32)),
+        nonce=Bytes8(bytes(8)),
+    )
+    return Block(header=header, transactions=(), ommers=())
+
+
+def block_json(block: Block) -> Dict[str, Any]:
+    """Describe a block as `eth_getBlockByNumber` does."""
+    header = block.header
+    return {
+        "parentHash": "0x" + header.parent_hash.hex(),
+        "sha3Uncles": "0x" + header.ommers_hash.hex(),
+        "miner": "0x" + header.coinbase.hex(),
+        "stateRoot": "0x" + header.state_root.hex(),
+        "transactionsRoot": "0x" + header.transactions_root.hex(),
+        "receiptsRoot": "0x" + header.receipt_root.hex(),
+        "logsBloom": "0x" + header.bloom.hex(),
+        "difficulty": hex(header.difficulty),
+        "number": hex(header.number),
+        "gasLimit": hex(header.gas_limit),
+        "gasUsed": hex(header.gas_used),
+        "timestamp": hex(header.timestamp),
+        "extraData": "0x",
+        "mixHash": "0x" + header.mix_digest.hex(),
+        "nonce": "0x" + header.nonce.hex(),
+        "transactions": [],
+        "uncles": [],
+    }
+
+
+class Provider(ThreadingHTTPServer):
+    """
+    An RPC provider with `CHAIN_LENGTH` blocks, that only makes `head` of
+    them available through `eth_getBlockByNumber` at first, and a few more
+    each time it is asked for a missing block.
+    """
+
+    daemon_threads = True
+
+    blocks: List[Block]
+    head: int
+    connections: int
+    requests: int
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.blocks = [make_block(number) for number in range(CHAIN_LENGTH)]
+        self.head = CHAIN_LENGTH // 3
+        self.connections = 0
+        self.requests = 0
+
+    def reply(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a single JSON-RPC call."""
+        number = int(call["params"][0], 0)
+        reply: Dict[str, Any] = {"jsonrpc": "2.0", "id": call["id"]}
+
+        if number >= CHAIN_LENGTH:
+            reply["error"] = {"code": -32000, "message": "block not found"}
+        elif call["method"] == "debug_getRawBlock":
+            reply["result"] = "0x" + rlp.encode(self.blocks[number]).hex()
+        elif number > self.head:
+            self.head += 7
+            reply["result"] = None
+        else:
+            reply["result"] = block_json(self.blocks[number])
+
+        return reply
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Answers batches of JSON-RPC calls, after a random delay."""
+
+    protocol_version = "HTTP/1.1"
+    server: Provider
+
+    def setup(self) -> None:
+        """Count the connections."""
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Answer a batch of calls."""
+        length = int(self.headers["Content-Length"])
+        calls = json.loads(self.rfile.read(length))
+        self.server.requests += 1
+
+        # Make later batches likely to be answered before earlier ones.
+        time.sleep(random.uniform(0, 0.02))
+
+        body = json.dumps([self.server.reply(call) for call in calls])
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        """Don't log requests."""
+        pass
+
+
+@pytest.fixture
+def provider() -> Iterator[Provider]:
+    """Run an RPC provider in the background."""
+    server = Provider()
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def download(
+    rpc_url: str, geth: bool, archive: Optional[BlockArchive] = None
+) -> List[Optional[Any]]:
+    """Take blocks from a new downloader until the end of the chain."""
+    downloader = BlockDownloader(
+        Hardfork.discover(),
+        logging.getLogger("test"),
+        rpc_url,
+        geth,
+        Uint(0),
+        U256(0),
+        workers=3,
+        archive=archive,
+    )
+
+    blocks: List[Optional[Any]] = []
+    while True:
+        block = downloader.take_block()
+        blocks.append(block)
+        if block is None:
+            return blocks
+
+
+@pytest.mark.parametrize("geth", [True, False])
+def test_download(
+    provider: Provider, geth: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Blocks are queued in order, followed by `None` at the end of the chain,
+    over one connection per worker.
+    """
+    monkeypatch.setattr(BlockDownloader, "RETRY_DELAY", 0.01)
+
+    blocks = download(f"http://127.0.0.1:{provider.server_address[1]}/", geth)
+
+    assert blocks == provider.blocks[1:] + [None]
+    assert provider.connections <= 3
+    assert provider.requests > 3
+
+
+@pytest.mark.parametrize("geth", [True, False])
+def test_archive(
+    provider: Provider,
+    geth: bool,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Downloaded blocks are archived, and can be replayed without RPC."""
+    monkeypatch.setattr(BlockDownloader, "RETRY_DELAY", 0.01)
+    rpc_url = f"http://127.0.0.1:{provider.server_address[1]}/"
+
+    with BlockArchive(str(tmp_path), writable=True) as archive:
+        assert download(rpc_url, geth, archive) == provider.blocks[1:] + [None]
+        assert archive.first == Uint(1)
+        assert archive.next == Uint(CHAIN_LENGTH)
+
+    provider.shutdown()
+    with BlockArchive(str(tmp_path)) as archive:
+        assert download(rpc_url, geth, archive) == provider.blocks[1:] + [None]
+
+
+def test_adjust_batch_size() -> None:
+    """The batch size follows the latency, within its bounds."""
+    downloader = BlockDownloader.__new__(BlockDownloader)
+    downloader.batch_size = 16
+    downloader.max_batch_size = 64
+    target = BlockDownloader.TARGET_LATENCY
+
+    downloader.adjust_batch_size(16, target / 4)
+    assert downloader.batch_size == 32
+    # Batches claimed before the last change don't change it again.
+    downloader.adjust_batch_size(16, target / 4)
+    assert downloader.batch_size == 32
+    downloader.adjust_batch_size(32, target / 4)
+    downloader.adjust_batch_size(64, target / 4)
+    assert downloader.batch_size == 64
+    downloader.adjust_batch_size(64, target * 0.75)
+    assert downloader.batch_size == 64
+
+    downloader.adjust_batch_size(64, target * 2)
+    assert downloader.batch_size == 32
+    downloader.adjust_batch_size(64, target * 2)
+    assert downloader.batch_size == 32
+    for _ in range(10):
+        downloader.adjust_batch_size(downloader.batch_size, target * 2)
+    assert downloader.batch_size == 1